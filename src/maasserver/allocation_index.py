@@ -0,0 +1,281 @@
+# Copyright 2018 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""In-memory index of the machines that can be allocated.
+
+Allocating a machine filters every available machine by the requested
+constraints, which takes many joins. When enabled with `allocation_index` in
+the region's configuration, each region process keeps a summary of every
+READY machine in memory, refreshed from the Postgres listener, so that the
+candidates for a set of constraints can be found without a query.
+
+The candidates are only a hint: they are filtered again by the database,
+under the allocation lock, before a machine is acquired.
+"""
+
+__all__ = [
+    "allocation_index",
+    "AllocationIndex",
+    "AllocationIndexService",
+    ]
+
+from collections import namedtuple
+from itertools import chain
+import threading
+
+from maasserver.config import RegionConfiguration
+from maasserver.enum import NODE_STATUS
+from maasserver.listener import PostgresListenerService
+from maasserver.models import (
+    Fabric,
+    Machine,
+    ResourcePool,
+    Zone,
+)
+from maasserver.node_constraint_filter_forms import (
+    get_storage_constraints_from_string,
+)
+from maasserver.utils.orm import transactional
+from maasserver.utils.threads import deferToDatabase
+from provisioningserver.logger import LegacyLogger
+from twisted.application.service import Service
+from twisted.internet.defer import inlineCallbacks
+from twisted.internet.threads import deferToThread
+
+
+log = LegacyLogger()
+
+
+# The attributes of a machine that candidates are chosen by.
+AllocationCandidate = namedtuple("AllocationCandidate", (
+    "id", "architecture", "cpu_count", "memory", "tags", "zone_id",
+    "pool_id", "fabric_ids", "disk_sizes", "disk_tags"))
+
+
+def make_candidate(machine):
+    """Return the `AllocationCandidate` for `machine`."""
+    blockdevices = list(machine.blockdevice_set.all())
+    return AllocationCandidate(
+        id=machine.id,
+        architecture=machine.architecture,
+        cpu_count=machine.cpu_count,
+        memory=machine.memory,
+        tags=frozenset(tag.name for tag in machine.tags.all()),
+        zone_id=machine.zone_id,
+        pool_id=machine.pool_id,
+        fabric_ids=frozenset(
+            interface.vlan.fabric_id
+            for interface in machine.interface_set.all()
+            if interface.vlan is not None),
+        disk_sizes=tuple(sorted(
+            (blockdevice.size for blockdevice in blockdevices),
+            reverse=True)),
+        disk_tags=frozenset(chain.from_iterable(
+            blockdevice.tags for blockdevice in blockdevices
+            if blockdevice.tags is not None)))
+
+
+class AllocationIndex:
+    """Summaries of the READY machines, by system_id.
+
+    This is read by the threads handling allocation requests and written by
+    `AllocationIndexService`, so all access to `candidates` is under `lock`.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.candidates = None
+        self.pending = None
+
+    def get_machines(self):
+        machines = Machine.objects.filter(status=NODE_STATUS.READY)
+        return machines.prefetch_related(
+            "tags", "interface_set__vlan", "blockdevice_set")
+
+    def load(self):
+        """Load every READY machine into the index.
+
+        Machines that are refreshed while this is loading are refreshed
+        again once it has loaded.
+        """
+        with self.lock:
+            self.pending = set()
+        candidates = transactional(self._load_candidates)()
+        with self.lock:
+            self.candidates = candidates
+            pending, self.pending = self.pending, None
+        for system_id in pending:
+            self.refresh(system_id)
+
+    def _load_candidates(self):
+        return {
+            machine.system_id: make_candidate(machine)
+            for machine in self.get_machines()
+        }
+
+    def refresh(self, system_id):
+        """Update, add, or remove the machine with `system_id`."""
+        with self.lock:
+            if self.pending is not None:
+                self.pending.add(system_id)
+            if self.candidates is None:
+                return
+        candidate = transactional(self._get_candidate)(system_id)
+        with self.lock:
+            if self.candidates is None:
+                return
+            elif candidate is None:
+                self.candidates.pop(system_id, None)
+            else:
+                self.candidates[system_id] = candidate
+
+    def _get_candidate(self, system_id):
+        machine = self.get_machines().filter(system_id=system_id).first()
+        return None if machine is None else make_candidate(machine)
+
+    def clear(self):
+        """Empty the index; it must be loaded again to be used."""
+        with self.lock:
+            self.candidates = None
+
+    def get_candidate_ids(self, form):
+        """Return the ids of the machines that may match `form`.
+
+        Only the architecture, CPU, memory, tag, zone, pool, fabric and
+        storage constraints are considered; `form` must still be used to
+        filter the candidates. This must be called with database access.
+
+        :param form: A valid `AcquireNodeForm`.
+        :return: A set of machine ids, or `None` if the index isn't loaded.
+        """
+        with self.lock:
+            if self.candidates is None:
+                return None
+            candidates = list(self.candidates.values())
+        predicates = list(self._get_predicates(form))
+        return {
+            candidate.id for candidate in candidates
+            if all(predicate(candidate) for predicate in predicates)
+        }
+
+    def _get_predicates(self, form):
+        """Yield a function for each of `form`'s indexed constraints.
+
+        Each function takes an `AllocationCandidate`, and returns False if it
+        certainly does not match the constraint.
+        """
+        def get(name):
+            return form.cleaned_data.get(form.get_field_name(name))
+
+        def get_ids(model, names):
+            return set(
+                model.objects.filter(name__in=names).values_list(
+                    "id", flat=True))
+
+        arches = get("arch")
+        if arches:
+            arches = set(arches)
+            yield lambda candidate: candidate.architecture in arches
+        cpu_count = get("cpu_count")
+        if cpu_count:
+            yield lambda candidate: (
+                candidate.cpu_count is not None and
+                candidate.cpu_count >= cpu_count)
+        mem = get("mem")
+        if mem:
+            yield lambda candidate: (
+                candidate.memory is not None and candidate.memory >= mem)
+        tags = get("tags")
+        if tags:
+            tags = set(tags)
+            yield lambda candidate: tags.issubset(candidate.tags)
+        not_tags = get("not_tags")
+        if not_tags:
+            yield lambda candidate: candidate.tags.isdisjoint(not_tags)
+        zone = get("zone")
+        if zone:
+            zone_ids = get_ids(Zone, [zone])
+            yield lambda candidate: candidate.zone_id in zone_ids
+        not_in_zone = get("not_in_zone")
+        if not_in_zone:
+            not_zone_ids = get_ids(Zone, not_in_zone)
+            yield lambda candidate: candidate.zone_id not in not_zone_ids
+        pool = get("pool")
+        if pool:
+            pool_ids = get_ids(ResourcePool, [pool])
+            yield lambda candidate: candidate.pool_id in pool_ids
+        not_in_pool = get("not_in_pool")
+        if not_in_pool:
+            not_pool_ids = get_ids(ResourcePool, not_in_pool)
+            yield lambda candidate: candidate.pool_id not in not_pool_ids
+        fabrics = get("fabrics")
+        if fabrics:
+            fabric_ids = get_ids(Fabric, fabrics)
+            yield lambda candidate: not candidate.fabric_ids.isdisjoint(
+                fabric_ids)
+        not_fabrics = get("not_fabrics")
+        if not_fabrics:
+            not_fabric_ids = get_ids(Fabric, not_fabrics)
+            yield lambda candidate: candidate.fabric_ids.isdisjoint(
+                not_fabric_ids)
+        storage = get("storage")
+        constraints = (
+            get_storage_constraints_from_string(storage) if storage else None)
+        if constraints:
+            # Each constraint is matched by a different block device, so the
+            # largest sizes asked for must fit the largest block devices.
+            sizes = sorted((size for _, size, _ in constraints), reverse=True)
+            disk_tags = set(chain.from_iterable(
+                tags for _, _, tags in constraints if tags is not None))
+            yield lambda candidate: (
+                len(candidate.disk_sizes) >= len(sizes) and
+                all(
+                    disk_size >= size
+                    for disk_size, size in zip(candidate.disk_sizes, sizes)
+                ) and
+                disk_tags.issubset(candidate.disk_tags))
+
+
+# The index used by this region process.
+allocation_index = AllocationIndex()
+
+
+def is_allocation_index_enabled():
+    with RegionConfiguration.open() as config:
+        return config.allocation_index
+
+
+class AllocationIndexService(Service):
+    """Loads `allocation_index` and keeps it up to date, when enabled."""
+
+    def __init__(
+            self, postgresListener: PostgresListenerService=None,
+            index: AllocationIndex=allocation_index):
+        super().__init__()
+        self.listener = postgresListener
+        self.index = index
+        self.registered = False
+
+    @inlineCallbacks
+    def startService(self):
+        super().startService()
+        enabled = yield deferToThread(is_allocation_index_enabled)
+        if enabled:
+            if self.listener is not None:
+                self.listener.register("machine", self.consumeMachineEvent)
+                self.registered = True
+            yield deferToDatabase(self.index.load)
+            log.msg(
+                "Allocation index loaded with {count} machine(s).",
+                count=len(self.index.candidates))
+
+    def stopService(self):
+        if self.registered:
+            self.listener.unregister("machine", self.consumeMachineEvent)
+            self.registered = False
+        self.index.clear()
+        return super().stopService()
+
+    def consumeMachineEvent(self, action, system_id):
+        """Refresh the machine with `system_id`, for any action."""
+        return deferToDatabase(self.index.refresh, system_id)
@@ -24,6 +24,7 @@ from formencode.validators import (
     StringBool,
 )
 from maasserver import locks
+from maasserver.allocation_index import allocation_index
 from maasserver.api.interfaces import DISPLAYED_INTERFACE_FIELDS
 from maasserver.api.logger import maaslog
 from maasserver.api.nodes import (
@@ -264,6 +265,54 @@ def get_allocated_composed_machine(
     return machine, storage
 
 
+def get_unavailable_message(form, input_constraints):
+    """Return why no machine could be allocated for `form`."""
+    constraints = form.describe_constraints()
+    if constraints == '':
+        # No constraints. That means no machines at all were available.
+        return "No machine available."
+    else:
+        return (
+            'No available machine matches constraints: %s '
+            '(resolved to "%s")' % (str(input_constraints), constraints))
+
+
+def set_constraints_by_type(machine, storage, interfaces, verbose=False):
+    """Set `constraint_map` and `constraints_by_type` on an allocated machine.
+
+    :param storage: The storage constraint map returned by `filter_nodes`.
+    :param interfaces: The interfaces constraint map returned by
+        `filter_nodes`.
+    """
+    machine.constraint_map = storage.get(machine.id, {})
+    machine.constraints_by_type = {}
+    # Need to get the interface constraints map into the proper format
+    # to return it here.
+    # Backward compatibility: provide the storage constraints in both
+    # formats.
+    if len(machine.constraint_map) > 0:
+        machine.constraints_by_type['storage'] = {}
+        new_storage = machine.constraints_by_type['storage']
+        # Convert this to the "new style" constraints map format.
+        for storage_key in machine.constraint_map:
+            # Each key in the storage map is actually a value which
+            # contains the ID of the matching storage device.
+            # Convert this to a label: list-of-matches format, to
+            # match how the constraints will be done going forward.
+            new_key = machine.constraint_map[storage_key]
+            matches = new_storage.get(new_key, [])
+            matches.append(storage_key)
+            new_storage[new_key] = matches
+    if len(interfaces) > 0:
+        machine.constraints_by_type['interfaces'] = {
+            label: interfaces.get(label, {}).get(machine.id)
+            for label in interfaces
+        }
+    if verbose:
+        machine.constraints_by_type['verbose_storage'] = storage
+        machine.constraints_by_type['verbose_interfaces'] = interfaces
+
+
 class MachineHandler(NodeHandler, OwnerDataMixin, PowerMixin):
     """Manage an individual Machine.
 
@@ -1619,6 +1668,11 @@ class MachinesHandler(NodesHandler, PowersMixin):
             constraint will be prefixed by `verbose_`, and contain the full
             data structure that indicates which machine(s) matched).
         :type verbose: bool
+        :param count: Optionally, the number of machines to allocate. When
+            given, a list of up to `count` distinct machines matching the
+            constraints is returned; fewer are returned when fewer are
+            available.
+        :type count: positive integer
 
         Returns 409 if a suitable machine matching the constraints could not be
         found.
@@ -1639,6 +1693,8 @@ class MachinesHandler(NodesHandler, PowersMixin):
         dry_run = get_optional_param(
             request.POST, 'dry_run', default=False, validator=StringBool)
         zone = get_optional_param(request.POST, 'zone', default=None)
+        count = get_optional_param(
+            request.POST, 'count', default=None, validator=Int(min=1))
 
         if not form.is_valid():
             raise MAASAPIValidationError(form.errors)
@@ -1650,8 +1706,35 @@ class MachinesHandler(NodesHandler, PowersMixin):
                 self.base_model.objects.get_available_machines_for_acquisition(
                     request.user)
                 )
-            machines, storage, interfaces = form.filter_nodes(machines)
-            machine = get_first(machines)
+            if count is not None:
+                # Allocate as many of the requested machines as are
+                # available, with the constraints evaluated only once.
+                machines, storage, interfaces = form.filter_nodes(machines)
+                machines = form.select_nodes_for_update(machines, count)
+                if len(machines) == 0:
+                    raise NodesNotAvailable(
+                        get_unavailable_message(form, input_constraints))
+                for machine in machines:
+                    if not dry_run:
+                        machine.acquire(
+                            request.user, get_oauth_token(request),
+                            agent_name=agent_name, comment=comment,
+                            bridge_all=bridge_all, bridge_stp=bridge_stp,
+                            bridge_fd=bridge_fd)
+                    set_constraints_by_type(
+                        machine, storage, interfaces, verbose)
+                return machines
+            machine = None
+            candidate_ids = allocation_index.get_candidate_ids(form)
+            if candidate_ids:
+                # The index may be a little stale, so the candidates are
+                # still filtered, and all machines are when none match.
+                candidates, storage, interfaces = form.filter_nodes(
+                    machines, node_ids=candidate_ids)
+                machine = get_first(candidates)
+            if machine is None:
+                machines, storage, interfaces = form.filter_nodes(machines)
+                machine = get_first(machines)
             if machine is None:
                 cores = form.cleaned_data.get('cpu_count')
                 if cores is not None:
@@ -1680,50 +1763,15 @@ class MachinesHandler(NodesHandler, PowersMixin):
                         request, data, storage, pods, form, input_constraints)
 
             if machine is None:
-                constraints = form.describe_constraints()
-                if constraints == '':
-                    # No constraints. That means no machines at all were
-                    # available.
-                    message = "No machine available."
-                else:
-                    message = (
-                        'No available machine matches constraints: %s '
-                        '(resolved to "%s")' % (
-                            str(input_constraints), constraints))
-                raise NodesNotAvailable(message)
+                raise NodesNotAvailable(
+                    get_unavailable_message(form, input_constraints))
             if not dry_run:
                 machine.acquire(
                     request.user, get_oauth_token(request),
                     agent_name=agent_name, comment=comment,
                     bridge_all=bridge_all, bridge_stp=bridge_stp,
                     bridge_fd=bridge_fd)
-            machine.constraint_map = storage.get(machine.id, {})
-            machine.constraints_by_type = {}
-            # Need to get the interface constraints map into the proper format
-            # to return it here.
-            # Backward compatibility: provide the storage constraints in both
-            # formats.
-            if len(machine.constraint_map) > 0:
-                machine.constraints_by_type['storage'] = {}
-                new_storage = machine.constraints_by_type['storage']
-                # Convert this to the "new style" constraints map format.
-                for storage_key in machine.constraint_map:
-                    # Each key in the storage map is actually a value which
-                    # contains the ID of the matching storage device.
-                    # Convert this to a label: list-of-matches format, to
-                    # match how the constraints will be done going forward.
-                    new_key = machine.constraint_map[storage_key]
-                    matches = new_storage.get(new_key, [])
-                    matches.append(storage_key)
-                    new_storage[new_key] = matches
-            if len(interfaces) > 0:
-                machine.constraints_by_type['interfaces'] = {
-                    label: interfaces.get(label, {}).get(machine.id)
-                    for label in interfaces
-                }
-            if verbose:
-                machine.constraints_by_type['verbose_storage'] = storage
-                machine.constraints_by_type['verbose_interfaces'] = interfaces
+            set_constraints_by_type(machine, storage, interfaces, verbose)
             return machine
 
     @admin_method
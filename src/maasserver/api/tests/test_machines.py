@@ -615,6 +615,88 @@ class TestMachinesAPI(APITestCase.ForUser):
             response.content.decode(settings.DEFAULT_CHARSET))
         self.assertEqual(machine.system_id, parsed_result['system_id'])
 
+    def test_POST_allocate_prefers_allocation_index_candidates(self):
+        cheap = factory.make_Node(
+            status=NODE_STATUS.READY, owner=None, with_boot_disk=True,
+            cpu_count=1, memory=1024)
+        candidate = factory.make_Node(
+            status=NODE_STATUS.READY, owner=None, with_boot_disk=True,
+            cpu_count=8, memory=8192)
+        get_candidate_ids = self.patch(
+            machines_module.allocation_index, "get_candidate_ids")
+        get_candidate_ids.return_value = {candidate.id}
+        response = self.client.post(
+            reverse('machines_handler'), {'op': 'allocate'})
+        self.assertEqual(http.client.OK, response.status_code)
+        parsed_result = json.loads(
+            response.content.decode(settings.DEFAULT_CHARSET))
+        self.assertEqual(candidate.system_id, parsed_result['system_id'])
+        self.assertNotEqual(cheap.system_id, parsed_result['system_id'])
+
+    def test_POST_allocate_falls_back_when_candidates_do_not_match(self):
+        machine = factory.make_Node(
+            status=NODE_STATUS.READY, owner=None, with_boot_disk=True)
+        stale = factory.make_Node(
+            status=NODE_STATUS.DEPLOYED, owner=factory.make_User(),
+            with_boot_disk=True)
+        get_candidate_ids = self.patch(
+            machines_module.allocation_index, "get_candidate_ids")
+        get_candidate_ids.return_value = {stale.id}
+        response = self.client.post(
+            reverse('machines_handler'), {'op': 'allocate'})
+        self.assertEqual(http.client.OK, response.status_code)
+        parsed_result = json.loads(
+            response.content.decode(settings.DEFAULT_CHARSET))
+        self.assertEqual(machine.system_id, parsed_result['system_id'])
+
+    def test_POST_allocate_with_count_allocates_cheapest_machines(self):
+        machines = [
+            factory.make_Node(
+                status=NODE_STATUS.READY, owner=None, with_boot_disk=True,
+                cpu_count=cpu_count, memory=1024)
+            for cpu_count in (1, 2, 4)
+        ]
+        response = self.client.post(
+            reverse('machines_handler'), {'op': 'allocate', 'count': 2})
+        self.assertEqual(http.client.OK, response.status_code)
+        parsed_result = json.loads(
+            response.content.decode(settings.DEFAULT_CHARSET))
+        self.assertEqual(
+            [machines[0].system_id, machines[1].system_id],
+            [machine['system_id'] for machine in parsed_result])
+        self.assertEqual(
+            [NODE_STATUS.ALLOCATED, NODE_STATUS.ALLOCATED, NODE_STATUS.READY],
+            [reload_object(machine).status for machine in machines])
+
+    def test_POST_allocate_with_count_allocates_those_available(self):
+        machine = factory.make_Node(
+            status=NODE_STATUS.READY, owner=None, with_boot_disk=True)
+        factory.make_Node(
+            status=NODE_STATUS.DEPLOYED, owner=factory.make_User(),
+            with_boot_disk=True)
+        response = self.client.post(
+            reverse('machines_handler'), {'op': 'allocate', 'count': 5})
+        self.assertEqual(http.client.OK, response.status_code)
+        parsed_result = json.loads(
+            response.content.decode(settings.DEFAULT_CHARSET))
+        self.assertEqual(
+            [machine.system_id],
+            [allocated['system_id'] for allocated in parsed_result])
+        self.assertEqual(self.user, reload_object(machine).owner)
+
+    def test_POST_allocate_with_count_fails_when_none_available(self):
+        factory.make_Node(
+            status=NODE_STATUS.DEPLOYED, owner=factory.make_User(),
+            with_boot_disk=True)
+        response = self.client.post(
+            reverse('machines_handler'), {'op': 'allocate', 'count': 2})
+        self.assertEqual(http.client.CONFLICT, response.status_code)
+
+    def test_POST_allocate_rejects_invalid_count(self):
+        response = self.client.post(
+            reverse('machines_handler'), {'op': 'allocate', 'count': 0})
+        self.assertEqual(http.client.BAD_REQUEST, response.status_code)
+
     def test_POST_allocate_returns_a_composed_machine_no_constraints(self):
         # The "allocate" operation returns a composed machine.
         available_status = NODE_STATUS.READY
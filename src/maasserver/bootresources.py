@@ -21,6 +21,10 @@ from subprocess import CalledProcessError
 from textwrap import dedent
 import threading
 import time
+from urllib.request import (
+    build_opener,
+    Request,
+)
 
 from django.db import (
     connection,
@@ -28,6 +32,7 @@ from django.db import (
 )
 from django.db.utils import load_backend
 from django.http import (
+    FileResponse,
     Http404,
     HttpResponse,
     StreamingHttpResponse,
@@ -53,6 +58,7 @@ from maasserver.enum import (
 )
 from maasserver.eventloop import services
 from maasserver.fields import LargeObjectFile
+from maasserver.largefilestore import get_largefile_store
 from maasserver.models import (
     BootResource,
     BootResourceFile,
@@ -198,6 +204,17 @@ class ConnectionWrapper:
             self._connection = None
 
 
+class LargeFileResponse(FileResponse):
+    """Streams boot resource content from the region's `LargeFileStore`.
+
+    WSGI servers that provide `wsgi.file_wrapper` can send the file with
+    `sendfile`; otherwise it is read in the same block size as is used for
+    large objects.
+    """
+
+    block_size = LargeObjectFile().block_size
+
+
 class SimpleStreamsHandler:
     """Simplestreams endpoint, that the racks talk to.
 
@@ -365,10 +382,21 @@ class SimpleStreamsHandler:
             rfile = resource_set.files.get(filename=filename)
         except BootResourceFile.DoesNotExist:
             raise Http404()
-        response = StreamingHttpResponse(
-            ConnectionWrapper(rfile.largefile.content),
-            content_type='application/octet-stream')
-        response['Content-Length'] = rfile.largefile.total_size
+        largefile = rfile.largefile
+        store = get_largefile_store()
+        stream = None if store is None else store.open_file(largefile.sha256)
+        if stream is not None:
+            response = LargeFileResponse(
+                stream, content_type='application/octet-stream')
+        else:
+            # Fall back to the large object, keeping a copy in the store for
+            # next time.
+            content = ConnectionWrapper(largefile.content)
+            if store is not None and largefile.complete:
+                content = store.wrap(content, largefile.sha256)
+            response = StreamingHttpResponse(
+                content, content_type='application/octet-stream')
+        response['Content-Length'] = largefile.total_size
         return response
 
 
@@ -384,6 +412,100 @@ def simplestreams_file_handler(
         request, os, arch, subarch, series, version, filename)
 
 
+class BootResourceStoreProgress:
+    """Aggregate progress of the content written by a `BootResourceStore`.
+
+    The writer threads update this as each chunk is written, so the progress
+    of the whole import can be reported without polling the size of each
+    `LargeFile` in the database.
+    """
+
+    # Log the progress each time another 10% of the content is written.
+    log_step = 10
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self, total_size=0, total_files=0):
+        with self.lock:
+            self.total_size = total_size
+            self.total_files = total_files
+            self.size = 0
+            self.files = 0
+            self._logged_step = 0
+
+    @property
+    def percentage(self):
+        """Percentage of the content that has been written."""
+        with self.lock:
+            if self.total_size == 0:
+                return 100.0
+            return min(100.0, self.size * 100.0 / self.total_size)
+
+    def update(self, size):
+        """Record that another `size` bytes have been written."""
+        with self.lock:
+            self.size += size
+            if self.total_size == 0:
+                return
+            step = min(100, int(self.size * 100 / self.total_size))
+            step -= step % self.log_step
+            if step <= self._logged_step:
+                return
+            self._logged_step = step
+            size, total_size = self.size, self.total_size
+            files, total_files = self.files, self.total_files
+        log.msg(
+            "Boot image import {step}% complete ({size} of {total_size} "
+            "bytes, {files} of {total_files} files).", step=step, size=size,
+            total_size=total_size, files=files, total_files=total_files)
+
+    def file_done(self):
+        """Record that all of the content of a file has been written."""
+        with self.lock:
+            self.files += 1
+
+
+def open_content_at_offset(reader, offset, read_size):
+    """Return a reader of the content of `reader` starting at `offset`.
+
+    When `reader` comes from a URL the remainder of the content is requested
+    with an HTTP range request. If the server does not honour the range, the
+    first `offset` bytes of `reader` are read and discarded instead.
+    """
+    if offset == 0:
+        return reader
+    url = getattr(reader, 'url', None)
+    if url is not None and url.startswith(('http://', 'https://')):
+        request = Request(url, headers={
+            'Range': 'bytes=%d-' % offset,
+            'User-Agent': transactional(get_maas_user_agent)(),
+        })
+        try:
+            response = build_opener().open(request)
+        except OSError as error:
+            log.msg(
+                "Unable to resume download of {url}: {error}",
+                url=url, error=error)
+        else:
+            content_range = response.headers.get('Content-Range', '')
+            if (response.status == 206 and
+                    content_range.startswith('bytes %d-' % offset)):
+                close = getattr(reader, 'close', None)
+                if close is not None:
+                    close()
+                return response
+            response.close()
+    remaining = offset
+    while remaining > 0:
+        buf = reader.read(min(remaining, read_size))
+        if len(buf) == 0:
+            break
+        remaining -= len(buf)
+    return reader
+
+
 class BootResourceStore(ObjectStore):
     """Stores the simplestream data into the `BootResource` model.
 
@@ -413,7 +535,9 @@ class BootResourceStore(ObjectStore):
 
     # Number of threads to run at the same time to write the contents of
     # files from simplestreams into the database. Increasing this number
-    # might cause high network and database load.
+    # might cause high network and database load. This is replaced by the
+    # `boot_images_import_parallelism` configuration when the store is
+    # created.
     write_threads = 2
 
     # Read at 10MiB per chunk.
@@ -422,7 +546,11 @@ class BootResourceStore(ObjectStore):
     def __init__(self):
         """Initialize store."""
         self.cache_current_resources()
+        self.write_threads = Config.objects.get_config(
+            'boot_images_import_parallelism')
+        self.progress = BootResourceStoreProgress()
         self._content_to_finalize = {}
+        self._largefiles_to_finalize = set()
         self._finalizing = False
         self._cancel_finalize = False
 
@@ -468,10 +596,16 @@ class BootResourceStore(ObjectStore):
 
         This action will actually be performed during the finalize method.
 
+        Content is only saved once for each `LargeFile`, even when it is
+        shared by more than one resource file.
+
         :param rfile: Resource file.
         :type rfile: BootResourceFile
         :param content: File-like object.
         """
+        if rfile.largefile_id in self._largefiles_to_finalize:
+            return
+        self._largefiles_to_finalize.add(rfile.largefile_id)
         self._content_to_finalize[rfile.id] = content
 
     def get_or_create_boot_resource(self, product):
@@ -692,6 +826,12 @@ class BootResourceStore(ObjectStore):
             largefile = get_one(
                 LargeFile.objects.filter(sha256=sha256))
 
+        if largefile is not None and not largefile.complete:
+            # The content of the largefile was only partially written, most
+            # likely because a previous import was stopped. The remainder of
+            # the content will be written, resuming where it stopped.
+            needs_saving = True
+
         if largefile is None:
             # No largefile exist for this resource file in the database, so a
             # new one will be created to store the data for this file.
@@ -756,9 +896,36 @@ class BootResourceStore(ObjectStore):
             {'sha256': rfile.largefile.sha256})
         log.debug("Finalizing boot image {ident}.", ident=ident)
 
-        # Ensure that the size of the largefile starts at zero.
-        rfile.largefile.size = 0
-        transactional(rfile.largefile.save)(update_fields=['size'])
+        @transactional
+        def read_written_content():
+            """Read the content already written into the checksummer.
+
+            Anything past the size recorded for the largefile was not
+            committed with its size and is truncated, so the content can be
+            resumed from that size.
+            """
+            largefile = rfile.largefile
+            largefile.size = min(largefile.size, largefile.total_size)
+            with largefile.content.open('rwb') as stream:
+                remaining = largefile.size
+                while remaining > 0:
+                    buf = stream.read(min(remaining, self.read_size))
+                    if len(buf) == 0:
+                        break
+                    cksummer.update(buf)
+                    remaining -= len(buf)
+                largefile.size -= remaining
+                stream.truncate(largefile.size)
+            largefile.save(update_fields=['size'])
+            return largefile.size
+
+        offset = read_written_content()
+        if offset > 0:
+            log.msg(
+                "Resuming boot image {ident} from {offset} bytes.",
+                ident=ident, offset=offset)
+            self.progress.update(offset)
+            reader = open_content_at_offset(reader, offset, self.read_size)
 
         @transactional
         def write_chunk():
@@ -769,16 +936,14 @@ class BootResourceStore(ObjectStore):
             """
             with rfile.largefile.content.open('wb') as stream:
                 buf = reader.read(self.read_size)
-                stream.seek(0, 2)
+                stream.seek(rfile.largefile.size)
                 stream.write(buf)
                 cksummer.update(buf)
                 buf_len = len(buf)
                 rfile.largefile.size += buf_len
                 rfile.largefile.save(update_fields=['size'])
-                if buf_len != self.read_size:
-                    return True
-                else:
-                    return False
+            self.progress.update(buf_len)
+            return buf_len != self.read_size
 
         # Write chunks until it says its done.
         while not self._cancel_finalize:
@@ -804,6 +969,7 @@ class BootResourceStore(ObjectStore):
             maaslog.error(msg)
             transactional(rfile.delete)()
         else:
+            self.progress.file_done()
             log.debug('Finalized boot image {ident}.', ident=ident)
 
     def perform_write(self):
@@ -811,6 +977,7 @@ class BootResourceStore(ObjectStore):
 
         This method will spawn threads to perform the writing. Maximum of
         `write_threads` will be running at once."""
+        self.progress.reset(*transactional(self._get_size_to_write)())
         threads = []
         while True:
             # Update list to only those that are still running.
@@ -839,6 +1006,13 @@ class BootResourceStore(ObjectStore):
             thread.start()
             threads.append(thread)
 
+    def _get_size_to_write(self):
+        """Return the total size and number of the files to be written."""
+        total_sizes = BootResourceFile.objects.filter(
+            id__in=self._content_to_finalize.keys()).values_list(
+            'largefile__total_size', flat=True)
+        return sum(total_sizes), len(total_sizes)
+
     def _other_resources_exists(self, os, arch, subarch, series):
         """Return `True` when simplestreams provided an image with the same
         os, arch, series combination.
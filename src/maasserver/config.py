@@ -64,6 +64,22 @@ class RegionConfiguration(Configuration, metaclass=RegionConfigurationMeta):
         "num_workers", "The number of regiond worker process to run.",
         Int(if_missing=4, accept_python=False, min=1))
 
+    # Boot resource options.
+    boot_resources_store = ConfigurationOption(
+        "boot_resources_store",
+        "Directory in which to keep a copy of boot resource content, which "
+        "is served to rack controllers in preference to the database. The "
+        "content is only served from the database when this is empty.",
+        UnicodeString(if_missing="", accept_python=False))
+
+    # Allocation options.
+    allocation_index = ConfigurationOption(
+        "allocation_index",
+        "Keep an in-memory index of the machines that are ready to be "
+        "allocated in each region process. Allocation requests use it to "
+        "narrow down the machines that are then filtered by the database.",
+        StringBool(if_missing=False))
+
     # Debug options.
     debug = ConfigurationOption(
         "debug", "Enable debug mode for detailed error and log reporting.",
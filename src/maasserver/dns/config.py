@@ -6,6 +6,7 @@
 __all__ = [
     'dns_force_reload',
     'dns_update_all_zones',
+    'dns_update_zones',
     ]
 
 from django.conf import settings
@@ -15,9 +16,11 @@ from maasserver.models.config import Config
 from maasserver.models.dnspublication import DNSPublication
 from maasserver.models.domain import Domain
 from maasserver.models.subnet import Subnet
+from netaddr import IPNetwork
 from provisioningserver.dns.actions import (
     bind_reload,
     bind_reload_with_retries,
+    bind_reload_zones,
     bind_write_configuration,
     bind_write_options,
     bind_write_zones,
@@ -95,6 +98,93 @@ def dns_update_all_zones(reload_retry=False):
     ]
 
 
+def dns_update_zones(domain_ids, subnet_ids, serial=None):
+    """Update the zone files for only some domains and subnets.
+
+    Unlike `dns_update_all_zones`, BIND's configuration is not rewritten and
+    only the regenerated zones are reloaded. This is only correct when the set
+    of zones is unchanged, i.e. no authoritative domain or reverse-DNS subnet
+    has been added, removed, or renamed.
+
+    :param domain_ids: The IDs of the domains whose forward zones should be
+        updated, or `None` to update all forward zones.
+    :param subnet_ids: The IDs of the subnets whose reverse zones should be
+        updated, or `None` to update all reverse zones.
+    :param serial: The zone serial to use. Defaults to the serial of the most
+        recent `DNSPublication`.
+    """
+    if not is_dns_enabled():
+        return
+
+    domains = Domain.objects.filter(authoritative=True)
+    if domain_ids is not None:
+        domains = domains.filter(id__in=domain_ids)
+    subnets = Subnet.objects.exclude(rdns_mode=RDNS_MODE.DISABLED)
+    if subnet_ids is not None:
+        subnets = get_subnets_sharing_reverse_zones(subnets, subnet_ids)
+    default_ttl = Config.objects.get_config('default_dns_ttl')
+    if serial is None:
+        serial = current_zone_serial()
+    else:
+        serial = '%0.10d' % serial
+    zones = ZoneGenerator(
+        domains, subnets, default_ttl,
+        serial).as_list()
+    bind_write_zones(zones)
+
+    zone_names = [
+        zone_info.zone_name
+        for zone in zones
+        for zone_info in zone.zone_info
+    ]
+    if len(zone_names) > 0 and not bind_reload_zones(zone_names):
+        # Reloading individual zones failed; try everything instead.
+        bind_reload()
+
+    # Return the current serial and list of updated domain names.
+    return serial, [
+        domain.name
+        for domain in domains
+    ]
+
+
+def get_rfc2317_parent(network):
+    """Return the network whose reverse zone carries RFC2317 glue for
+    `network`, or `network` itself if it does not need glue."""
+    if network.version == 4 and network.prefixlen > 24:
+        return IPNetwork("%s/24" % network.network).cidr
+    elif network.version == 6 and network.prefixlen > 124:
+        return IPNetwork("%s/124" % network.network).cidr
+    else:
+        return network
+
+
+def get_subnets_sharing_reverse_zones(subnets, subnet_ids):
+    """Return those of `subnets` that must be regenerated with `subnet_ids`.
+
+    Reverse zones for small networks are glued into the zones of the networks
+    that contain them (RFC2317), so regenerating a subnet's reverse zones also
+    means regenerating those of every overlapping subnet, transitively.
+    """
+    networks = {
+        subnet: get_rfc2317_parent(IPNetwork(subnet.cidr))
+        for subnet in subnets
+    }
+    selected = {
+        subnet for subnet in networks
+        if subnet.id in subnet_ids
+    }
+    pending = list(selected)
+    while len(pending) > 0:
+        network = networks[pending.pop()]
+        for subnet, other in networks.items():
+            if subnet not in selected and (
+                    other in network or network in other):
+                selected.add(subnet)
+                pending.append(subnet)
+    return selected
+
+
 def get_upstream_dns():
     """Return the IP addresses of configured upstream DNS servers.
 
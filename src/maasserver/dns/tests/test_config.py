@@ -17,24 +17,35 @@ from maasserver.dns.config import (
     current_zone_serial,
     dns_force_reload,
     dns_update_all_zones,
+    dns_update_zones,
+    get_rfc2317_parent,
+    get_subnets_sharing_reverse_zones,
     get_trusted_networks,
     get_upstream_dns,
 )
 from maasserver.enum import (
     IPADDRESS_TYPE,
     NODE_STATUS,
+    RDNS_MODE,
 )
 from maasserver.listener import PostgresListenerService
 from maasserver.models import (
     Config,
     Domain,
+    Subnet,
 )
 from maasserver.models.dnspublication import DNSPublication
 from maasserver.testing.config import RegionConfigurationFixture
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import MAASServerTestCase
-from maastesting.matchers import MockCalledOnceWith
-from netaddr import IPAddress
+from maastesting.matchers import (
+    MockCalledOnceWith,
+    MockNotCalled,
+)
+from netaddr import (
+    IPAddress,
+    IPNetwork,
+)
 from provisioningserver.dns.config import (
     compose_config_path,
     DNSConfig,
@@ -322,6 +333,106 @@ class TestDNSConfigModifications(TestDNSServer):
         ]))
 
 
+class TestDNSUpdateZones(TestDNSServer):
+    """Tests for incremental updates with `dns_update_zones`."""
+
+    def test_dns_update_zones_updates_dns(self):
+        self.patch(settings, 'DNS_CONNECT', True)
+        network = factory.make_ipv4_network()
+        subnet = factory.make_Subnet(cidr=str(network.cidr))
+        dns_update_all_zones()
+        node, static = self.create_node_with_static_ip(subnet=subnet)
+        dns_update_zones([node.domain.id], [subnet.id])
+        self.assertDNSMatches(node.hostname, node.domain.name, static.ip)
+
+    def test_dns_update_zones_writes_only_given_zones(self):
+        self.patch(settings, 'DNS_CONNECT', True)
+        domain = factory.make_Domain()
+        factory.make_Domain()
+        subnet = factory.make_Subnet(cidr="10.1.0.0/24")
+        factory.make_Subnet(cidr="10.2.0.0/24")
+        bind_write_zones = self.patch_autospec(
+            dns_config_module, "bind_write_zones")
+        bind_reload_zones = self.patch_autospec(
+            dns_config_module, "bind_reload_zones")
+        dns_update_zones([domain.id], [subnet.id])
+        [zones] = bind_write_zones.call_args[0]
+        self.assertThat(
+            [zone_info.zone_name for zone in zones
+             for zone_info in zone.zone_info],
+            Equals([domain.name, "0.1.10.in-addr.arpa"]))
+        self.assertThat(
+            bind_reload_zones, MockCalledOnceWith(
+                [domain.name, "0.1.10.in-addr.arpa"]))
+
+    def test_dns_update_zones_does_not_rewrite_configuration(self):
+        self.patch(settings, 'DNS_CONNECT', True)
+        domain = factory.make_Domain()
+        bind_write_configuration = self.patch_autospec(
+            dns_config_module, "bind_write_configuration")
+        bind_write_options = self.patch_autospec(
+            dns_config_module, "bind_write_options")
+        dns_update_zones([domain.id], [])
+        self.assertThat(bind_write_configuration, MockNotCalled())
+        self.assertThat(bind_write_options, MockNotCalled())
+
+    def test_dns_update_zones_reloads_all_if_zone_reload_fails(self):
+        self.patch(settings, 'DNS_CONNECT', True)
+        domain = factory.make_Domain()
+        self.patch_autospec(
+            dns_config_module, "bind_reload_zones").return_value = False
+        bind_reload = self.patch_autospec(dns_config_module, "bind_reload")
+        dns_update_zones([domain.id], [])
+        self.assertThat(bind_reload, MockCalledOnceWith())
+
+    def test_dns_update_zones_returns_serial_and_domains(self):
+        self.patch(settings, 'DNS_CONNECT', True)
+        domain = factory.make_Domain()
+        factory.make_Domain()
+        serial = random.randint(1, 1000)
+        self.assertThat(
+            dns_update_zones([domain.id], [], serial),
+            Equals(('%0.10d' % serial, [domain.name])))
+
+
+class TestGetSubnetsSharingReverseZones(MAASServerTestCase):
+    """Tests for `get_rfc2317_parent` and
+    `get_subnets_sharing_reverse_zones`."""
+
+    def test_get_rfc2317_parent(self):
+        self.assertThat(
+            get_rfc2317_parent(IPNetwork("10.0.0.32/29")),
+            Equals(IPNetwork("10.0.0.0/24")))
+        self.assertThat(
+            get_rfc2317_parent(IPNetwork("10.0.0.0/16")),
+            Equals(IPNetwork("10.0.0.0/16")))
+        self.assertThat(
+            get_rfc2317_parent(IPNetwork("2001:db8::20/126")),
+            Equals(IPNetwork("2001:db8::20/124")))
+
+    def test_returns_only_given_subnets_when_unrelated(self):
+        subnet = factory.make_Subnet(cidr="10.1.0.0/24")
+        factory.make_Subnet(cidr="10.2.0.0/24")
+        self.assertThat(
+            get_subnets_sharing_reverse_zones(
+                Subnet.objects.all(), [subnet.id]),
+            Equals({subnet}))
+
+    def test_includes_rfc2317_siblings_and_parents(self):
+        small = factory.make_Subnet(
+            cidr="10.1.2.32/29", rdns_mode=RDNS_MODE.RFC2317)
+        sibling = factory.make_Subnet(
+            cidr="10.1.2.64/29", rdns_mode=RDNS_MODE.RFC2317)
+        parent = factory.make_Subnet(cidr="10.1.0.0/16")
+        cousin = factory.make_Subnet(
+            cidr="10.1.3.32/29", rdns_mode=RDNS_MODE.RFC2317)
+        factory.make_Subnet(cidr="10.2.0.0/16")
+        self.assertThat(
+            get_subnets_sharing_reverse_zones(
+                Subnet.objects.all(), [small.id]),
+            Equals({small, sibling, parent, cousin}))
+
+
 class TestDNSDynamicIPAddresses(TestDNSServer):
     """Allocated nodes with IP addresses in the dynamic range get a DNS
     record.
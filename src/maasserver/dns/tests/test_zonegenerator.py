@@ -40,6 +40,7 @@ from maasserver.models import (
 )
 from maasserver.models.dnsdata import HostnameRRsetMapping
 from maasserver.models.staticipaddress import HostnameIPMapping
+from maasserver.testing import sampledata
 from maasserver.testing.config import RegionConfigurationFixture
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import (
@@ -47,6 +48,7 @@ from maasserver.testing.testcase import (
     MAASTransactionServerTestCase,
 )
 from maasserver.utils.orm import transactional
+from maastesting.djangotestcase import count_queries
 from maastesting.factory import factory as maastesting_factory
 from maastesting.fakemethod import FakeMethod
 from maastesting.matchers import (
@@ -571,6 +573,33 @@ class TestZoneGenerator(MAASServerTestCase):
             MatchesSetwise(*expected_zones))
 
 
+class TestZoneGeneratorMappings(MAASServerTestCase):
+    """Tests for the mappings used by :class:`ZoneGenerator`."""
+
+    def test_mappings_are_computed_in_bulk(self):
+        sampledata.populate()
+        domains = list(Domain.objects.all())
+        subnets = list(Subnet.objects.all())
+        zonegen = ZoneGenerator(
+            domains, subnets, serial=random.randint(0, 65535))
+        count, mappings = count_queries(zonegen._get_mappings)
+        count_one, _ = count_queries(ZoneGenerator(
+            domains[:1], subnets[:1],
+            serial=random.randint(0, 65535))._get_mappings)
+        self.assertThat(count, Equals(count_one))
+        self.assertItemsEqual(domains + ['reverse'], mappings.keys())
+        for domain in domains:
+            self.assertThat(
+                mappings[domain], Equals(get_hostname_ip_mapping(domain)))
+        self.assertThat(
+            mappings['reverse'], Equals(get_hostname_ip_mapping(subnets[0])))
+
+    def test_mappings_omit_reverse_without_subnets(self):
+        domain = factory.make_Domain()
+        zonegen = ZoneGenerator(domain, (), serial=random.randint(0, 65535))
+        self.assertItemsEqual([domain], zonegen._get_mappings().keys())
+
+
 class TestZoneGeneratorTTL(MAASTransactionServerTestCase):
     """Tests for TTL in :class:ZoneGenerator`."""
 
@@ -192,10 +192,19 @@ class ZoneGenerator:
         self.default_domain = Domain.objects.get_default_domain()
         self.serial = serial
 
-    @staticmethod
-    def _get_mappings():
-        """Return a lazily evaluated mapping dict."""
-        return lazydict(get_hostname_ip_mapping)
+    def _get_mappings(self):
+        """Return a mapping dict.
+
+        The mappings for our domains, and the reverse mapping if we have
+        subnets, are computed up-front in bulk. Others are lazily evaluated.
+        """
+        mappings = lazydict(get_hostname_ip_mapping)
+        bulk_mappings = StaticIPAddress.objects.get_hostname_ip_mappings(
+            self.domains, reverse=len(self.subnets) > 0)
+        if None in bulk_mappings:
+            mappings['reverse'] = bulk_mappings.pop(None)
+        mappings.update(bulk_mappings)
+        return mappings
 
     @staticmethod
     def _get_rrset_mappings():
@@ -299,7 +308,7 @@ class ZoneGenerator:
 
         # Since get_hostname_ip_mapping(Subnet) ignores Subnet.id, so we can
         # just do it once and be happy.  LP#1600259
-        if len(subnets):
+        if len(subnets) and 'reverse' not in mappings:
             mappings['reverse'] = mappings[Subnet.objects.first()]
 
         # For each of the zones that we are generating (one or more per
@@ -162,6 +162,11 @@ def make_NetworkTimeProtocolService():
     return ntp.RegionNetworkTimeProtocolService(reactor)
 
 
+def make_AllocationIndexService(postgresListener):
+    from maasserver.allocation_index import AllocationIndexService
+    return AllocationIndexService(postgresListener)
+
+
 def make_WebApplicationService(postgresListener, statusWorker):
     from maasserver.webapp import WebApplicationService
     site_port = DEFAULT_PORT  # config["port"]
@@ -323,6 +328,11 @@ class RegionEventLoop:
             "factory": make_ReverseDNSService,
             "requires": ["postgres-listener-master"],
         },
+        "allocation-index": {
+            "only_on_master": False,
+            "factory": make_AllocationIndexService,
+            "requires": ["postgres-listener-worker"],
+        },
         "rack-controller": {
             "only_on_master": False,
             "factory": make_RackControllerService,
@@ -534,6 +534,19 @@ CONFIG_ITEMS = {
                 "with the address of the image repository.")
         }
     },
+    'boot_images_import_parallelism': {
+        'default': 2,
+        'form': forms.IntegerField,
+        'form_kwargs': {
+            'required': False,
+            'label': (
+                "Number of boot image files to download at the same time"),
+            'help_text': (
+                "Increasing this speeds up importing new images but puts "
+                "more load on the network and the database."),
+            'min_value': 1,
+        },
+    },
     'curtin_verbose': {
         'default': False,
         'form': forms.BooleanField,
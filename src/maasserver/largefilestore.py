@@ -0,0 +1,223 @@
+# Copyright 2018 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Content-addressed filesystem store for `LargeFile` content.
+
+A region controller can keep a copy of the content of each `LargeFile` on
+its local disk, named by the SHA256 of the content. Boot resources are
+served from that copy when it exists, so that syncing images to many rack
+controllers does not have to read all of the content out of the database's
+large object storage. The large objects remain the canonical copy.
+"""
+
+__all__ = [
+    "get_largefile_store",
+    "LargeFileStore",
+    ]
+
+from functools import lru_cache
+import hashlib
+import os
+import tempfile
+
+from maasserver.config import RegionConfiguration
+from provisioningserver.logger import LegacyLogger
+
+
+log = LegacyLogger()
+
+
+class LargeFileStoreWriter:
+    """Writes content into a `LargeFileStore`.
+
+    The content is written to a temporary file alongside its final location
+    and is only moved into place by `commit` when its SHA256 matches.
+    """
+
+    def __init__(self, store, sha256):
+        self.store = store
+        self.sha256 = sha256
+        self.hash = hashlib.sha256()
+        directory = os.path.dirname(store.get_path(sha256))
+        os.makedirs(directory, exist_ok=True)
+        fd, self.temp_path = tempfile.mkstemp(prefix=".", dir=directory)
+        self.stream = os.fdopen(fd, "wb")
+
+    def write(self, data):
+        self.hash.update(data)
+        self.stream.write(data)
+
+    def commit(self):
+        """Move the content into the store.
+
+        :return: True if the content was stored, or False if its SHA256 was
+            not the expected value and it was discarded.
+        """
+        self.stream.close()
+        if self.hash.hexdigest() != self.sha256:
+            os.remove(self.temp_path)
+            return False
+        os.chmod(self.temp_path, 0o644)
+        os.rename(self.temp_path, self.store.get_path(self.sha256))
+        return True
+
+    def abort(self):
+        """Discard the content written so far."""
+        self.stream.close()
+        try:
+            os.remove(self.temp_path)
+        except FileNotFoundError:
+            pass
+
+
+class LargeFileStoreWrapper:
+    """Wraps an iterator of content, copying it into a `LargeFileStore`.
+
+    The copy is only kept once the wrapped iterator has been exhausted, so a
+    download that is abandoned part way through leaves nothing behind.
+    """
+
+    def __init__(self, content, store, sha256):
+        self.content = content
+        self.store = store
+        self.sha256 = sha256
+        self.writer = None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.writer is None:
+            try:
+                self.writer = self.store.get_writer(self.sha256)
+            except OSError as error:
+                log.msg(
+                    "Unable to store large file {sha256}: {error}",
+                    sha256=self.sha256, error=error)
+                self.writer = False
+        try:
+            data = next(self.content)
+        except StopIteration:
+            if self.writer:
+                try:
+                    stored = self.writer.commit()
+                except OSError as error:
+                    self._abandon(error)
+                else:
+                    if not stored:
+                        log.msg(
+                            "Content of large file {sha256} does not match "
+                            "its SHA256; not storing it.", sha256=self.sha256)
+            self.writer = False
+            raise
+        if self.writer:
+            try:
+                self.writer.write(data)
+            except OSError as error:
+                self._abandon(error)
+        return data
+
+    def _abandon(self, error):
+        """Stop copying into the store after `error`, but keep serving.
+
+        A full or failing disk must not break the download that is being
+        copied, so the partial copy is discarded and the content continues
+        to be passed through.
+        """
+        log.msg(
+            "Unable to store large file {sha256}: {error}",
+            sha256=self.sha256, error=error)
+        try:
+            self.writer.abort()
+        except OSError:
+            pass
+        self.writer = False
+
+    def close(self):
+        if self.writer:
+            self.writer.abort()
+        self.writer = False
+        close = getattr(self.content, "close", None)
+        if close is not None:
+            close()
+
+
+class LargeFileStore:
+    """Stores the content of large files in a directory, by SHA256."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def get_path(self, sha256):
+        """Return the path of the content with `sha256`."""
+        return os.path.join(self.path, sha256[:2], sha256)
+
+    def has_file(self, sha256):
+        """True if content with `sha256` is in the store."""
+        return os.path.isfile(self.get_path(sha256))
+
+    def open_file(self, sha256):
+        """Return a binary stream of the content with `sha256`.
+
+        :return: An open file, or `None` if the content is not in the store.
+        """
+        try:
+            return open(self.get_path(sha256), "rb")
+        except FileNotFoundError:
+            return None
+
+    def get_writer(self, sha256):
+        """Return a `LargeFileStoreWriter` for the content with `sha256`."""
+        return LargeFileStoreWriter(self, sha256)
+
+    def write_file(self, sha256, content):
+        """Store the `content` iterable as the content with `sha256`.
+
+        :return: True if the content was stored, or False if its SHA256 did
+            not match.
+        """
+        writer = self.get_writer(sha256)
+        try:
+            for data in content:
+                writer.write(data)
+        except:
+            writer.abort()
+            raise
+        return writer.commit()
+
+    def wrap(self, content, sha256):
+        """Return `content` wrapped so that it is stored as it is read."""
+        return LargeFileStoreWrapper(content, self, sha256)
+
+    def remove_file(self, sha256):
+        """Remove the content with `sha256` from the store."""
+        try:
+            os.remove(self.get_path(sha256))
+        except FileNotFoundError:
+            pass
+
+    def list_files(self):
+        """Yield the SHA256 of each content in the store."""
+        if not os.path.isdir(self.path):
+            return
+        for prefix in sorted(os.listdir(self.path)):
+            directory = os.path.join(self.path, prefix)
+            if os.path.isdir(directory):
+                for name in sorted(os.listdir(directory)):
+                    if not name.startswith("."):
+                        yield name
+
+
+@lru_cache(maxsize=1)
+def get_largefile_store():
+    """Return the `LargeFileStore` for this region.
+
+    :return: A `LargeFileStore`, or `None` if `boot_resources_store` is not
+        set in the region's configuration.
+    """
+    with RegionConfiguration.open() as config:
+        path = config.boot_resources_store
+    if path:
+        return LargeFileStore(path)
+    else:
+        return None
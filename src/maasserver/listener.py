@@ -8,7 +8,10 @@ __all__ = [
     "PostgresListenerService",
     ]
 
-from collections import defaultdict
+from collections import (
+    defaultdict,
+    OrderedDict,
+)
 from contextlib import closing
 from errno import ENOENT
 
@@ -48,6 +51,69 @@ class ACTIONS:
     DELETE = "delete"
 
 
+class NotificationCoalescer:
+    """Collapses notifications about the same object until they are handled.
+
+    Notifications are keyed by the entity channel and payload, so that many
+    notifications about one object, such as the updates made to a machine
+    while it is being deployed, are delivered to the handlers only once with
+    the action that describes the combined change. Notifications are
+    delivered in the order in which each object was first notified.
+
+    :ivar received: Number of notifications that have been added.
+    :ivar delivered: Number of notifications that have been popped.
+    """
+
+    # The action to deliver when a notification with the second action is
+    # received for an object that already has a pending notification with the
+    # first action. `None` means that nothing is delivered for that object.
+    # Any pair not listed here is delivered with the second action.
+    MERGED_ACTIONS = {
+        (ACTIONS.CREATE, ACTIONS.UPDATE): ACTIONS.CREATE,
+        (ACTIONS.CREATE, ACTIONS.DELETE): None,
+        (ACTIONS.DELETE, ACTIONS.CREATE): ACTIONS.UPDATE,
+    }
+
+    def __init__(self):
+        self.pending = OrderedDict()
+        self.received = 0
+        self.delivered = 0
+
+    def __len__(self):
+        return len(self.pending)
+
+    def __iter__(self):
+        return iter(self.pending.values())
+
+    @property
+    def coalesced(self):
+        """Number of notifications that were collapsed into others."""
+        return self.received - self.delivered - len(self.pending)
+
+    def add(self, channel, payload):
+        """Add a notification received on `channel` with `payload`."""
+        self.received += 1
+        name, _, action = channel.partition("_")
+        key = name, payload
+        if key in self.pending:
+            pending_channel, _ = self.pending[key]
+            pending_action = pending_channel.partition("_")[2]
+            action = self.MERGED_ACTIONS.get(
+                (pending_action, action), action)
+            if action is None:
+                del self.pending[key]
+            else:
+                self.pending[key] = "%s_%s" % (name, action), payload
+        else:
+            self.pending[key] = channel, payload
+
+    def pop(self):
+        """Remove and return the oldest pending `(channel, payload)`."""
+        _, notification = self.pending.popitem(last=False)
+        self.delivered += 1
+        return notification
+
+
 class PostgresListenerNotifyError(Exception):
     """Error raised when the listener gets a notify message that cannot be
     decoded or is not being handled."""
@@ -91,7 +157,7 @@ class PostgresListenerService(Service, object):
         self.autoReconnect = False
         self.connection = None
         self.connectionFileno = None
-        self.notifications = set()
+        self.notifications = NotificationCoalescer()
         self.notifier = task.LoopingCall(self.handleNotifies)
         self.notifierDone = None
         self.connecting = None
@@ -150,11 +216,12 @@ class PostgresListenerService(Service, object):
             #
             self.loseConnection(Failure(error.ConnectionLost()))
         else:
-            # Add each notify to to the notifications set. This removes
-            # duplicate notifications when one entity in the database is
-            # updated multiple times in a short interval. Accumulating
-            # notifications and allowing the listener to pick them up in
-            # batches is imperfect but good enough, and simple.
+            # Add each notify to the pending notifications. This collapses
+            # the notifications for one entity in the database when it is
+            # changed multiple times before the notifications are handled,
+            # every `HANDLE_NOTIFY_DELAY` seconds. Accumulating notifications
+            # and allowing the listener to pick them up in batches is
+            # imperfect but good enough, and simple.
             notifies = self.connection.connection.notifies
             if len(notifies) != 0:
                 for notify in notifies:
@@ -179,7 +246,7 @@ class PostgresListenerService(Service, object):
                         # Place non-system messages into the queue to be
                         # processed.
                         self.notifications.add(
-                            (notify.channel, notify.payload))
+                            notify.channel, notify.payload)
                 # Delete the contents of the connection's notifies list so
                 # that we don't process them a second time.
                 del notifies[:]
@@ -409,6 +476,14 @@ class PostgresListenerService(Service, object):
 
     def handleNotifies(self, clock=reactor):
         """Process all notify message in the notifications set."""
+        if len(self.notifications) != 0:
+            self.log.debug(
+                "Handling {count} notifications; {coalesced} of {received} "
+                "received so far were coalesced.",
+                count=len(self.notifications),
+                coalesced=self.notifications.coalesced,
+                received=self.notifications.received)
+
         def gen_notifications(notifications):
             while len(notifications) != 0:
                 yield notifications.pop()
@@ -0,0 +1,127 @@
+# Copyright 2018 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Django command: copy large file content to and from the filesystem."""
+
+__all__ = ['Command']
+
+from textwrap import dedent
+
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+)
+from maasserver.bootresources import is_import_resources_running
+from maasserver.fields import LargeObjectFile
+from maasserver.largefilestore import (
+    get_largefile_store,
+    LargeFileStore,
+)
+from maasserver.models import LargeFile
+from maasserver.utils.orm import transactional
+
+
+@transactional
+def export_largefile(store, largefile_id):
+    """Copy the content of a `LargeFile` into `store`.
+
+    :return: True if the content was copied.
+    """
+    largefile = LargeFile.objects.get(id=largefile_id)
+    if not largefile.complete or store.has_file(largefile.sha256):
+        return False
+    with largefile.content.open('rb') as stream:
+        return store.write_file(largefile.sha256, stream)
+
+
+@transactional
+def import_largefile(store, largefile_id):
+    """Restore the content of an incomplete `LargeFile` from `store`.
+
+    :return: True if the content was restored.
+    """
+    largefile = LargeFile.objects.get(id=largefile_id)
+    if largefile.complete:
+        return False
+    stream = store.open_file(largefile.sha256)
+    if stream is None:
+        return False
+    length = 0
+    content = LargeObjectFile()
+    with stream, content.open('wb') as objstream:
+        for data in iter(lambda: stream.read(content.block_size), b''):
+            objstream.write(data)
+            length += len(data)
+    if length != largefile.total_size:
+        content.unlink()
+        return False
+    largefile.content.unlink()
+    largefile.content = content
+    largefile.size = length
+    largefile.save()
+    return True
+
+
+@transactional
+def get_largefile_ids():
+    return list(LargeFile.objects.values_list('id', flat=True))
+
+
+@transactional
+def get_largefile_hashes():
+    return set(LargeFile.objects.values_list('sha256', flat=True))
+
+
+class Command(BaseCommand):
+    """Copies large file content between the database and the filesystem
+    store that this region serves boot resources from.
+    """
+    help = dedent(
+        "Copy boot resource content between the database and the boot "
+        "resources store of this region. 'export' copies the content of "
+        "every complete large file into the store, 'import' restores the "
+        "content of incomplete large files from the store, and 'clean' "
+        "removes content from the store that is no longer in the database.")
+
+    def add_arguments(self, parser):
+        super(Command, self).add_arguments(parser)
+        parser.add_argument(
+            'action', choices=['export', 'import', 'clean'],
+            help="Action to perform.")
+        parser.add_argument(
+            '--path', default=None,
+            help="Directory of the store. (default: the boot_resources_store "
+                 "set in the region configuration.)")
+
+    def handle(self, **options):
+        path = options.get('path')
+        if path is None:
+            store = get_largefile_store()
+        else:
+            store = LargeFileStore(path)
+        if store is None:
+            raise CommandError(
+                "No store given; use --path or set boot_resources_store.")
+
+        action = options['action']
+        if action == 'export':
+            count = sum(
+                export_largefile(store, largefile_id)
+                for largefile_id in get_largefile_ids())
+            print("Copied %d large file(s) into %s." % (count, store.path))
+        elif action == 'import':
+            if is_import_resources_running():
+                raise CommandError(
+                    "Boot resources are being imported; try again later.")
+            count = sum(
+                import_largefile(store, largefile_id)
+                for largefile_id in get_largefile_ids())
+            print("Restored %d large file(s) from %s." % (count, store.path))
+        else:
+            hashes = get_largefile_hashes()
+            count = 0
+            for sha256 in list(store.list_files()):
+                if sha256 not in hashes:
+                    store.remove_file(sha256)
+                    count += 1
+            print("Removed %d large file(s) from %s." % (count, store.path))
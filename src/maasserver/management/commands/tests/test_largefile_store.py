@@ -0,0 +1,71 @@
+# Copyright 2018 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Test the `largefile_store` management command."""
+
+__all__ = []
+
+import hashlib
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from maasserver.largefilestore import LargeFileStore
+from maasserver.management.commands import largefile_store
+from maasserver.models import LargeFile
+from maasserver.testing.factory import factory
+from maasserver.testing.testcase import MAASServerTestCase
+from maasserver.utils.orm import reload_object
+from maastesting.fixtures import CaptureStandardIO
+
+
+class TestLargeFileStoreCommand(MAASServerTestCase):
+
+    def call_command(self, action, store):
+        with CaptureStandardIO():
+            call_command("largefile_store", action, path=store.path)
+
+    def test_export_copies_complete_largefiles(self):
+        store = LargeFileStore(self.make_dir())
+        content = factory.make_bytes(size=1024)
+        largefile = factory.make_LargeFile(content=content)
+        incomplete = factory.make_LargeFile(
+            content=factory.make_bytes(size=10), size=100)
+        self.call_command("export", store)
+        with store.open_file(largefile.sha256) as stream:
+            self.assertEqual(content, stream.read())
+        self.assertFalse(store.has_file(incomplete.sha256))
+
+    def test_import_restores_incomplete_largefiles(self):
+        store = LargeFileStore(self.make_dir())
+        content = factory.make_bytes(size=1024)
+        largefile = factory.make_LargeFile(
+            content=content[:10], size=len(content))
+        LargeFile.objects.filter(id=largefile.id).update(
+            sha256=hashlib.sha256(content).hexdigest())
+        largefile = reload_object(largefile)
+        store.write_file(largefile.sha256, [content])
+        is_running = self.patch(largefile_store, "is_import_resources_running")
+        is_running.return_value = False
+        self.call_command("import", store)
+        largefile = reload_object(largefile)
+        self.assertTrue(largefile.complete)
+        with largefile.content.open('rb') as stream:
+            self.assertEqual(content, stream.read())
+
+    def test_import_refuses_while_importing_resources(self):
+        store = LargeFileStore(self.make_dir())
+        is_running = self.patch(largefile_store, "is_import_resources_running")
+        is_running.return_value = True
+        self.assertRaises(CommandError, self.call_command, "import", store)
+
+    def test_clean_removes_unknown_content(self):
+        store = LargeFileStore(self.make_dir())
+        content = factory.make_bytes(size=1024)
+        largefile = factory.make_LargeFile(content=content)
+        store.write_file(largefile.sha256, [content])
+        other = factory.make_bytes(size=1024)
+        other_sha256 = hashlib.sha256(other).hexdigest()
+        store.write_file(other_sha256, [other])
+        self.call_command("clean", store)
+        self.assertTrue(store.has_file(largefile.sha256))
+        self.assertFalse(store.has_file(other_sha256))
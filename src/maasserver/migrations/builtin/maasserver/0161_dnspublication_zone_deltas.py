@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import django.contrib.postgres.fields
+from django.db import (
+    migrations,
+    models,
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maasserver', '0160_pool_only_for_machines'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dnspublication',
+            name='domain_ids',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), blank=True, default=None, editable=False, null=True, size=None),
+        ),
+        migrations.AddField(
+            model_name='dnspublication',
+            name='subnet_ids',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), blank=True, default=None, editable=False, null=True, size=None),
+        ),
+    ]
@@ -9,6 +9,7 @@ __all__ = [
 
 from datetime import datetime
 
+from django.contrib.postgres.fields import ArrayField
 from django.core.validators import (
     MaxValueValidator,
     MinValueValidator,
@@ -21,6 +22,7 @@ from django.db.models.fields import (
     BigIntegerField,
     CharField,
     DateTimeField,
+    IntegerField,
 )
 from maasserver import DefaultMeta
 from maasserver.sequence import (
@@ -68,6 +70,36 @@ class DNSPublicationManager(Manager):
                 candidates = candidates.filter(created__lt=cutoff)
             candidates.delete()
 
+    def get_changes_since(self, serial):
+        """Return the domains and subnets touched since `serial`.
+
+        The publications following the one with the given `serial` are
+        merged. A publication that does not record which domains or subnets
+        it touched is taken to have touched all of them.
+
+        :raise DoesNotExist: If the publication with the given `serial` no
+            longer exists, e.g. it has been garbage collected, or the zone
+            serial has cycled since. The set of changes cannot be known.
+        :return: A ``(publication, domain_ids, subnet_ids)`` tuple, where
+            `publication` is the most recent publication that was merged.
+            Each of `domain_ids` and `subnet_ids` is either a set of IDs or
+            `None`, meaning that everything must be updated.
+        """
+        publication = self.filter(serial=serial).latest("id")
+        domain_ids, subnet_ids = set(), set()
+        for publication in self.filter(id__gt=publication.id).order_by("id"):
+            if domain_ids is not None:
+                if publication.domain_ids is None:
+                    domain_ids = None
+                else:
+                    domain_ids.update(publication.domain_ids)
+            if subnet_ids is not None:
+                if publication.subnet_ids is None:
+                    subnet_ids = None
+                else:
+                    subnet_ids.update(publication.subnet_ids)
+        return publication, domain_ids, subnet_ids
+
 
 class DNSPublication(Model):
     """A row in this table denotes a DNS publication request.
@@ -101,3 +133,15 @@ class DNSPublication(Model):
     source = CharField(
         editable=False, max_length=255, null=False, blank=True,
         help_text="A brief explanation why DNS was published.")
+
+    # The domains whose forward zones are affected by this publication. NULL
+    # means that every forward zone needs to be regenerated. BIND's
+    # configuration is only rewritten when `subnet_ids` is also NULL.
+    domain_ids = ArrayField(
+        IntegerField(), editable=False, null=True, blank=True, default=None)
+
+    # The subnets whose reverse zones are affected by this publication. NULL
+    # means that every reverse zone needs to be regenerated. BIND's
+    # configuration is only rewritten when `domain_ids` is also NULL.
+    subnet_ids = ArrayField(
+        IntegerField(), editable=False, null=True, blank=True, default=None)
@@ -1166,42 +1166,47 @@ class Interface(CleanSave, TimestampedModel):
             allocated IP addresses.
         """
         exclude_addresses = set(exclude_addresses)
-        assigned_addresses = []
+        # The addresses for each subnet are allocated together.
+        auto_ips_by_subnet = OrderedDict()
         for auto_ip in self.ip_addresses.filter(
                 alloc_type=IPADDRESS_TYPE.AUTO):
             if not auto_ip.ip:
-                assigned_ip = self._claim_auto_ip(
-                    auto_ip, exclude_addresses=exclude_addresses)
-                if assigned_ip is not None:
-                    assigned_addresses.append(assigned_ip)
-                    exclude_addresses.add(str(assigned_ip.ip))
+                if auto_ip.subnet is None:
+                    maaslog.error(
+                        "Could not find subnet for interface %s." %
+                        (self.get_log_string()))
+                    raise StaticIPAddressUnavailable(
+                        "Automatic IP address cannot be configured on "
+                        "interface %s without an associated subnet." % (
+                            self.get_name()))
+                auto_ips_by_subnet.setdefault(
+                    auto_ip.subnet, []).append(auto_ip)
+        assigned_addresses = []
+        for subnet, auto_ips in auto_ips_by_subnet.items():
+            assigned_addresses.extend(self._claim_auto_ips_in_subnet(
+                subnet, auto_ips, exclude_addresses=exclude_addresses))
+            exclude_addresses.update(
+                str(auto_ip.ip) for auto_ip in auto_ips)
         return assigned_addresses
 
-    def _claim_auto_ip(self, auto_ip, exclude_addresses=[]):
-        """Claim an IP address for the `auto_ip`."""
-        subnet = auto_ip.subnet
-        if subnet is None:
-            maaslog.error(
-                "Could not find subnet for interface %s." %
-                (self.get_log_string()))
-            raise StaticIPAddressUnavailable(
-                "Automatic IP address cannot be configured on interface %s "
-                "without an associated subnet." % self.get_name())
-
-        # Allocate a new IP address from the entire subnet, excluding already
+    def _claim_auto_ips_in_subnet(self, subnet, auto_ips, exclude_addresses):
+        """Claim an IP address in `subnet` for each of `auto_ips`."""
+        # Allocate new IP addresses from the entire subnet, excluding already
         # allocated addresses and ranges.
-        new_ip = StaticIPAddress.objects.allocate_new(
-            subnet=subnet, alloc_type=IPADDRESS_TYPE.AUTO,
+        new_ips = StaticIPAddress.objects.allocate_new_bulk(
+            subnet, len(auto_ips), alloc_type=IPADDRESS_TYPE.AUTO,
             exclude_addresses=exclude_addresses)
-        auto_ip.ip = new_ip.ip
-        # Throw away the newly-allocated address and assign it to the old AUTO
-        # address, so that the interface link IDs remain consistent.
-        new_ip.delete()
-        auto_ip.save()
-        maaslog.info("Allocated automatic IP address %s for %s." % (
-            auto_ip.ip,
-            self.get_log_string()))
-        return auto_ip
+        # Throw away the newly-allocated addresses and assign them to the old
+        # AUTO addresses, so that the interface link IDs remain consistent.
+        StaticIPAddress.objects.filter(
+            id__in=[new_ip.id for new_ip in new_ips]).delete()
+        for auto_ip, new_ip in zip(auto_ips, new_ips):
+            auto_ip.ip = new_ip.ip
+            auto_ip.save()
+            maaslog.info("Allocated automatic IP address %s for %s." % (
+                auto_ip.ip,
+                self.get_log_string()))
+        return auto_ips
 
     def release_auto_ips(self):
         """Release all AUTO IP address for this interface that have an IP
@@ -45,6 +45,7 @@ from maasserver.enum import (
     IPADDRESS_TYPE_CHOICES_DICT,
 )
 from maasserver.exceptions import (
+    StaticIPAddressExhaustion,
     StaticIPAddressOutOfRange,
     StaticIPAddressUnavailable,
 )
@@ -53,7 +54,10 @@ from maasserver.models.cleansave import CleanSave
 from maasserver.models.config import Config
 from maasserver.models.domain import Domain
 from maasserver.models.subnet import Subnet
-from maasserver.models.timestampedmodel import TimestampedModel
+from maasserver.models.timestampedmodel import (
+    now,
+    TimestampedModel,
+)
 from maasserver.utils import orm
 from maasserver.utils.dns import get_ip_based_hostname
 from netaddr import IPAddress
@@ -71,17 +75,28 @@ _mapping_base_fields = (
 
 _special_mapping_result = _mapping_base_fields + (
     'dnsresource_id',
+    'alloc_type',
+    'has_dnsrr',
+    'has_node',
+    'dnsrr_domain_id',
+    'dnsrr_dom2_id',
+    'node_domain_id',
+    'node_dom2_id',
 )
 
 _mapping_query_result = _mapping_base_fields + (
     'is_boot',
     'preference',
     'family',
+    'node_domain_id',
+    'domain2_id',
 )
 
 _interface_mapping_result = _mapping_base_fields + (
     'iface_name',
     'assigned',
+    'node_domain_id',
+    'domain2_id',
 )
 
 SpecialMappingQueryResult = namedtuple(
@@ -289,33 +304,77 @@ class StaticIPAddressManager(Manager):
             return self._attempt_allocation(
                 requested_address, alloc_type, user=user, subnet=subnet)
 
-    def _get_special_mappings(self, domain, raw_ttl=False):
-        """Get the special mappings, possibly limited to a single Domain.
-
-        This function is responsible for creating these mappings:
-        - any USER_RESERVED IP that has no name (dnsrr or node),
-        - any IP not associated with a Node,
-        - any IP associated with a DNSResource.
-
-        Addresses that are associated with both a Node and a DNSResource behave
-        thusly:
-        - Both forward mappings include the address
-        - The reverse mapping points only to the Node (and is the
-          responsibility of the caller.)
-
-        The caller is responsible for addresses otherwise derived from nodes.
-
-        Because of how the get hostname_ip_mapping code works, we actually need
-        to fetch ALL of the entries for subnets, but forward mappings are
-        domain-specific.
-
-        :param domain: limit return to just the given Domain.  If anything
-            other than a Domain is passed in (e.g., a Subnet or None), we
-            return all of the reverse mappings.
-        :param raw_ttl: Boolean, if True then just return the address_ttl,
-            otherwise, coalesce the address_ttl to be the correct answer for
-            zone generation.
-        :return: a (default) dict of hostname: HostnameIPMapping entries.
+    def allocate_new_bulk(
+            self, subnet, count, alloc_type=IPADDRESS_TYPE.AUTO, user=None,
+            exclude_addresses=()):
+        """Return `count` new StaticIPAddresses from `subnet`.
+
+        The free ranges of `subnet` are computed once, and the addresses are
+        inserted with a single `INSERT`, without taking the
+        `address_allocation` lock. Candidates are chosen from a random place
+        in the free ranges so that concurrent allocations seldom choose the
+        same addresses. When they do, the `INSERT` fails with a unique
+        violation or serialization failure, and the whole transaction is
+        retried by `transactional`. As with `allocate_new`, observed
+        neighbours are only used once no other addresses are free, least
+        recently seen first, and a warning is logged for each.
+
+        :param subnet: The subnet from which to allocate the addresses.
+        :param count: The number of addresses to allocate.
+        :param alloc_type: See `allocate_new`.
+        :param user: See `allocate_new`.
+        :param exclude_addresses: A list of addresses which MUST NOT be used.
+        :raise StaticIPAddressExhaustion: If `subnet` has fewer than `count`
+            addresses free.
+        :return: A list of `StaticIPAddress`.
+        """
+        self._verify_alloc_type(alloc_type, user)
+        exclude_addresses = {str(address) for address in exclude_addresses}
+        allocated_ids = []
+        for avoid_observed_neighbours in (True, False):
+            if len(allocated_ids) >= count:
+                break
+            candidates = subnet.get_next_ips_for_allocation(
+                count - len(allocated_ids),
+                exclude_addresses=exclude_addresses,
+                avoid_observed_neighbours=avoid_observed_neighbours,
+                spread=True)
+            allocated_ids.extend(self._insert_addresses(
+                candidates, alloc_type, subnet, user))
+            exclude_addresses.update(candidates)
+        if len(allocated_ids) < count:
+            raise StaticIPAddressExhaustion(
+                "No more IPs available in subnet: %s." % subnet.cidr)
+        return list(self.filter(id__in=allocated_ids).order_by('id'))
+
+    def _insert_addresses(self, addresses, alloc_type, subnet, user):
+        """Insert `addresses` in one statement.
+
+        :return: The ids of the inserted rows.
+        """
+        if len(addresses) == 0:
+            return []
+        timestamp = now()
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO maasserver_staticipaddress (
+                    created, updated, ip, alloc_type, subnet_id, user_id,
+                    lease_time)
+                SELECT %s, %s, candidate.ip, %s, %s, %s, 0
+                FROM unnest(%s::inet[]) WITH ORDINALITY AS candidate(ip, n)
+                ORDER BY candidate.n
+                RETURNING id
+                """, [
+                timestamp, timestamp, alloc_type, subnet.id,
+                None if user is None else user.id, addresses])
+            return [row[0] for row in cursor.fetchall()]
+
+    def _get_special_mappings_query(self, raw_ttl=False):
+        """Return the SQL for special mappings, less the final filter.
+
+        The returned query ends with a dangling `AND`; the caller must append
+        the condition that selects the wanted rows. See
+        `_get_special_mappings` for a description of the columns.
         """
         default_ttl = "%d" % Config.objects.get_config('default_dns_ttl')
         # raw_ttl says that we don't coalesce, but we need to pick one, so we
@@ -334,7 +393,7 @@ class StaticIPAddressManager(Manager):
         # view of a DNSResource (and Node) that we need, and finally use
         # domain2 to handle the case where an FQDN is also the name of a domain
         # that we know.
-        sql_query = """
+        return """
             SELECT
                 COALESCE(dnsrr.fqdn, node.fqdn) AS fqdn,
                 node.system_id,
@@ -342,7 +401,14 @@ class StaticIPAddressManager(Manager):
                 staticip.user_id,
                 """ + ttl_clause + """ AS ttl,
                 staticip.ip,
-                dnsrr.id AS dnsresource_id
+                dnsrr.id AS dnsresource_id,
+                staticip.alloc_type,
+                dnsrr.fqdn IS NOT NULL AS has_dnsrr,
+                node.fqdn IS NOT NULL AS has_node,
+                dnsrr.domain_id AS dnsrr_domain_id,
+                dnsrr.dom2_id AS dnsrr_dom2_id,
+                node.domain_id AS node_domain_id,
+                node.dom2_id AS node_dom2_id
             FROM
                 maasserver_staticipaddress AS staticip
             LEFT JOIN (
@@ -400,6 +466,35 @@ class StaticIPAddressManager(Manager):
                 (staticip.ip IS NOT NULL AND host(staticip.ip) != '') AND
                 """
 
+    def _get_special_mappings(self, domain, raw_ttl=False):
+        """Get the special mappings, possibly limited to a single Domain.
+
+        This function is responsible for creating these mappings:
+        - any USER_RESERVED IP that has no name (dnsrr or node),
+        - any IP not associated with a Node,
+        - any IP associated with a DNSResource.
+
+        Addresses that are associated with both a Node and a DNSResource behave
+        thusly:
+        - Both forward mappings include the address
+        - The reverse mapping points only to the Node (and is the
+          responsibility of the caller.)
+
+        The caller is responsible for addresses otherwise derived from nodes.
+
+        Because of how the get hostname_ip_mapping code works, we actually need
+        to fetch ALL of the entries for subnets, but forward mappings are
+        domain-specific.
+
+        :param domain: limit return to just the given Domain.  If anything
+            other than a Domain is passed in (e.g., a Subnet or None), we
+            return all of the reverse mappings.
+        :param raw_ttl: Boolean, if True then just return the address_ttl,
+            otherwise, coalesce the address_ttl to be the correct answer for
+            zone generation.
+        :return: a (default) dict of hostname: HostnameIPMapping entries.
+        """
+        sql_query = self._get_special_mappings_query(raw_ttl)
         query_parms = []
         if isinstance(domain, Domain):
             if domain.is_default():
@@ -451,12 +546,19 @@ class StaticIPAddressManager(Manager):
                     node.fqdn IS NULL))"""
             query_parms += [IPADDRESS_TYPE.USER_RESERVED]
 
-        default_domain = Domain.objects.get_default_domain()
-        mapping = defaultdict(HostnameIPMapping)
         cursor = connection.cursor()
         cursor.execute(sql_query, query_parms)
-        for result in cursor.fetchall():
-            result = SpecialMappingQueryResult(*result)
+        return self._make_special_mapping(
+            Domain.objects.get_default_domain(),
+            map(SpecialMappingQueryResult._make, cursor.fetchall()))
+
+    def _make_special_mapping(self, default_domain, results):
+        """Build a special mapping from `SpecialMappingQueryResult`s.
+
+        :return: a (default) dict of hostname: HostnameIPMapping entries.
+        """
+        mapping = defaultdict(HostnameIPMapping)
+        for result in results:
             if result.fqdn is None or result.fqdn == '':
                 fqdn = "%s.%s" % (
                     get_ip_based_hostname(result.ip), default_domain.name)
@@ -479,20 +581,18 @@ class StaticIPAddressManager(Manager):
             entry.dnsresource_id = result.dnsresource_id
         return mapping
 
-    def get_hostname_ip_mapping(self, domain_or_subnet, raw_ttl=False):
-        """Return hostname mappings for `StaticIPAddress` entries.
+    def _get_mapping_queries(self, filter_domains, raw_ttl=False):
+        """Return the SQL for node address mappings, less the final filter.
 
-        Returns a mapping `{hostnames -> (ttl, [ips])}` corresponding to
-        current `StaticIPAddress` objects for the nodes in `domain`, or
-        `subnet`.
-
-        At most one IPv4 address and one IPv6 address will be returned per
-        node, each the one for whichever `Interface` was created first.
+        Two queries are returned, each ending with a dangling `AND` to which
+        the caller must append the condition that selects the wanted rows.
+        The first returns, for each FQDN, its preferred IPv4 and IPv6
+        addresses; the second returns every address on every interface.
 
-        The returned name is an FQDN (no trailing dot.)
+        :param filter_domains: Whether to join the domains whose name is the
+            FQDN of a node (or of one of its interfaces) as `domain2`, in
+            order to filter on that.
         """
-        cursor = connection.cursor()
-
         # DISTINCT ON returns the first matching row for any given
         # hostname, using the query's ordering.  Here, we're trying to
         # return the IPs for the oldest Interface address.
@@ -505,6 +605,7 @@ class StaticIPAddressManager(Manager):
                     node.address_ttl,
                     domain.ttl,
                     %s)""" % default_ttl
+        domain2_clause = "domain2.id" if filter_domains else "NULL"
         sql_query = """
             SELECT DISTINCT ON (fqdn, is_boot, family)
                 CONCAT(node.hostname, '.', domain.name) AS fqdn,
@@ -538,7 +639,9 @@ class StaticIPAddressManager(Manager):
                     WHEN interface.type = 'unknown' THEN 9
                     ELSE 10
                 END AS preference,
-                family(staticip.ip) AS family
+                family(staticip.ip) AS family,
+                node.domain_id AS node_domain_id,
+                """ + domain2_clause + """ AS domain2_id
             FROM
                 maasserver_interface AS interface
             LEFT OUTER JOIN maasserver_interfacerelationship AS rel ON
@@ -558,7 +661,7 @@ class StaticIPAddressManager(Manager):
             JOIN maasserver_staticipaddress AS staticip ON
                 staticip.id = link.staticipaddress_id
             """
-        if isinstance(domain_or_subnet, Domain):
+        if filter_domains:
             # The model has nodes in the parent domain, but they actually live
             # in the child domain.  And the parent needs the glue.  So we
             # return such nodes addresses in _BOTH_ the parent and the child
@@ -569,46 +672,11 @@ class StaticIPAddressManager(Manager):
                 /* Pick up another copy of domain looking for instances of
                  * nodes a the top of a domain.
                  */ domain2.name = CONCAT(node.hostname, '.', domain.name)
-            WHERE
-                (domain2.id = %s OR node.domain_id = %s) AND
             """
-            query_parms = [domain_or_subnet.id, domain_or_subnet.id, ]
-        else:
-            # For subnets, we need ALL the names, so that we can correctly
-            # identify which ones should have the FQDN.  dns/zonegenerator.py
-            # optimizes based on this, and only calls once with a subnet,
-            # expecting to get all the subnets back in one table.
-            sql_query += """
-            WHERE
-            """
-            query_parms = []
         sql_query += """
+            WHERE
                 staticip.ip IS NOT NULL AND
-                host(staticip.ip) != ''
-            ORDER BY
-                fqdn,
-                is_boot DESC,
-                family,
-                preference,
-                /*
-                 * We want STICKY and USER_RESERVED addresses to be preferred,
-                 * followed by AUTO, DHCP, and finally DISCOVERED.
-                 */
-                CASE
-                    WHEN staticip.alloc_type = 1 /* STICKY */
-                        THEN 1
-                    WHEN staticip.alloc_type = 4 /* USER_RESERVED */
-                        THEN 2
-                    WHEN staticip.alloc_type = 0 /* AUTO */
-                        THEN 3
-                    WHEN staticip.alloc_type = 5 /* DHCP */
-                        THEN 4
-                    WHEN staticip.alloc_type = 6 /* DISCOVERED */
-                        THEN 5
-                    ELSE staticip.alloc_type
-                END,
-                interface.id,
-                inet 'fc00::/7' >> ip /* ULA after non-ULA */
+                host(staticip.ip) != '' AND
             """
         iface_sql_query = """
             SELECT
@@ -619,7 +687,9 @@ class StaticIPAddressManager(Manager):
                 """ + ttl_clause + """ AS ttl,
                 staticip.ip,
                 interface.name,
-                alloc_type != 6 /* DISCOVERED */ AS assigned
+                alloc_type != 6 /* DISCOVERED */ AS assigned,
+                node.domain_id AS node_domain_id,
+                """ + domain2_clause + """ AS domain2_id
             FROM
                 maasserver_interface AS interface
             JOIN maasserver_node AS node ON
@@ -631,7 +701,7 @@ class StaticIPAddressManager(Manager):
             JOIN maasserver_staticipaddress AS staticip ON
                 staticip.id = link.staticipaddress_id
             """
-        if isinstance(domain_or_subnet, Domain):
+        if filter_domains:
             # This logic is similar to the logic in sql_query above.
             iface_sql_query += """
             LEFT JOIN maasserver_domain AS domain2 ON
@@ -640,43 +710,71 @@ class StaticIPAddressManager(Manager):
                  */
                 domain2.name = CONCAT(
                     interface.name, '.', node.hostname, '.', domain.name)
-            WHERE
-                (domain2.id = %s OR node.domain_id = %s) AND
-            """
-        else:
-            # For subnets, we need ALL the names, so that we can correctly
-            # identify which ones should have the FQDN.  dns/zonegenerator.py
-            # optimizes based on this, and only calls once with a subnet,
-            # expecting to get all the subnets back in one table.
-            iface_sql_query += """
-            WHERE
             """
         iface_sql_query += """
+            WHERE
                 staticip.ip IS NOT NULL AND
-                host(staticip.ip) != ''
+                host(staticip.ip) != '' AND
+            """
+        return sql_query, iface_sql_query
+
+    def _get_mapping_orderings(self):
+        """Return the ORDER BY clauses for `_get_mapping_queries`."""
+        ordering = """
+            ORDER BY
+                fqdn,
+                is_boot DESC,
+                family,
+                preference,
+                /*
+                 * We want STICKY and USER_RESERVED addresses to be preferred,
+                 * followed by AUTO, DHCP, and finally DISCOVERED.
+                 */
+                CASE
+                    WHEN staticip.alloc_type = 1 /* STICKY */
+                        THEN 1
+                    WHEN staticip.alloc_type = 4 /* USER_RESERVED */
+                        THEN 2
+                    WHEN staticip.alloc_type = 0 /* AUTO */
+                        THEN 3
+                    WHEN staticip.alloc_type = 5 /* DHCP */
+                        THEN 4
+                    WHEN staticip.alloc_type = 6 /* DISCOVERED */
+                        THEN 5
+                    ELSE staticip.alloc_type
+                END,
+                interface.id,
+                inet 'fc00::/7' >> ip /* ULA after non-ULA */
+            """
+        iface_ordering = """
             ORDER BY
                 node.hostname,
                 assigned DESC, /* Return all assigned IPs for a node first. */
                 interface.id
             """
-        # We get user reserved et al mappings first, so that we can overwrite
-        # TTL as we process the return from the SQL horror above.
-        mapping = self._get_special_mappings(domain_or_subnet, raw_ttl)
+        return ordering, iface_ordering
+
+    def _add_node_mappings(self, mapping, results, iface_results):
+        """Add addresses of nodes to a special `mapping`.
+
+        :param results: `MappingQueryResult`s, in the order returned by the
+            first of the `_get_mapping_queries`.
+        :param iface_results: `InterfaceMappingResult`s, in the order
+            returned by the second of the `_get_mapping_queries`.
+        """
         # All of the mappings that we got mean that we will only want to add
         # addresses for the boot interface (is_boot == True).
         iface_is_boot = defaultdict(bool, {
             hostname: True for hostname in mapping.keys()
         })
         assigned_ips = defaultdict(bool)
-        cursor.execute(sql_query, query_parms)
         # The records from the query provide, for each hostname (after
         # stripping domain), the boot and non-boot interface ip address in ipv4
         # and ipv6.  Our task: if there are boot interace IPs, they win.  If
         # there are none, then whatever we got wins.  The ORDER BY means that
         # we will see all of the boot interfaces before we see any non-boot
         # interface IPs.  See Bug#1584850
-        for result in cursor.fetchall():
-            result = MappingQueryResult(*result)
+        for result in results:
             entry = mapping[result.fqdn]
             entry.node_type = result.node_type
             entry.system_id = result.system_id
@@ -691,9 +789,7 @@ class StaticIPAddressManager(Manager):
         # Next, get all the addresses, on all the interfaces, and add the ones
         # that are not already present on the FQDN as $IFACE.$FQDN.  Exclude
         # any discovered addresses once there are any non-discovered addresses.
-        cursor.execute(iface_sql_query, query_parms)
-        for result in cursor.fetchall():
-            result = InterfaceMappingResult(*result)
+        for result in iface_results:
             if result.assigned:
                 assigned_ips[result.fqdn] = True
             # If this is an assigned IP, or there are NO assigned IPs on the
@@ -710,6 +806,126 @@ class StaticIPAddressManager(Manager):
                     entry.ips.add(result.ip)
         return mapping
 
+    def get_hostname_ip_mapping(self, domain_or_subnet, raw_ttl=False):
+        """Return hostname mappings for `StaticIPAddress` entries.
+
+        Returns a mapping `{hostnames -> (ttl, [ips])}` corresponding to
+        current `StaticIPAddress` objects for the nodes in `domain`, or
+        `subnet`.
+
+        At most one IPv4 address and one IPv6 address will be returned per
+        node, each the one for whichever `Interface` was created first.
+
+        The returned name is an FQDN (no trailing dot.)
+        """
+        is_domain = isinstance(domain_or_subnet, Domain)
+        sql_query, iface_sql_query = self._get_mapping_queries(
+            is_domain, raw_ttl)
+        if is_domain:
+            filter_clause = """
+                (domain2.id = %s OR node.domain_id = %s)
+            """
+            query_parms = [domain_or_subnet.id, domain_or_subnet.id]
+        else:
+            # For subnets, we need ALL the names, so that we can correctly
+            # identify which ones should have the FQDN.  dns/zonegenerator.py
+            # optimizes based on this, and only calls once with a subnet,
+            # expecting to get all the subnets back in one table.
+            filter_clause = """
+                TRUE
+            """
+            query_parms = []
+        ordering, iface_ordering = self._get_mapping_orderings()
+        # We get user reserved et al mappings first, so that we can overwrite
+        # TTL as we process the return from the SQL horror above.
+        mapping = self._get_special_mappings(domain_or_subnet, raw_ttl)
+        cursor = connection.cursor()
+        cursor.execute(sql_query + filter_clause + ordering, query_parms)
+        results = list(map(MappingQueryResult._make, cursor.fetchall()))
+        cursor.execute(
+            iface_sql_query + filter_clause + iface_ordering, query_parms)
+        iface_results = list(
+            map(InterfaceMappingResult._make, cursor.fetchall()))
+        return self._add_node_mappings(mapping, results, iface_results)
+
+    def get_hostname_ip_mappings(self, domains, reverse=True, raw_ttl=False):
+        """Return hostname mappings for many domains at once.
+
+        This is equivalent to calling `get_hostname_ip_mapping` for each of
+        the given `domains`, and once for a subnet, but it issues the same
+        three queries regardless of the number of domains, partitioning the
+        results in Python.
+
+        :param domains: An iterable of `Domain`s.
+        :param reverse: Whether to also compute the mapping for subnets.
+        :return: a dict of `Domain`: mapping, as `get_hostname_ip_mapping`
+            would return for that domain. If `reverse` is true, the mapping
+            it would return for any subnet is stored under the key `None`.
+        """
+        domains = {domain.id: domain for domain in domains}
+        default_domain = Domain.objects.get_default_domain()
+        cursor = connection.cursor()
+
+        # Partition special mappings between domains, and the reverse. The
+        # conditions are those applied in SQL by `_get_special_mappings`.
+        special_results = {domain_id: [] for domain_id in domains}
+        reverse_special_results = []
+        cursor.execute(
+            self._get_special_mappings_query(raw_ttl) + " TRUE")
+        for result in map(SpecialMappingQueryResult._make, cursor.fetchall()):
+            unnamed_reserved = (
+                result.alloc_type == IPADDRESS_TYPE.USER_RESERVED and
+                not result.has_dnsrr and not result.has_node)
+            if result.has_dnsrr:
+                domain_ids = {
+                    result.dnsrr_domain_id, result.dnsrr_dom2_id,
+                    result.node_domain_id, result.node_dom2_id,
+                }
+                for domain_id in domain_ids:
+                    if domain_id in special_results:
+                        special_results[domain_id].append(result)
+            elif unnamed_reserved and default_domain.id in special_results:
+                special_results[default_domain.id].append(result)
+            if unnamed_reserved or (result.has_dnsrr and not result.has_node):
+                reverse_special_results.append(result)
+
+        # Likewise for node addresses, using the conditions applied in SQL by
+        # `get_hostname_ip_mapping`. This relies on the rows for a given FQDN
+        # all having the same domain, so that DISTINCT ON picks the same row
+        # regardless of the filter.
+        sql_query, iface_sql_query = self._get_mapping_queries(True, raw_ttl)
+        ordering, iface_ordering = self._get_mapping_orderings()
+        node_results = {domain_id: [] for domain_id in domains}
+        reverse_node_results = []
+        cursor.execute(sql_query + " TRUE " + ordering)
+        for result in map(MappingQueryResult._make, cursor.fetchall()):
+            for domain_id in {result.node_domain_id, result.domain2_id}:
+                if domain_id in node_results:
+                    node_results[domain_id].append(result)
+            reverse_node_results.append(result)
+        iface_results = {domain_id: [] for domain_id in domains}
+        reverse_iface_results = []
+        cursor.execute(iface_sql_query + " TRUE " + iface_ordering)
+        for result in map(InterfaceMappingResult._make, cursor.fetchall()):
+            for domain_id in {result.node_domain_id, result.domain2_id}:
+                if domain_id in iface_results:
+                    iface_results[domain_id].append(result)
+            reverse_iface_results.append(result)
+
+        mappings = {
+            domain: self._add_node_mappings(
+                self._make_special_mapping(
+                    default_domain, special_results[domain_id]),
+                node_results[domain_id], iface_results[domain_id])
+            for domain_id, domain in domains.items()
+        }
+        if reverse:
+            mappings[None] = self._add_node_mappings(
+                self._make_special_mapping(
+                    default_domain, reverse_special_results),
+                reverse_node_results, reverse_iface_results)
+        return mappings
+
     def filter_by_ip_family(self, family):
         possible_families = map_enum_reverse(IPADDRESS_FAMILY)
         if family not in possible_families:
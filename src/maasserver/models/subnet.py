@@ -9,8 +9,10 @@ __all__ = [
 ]
 
 from operator import attrgetter
+import random
 from typing import (
     Iterable,
+    List,
     Optional,
 )
 
@@ -172,6 +174,55 @@ class SubnetQueriesMixin(MAASQueriesMixin):
         else:
             return None
 
+    # As `find_best_subnet_for_ip_query`, but for many IP addresses at once;
+    # DISTINCT ON picks the first (i.e. best) subnet for each address.
+    find_best_subnets_for_ips_query = """
+        SELECT DISTINCT ON (address.ip)
+            subnet.*,
+            host(address.ip) "ip"
+        FROM unnest(%s::inet[]) AS address(ip)
+        INNER JOIN maasserver_subnet AS subnet
+            ON address.ip << subnet.cidr
+        INNER JOIN maasserver_vlan AS vlan
+            ON subnet.vlan_id = vlan.id
+        ORDER BY
+            address.ip,
+            vlan.dhcp_on DESC,
+            masklen(subnet.cidr) DESC
+        """
+
+    def get_best_subnets_for_ips(self, ips):
+        """Find the most-specific managed Subnet for each of the given IP
+        addresses, using a single query.
+
+        :return: A dict mapping each IP address, as given, to its best
+            `Subnet`. IP addresses that belong to no subnet, or that cannot
+            be parsed, are omitted. IP addresses in the same subnet share
+            one `Subnet` instance, so related objects prefetched for one
+            are there for all.
+        """
+        normalised = {}
+        for ip in ips:
+            try:
+                address = IPAddress(ip)
+            except (AddrFormatError, TypeError, ValueError):
+                continue
+            if address.is_ipv4_mapped():
+                address = address.ipv4()
+            normalised.setdefault(str(address), []).append(ip)
+        if len(normalised) == 0:
+            return {}
+        subnets = self.raw(
+            self.find_best_subnets_for_ips_query,
+            params=[list(normalised)])
+        # The raw query returns a new instance for each row.
+        instances = {}
+        return {
+            ip: instances.setdefault(subnet.id, subnet)
+            for subnet in subnets
+            for ip in normalised[subnet.ip]
+        }
+
     def validate_filter_specifiers(self, specifiers):
         """Validate the given filter string."""
         try:
@@ -732,12 +783,7 @@ class Subnet(CleanSave, TimestampedModel):
             # address is least likely to be in-use.
             discovery = self.get_least_recently_seen_unknown_neighbour()
             if discovery is not None:
-                maaslog.warning(
-                    "Next IP address to allocate from '%s' has been observed "
-                    "previously: %s was last claimed by %s via %s at %s." % (
-                        self.label, discovery.ip, discovery.mac_address,
-                        discovery.observer_interface.get_log_string(),
-                        discovery.last_seen))
+                self._log_neighbour_allocation(discovery)
                 return str(discovery.ip)
         # The purpose of this is to that we ensure we always get an IP address
         # from the *smallest* free contiguous range. This way, larger ranges
@@ -746,6 +792,81 @@ class Subnet(CleanSave, TimestampedModel):
         free_range = min(free_ranges, key=attrgetter('num_addresses'))
         return str(IPAddress(free_range.first))
 
+    def _log_neighbour_allocation(self, discovery):
+        """Warn that the address of `discovery` is about to be allocated."""
+        maaslog.warning(
+            "Next IP address to allocate from '%s' has been observed "
+            "previously: %s was last claimed by %s via %s at %s." % (
+                self.label, discovery.ip, discovery.mac_address,
+                discovery.observer_interface.get_log_string(),
+                discovery.last_seen))
+
+    def get_next_ips_for_allocation(
+            self, count: int, exclude_addresses: Optional[Iterable]=None,
+            avoid_observed_neighbours: bool=True,
+            spread: bool=False) -> List[str]:
+        """Return up to `count` free addresses from this subnet to use next.
+
+        The free ranges are computed once for all the addresses. As with
+        `get_next_ip_for_allocation`, addresses are taken from the smallest
+        free ranges first, to preserve the larger ranges.
+
+        :param exclude_addresses: Optional list of addresses to exclude.
+        :param avoid_observed_neighbours: If True, known observed neighbours
+            are not considered free. If False, the free addresses of observed
+            neighbours come first, least recently seen first, and a warning
+            is logged for each.
+        :param spread: If True, start at a random address in the free ranges
+            (still ordered smallest first) and wrap around, so that
+            concurrent allocations are unlikely to choose the same addresses.
+        :return: A list of at most `count` addresses; fewer if the subnet
+            has fewer free.
+        """
+        # Circular imports.
+        from maasserver.models import Discovery
+        free_ranges = self.get_ipranges_not_in_use(
+            exclude_addresses=exclude_addresses,
+            with_neighbours=avoid_observed_neighbours)
+        addresses = []
+        if avoid_observed_neighbours is False:
+            # As in `get_next_ip_for_allocation`, make an educated guess about
+            # which addresses are least likely to be in use.
+            least_recent_neighbours = Discovery.objects.filter(
+                subnet=self).by_unknown_ip().order_by('last_seen')
+            for discovery in least_recent_neighbours:
+                if len(addresses) >= count:
+                    break
+                address = str(discovery.ip)
+                if address in free_ranges and address not in addresses:
+                    self._log_neighbour_allocation(discovery)
+                    addresses.append(address)
+        chosen = set(addresses)
+        version = self.get_ipnetwork().version
+        spans = [
+            (free_range.first, free_range.last)
+            for free_range in sorted(
+                free_ranges.ranges,
+                key=attrgetter('num_addresses', 'first'))
+        ]
+        if spread and len(spans) > 0:
+            offset = random.randrange(
+                sum(last - first + 1 for first, last in spans))
+            for index, (first, last) in enumerate(spans):
+                if offset <= last - first:
+                    break
+                offset -= last - first + 1
+            spans = (
+                [(first + offset, last)] + spans[index + 1:] +
+                spans[:index] + [(first, first + offset - 1)])
+        for first, last in spans:
+            for value in range(first, last + 1):
+                if len(addresses) >= count:
+                    return addresses
+                address = str(IPAddress(value, version=version))
+                if address not in chosen:
+                    addresses.append(address)
+        return addresses
+
     def render_json_for_related_ips(
             self, with_username=True, with_summary=True):
         """Render a representation of this subnet's related IP addresses,
@@ -169,3 +169,37 @@ class TestDNSPublicationManager(MAASServerTestCase):
         DNSPublication.objects.collect_garbage()
         self.assertThat(get_ages(), Equals(deltas))
         self.assertThat(deltas, HasLength(1))
+
+    def test_get_changes_since_merges_domains_and_subnets(self):
+        previous = DNSPublication(serial=1)
+        previous.save()
+        DNSPublication(serial=2, domain_ids=[1, 2], subnet_ids=[]).save()
+        latest = DNSPublication(serial=3, domain_ids=[2, 3], subnet_ids=[4])
+        latest.save()
+        self.assertThat(
+            DNSPublication.objects.get_changes_since(previous.serial),
+            Equals((latest, {1, 2, 3}, {4})))
+
+    def test_get_changes_since_returns_none_when_unknown(self):
+        previous = DNSPublication(serial=1)
+        previous.save()
+        DNSPublication(serial=2, domain_ids=[1], subnet_ids=[2]).save()
+        DNSPublication(serial=3, domain_ids=[1], subnet_ids=None).save()
+        latest = DNSPublication(serial=4)
+        latest.save()
+        self.assertThat(
+            DNSPublication.objects.get_changes_since(previous.serial),
+            Equals((latest, None, None)))
+
+    def test_get_changes_since_returns_nothing_when_no_changes(self):
+        previous = DNSPublication(serial=1)
+        previous.save()
+        self.assertThat(
+            DNSPublication.objects.get_changes_since(previous.serial),
+            Equals((previous, set(), set())))
+
+    def test_get_changes_since_crashes_when_serial_not_found(self):
+        DNSPublication(serial=2).save()
+        self.assertRaises(
+            DNSPublication.DoesNotExist,
+            DNSPublication.objects.get_changes_since, 1)
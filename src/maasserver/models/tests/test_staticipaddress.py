@@ -10,7 +10,10 @@ from random import (
     shuffle,
 )
 import threading
-from unittest.mock import sentinel
+from unittest.mock import (
+    ANY,
+    sentinel,
+)
 
 from django.core.exceptions import ValidationError
 from django.db import IntegrityError
@@ -35,6 +38,7 @@ from maasserver.models.staticipaddress import (
     StaticIPAddress,
 )
 from maasserver.models.subnet import Subnet
+from maasserver.testing import sampledata
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import (
     MAASServerTestCase,
@@ -47,6 +51,8 @@ from maasserver.utils.orm import (
     transactional,
 )
 from maasserver.websockets.base import dehydrate_datetime
+from maastesting.djangotestcase import count_queries
+from maastesting.matchers import MockCalledOnceWith
 from netaddr import IPAddress
 from psycopg2.errorcodes import FOREIGN_KEY_VIOLATION
 from testtools import ExpectedException
@@ -58,6 +64,7 @@ from testtools.matchers import (
     HasLength,
     Is,
     IsInstance,
+    LessThan,
     Not,
 )
 from twisted.python.failure import Failure
@@ -312,6 +319,87 @@ class TestStaticIPAddressManager(MAASServerTestCase):
                 orm.retry_context.stack._cm_pending,
                 HasLength(0))
 
+    def test_allocate_new_bulk_returns_distinct_valid_ips(self):
+        subnet = factory.make_managed_Subnet()
+        ipaddresses = StaticIPAddress.objects.allocate_new_bulk(subnet, 5)
+        self.assertThat(ipaddresses, HasLength(5))
+        self.assertThat(
+            ipaddresses, AllMatch(IsInstance(StaticIPAddress)))
+        ips = {ipaddress.ip for ipaddress in ipaddresses}
+        self.assertThat(ips, HasLength(5))
+        self.assertThat(ips, AllMatch(
+            AfterPreprocessing(subnet.is_valid_static_ip, Is(True))))
+        self.assertThat(
+            {ipaddress.alloc_type for ipaddress in ipaddresses},
+            Equals({IPADDRESS_TYPE.AUTO}))
+
+    def test_allocate_new_bulk_sets_user(self):
+        subnet = factory.make_managed_Subnet()
+        user = factory.make_User()
+        ipaddresses = StaticIPAddress.objects.allocate_new_bulk(
+            subnet, 2, alloc_type=IPADDRESS_TYPE.USER_RESERVED, user=user)
+        self.assertEqual(
+            [user, user], [ipaddress.user for ipaddress in ipaddresses])
+
+    def test_allocate_new_bulk_spreads_candidates(self):
+        subnet = factory.make_Subnet(
+            cidr="192.168.231.0/29", gateway_ip=None, dns_servers=None)
+        get_next_ips_for_allocation = self.patch(
+            subnet, "get_next_ips_for_allocation")
+        get_next_ips_for_allocation.return_value = ["192.168.231.4"]
+        StaticIPAddress.objects.allocate_new_bulk(subnet, 1)
+        self.assertThat(get_next_ips_for_allocation, MockCalledOnceWith(
+            1, exclude_addresses=ANY, avoid_observed_neighbours=True,
+            spread=True))
+
+    def test_allocate_new_bulk_fails_retryably_if_address_taken(self):
+        subnet = factory.make_Subnet(
+            cidr="192.168.231.0/29", gateway_ip=None, dns_servers=None)
+        # The free addresses were computed before another allocation took
+        # one of them.
+        self.patch(subnet, "get_next_ips_for_allocation").return_value = [
+            "192.168.231.1"]
+        factory.make_StaticIPAddress(
+            ip="192.168.231.1", alloc_type=IPADDRESS_TYPE.STICKY,
+            subnet=subnet)
+
+        def allocate():
+            with orm.savepoint():
+                StaticIPAddress.objects.allocate_new_bulk(subnet, 1)
+
+        error = self.assertRaises(IntegrityError, allocate)
+        self.assertTrue(orm.is_retryable_failure(error))
+
+    def test_allocate_new_bulk_excludes_addresses(self):
+        subnet = factory.make_Subnet(
+            cidr="192.168.232.0/29", gateway_ip=None, dns_servers=None)
+        ipaddresses = StaticIPAddress.objects.allocate_new_bulk(
+            subnet, 5, exclude_addresses=["192.168.232.1"])
+        self.assertItemsEqual(
+            ["192.168.232.%d" % i for i in range(2, 7)],
+            [ipaddress.ip for ipaddress in ipaddresses])
+
+    def test_allocate_new_bulk_uses_observed_neighbours_last(self):
+        subnet = factory.make_Subnet(
+            cidr="192.168.233.0/30", gateway_ip=None, dns_servers=None)
+        rackif = factory.make_Interface(vlan=subnet.vlan)
+        factory.make_Discovery(ip="192.168.233.1", interface=rackif)
+        ipaddresses = StaticIPAddress.objects.allocate_new_bulk(subnet, 2)
+        self.assertEqual(
+            ["192.168.233.2", "192.168.233.1"],
+            [ipaddress.ip for ipaddress in ipaddresses])
+
+    def test_allocate_new_bulk_raises_when_addresses_exhausted(self):
+        subnet = factory.make_Subnet(
+            cidr="192.168.234.0/30", gateway_ip=None, dns_servers=None)
+        e = self.assertRaises(
+            StaticIPAddressExhaustion,
+            StaticIPAddress.objects.allocate_new_bulk,
+            subnet, 3)
+        self.assertEqual(
+            "No more IPs available in subnet: %s." % subnet.cidr,
+            str(e))
+
 
 class TestStaticIPAddressManagerTransactional(MAASTransactionServerTestCase):
     """Transactional tests for `StaticIPAddressManager."""
@@ -361,6 +449,45 @@ class TestStaticIPAddressManagerTransactional(MAASTransactionServerTestCase):
         self.assertThat(ips, AllMatch(
             AfterPreprocessing(subnet.is_valid_static_ip, Is(True))))
 
+    def test_allocate_new_bulk_works_under_concurrency(self):
+        ipv6 = (self.ip_version == 6)
+        subnet = factory.make_managed_Subnet(ipv6=ipv6)
+        count = 8  # Allocate this number of batches.
+        size = 5  # Of this number of IP addresses.
+        mutex = threading.Lock()
+        results = []
+
+        @transactional
+        def allocate():
+            return StaticIPAddress.objects.allocate_new_bulk(subnet, size)
+
+        def allocate_batch():
+            try:
+                sips = allocate()
+            except:
+                failure = Failure()
+                with mutex:
+                    results.append(failure)
+            else:
+                with mutex:
+                    results.extend(sips)
+
+        threads = [
+            threading.Thread(target=allocate_batch)
+            for _ in range(count)
+        ]
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertThat(results, AllMatch(IsInstance(StaticIPAddress)))
+        ips = {sip.ip for sip in results}
+        self.assertThat(ips, HasLength(count * size))
+        self.assertThat(ips, AllMatch(
+            AfterPreprocessing(subnet.is_valid_static_ip, Is(True))))
+
 
 class TestStaticIPAddressManagerMapping(MAASServerTestCase):
     """Tests for get_hostname_ip_mapping()."""
@@ -1100,6 +1227,63 @@ class TestStaticIPAddressManagerMapping(MAASServerTestCase):
         }
 
 
+class TestStaticIPAddressManagerBulkMapping(MAASServerTestCase):
+    """Tests for get_hostname_ip_mappings()."""
+
+    def make_sample_data(self):
+        sampledata.populate()
+        domain = factory.make_Domain()
+        subnet = factory.make_Subnet()
+        factory.make_DNSResource(domain=domain, subnet=subnet)
+        factory.make_StaticIPAddress(
+            alloc_type=IPADDRESS_TYPE.USER_RESERVED, subnet=subnet)
+
+    def test_matches_get_hostname_ip_mapping(self):
+        self.make_sample_data()
+        domains = list(Domain.objects.all())
+        mappings = StaticIPAddress.objects.get_hostname_ip_mappings(domains)
+        self.assertThat(mappings, HasLength(len(domains) + 1))
+        for domain in domains:
+            self.assertThat(
+                mappings[domain], Equals(
+                    StaticIPAddress.objects.get_hostname_ip_mapping(domain)))
+        self.assertThat(
+            mappings[None], Equals(
+                StaticIPAddress.objects.get_hostname_ip_mapping(
+                    Subnet.objects.first())))
+
+    def test_matches_get_hostname_ip_mapping_with_raw_ttl(self):
+        self.make_sample_data()
+        domains = list(Domain.objects.all())
+        mappings = StaticIPAddress.objects.get_hostname_ip_mappings(
+            domains, raw_ttl=True)
+        for domain in domains:
+            self.assertThat(
+                mappings[domain], Equals(
+                    StaticIPAddress.objects.get_hostname_ip_mapping(
+                        domain, raw_ttl=True)))
+
+    def test_omits_reverse_mapping_if_not_requested(self):
+        domain = factory.make_Domain()
+        mappings = StaticIPAddress.objects.get_hostname_ip_mappings(
+            [domain], reverse=False)
+        self.assertThat(mappings, Equals({domain: {}}))
+
+    def test_query_count_does_not_depend_on_number_of_domains(self):
+        self.make_sample_data()
+        domains = list(Domain.objects.all())
+        count_one, _ = count_queries(
+            StaticIPAddress.objects.get_hostname_ip_mappings, domains[:1])
+        count_all, _ = count_queries(
+            StaticIPAddress.objects.get_hostname_ip_mappings, domains)
+        count_each, _ = count_queries(lambda: [
+            StaticIPAddress.objects.get_hostname_ip_mapping(domain)
+            for domain in domains
+        ])
+        self.assertThat(count_all, Equals(count_one))
+        self.assertThat(count_all, LessThan(count_each))
+
+
 class TestStaticIPAddress(MAASServerTestCase):
 
     def test_repr_with_valid_type(self):
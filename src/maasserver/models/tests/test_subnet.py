@@ -32,6 +32,7 @@ from maasserver.models import (
     Config,
     Notification,
     Space,
+    subnet as subnet_module,
 )
 from maasserver.models.subnet import (
     create_cidr,
@@ -49,7 +50,11 @@ from maasserver.utils.orm import (
     get_one,
     reload_object,
 )
-from maastesting.matchers import DocTestMatches
+from maastesting.djangotestcase import count_queries
+from maastesting.matchers import (
+    DocTestMatches,
+    MockCalledOnceWith,
+)
 from netaddr import (
     AddrFormatError,
     IPAddress,
@@ -713,6 +718,57 @@ class TestGetBestSubnetForIP(MAASServerTestCase):
         self.expectThat(subnet, Is(None))
 
 
+class TestGetBestSubnetsForIPs(MAASServerTestCase):
+
+    def test__returns_most_specific_subnets(self):
+        factory.make_Subnet(cidr="10.0.0.0/8")
+        ipv4_subnet = factory.make_Subnet(cidr="10.1.1.0/24")
+        factory.make_Subnet(cidr="10.1.0.0/16")
+        factory.make_Subnet(cidr="2001::/16")
+        ipv6_subnet = factory.make_Subnet(cidr="2001:db8:1:2::/64")
+        subnets = Subnet.objects.get_best_subnets_for_ips(
+            ["10.1.1.1", "10.1.1.2", "2001:db8:1:2::1", "::ffff:10.1.1.3"])
+        self.assertEqual({
+            "10.1.1.1": ipv4_subnet,
+            "10.1.1.2": ipv4_subnet,
+            "2001:db8:1:2::1": ipv6_subnet,
+            "::ffff:10.1.1.3": ipv4_subnet,
+        }, subnets)
+
+    def test__omits_ips_with_no_subnet(self):
+        subnet = factory.make_Subnet(cidr="10.0.0.0/8")
+        subnets = Subnet.objects.get_best_subnets_for_ips(["10.0.0.1", "::"])
+        self.assertEqual({"10.0.0.1": subnet}, subnets)
+
+    def test__omits_ips_that_cannot_be_parsed(self):
+        subnet = factory.make_Subnet(cidr="10.0.0.0/8")
+        subnets = Subnet.objects.get_best_subnets_for_ips(
+            ["10.0.0.1", "not-an-ip"])
+        self.assertEqual({"10.0.0.1": subnet}, subnets)
+
+    def test__shares_one_instance_per_subnet(self):
+        factory.make_Subnet(cidr="10.0.0.0/8")
+        subnets = Subnet.objects.get_best_subnets_for_ips(
+            ["10.0.0.1", "10.0.0.2"])
+        self.assertIs(subnets["10.0.0.1"], subnets["10.0.0.2"])
+
+    def test__matches_get_best_subnet_for_ip(self):
+        factory.make_Subnet(cidr="10.0.0.0/8", dhcp_on=False)
+        factory.make_Subnet(cidr="10.1.0.0/16", dhcp_on=True)
+        factory.make_Subnet(cidr="10.1.1.0/24", dhcp_on=False)
+        ips = ["10.1.1.1", "10.1.2.1", "10.2.0.1"]
+        self.assertEqual({
+            ip: Subnet.objects.get_best_subnet_for_ip(ip)
+            for ip in ips
+        }, Subnet.objects.get_best_subnets_for_ips(ips))
+
+    def test__uses_one_query(self):
+        factory.make_Subnet(cidr="10.0.0.0/8")
+        ips = ["10.0.0.%d" % i for i in range(1, 10)]
+        count, _ = count_queries(Subnet.objects.get_best_subnets_for_ips, ips)
+        self.assertEqual(1, count)
+
+
 class SubnetLabelTest(MAASServerTestCase):
 
     def test__returns_cidr_for_null_name(self):
@@ -1211,6 +1267,55 @@ class TestSubnetGetNextIPForAllocation(MAASServerTestCase):
         ip = subnet.get_next_ip_for_allocation()
         self.assertThat(ip, Equals("10.0.0.5"))
 
+    def test__next_ips_fill_smallest_free_ranges_first(self):
+        # Note: 10.0.0.0/29 --> 10.0.0.1 through 10.0.0.0.6 are usable.
+        subnet = self.make_Subnet(
+            cidr="10.0.0.0/29", gateway_ip=None, dns_servers=None)
+        # With .4 in use, the free ranges are {1, 2, 3}, {5, 6}.
+        factory.make_StaticIPAddress(ip="10.0.0.4", cidr="10.0.0.0/29")
+        ips = subnet.get_next_ips_for_allocation(3)
+        self.assertThat(ips, Equals(["10.0.0.5", "10.0.0.6", "10.0.0.1"]))
+
+    def test__next_ips_use_least_recently_seen_neighbours_first(self):
+        # Note: 10.0.0.0/29 --> 10.0.0.1 through 10.0.0.0.6 are usable.
+        subnet = self.make_Subnet(
+            cidr="10.0.0.0/29", gateway_ip=None, dns_servers=None)
+        rackif = factory.make_Interface(vlan=subnet.vlan)
+        dt_now = now()
+        factory.make_Discovery(
+            ip="10.0.0.2", interface=rackif, updated=dt_now)
+        factory.make_Discovery(
+            ip="10.0.0.6", interface=rackif,
+            updated=dt_now - timedelta(days=1))
+        logger = self.useFixture(FakeLogger("maas"))
+        ips = subnet.get_next_ips_for_allocation(
+            3, avoid_observed_neighbours=False)
+        self.assertThat(ips, Equals(["10.0.0.6", "10.0.0.2", "10.0.0.1"]))
+        self.assertThat(logger.output, DocTestMatches(
+            "...observed previously: 10.0.0.6..."
+            "...observed previously: 10.0.0.2..."))
+
+    def test__next_ips_spread_starts_at_random_offset_and_wraps(self):
+        # Note: 10.0.0.0/29 --> 10.0.0.1 through 10.0.0.0.6 are usable.
+        subnet = self.make_Subnet(
+            cidr="10.0.0.0/29", gateway_ip=None, dns_servers=None)
+        # With .4 in use, the free ranges are {5, 6}, {1, 2, 3} in order.
+        factory.make_StaticIPAddress(ip="10.0.0.4", cidr="10.0.0.0/29")
+        randrange = self.patch(subnet_module.random, "randrange")
+        randrange.return_value = 3
+        ips = subnet.get_next_ips_for_allocation(5, spread=True)
+        self.assertThat(randrange, MockCalledOnceWith(5))
+        self.assertThat(ips, Equals([
+            "10.0.0.2", "10.0.0.3", "10.0.0.5", "10.0.0.6", "10.0.0.1"]))
+
+    def test__next_ips_returns_fewer_when_exhausted(self):
+        # Note: 10.0.0.0/30 --> 10.0.0.1 and 10.0.0.0.2 are usable.
+        subnet = self.make_Subnet(
+            cidr="10.0.0.0/30", gateway_ip=None, dns_servers=None)
+        ips = subnet.get_next_ips_for_allocation(
+            5, exclude_addresses=["10.0.0.1"])
+        self.assertThat(ips, Equals(["10.0.0.2"]))
+
 
 class TestUnmanagedSubnets(MAASServerTestCase):
 
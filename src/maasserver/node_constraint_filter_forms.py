@@ -128,6 +128,7 @@ IGNORED_FIELDS = {
     'verbose',
     'op',
     'agent_name',
+    'count',
 }
 
 
@@ -784,15 +785,20 @@ class AcquireNodeForm(RenamableFieldsForm):
             for constraint in constraints
             if constraint is not None)
 
-    def filter_nodes(self, nodes):
+    def filter_nodes(self, nodes, node_ids=None):
         """Return the subset of nodes that match the form's constraints.
 
         :param nodes:  The set of nodes on which the form should apply
             constraints.
         :type nodes: `django.db.models.query.QuerySet`
+        :param node_ids: Optionally, the ids of the only nodes to consider,
+            e.g. the candidates found by `AllocationIndex`.
         :return: A QuerySet of the nodes that match the form's constraints.
         :rtype: `django.db.models.query.QuerySet`
         """
+        if node_ids is not None:
+            node_ids = list(node_ids)
+            nodes = nodes.filter(id__in=node_ids)
         filtered_nodes = nodes
         filtered_nodes = self.filter_by_pod_or_pod_type(filtered_nodes)
         filtered_nodes = self.filter_by_hostname(filtered_nodes)
@@ -808,7 +814,7 @@ class AcquireNodeForm(RenamableFieldsForm):
         filtered_nodes = self.filter_by_fabrics(filtered_nodes)
         filtered_nodes = self.filter_by_fabric_classes(filtered_nodes)
         compatible_nodes, filtered_nodes = self.filter_by_storage(
-            filtered_nodes)
+            filtered_nodes, node_ids)
         compatible_interfaces, filtered_nodes = self.filter_by_interfaces(
             filtered_nodes)
         filtered_nodes = self.reorder_nodes_by_cost(filtered_nodes)
@@ -825,6 +831,25 @@ class AcquireNodeForm(RenamableFieldsForm):
             select={'cost': "cpu_count + memory / 1024."})
         return filtered_nodes.order_by("cost")
 
+    def select_nodes_for_update(self, filtered_nodes, count):
+        """Lock and return up to `count` of `filtered_nodes`, cheapest first.
+
+        The nodes are chosen and locked by a single `SELECT ... FOR UPDATE
+        SKIP LOCKED`, so nodes locked by another transaction are passed over
+        rather than waited for. This must be called in a transaction.
+
+        :param filtered_nodes: The nodes returned by `filter_nodes`.
+        :param count: The maximum number of nodes to return.
+        :return: A list of at most `count` distinct nodes.
+        """
+        # FOR UPDATE can't be used with DISTINCT, so the matching nodes are
+        # found by a subquery.
+        nodes = filtered_nodes.model.objects.filter(
+            id__in=filtered_nodes.order_by().values("id"))
+        nodes = nodes.extra(select={'cost': "cpu_count + memory / 1024."})
+        nodes = nodes.order_by("cost", "id")
+        return list(nodes.select_for_update(skip_locked=True)[:count])
+
     def filter_by_interfaces(self, filtered_nodes):
         compatible_interfaces = {}
         interfaces_label_map = self.cleaned_data.get(
@@ -837,12 +862,12 @@ class AcquireNodeForm(RenamableFieldsForm):
 
         return compatible_interfaces, filtered_nodes
 
-    def filter_by_storage(self, filtered_nodes):
+    def filter_by_storage(self, filtered_nodes, node_ids=None):
         compatible_nodes = {}  # Maps node/storage to named storage constraints
         storage = self.cleaned_data.get(
             self.get_field_name('storage'))
         if storage:
-            compatible_nodes = nodes_by_storage(storage)
+            compatible_nodes = nodes_by_storage(storage, node_ids=node_ids)
             node_ids = list(compatible_nodes)
             if node_ids is not None:
                 filtered_nodes = filtered_nodes.filter(id__in=node_ids)
@@ -37,9 +37,10 @@ from provisioningserver.logger import (
 )
 from provisioningserver.rpc.cluster import EvaluateTag
 from provisioningserver.tags import (
+    compile_xpath,
     DEFAULT_BATCH_SIZE,
     gen_batches,
-    merge_details,
+    merge_details_cached,
 )
 from provisioningserver.utils import classify
 from provisioningserver.utils.twisted import (
@@ -184,6 +185,18 @@ def _do_populate_tags(clients):
     return [d]
 
 
+def _get_tag_xpath(definition):
+    """Return `definition` compiled, or as-is if it is not valid.
+
+    `try_match_xpath` logs invalid expressions, and treats them as not
+    matching, when they are given to it uncompiled.
+    """
+    try:
+        return compile_xpath(definition, tag_nsmap)
+    except etree.XPathError:
+        return definition
+
+
 @synchronous
 def populate_tags_for_single_node(tags, node):
     """Reevaluate all tags for a single node.
@@ -195,11 +208,12 @@ def populate_tags_for_single_node(tags, node):
     connected.
     """
     probed_details = get_single_probed_details(node)
-    probed_details_doc = merge_details(probed_details)
-    # Same document, many queries: use XPathEvaluator.
-    evaluator = etree.XPathEvaluator(probed_details_doc, namespaces=tag_nsmap)
-    evaluator = partial(try_match_xpath, doc=evaluator, logger=logger)
-    tags_defined = ((tag, tag.definition) for tag in tags if tag.is_defined)
+    probed_details_doc = merge_details_cached(probed_details)
+    # Same document, many queries: use the compiled expressions.
+    evaluator = partial(try_match_xpath, doc=probed_details_doc, logger=logger)
+    tags_defined = (
+        (tag, _get_tag_xpath(tag.definition))
+        for tag in tags if tag.is_defined)
     tags_matching, tags_nonmatching = classify(evaluator, tags_defined)
     node.tags.remove(*tags_nonmatching)
     node.tags.add(*tags_matching)
@@ -215,12 +229,12 @@ def populate_tag_for_multiple_nodes(tag, nodes, batch_size=DEFAULT_BATCH_SIZE):
     locally, i.e. when there are no rack controllers connected.
     """
     # Same expression, multuple documents: compile expression with XPath.
-    xpath = etree.XPath(tag.definition, namespaces=tag_nsmap)
+    xpath = compile_xpath(tag.definition, tag_nsmap)
     # The XML details documents can be large so work in batches.
     for batch in gen_batches(nodes, batch_size):
         probed_details = get_probed_details(batch)
         probed_details_docs_by_node = {
-            node: merge_details(probed_details[node.system_id])
+            node: merge_details_cached(probed_details[node.system_id])
             for node in batch
         }
         nodes_matching, nodes_nonmatching = classify(
@@ -17,9 +17,12 @@ __all__ = [
     ]
 
 from collections import namedtuple
+from copy import copy
 import json
 import os.path
 from pipes import quote
+import threading
+import time
 from urllib.parse import (
     urlencode,
     urlparse,
@@ -719,18 +722,11 @@ def get_preseed_template(filenames):
     """
     assert not isinstance(filenames, (bytes, str))
     assert all(isinstance(filename, str) for filename in filenames)
-    for location in settings.PRESEED_TEMPLATE_LOCATIONS:
-        for filename in filenames:
-            filepath = os.path.join(location, filename)
-            try:
-                with open(filepath, "r", encoding="utf-8") as stream:
-                    content = stream.read()
-            except IOError:
-                pass  # Ignore.
-            else:
-                return filepath, content
-    else:
+    filepath, template = preseed_template_cache.get(filenames)
+    if filepath is None:
         return None, None
+    else:
+        return filepath, template.content
 
 
 def get_escape_singleton():
@@ -755,6 +751,108 @@ class PreseedTemplate(tempita.Template):
         escape=get_escape_singleton())
 
 
+class PreseedTemplateCache:
+    """Process-wide cache of preseed template lookups and parsed templates.
+
+    The names in each of `PRESEED_TEMPLATE_LOCATIONS` are listed once, and
+    again only when the location's mtime changes, so finding a template does
+    not try to open every candidate filename. Templates are parsed once per
+    path, and again only when the file's mtime or size changes.
+
+    As with git's index, a file or directory modified within the last
+    `MTIME_GRANULARITY` seconds is not cached: the file system may give a
+    later change the same mtime.
+
+    :ivar hits: The number of templates found already parsed.
+    :ivar misses: The number of templates that had to be read and parsed.
+    """
+
+    MTIME_GRANULARITY = 2
+
+    def __init__(self):
+        super(PreseedTemplateCache, self).__init__()
+        self.lock = threading.Lock()
+        # Map of location to (version, frozenset of names).
+        self.listings = {}
+        # Map of path to (version, PreseedTemplate).
+        self.templates = {}
+        self.hits = 0
+        self.misses = 0
+
+    def is_settled(self, stat):
+        """Whether a change since `stat` would have changed its mtime."""
+        return time.time() - stat.st_mtime >= self.MTIME_GRANULARITY
+
+    def list_location(self, location):
+        """Return the set of names in the directory `location`."""
+        try:
+            stat = os.stat(location)
+        except OSError:
+            return frozenset()
+        version = stat.st_mtime_ns, stat.st_ino
+        with self.lock:
+            cached = self.listings.get(location)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        try:
+            names = frozenset(os.listdir(location))
+        except OSError:
+            return frozenset()
+        if self.is_settled(stat):
+            with self.lock:
+                self.listings[location] = version, names
+        return names
+
+    def load(self, filepath):
+        """Return the parsed template at `filepath`.
+
+        The template has no `get_template` hook, and must not be modified.
+
+        :raise OSError: If the template cannot be read.
+        """
+        stat = os.stat(filepath)
+        version = stat.st_mtime_ns, stat.st_size, stat.st_ino
+        with self.lock:
+            cached = self.templates.get(filepath)
+            if cached is not None and cached[0] == version:
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+        with open(filepath, "r", encoding="utf-8") as stream:
+            content = stream.read()
+        template = PreseedTemplate(content, name=filepath)
+        if self.is_settled(stat):
+            with self.lock:
+                self.templates[filepath] = version, template
+        return template
+
+    def get(self, filenames):
+        """Return the path and parsed template for the first template found.
+
+        :param filenames: An iterable of relative filenames.
+        :return: A ``(filepath, template)`` tuple, or ``(None, None)``.
+        """
+        for location in settings.PRESEED_TEMPLATE_LOCATIONS:
+            names = self.list_location(location)
+            for filename in filenames:
+                if filename in names:
+                    filepath = os.path.join(location, filename)
+                    try:
+                        return filepath, self.load(filepath)
+                    except OSError:
+                        pass  # Ignore.
+        return None, None
+
+    def clear(self):
+        """Forget all cached listings and templates."""
+        with self.lock:
+            self.listings.clear()
+            self.templates.clear()
+
+
+preseed_template_cache = PreseedTemplateCache()
+
+
 class TemplateNotFoundError(Exception):
     """The template has not been found."""
 
@@ -780,13 +878,14 @@ def load_preseed_template(node, prefix, osystem='', release=''):
         """
         filenames = list(get_preseed_filenames(
             node, name, osystem, release, default))
-        filepath, content = get_preseed_template(filenames)
+        filepath, template = preseed_template_cache.get(filenames)
         if filepath is None:
             raise TemplateNotFoundError(name)
-        # This is where the closure happens: pass `get_template` when
-        # instanciating PreseedTemplate.
-        return PreseedTemplate(
-            content, name=filepath, get_template=get_template)
+        # This is where the closure happens: set `get_template` on a copy
+        # of the shared, cached PreseedTemplate.
+        template = copy(template)
+        template.get_template = get_template
+        return template
 
     return get_template(prefix, None, default=True)
 
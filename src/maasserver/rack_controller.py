@@ -30,6 +30,12 @@ DHCP:
     for messages on 'sys_dhcp_{id}' channel and set that rack controller as
     needing an update. Any time a message is received on this queue that rack
     controller is marked as needing an update.
+
+Boot config:
+    Each regiond process also listens for messages on the 'sys_boot_config'
+    channel. Each message holds the MAC addresses of a node whose boot
+    configuration has changed, and the watched rack controllers are told to
+    drop any boot configuration they have cached for those MAC addresses.
 """
 
 __all__ = [
@@ -41,9 +47,11 @@ from functools import partial
 from maasserver import dhcp
 from maasserver.listener import PostgresListenerUnregistrationError
 from maasserver.models.node import RackController
+from maasserver.rpc import getClientFor
 from maasserver.utils.orm import transactional
 from maasserver.utils.threads import deferToDatabase
 from provisioningserver.logger import LegacyLogger
+from provisioningserver.rpc.cluster import InvalidateBootConfig
 from provisioningserver.rpc.exceptions import NoConnectionsAvailable
 from provisioningserver.utils.twisted import (
     asynchronous,
@@ -54,9 +62,11 @@ from twisted.application.service import Service
 from twisted.internet import reactor
 from twisted.internet.defer import (
     CancelledError,
+    DeferredList,
     maybeDeferred,
 )
 from twisted.internet.task import LoopingCall
+from twisted.protocols.amp import UnhandledCommand
 
 
 log = LegacyLogger()
@@ -98,6 +108,8 @@ class RackControllerService(Service):
             self.processId = processId
             self.postgresListener.register(
                 "sys_core_%d" % self.processId, self.coreHandler)
+            self.postgresListener.register(
+                "sys_boot_config", self.bootConfigHandler)
             return self.processId
 
         @transactional
@@ -149,6 +161,14 @@ class RackControllerService(Service):
                 # Error is acceptable as it might not have been called yet.
                 pass
 
+            # Unregister the boot config handler.
+            try:
+                self.postgresListener.unregister(
+                    "sys_boot_config", self.bootConfigHandler)
+            except PostgresListenerUnregistrationError:
+                # Error is acceptable as it might not have been called yet.
+                pass
+
             # Unregister all DHCP handling.
             for rack_id in self.watching:
                 try:
@@ -200,6 +220,45 @@ class RackControllerService(Service):
             self.needsDHCPUpdate.add(rack_id)
             self.startProcessing()
 
+    def bootConfigHandler(self, channel, message):
+        """Called when the `sys_boot_config` message is received."""
+        macs = message.split()
+        if len(macs) == 0 or len(self.watching) == 0:
+            return None
+        d = deferToDatabase(self.getWatchedSystemIDs)
+        d.addCallback(self.invalidateBootConfig, macs)
+        d.addErrback(log.err, "Failed to invalidate cached boot configs.")
+        return d
+
+    @transactional
+    def getWatchedSystemIDs(self):
+        """Return the system_id of each watched rack controller."""
+        return list(
+            RackController.objects.filter(
+                id__in=self.watching).values_list("system_id", flat=True))
+
+    def invalidateBootConfig(self, system_ids, macs):
+        """Tell the rack controllers to drop cached boot configs for `macs`.
+        """
+        def invalidate(client):
+            return client(InvalidateBootConfig, macs=macs)
+
+        def eb_invalidate(failure, system_id):
+            # Older rack controllers do not cache boot configs.
+            if failure.check(NoConnectionsAvailable, UnhandledCommand):
+                return None
+            log.err(
+                failure, "Failed to invalidate cached boot configs on rack "
+                "controller '%s'." % system_id)
+
+        ds = []
+        for system_id in system_ids:
+            d = maybeDeferred(getClientFor, system_id)
+            d.addCallback(invalidate)
+            d.addErrback(eb_invalidate, system_id)
+            ds.append(d)
+        return DeferredList(ds)
+
     def startProcessing(self):
         """Start the process looping call."""
         if not self.processing.running:
@@ -12,6 +12,13 @@ DNS:
     as requiring an update. Once marked for update the DNS configuration is
     updated and bind9 is told to reload.
 
+    Each `DNSPublication` records which domains and subnets it affects. When
+    the publications since the last update carry that information for
+    either forward or reverse zones, only the affected zones are regenerated
+    and reloaded. Otherwise all zones and the BIND configuration are
+    regenerated. A timer also forces such a full update every
+    `FULL_DNS_UPDATE_INTERVAL` seconds, even if nothing has been published.
+
 Proxy:
     The regiond process listens for messages from Postgres on channel
     'sys_proxy'. Any time a message is recieved on that channel the maas-proxy
@@ -23,7 +30,10 @@ __all__ = [
     "RegionControllerService",
 ]
 
-from maasserver.dns.config import dns_update_all_zones
+from maasserver.dns.config import (
+    dns_update_all_zones,
+    dns_update_zones,
+)
 from maasserver.models.dnspublication import DNSPublication
 from maasserver.proxyconfig import proxy_update_config
 from maasserver.utils.orm import transactional
@@ -46,6 +56,10 @@ from twisted.names.client import Resolver
 
 log = LegacyLogger()
 
+# The time, in seconds, between forced full regenerations of DNS zones and
+# configuration. In between, zones are updated incrementally where possible.
+FULL_DNS_UPDATE_INTERVAL = 60 * 60
+
 
 class DNSReloadError(Exception):
     """Error raised when the bind never fully reloads the zone."""
@@ -77,6 +91,9 @@ class RegionControllerService(Service):
         self.dnsResolver = Resolver(
             resolv=None, servers=[('127.0.0.1', 53)],
             timeout=(1,), reactor=clock)
+        self.fullDNSUpdates = LoopingCall(self.markFullDNSForUpdate)
+        self.fullDNSUpdates.clock = self.clock
+        self.needsFullDNSUpdate = False
         self.previousSerial = None
 
     @asynchronous(timeout=FOREVER)
@@ -90,12 +107,17 @@ class RegionControllerService(Service):
         self.markDNSForUpdate(None, None)
         self.markProxyForUpdate(None, None)
 
+        # The first update is a full one, so the next is due an interval on.
+        self.fullDNSUpdates.start(FULL_DNS_UPDATE_INTERVAL, now=False)
+
     @asynchronous(timeout=FOREVER)
     def stopService(self):
         """Close the controller."""
         super(RegionControllerService, self).stopService()
         self.postgresListener.unregister("sys_dns", self.markDNSForUpdate)
         self.postgresListener.unregister("sys_proxy", self.markProxyForUpdate)
+        if self.fullDNSUpdates.running:
+            self.fullDNSUpdates.stop()
         if self.processingDefer is not None:
             self.processingDefer, d = None, self.processingDefer
             self.processing.stop()
@@ -106,6 +128,11 @@ class RegionControllerService(Service):
         self.needsDNSUpdate = True
         self.startProcessing()
 
+    def markFullDNSForUpdate(self):
+        """Called every `FULL_DNS_UPDATE_INTERVAL` seconds."""
+        self.needsFullDNSUpdate = True
+        self.markDNSForUpdate(None, None)
+
     def markProxyForUpdate(self, channel, message):
         """Called when the `sys_proxy` message is received."""
         self.needsProxyUpdate = True
@@ -121,7 +148,9 @@ class RegionControllerService(Service):
         defers = []
         if self.needsDNSUpdate:
             self.needsDNSUpdate = False
-            d = deferToDatabase(transactional(dns_update_all_zones))
+            full = self._isFullDNSUpdateDue()
+            self.needsFullDNSUpdate = False
+            d = deferToDatabase(self._updateDNS, full)
             d.addCallback(self._checkSerial)
             d.addCallback(self._logDNSReload)
             d.addErrback(
@@ -145,6 +174,30 @@ class RegionControllerService(Service):
         else:
             return DeferredList(defers)
 
+    def _isFullDNSUpdateDue(self):
+        """Return whether all zones must be regenerated, regardless of what
+        has changed since the previous update."""
+        return self.previousSerial is None or self.needsFullDNSUpdate
+
+    @transactional
+    def _updateDNS(self, full):
+        """Update DNS zones, only those affected by changes if possible.
+
+        :param full: Whether all zones must be regenerated.
+        """
+        if not full:
+            try:
+                publication, domain_ids, subnet_ids = (
+                    DNSPublication.objects.get_changes_since(
+                        int(self.previousSerial)))
+            except DNSPublication.DoesNotExist:
+                pass  # Changes since the previous update are unknown.
+            else:
+                if domain_ids is not None or subnet_ids is not None:
+                    return dns_update_zones(
+                        domain_ids, subnet_ids, publication.serial)
+        return dns_update_all_zones()
+
     @inlineCallbacks
     def _checkSerial(self, result):
         """Check that the serial of the domain is updated."""
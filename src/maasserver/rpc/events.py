@@ -7,8 +7,13 @@ __all__ = [
     "register_event_type",
     "send_event",
     "send_event_mac_address",
+    "send_events",
 ]
 
+from django.db import (
+    connection,
+    IntegrityError,
+)
 from maasserver.enum import INTERFACE_TYPE
 from maasserver.models import (
     Event,
@@ -16,7 +21,15 @@ from maasserver.models import (
     Interface,
     Node,
 )
-from maasserver.utils.orm import transactional
+from maasserver.utils.orm import (
+    is_foreign_key_violation,
+    savepoint,
+    transactional,
+)
+from netaddr import (
+    AddrFormatError,
+    EUI,
+)
 from provisioningserver.logger import LegacyLogger
 from provisioningserver.rpc.exceptions import NoSuchEventType
 from provisioningserver.utils.twisted import synchronous
@@ -24,6 +37,10 @@ from provisioningserver.utils.twisted import synchronous
 
 log = LegacyLogger()
 
+# IDs of event types, by name. Event types are registered once, from a
+# static catalog, so `send_events` need not look them up for every batch.
+event_type_ids = {}
+
 
 @synchronous
 @transactional
@@ -93,3 +110,121 @@ def send_event_mac_address(mac_address, type_name, description, timestamp):
         Event.objects.create(
             node=interface.node, type=event_type, description=description,
             created=timestamp)
+
+
+def get_event_type_ids(type_names):
+    """Return a dict of the IDs of the event types named in `type_names`.
+
+    IDs are cached in `event_type_ids`. Event types that do not exist are
+    omitted.
+    """
+    missing = set(type_names).difference(event_type_ids)
+    if len(missing) > 0:
+        event_type_ids.update(
+            EventType.objects.filter(name__in=missing).values_list(
+                "name", "id"))
+    return {
+        type_name: event_type_ids[type_name]
+        for type_name in type_names
+        if type_name in event_type_ids
+    }
+
+
+def _create_events(events, timestamp):
+    """Create `events` in bulk, as for `send_events`."""
+    type_ids = get_event_type_ids({event["type_name"] for event in events})
+    system_ids = {
+        event["system_id"] for event in events
+        if event.get("system_id") is not None
+    }
+    # MAC addresses are parsed here because PostgreSQL would reject a
+    # malformed one in the query below, losing the whole batch. Events with
+    # a malformed MAC address are skipped like those for unknown nodes.
+    mac_addresses = {}
+    for event in events:
+        mac_address = event.get("mac_address")
+        if event.get("system_id") is None and mac_address is not None:
+            try:
+                mac_addresses[mac_address] = EUI(mac_address)
+            except AddrFormatError:
+                pass
+    node_ids = {}
+    if len(system_ids) > 0:
+        node_ids.update(
+            Node.objects.filter(system_id__in=system_ids).values_list(
+                "system_id", "id"))
+    if len(mac_addresses) > 0:
+        interfaces = Interface.objects.filter(
+            type=INTERFACE_TYPE.PHYSICAL, mac_address__in={
+                str(mac_address) for mac_address in mac_addresses.values()})
+        node_ids.update(
+            (EUI(mac_address.raw), node_id)
+            for mac_address, node_id in interfaces.values_list(
+                "mac_address", "node_id"))
+
+    new_events = []
+    for event in events:
+        type_name = event["type_name"]
+        if event.get("system_id") is not None:
+            node_id = node_ids.get(event["system_id"])
+        else:
+            node_id = node_ids.get(mac_addresses.get(event.get("mac_address")))
+        if type_name not in type_ids:
+            log.debug(
+                "Event '{type}: {description}' sent with non-existent "
+                "event type.", type=type_name,
+                description=event["description"])
+        elif node_id is None:
+            # As in `send_event`, the cluster may be sending events for a
+            # node that we don't know about yet, most likely because it is
+            # trying to enlist.
+            log.debug(
+                "Event '{type}: {description}' sent for non-existent "
+                "node '{node}'.", type=type_name,
+                description=event["description"],
+                node=event.get("system_id") or event.get("mac_address"))
+        else:
+            new_events.append(Event(
+                type_id=type_ids[type_name], node_id=node_id,
+                description=event["description"], created=timestamp,
+                updated=timestamp))
+    Event.objects.bulk_create(new_events)
+
+
+def _set_constraints(mode):
+    """Set when foreign keys are checked in this transaction."""
+    with connection.cursor() as cursor:
+        cursor.execute("SET CONSTRAINTS ALL %s" % mode)
+
+
+@synchronous
+@transactional
+def send_events(events, timestamp):
+    """Send many events.
+
+    for :py:class:`~provisioningserver.rpc.region.SendEvents`.
+
+    Event types are looked up in `event_type_ids`, and the nodes of all the
+    events are found at once, before the events are created in bulk.
+
+    :param events: A list of dicts with `type_name` and `description` keys,
+        and either a `system_id` or a `mac_address` key. Events of unknown
+        types, or for unknown nodes, are skipped.
+    :param timestamp: The time at which the events were received.
+    """
+    try:
+        with savepoint():
+            # Foreign keys are otherwise only checked at commit, when a stale
+            # ID in `event_type_ids` could no longer be dealt with here.
+            _set_constraints("IMMEDIATE")
+            _create_events(events, timestamp)
+    except IntegrityError as error:
+        if is_foreign_key_violation(error):
+            # A cached event type, or a node, has been deleted since it was
+            # looked up. Look everything up afresh and try once more.
+            event_type_ids.clear()
+            _create_events(events, timestamp)
+        else:
+            raise
+    finally:
+        _set_constraints("DEFERRED")
@@ -5,13 +5,18 @@
 
 __all__ = [
     "update_lease",
+    "update_leases",
 ]
 
+from collections import defaultdict
 from datetime import datetime
 
+from django.db import transaction
+from django.db.models import prefetch_related_objects
 from maasserver.enum import (
     IPADDRESS_FAMILY,
     IPADDRESS_TYPE,
+    IPRANGE_TYPE,
 )
 from maasserver.models import (
     DNSResource,
@@ -22,7 +27,10 @@ from maasserver.models import (
     UnknownInterface,
 )
 from maasserver.utils.orm import transactional
-from netaddr import IPAddress
+from netaddr import (
+    EUI,
+    IPAddress,
+)
 from provisioningserver.logger import LegacyLogger
 from provisioningserver.utils.network import coerce_to_valid_hostname
 from provisioningserver.utils.twisted import synchronous
@@ -44,6 +52,20 @@ def _is_valid_hostname(hostname):
     )
 
 
+def _get_dynamic_range_for_ip(subnet, ip):
+    """Return the dynamic `IPRange` of `subnet` containing `ip`, if any.
+
+    Unlike `Subnet.get_dynamic_range_for_ip` this will use the subnet's IP
+    ranges if they have been prefetched.
+    """
+    ip = IPAddress(ip)
+    for iprange in subnet.iprange_set.all():
+        if iprange.type == IPRANGE_TYPE.DYNAMIC:
+            if ip in iprange.netaddr_iprange:
+                return iprange
+    return None
+
+
 @synchronous
 @transactional
 def update_lease(
@@ -79,13 +101,96 @@ def update_lease(
     :raises NoSuchCluster: If the cluster identified by `cluster_uuid` does not
         exist.
     """
+    subnet = Subnet.objects.get_best_subnet_for_ip(ip)
+    interfaces_by_mac = {
+        str(mac): list(Interface.objects.filter(mac_address=mac)),
+    }
+    node_hostnames = set()
+    if _is_valid_hostname(hostname):
+        node_hostnames.update(
+            Node.objects.filter(
+                hostname=coerce_to_valid_hostname(hostname)).values_list(
+                "hostname", flat=True))
+    return _update_lease(
+        action, mac, ip_family, ip, timestamp, lease_time, hostname,
+        subnet, interfaces_by_mac, node_hostnames)
+
+
+@synchronous
+@transactional
+def update_leases(leases):
+    """Update many DHCP leases from a cluster, in order.
+
+    This is equivalent to calling `update_lease` for each lease in turn, but
+    the subnets, interfaces, and node hostnames needed for the whole batch are
+    each found with a single query, and all leases are updated within a single
+    transaction. A lease that cannot be updated because of a `LeaseUpdateError`
+    is logged and skipped; it does not prevent the others from being updated.
+
+    :param leases: A list of dicts, each with the keyword arguments for
+        `update_lease`, as found in
+        :py:class`~provisioningserver.rpc.region.UpdateLeases`.
+    """
+    if len(leases) == 0:
+        return {}
+
+    subnets = Subnet.objects.get_best_subnets_for_ips(
+        lease["ip"] for lease in leases)
+    # Leases on the same subnet share its instance, so this prefetches the
+    # ranges of every subnet once.
+    prefetch_related_objects(list(subnets.values()), "iprange_set")
+
+    macs = {str(lease["mac"]) for lease in leases}
+    interfaces_by_eui = defaultdict(list)
+    for interface in Interface.objects.filter(mac_address__in=macs):
+        interfaces_by_eui[EUI(str(interface.mac_address))].append(interface)
+    interfaces_by_mac = {
+        mac: interfaces_by_eui.get(EUI(mac), [])
+        for mac in macs
+    }
+
+    node_hostnames = set(
+        Node.objects.filter(hostname__in={
+            coerce_to_valid_hostname(lease["hostname"])
+            for lease in leases
+            if _is_valid_hostname(lease.get("hostname"))
+        }).values_list("hostname", flat=True))
+
+    for lease in leases:
+        try:
+            # Use a savepoint so that a failed lease does not spoil the
+            # transaction for the rest of the batch.
+            with transaction.atomic():
+                _update_lease(
+                    lease["action"], lease["mac"], lease["ip_family"],
+                    lease["ip"], lease["timestamp"], lease.get("lease_time"),
+                    lease.get("hostname"), subnets.get(lease["ip"]),
+                    interfaces_by_mac, node_hostnames)
+        except LeaseUpdateError as error:
+            log.msg("Failed to update lease: %s" % error)
+    return {}
+
+
+def _update_lease(
+        action, mac, ip_family, ip, timestamp, lease_time, hostname,
+        subnet, interfaces_by_mac, node_hostnames):
+    """Update one DHCP lease, given everything that needs to be looked up.
+
+    See `update_lease` for a description of the lease arguments.
+
+    :param subnet: The best `Subnet` for `ip`, or `None`.
+    :param interfaces_by_mac: A dict of MAC address, as a string, to the list
+        of interfaces with that MAC address. This is updated when a new
+        unknown interface is created for `mac`.
+    :param node_hostnames: A set of the node hostnames that are equal to the
+        coerced `hostname`.
+    """
     # Check for a valid action.
     if action not in ["commit", "expiry", "release"]:
         raise LeaseUpdateError("Unknown lease action: %s" % action)
 
     # Get the subnet for this IP address. If no subnet exists then something
     # is wrong as we should not be recieving message about unknown subnets.
-    subnet = Subnet.objects.get_best_subnet_for_ip(ip)
     if subnet is None:
         raise LeaseUpdateError("No subnet exists for: %s" % ip)
 
@@ -107,19 +212,19 @@ def update_lease(
 
     # We will recieve actions on all addresses in the subnet. We only want
     # to update the addresses in the dynamic range.
-    dynamic_range = subnet.get_dynamic_range_for_ip(IPAddress(ip))
+    dynamic_range = _get_dynamic_range_for_ip(subnet, ip)
     if dynamic_range is None:
         # Do nothing.
         return {}
 
-    interfaces = list(Interface.objects.filter(mac_address=mac))
+    interfaces = interfaces_by_mac.get(str(mac), [])
     if len(interfaces) == 0 and action == "commit":
         # A MAC address that is unknown to MAAS was given an IP address. Create
         # an unknown interface for this lease.
         unknown_interface = UnknownInterface(
             name="eth0", mac_address=mac, vlan_id=subnet.vlan_id)
         unknown_interface.save()
-        interfaces = [unknown_interface]
+        interfaces = interfaces_by_mac[str(mac)] = [unknown_interface]
     elif len(interfaces) == 0:
         # No interfaces and not commit action so nothing needs to be done.
         return {}
@@ -167,9 +272,7 @@ def update_lease(
             # MAAS automatically manages DNS for node hostnames, so we cannot
             # allow a DHCP client to override that.
             hostname_belongs_to_a_node = (
-                Node.objects.filter(
-                    hostname=coerce_to_valid_hostname(sip_hostname)).exists()
-            )
+                coerce_to_valid_hostname(sip_hostname) in node_hostnames)
             if hostname_belongs_to_a_node:
                 # Ensure we don't allow a DHCP hostname to override a node
                 # hostname.
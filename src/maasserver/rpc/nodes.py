@@ -6,6 +6,7 @@
 __all__ = [
     "mark_node_failed",
     "update_node_power_state",
+    "update_node_power_states",
     "commission_node",
     "create_node",
 ]
@@ -187,6 +188,30 @@ def update_node_power_state(system_id, power_state):
     node.update_power_state(power_state)
 
 
+@synchronous
+@transactional
+def update_node_power_states(power_states):
+    """Update the power states of many nodes.
+
+    for :py:class:`~provisioningserver.rpc.region.UpdateNodePowerStates`.
+
+    :param power_states: A list of dicts with `system_id` and `power_state`
+        keys. Nodes that do not exist are skipped.
+    """
+    system_ids = {
+        power_state["system_id"]
+        for power_state in power_states
+    }
+    nodes = {
+        node.system_id: node
+        for node in Node.objects.filter(system_id__in=system_ids)
+    }
+    for power_state in power_states:
+        node = nodes.get(power_state["system_id"])
+        if node is not None:
+            node.update_power_state(power_state["power_state"])
+
+
 @synchronous
 @transactional
 def create_node(
@@ -30,6 +30,7 @@ from maasserver.rpc import (
     packagerepository,
     rackcontrollers,
 )
+from maasserver.rpc.events import send_events
 from maasserver.rpc.nodes import (
     commission_node,
     create_node,
@@ -156,6 +157,30 @@ class Region(RPCProtocol):
         # region recieves the message.
         return d
 
+    @region.UpdateLeases.responder
+    def update_leases(self, cluster_uuid, updates):
+        """update_leases(cluster_uuid, updates)
+
+        Implementation of
+        :py:class`~provisioningserver.rpc.region.UpdateLeases`.
+        """
+        dbtasks = eventloop.services.getServiceNamed("database-tasks")
+        d = dbtasks.deferTask(leases.update_leases, updates)
+
+        # Catch all errors except the NoSuchCluster failure. We want that to
+        # be sent back to the cluster.
+        def err_NoSuchCluster_passThrough(failure):
+            if failure.check(NoSuchCluster):
+                return failure
+            else:
+                log.err(failure, "Unhandled failure in updating leases.")
+                return {}
+        d.addErrback(err_NoSuchCluster_passThrough)
+
+        # Wait for the batch to be handled, for the same reason as in
+        # `update_lease`.
+        return d
+
     @amp.StartTLS.responder
     def get_tls_parameters(self):
         """get_tls_parameters()
@@ -278,6 +303,17 @@ class Region(RPCProtocol):
         d.addCallback(lambda args: {})
         return d
 
+    @region.UpdateNodePowerStates.responder
+    def update_node_power_states(self, power_states):
+        """update_node_power_states()
+
+        Implementation of
+        :py:class:`~provisioningserver.rpc.region.UpdateNodePowerStates`.
+        """
+        d = deferToDatabase(nodes.update_node_power_states, power_states)
+        d.addCallback(lambda args: {})
+        return d
+
     @region.RegisterEventType.responder
     def register_event_type(self, name, description, level):
         """register_event_type()
@@ -320,6 +356,19 @@ class Region(RPCProtocol):
         # Don't wait for the record to be written.
         return succeed({})
 
+    @region.SendEvents.responder
+    def send_events(self, events):
+        """send_events()
+
+        Implementation of
+        :py:class:`~provisioningserver.rpc.region.SendEvents`.
+        """
+        timestamp = datetime.now()
+        dbtasks = eventloop.services.getServiceNamed("database-tasks")
+        dbtasks.addTask(send_events, events, timestamp)
+        # Don't wait for the records to be written.
+        return succeed({})
+
     @region.ReportForeignDHCPServer.responder
     def report_foreign_dhcp_server(
             self, system_id, interface_name, dhcp_ip=None):
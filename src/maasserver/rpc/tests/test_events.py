@@ -14,6 +14,7 @@ from maasserver.models.eventtype import EventType
 from maasserver.rpc import events
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import MAASServerTestCase
+from maastesting.djangotestcase import count_queries
 from provisioningserver.rpc.exceptions import NoSuchEventType
 
 
@@ -92,3 +93,95 @@ class TestSendEventMACAddress(MAASServerTestCase):
         Event.objects.get(
             node=node, type=event_type, description=description,
             created=timestamp)
+
+
+class TestSendEvents(MAASServerTestCase):
+
+    def setUp(self):
+        super(TestSendEvents, self).setUp()
+        self.patch(events, "event_type_ids", {})
+
+    def make_event(self, event_type, node=None, mac_address=None):
+        return {
+            "system_id": None if node is None else node.system_id,
+            "mac_address": mac_address,
+            "type_name": event_type.name,
+            "description": factory.make_name("description"),
+        }
+
+    def test__creates_events_for_nodes(self):
+        event_type = factory.make_EventType()
+        node = factory.make_Node()
+        other_node = factory.make_Node(interface=True)
+        mac_address = other_node.interface_set.first().mac_address.get_raw()
+        node_events = [
+            self.make_event(event_type, node=node),
+            self.make_event(event_type, mac_address=mac_address.upper()),
+        ]
+        timestamp = datetime.datetime.utcnow()
+        events.send_events(node_events, timestamp)
+        self.assertItemsEqual([
+            (node, node_events[0]["description"]),
+            (other_node, node_events[1]["description"]),
+        ], [
+            (event.node, event.description)
+            for event in Event.objects.filter(
+                type=event_type, created=timestamp)
+        ])
+
+    def test__skips_unknown_nodes_and_event_types(self):
+        event_type = factory.make_EventType()
+        node = factory.make_Node()
+        unknown_type = factory.make_name("type")
+        node_events = [
+            self.make_event(event_type, node=node),
+            self.make_event(event_type, mac_address="00:00:00:00:00:01"),
+            dict(self.make_event(event_type, node=node),
+                 system_id=factory.make_name("system_id")),
+            dict(self.make_event(event_type, node=node),
+                 type_name=unknown_type),
+        ]
+        events.send_events(node_events, datetime.datetime.utcnow())
+        self.assertEqual(
+            [node_events[0]["description"]],
+            [event.description
+             for event in Event.objects.filter(type=event_type)])
+
+    def test__skips_malformed_mac_addresses(self):
+        event_type = factory.make_EventType()
+        node = factory.make_Node(interface=True)
+        mac_address = node.interface_set.first().mac_address.get_raw()
+        node_events = [
+            self.make_event(event_type, mac_address="not-a-mac"),
+            self.make_event(event_type, mac_address=mac_address),
+        ]
+        events.send_events(node_events, datetime.datetime.utcnow())
+        self.assertEqual(
+            [node_events[1]["description"]],
+            [event.description
+             for event in Event.objects.filter(type=event_type)])
+
+    def test__caches_event_type_ids(self):
+        event_type = factory.make_EventType()
+        node = factory.make_Node()
+        events.send_events(
+            [self.make_event(event_type, node=node)],
+            datetime.datetime.utcnow())
+        self.assertEqual(
+            {event_type.name: event_type.id}, events.event_type_ids)
+        count, _ = count_queries(
+            events.get_event_type_ids, [event_type.name])
+        self.assertEqual(0, count)
+
+    def test__looks_up_stale_event_type_ids_again(self):
+        event_type = factory.make_EventType()
+        node = factory.make_Node()
+        events.event_type_ids[event_type.name] = event_type.id + 1000
+        events.send_events(
+            [self.make_event(event_type, node=node)],
+            datetime.datetime.utcnow())
+        self.assertEqual(
+            [event_type.id],
+            [event.type_id for event in Event.objects.filter(node=node)])
+        self.assertEqual(
+            {event_type.name: event_type.id}, events.event_type_ids)
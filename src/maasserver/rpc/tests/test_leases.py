@@ -20,6 +20,7 @@ from maasserver.models.staticipaddress import StaticIPAddress
 from maasserver.rpc.leases import (
     LeaseUpdateError,
     update_lease,
+    update_leases,
 )
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import MAASServerTestCase
@@ -27,6 +28,7 @@ from maasserver.utils.orm import (
     get_one,
     reload_object,
 )
+from maastesting.djangotestcase import count_queries
 from netaddr import IPAddress
 from testtools.matchers import (
     Contains,
@@ -381,3 +383,118 @@ class TestUpdateLease(MAASServerTestCase):
         self.assertItemsEqual(
             [boot_interface.id],
             sip.interface_set.values_list("id", flat=True))
+
+
+class TestUpdateLeases(MAASServerTestCase):
+
+    def make_lease(self, action="commit", mac=None, ip=None, hostname=None):
+        if mac is None:
+            mac = factory.make_mac_address()
+        lease = {
+            "action": action,
+            "mac": mac,
+            "ip": ip,
+            "ip_family": "ipv4",
+            "timestamp": int(time.time()),
+            "lease_time": None,
+            "hostname": None,
+        }
+        if action == "commit":
+            lease["lease_time"] = random.randint(30, 1000)
+            lease["hostname"] = (
+                factory.make_name("host") if hostname is None else hostname)
+        return lease
+
+    def make_ip_in_dynamic_range(self, subnet):
+        return factory.pick_ip_in_IPRange(subnet.get_dynamic_ranges()[0])
+
+    def test_does_nothing_for_no_leases(self):
+        count, _ = count_queries(update_leases, [])
+        self.assertEqual(0, count)
+
+    def test_creates_leases_for_known_and_unknown_interfaces(self):
+        subnet = factory.make_ipv4_Subnet_with_IPRanges(
+            with_static_range=False, dhcp_on=True)
+        node = factory.make_Node_with_Interface_on_Subnet(subnet=subnet)
+        boot_interface = node.get_boot_interface()
+        known_ip = self.make_ip_in_dynamic_range(subnet)
+        unknown_ip = self.make_ip_in_dynamic_range(subnet)
+        known = self.make_lease(mac=boot_interface.mac_address, ip=known_ip)
+        unknown = self.make_lease(ip=unknown_ip)
+        update_leases([known, unknown])
+
+        sip = StaticIPAddress.objects.get(
+            alloc_type=IPADDRESS_TYPE.DISCOVERED, ip=known_ip)
+        self.assertEqual(subnet, sip.subnet)
+        self.assertItemsEqual(
+            [boot_interface.id],
+            sip.interface_set.values_list("id", flat=True))
+        unknown_interface = UnknownInterface.objects.get(
+            mac_address=unknown["mac"])
+        self.assertItemsEqual(
+            [unknown_ip],
+            unknown_interface.ip_addresses.values_list("ip", flat=True))
+
+    def test_applies_leases_in_order(self):
+        subnet = factory.make_ipv4_Subnet_with_IPRanges(
+            with_static_range=False, dhcp_on=True)
+        mac = factory.make_mac_address()
+        ip = self.make_ip_in_dynamic_range(subnet)
+        update_leases([
+            self.make_lease(mac=mac, ip=ip),
+            self.make_lease(action="release", mac=mac, ip=ip),
+        ])
+        # The commit created an unknown interface which the release then
+        # found, leaving a DISCOVERED address with no IP.
+        unknown_interface = UnknownInterface.objects.get(mac_address=mac)
+        self.assertItemsEqual(
+            [None],
+            unknown_interface.ip_addresses.values_list("ip", flat=True))
+
+    def test_skips_dns_record_for_hostname_from_existing_node(self):
+        subnet = factory.make_ipv4_Subnet_with_IPRanges(
+            with_static_range=False, dhcp_on=True)
+        hostname = factory.make_name().lower()
+        factory.make_Node(hostname=hostname)
+        lease = self.make_lease(
+            ip=self.make_ip_in_dynamic_range(subnet), hostname=hostname)
+        update_leases([lease])
+        self.assertIsNone(DNSResource.objects.filter(name=hostname).first())
+
+    def test_skips_leases_that_cannot_be_updated(self):
+        subnet = factory.make_ipv4_Subnet_with_IPRanges(
+            with_static_range=False, dhcp_on=True)
+        ip = self.make_ip_in_dynamic_range(subnet)
+        bad = self.make_lease(action=factory.make_name("action"), ip=ip)
+        no_subnet = self.make_lease(ip=factory.make_ipv6_address())
+        good = self.make_lease(ip=ip)
+        update_leases([bad, no_subnet, good])
+        self.assertIsNotNone(
+            StaticIPAddress.objects.filter(
+                alloc_type=IPADDRESS_TYPE.DISCOVERED, ip=ip).first())
+
+    def test_skips_leases_with_malformed_ips(self):
+        subnet = factory.make_ipv4_Subnet_with_IPRanges(
+            with_static_range=False, dhcp_on=True)
+        ip = self.make_ip_in_dynamic_range(subnet)
+        update_leases([
+            self.make_lease(ip=factory.make_name("ip")),
+            self.make_lease(ip=ip),
+        ])
+        self.assertIsNotNone(
+            StaticIPAddress.objects.filter(
+                alloc_type=IPADDRESS_TYPE.DISCOVERED, ip=ip).first())
+
+    def test_query_count_does_not_depend_on_lookups(self):
+        subnet = factory.make_ipv4_Subnet_with_IPRanges(
+            with_static_range=False, dhcp_on=True)
+        # Releases for unknown MAC addresses do nothing but the lookups.
+        ips = [self.make_ip_in_dynamic_range(subnet) for _ in range(5)]
+        count_one, _ = count_queries(
+            update_leases, [self.make_lease(action="release", ip=ips[0])])
+        count_many, _ = count_queries(update_leases, [
+            self.make_lease(action="release", ip=ip)
+            for ip in ips
+        ])
+        # Each additional lease costs only its savepoint.
+        self.assertEqual(count_one + (len(ips) - 1) * 2, count_many)
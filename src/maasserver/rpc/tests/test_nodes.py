@@ -31,6 +31,7 @@ from maasserver.rpc.nodes import (
     mark_node_failed,
     request_node_info_by_mac_address,
     update_node_power_state,
+    update_node_power_states,
 )
 from maasserver.rpc.testing.fixtures import MockLiveRegionToClusterRPCFixture
 from maasserver.testing.architecture import make_usable_architecture
@@ -536,6 +537,28 @@ class TestUpdateNodePowerState(MAASServerTestCase):
         self.assertEqual(reload_object(node).power_state, POWER_STATE.ON)
 
 
+class TestUpdateNodePowerStates(MAASServerTestCase):
+
+    def test__updates_node_power_states(self):
+        node_on = factory.make_Node(power_state=POWER_STATE.OFF)
+        node_off = factory.make_Node(power_state=POWER_STATE.ON)
+        update_node_power_states([
+            {"system_id": node_on.system_id, "power_state": POWER_STATE.ON},
+            {"system_id": node_off.system_id, "power_state": POWER_STATE.OFF},
+        ])
+        self.assertEqual(reload_object(node_on).power_state, POWER_STATE.ON)
+        self.assertEqual(reload_object(node_off).power_state, POWER_STATE.OFF)
+
+    def test__skips_nodes_that_dont_exist(self):
+        node = factory.make_Node(power_state=POWER_STATE.OFF)
+        update_node_power_states([
+            {"system_id": factory.make_name('system_id'),
+             "power_state": POWER_STATE.ON},
+            {"system_id": node.system_id, "power_state": POWER_STATE.ON},
+        ])
+        self.assertEqual(reload_object(node).power_state, POWER_STATE.ON)
+
+
 class TestGetControllerType(MAASServerTestCase):
     """Tests for `get_controller_type`."""
 
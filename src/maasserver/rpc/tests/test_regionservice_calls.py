@@ -93,9 +93,12 @@ from provisioningserver.rpc.region import (
     RequestRackRefresh,
     SendEvent,
     SendEventMACAddress,
+    SendEvents,
     UpdateInterfaces,
     UpdateLease,
+    UpdateLeases,
     UpdateNodePowerState,
+    UpdateNodePowerStates,
     UpdateServices,
 )
 from provisioningserver.rpc.testing import (
@@ -298,6 +301,69 @@ class TestRegionProtocol_UpdateLease(MAASTransactionServerTestCase):
         # works as expected.
 
 
+class TestRegionProtocol_UpdateLeases(MAASTransactionServerTestCase):
+
+    def setUp(self):
+        super(TestRegionProtocol_UpdateLeases, self).setUp()
+        self.useFixture(RegionEventLoopFixture("database-tasks"))
+
+    def test_update_leases_is_registered(self):
+        protocol = Region()
+        responder = protocol.locateResponder(UpdateLeases.commandName)
+        self.assertIsNotNone(responder)
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test__calls_update_leases(self):
+        uuid = factory.make_name("uuid")
+        update_leases = self.patch(leases_module, "update_leases")
+        update_leases.return_value = {}
+        updates = [{
+            "action": "expiry",
+            "mac": factory.make_mac_address(),
+            "ip_family": "ipv4",
+            "ip": factory.make_ipv4_address(),
+            "timestamp": int(time.time()),
+        }]
+
+        yield eventloop.start()
+        try:
+            response = yield call_responder(
+                Region(), UpdateLeases, {
+                    "cluster_uuid": uuid,
+                    "updates": updates,
+                    })
+        finally:
+            yield eventloop.reset()
+
+        self.assertEqual({}, response)
+        self.assertThat(update_leases, MockCalledOnceWith([
+            dict(updates[0], lease_time=None, hostname=None),
+        ]))
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test__doesnt_raises_other_errors(self):
+        uuid = factory.make_name("uuid")
+
+        # Cause a random exception
+        self.patch(leases_module, "update_leases").side_effect = (
+            factory.make_exception())
+
+        yield eventloop.start()
+        try:
+            yield call_responder(
+                Region(), UpdateLeases, {
+                    "cluster_uuid": uuid,
+                    "updates": [],
+                    })
+        finally:
+            yield eventloop.reset()
+
+        # Test is that no exceptions are raised. If this test passes then all
+        # works as expected.
+
+
 class TestRegionProtocol_GetBootConfig(MAASTransactionServerTestCase):
 
     def test_get_boot_config_is_registered(self):
@@ -653,6 +719,47 @@ class TestRegionProtocol_UpdateNodePowerState(MAASTransactionServerTestCase):
         return d.addErrback(check)
 
 
+class TestRegionProtocol_UpdateNodePowerStates(
+        MAASTransactionServerTestCase):
+
+    @transactional
+    def create_node(self, power_state):
+        node = factory.make_Node(power_state=power_state)
+        return node
+
+    @transactional
+    def get_node_power_state(self, system_id):
+        node = Node.objects.get(system_id=system_id)
+        return node.power_state
+
+    def test__is_registered(self):
+        protocol = Region()
+        responder = protocol.locateResponder(
+            UpdateNodePowerStates.commandName)
+        self.assertIsNotNone(responder)
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test__changes_power_states(self):
+        power_state = factory.pick_enum(POWER_STATE)
+        node = yield deferToDatabase(self.create_node, power_state)
+
+        new_state = factory.pick_enum(POWER_STATE, but_not=power_state)
+        response = yield call_responder(
+            Region(), UpdateNodePowerStates, {
+                'power_states': [
+                    {'system_id': node.system_id, 'power_state': new_state},
+                    {'system_id': factory.make_name('unknown-system-id'),
+                     'power_state': new_state},
+                ],
+            })
+
+        self.assertEqual({}, response)
+        db_state = yield deferToDatabase(
+            self.get_node_power_state, node.system_id)
+        self.assertEqual(new_state, db_state)
+
+
 class TestRegionProtocol_RegisterEventType(MAASTransactionServerTestCase):
 
     def test_register_event_type_is_registered(self):
@@ -1001,6 +1108,71 @@ class TestRegionProtocol_SendEventMACAddress(MAASTransactionServerTestCase):
                 type=name, description=event_description, mac=mac_address))
 
 
+class TestRegionProtocol_SendEvents(MAASTransactionServerTestCase):
+
+    def setUp(self):
+        super(TestRegionProtocol_SendEvents, self).setUp()
+        self.useFixture(RegionEventLoopFixture("database-tasks"))
+
+    def test_send_events_is_registered(self):
+        protocol = Region()
+        responder = protocol.locateResponder(SendEvents.commandName)
+        self.assertIsNotNone(responder)
+
+    @transactional
+    def get_events(self, type_name):
+        return {
+            (event.node.system_id, event.description, event.created)
+            for event in Event.objects.filter(
+                type__name=type_name).select_related('node')
+        }
+
+    @transactional
+    def make_event_type(self):
+        return factory.make_EventType().name
+
+    @transactional
+    def make_interface(self):
+        interface = factory.make_Interface(INTERFACE_TYPE.PHYSICAL)
+        return interface.mac_address.get_raw(), interface.node.system_id
+
+    @transactional
+    def create_node(self):
+        return factory.make_Node().system_id
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_send_events_stores_events(self):
+        timestamp = datetime.now() - timedelta(seconds=randint(99, 99999))
+        self.patch(regionservice, "datetime").now.return_value = timestamp
+        type_name = yield deferToDatabase(self.make_event_type)
+        system_id = yield deferToDatabase(self.create_node)
+        mac_address, mac_system_id = yield deferToDatabase(
+            self.make_interface)
+        descriptions = [factory.make_name('description') for _ in range(2)]
+
+        yield eventloop.start()
+        try:
+            response = yield call_responder(
+                Region(), SendEvents, {
+                    'events': [
+                        {'system_id': system_id, 'type_name': type_name,
+                         'description': descriptions[0]},
+                        {'mac_address': mac_address, 'type_name': type_name,
+                         'description': descriptions[1]},
+                    ],
+                })
+        finally:
+            yield eventloop.reset()
+
+        self.assertEqual({}, response)
+        events = yield deferToDatabase(self.get_events, type_name)
+        self.assertEqual({
+            (system_id, descriptions[0], timestamp),
+            (mac_system_id, descriptions[1], timestamp),
+        }, events)
+
+
 class TestRegionProtocol_UpdateServices(MAASTransactionServerTestCase):
 
     def setUp(self):
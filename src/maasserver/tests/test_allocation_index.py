@@ -0,0 +1,171 @@
+# Copyright 2018 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for `maasserver.allocation_index`."""
+
+__all__ = []
+
+from crochet import wait_for
+from maasserver import allocation_index as allocation_index_module
+from maasserver.allocation_index import (
+    AllocationIndex,
+    AllocationIndexService,
+)
+from maasserver.enum import NODE_STATUS
+from maasserver.node_constraint_filter_forms import AcquireNodeForm
+from maasserver.testing.factory import factory
+from maasserver.testing.listener import FakePostgresListenerService
+from maasserver.testing.testcase import (
+    MAASServerTestCase,
+    MAASTransactionServerTestCase,
+)
+from maasserver.utils.threads import deferToDatabase
+from twisted.internet.defer import inlineCallbacks
+
+
+wait_for_reactor = wait_for(30)  # 30 seconds.
+
+
+def make_form(**constraints):
+    form = AcquireNodeForm(data=constraints)
+    assert form.is_valid(), form.errors
+    return form
+
+
+class TestAllocationIndex(MAASServerTestCase):
+    """Tests for `AllocationIndex`."""
+
+    def make_loaded_index(self):
+        index = AllocationIndex()
+        index.load()
+        return index
+
+    def test_get_candidate_ids_returns_None_until_loaded(self):
+        factory.make_Node(status=NODE_STATUS.READY)
+        index = AllocationIndex()
+        self.assertIsNone(index.get_candidate_ids(make_form()))
+
+    def test_load_indexes_only_ready_machines(self):
+        machine = factory.make_Node(status=NODE_STATUS.READY)
+        factory.make_Node(status=NODE_STATUS.DEPLOYED)
+        factory.make_Device()
+        index = self.make_loaded_index()
+        self.assertEqual({machine.id}, index.get_candidate_ids(make_form()))
+
+    def test_refresh_adds_and_removes_machines(self):
+        index = self.make_loaded_index()
+        machine = factory.make_Node(status=NODE_STATUS.READY)
+        index.refresh(machine.system_id)
+        self.assertEqual({machine.id}, index.get_candidate_ids(make_form()))
+        machine.status = NODE_STATUS.ALLOCATED
+        machine.save()
+        index.refresh(machine.system_id)
+        self.assertEqual(set(), index.get_candidate_ids(make_form()))
+
+    def test_refresh_while_loading_is_repeated(self):
+        index = AllocationIndex()
+        machine = factory.make_Node(status=NODE_STATUS.READY)
+        self.patch(index, "_load_candidates").side_effect = (
+            lambda: index.refresh(machine.system_id) or {})
+        index.load()
+        self.assertEqual({machine.id}, index.get_candidate_ids(make_form()))
+
+    def test_clear_unloads(self):
+        index = self.make_loaded_index()
+        index.clear()
+        self.assertIsNone(index.get_candidate_ids(make_form()))
+
+    def test_filters_by_cpu_count_and_memory(self):
+        small = factory.make_Node(
+            status=NODE_STATUS.READY, cpu_count=2, memory=1024)
+        large = factory.make_Node(
+            status=NODE_STATUS.READY, cpu_count=8, memory=8192)
+        index = self.make_loaded_index()
+        self.assertEqual(
+            {large.id}, index.get_candidate_ids(make_form(cpu_count=4)))
+        self.assertEqual(
+            {large.id}, index.get_candidate_ids(make_form(mem=2048)))
+        self.assertEqual(
+            {small.id, large.id},
+            index.get_candidate_ids(make_form(cpu_count=2, mem=1024)))
+
+    def test_filters_by_tags(self):
+        tag = factory.make_Tag()
+        tagged = factory.make_Node(status=NODE_STATUS.READY)
+        tagged.tags.add(tag)
+        untagged = factory.make_Node(status=NODE_STATUS.READY)
+        index = self.make_loaded_index()
+        self.assertEqual(
+            {tagged.id}, index.get_candidate_ids(make_form(tags=[tag.name])))
+        self.assertEqual(
+            {untagged.id},
+            index.get_candidate_ids(make_form(not_tags=[tag.name])))
+
+    def test_filters_by_zone_and_pool(self):
+        zone = factory.make_Zone()
+        pool = factory.make_ResourcePool()
+        in_zone = factory.make_Node(status=NODE_STATUS.READY, zone=zone)
+        in_pool = factory.make_Node(status=NODE_STATUS.READY, pool=pool)
+        index = self.make_loaded_index()
+        self.assertEqual(
+            {in_zone.id}, index.get_candidate_ids(make_form(zone=zone.name)))
+        self.assertEqual(
+            {in_pool.id}, index.get_candidate_ids(make_form(pool=pool.name)))
+        self.assertNotIn(
+            in_zone.id,
+            index.get_candidate_ids(make_form(not_in_zone=[zone.name])))
+
+    def test_filters_by_storage(self):
+        small = factory.make_Node(
+            status=NODE_STATUS.READY, with_boot_disk=False)
+        factory.make_PhysicalBlockDevice(node=small, size=10 * (1000 ** 3))
+        large = factory.make_Node(
+            status=NODE_STATUS.READY, with_boot_disk=False)
+        factory.make_PhysicalBlockDevice(
+            node=large, size=100 * (1000 ** 3), tags=["ssd"])
+        index = self.make_loaded_index()
+        self.assertEqual(
+            {large.id}, index.get_candidate_ids(make_form(storage="50")))
+        self.assertEqual(
+            {large.id}, index.get_candidate_ids(make_form(storage="5(ssd)")))
+        self.assertEqual(
+            set(), index.get_candidate_ids(make_form(storage="5,5")))
+
+
+class TestAllocationIndexService(MAASTransactionServerTestCase):
+    """Tests for `AllocationIndexService`."""
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_does_nothing_when_disabled(self):
+        self.patch(
+            allocation_index_module,
+            "is_allocation_index_enabled").return_value = False
+        listener = FakePostgresListenerService()
+        index = AllocationIndex()
+        service = AllocationIndexService(listener, index)
+        yield service.startService()
+        self.assertIsNone(index.candidates)
+        self.assertEqual([], listener.listeners["machine"])
+        yield service.stopService()
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_loads_and_refreshes_when_enabled(self):
+        self.patch(
+            allocation_index_module,
+            "is_allocation_index_enabled").return_value = True
+        listener = FakePostgresListenerService()
+        index = AllocationIndex()
+        service = AllocationIndexService(listener, index)
+        yield service.startService()
+        self.assertEqual(
+            [service.consumeMachineEvent], listener.listeners["machine"])
+        self.assertEqual({}, index.candidates)
+        machine = yield deferToDatabase(
+            factory.make_Node, status=NODE_STATUS.READY)
+        yield service.consumeMachineEvent("create", machine.system_id)
+        self.assertEqual([machine.system_id], list(index.candidates))
+        yield service.stopService()
+        self.assertIsNone(index.candidates)
+        self.assertEqual([], listener.listeners["machine"])
@@ -7,6 +7,7 @@ __all__ = []
 
 from datetime import datetime
 from email.utils import format_datetime
+import hashlib
 import http.client
 from io import BytesIO
 import json
@@ -32,7 +33,10 @@ from django.db import (
     connections,
     transaction,
 )
-from django.http import StreamingHttpResponse
+from django.http import (
+    FileResponse,
+    StreamingHttpResponse,
+)
 from fixtures import (
     FakeLogger,
     Fixture,
@@ -44,9 +48,11 @@ from maasserver import (
 from maasserver.bootresources import (
     BootResourceRepoWriter,
     BootResourceStore,
+    BootResourceStoreProgress,
     download_all_boot_resources,
     download_boot_resources,
     get_simplestream_endpoint,
+    open_content_at_offset,
     set_global_default_releases,
     SimpleStreamsHandler,
 )
@@ -61,6 +67,7 @@ from maasserver.enum import (
     BOOT_RESOURCE_TYPE,
     COMPONENT,
 )
+from maasserver.largefilestore import LargeFileStore
 from maasserver.listener import PostgresListenerService
 from maasserver.models import (
     BootResource,
@@ -559,6 +566,36 @@ class TestConnectionWrapper(MAASTransactionServerTestCase):
         """
         return b''.join(response.streaming_content)
 
+    def test_download_copies_content_into_largefile_store(self):
+        content, url = self.make_file_for_client()
+        store = LargeFileStore(self.make_dir())
+        self.patch(bootresources, "get_largefile_store").return_value = store
+
+        client = MAASSensibleClient()
+        response = client.get(url)
+        self.assertEqual(content, self.read_response(response))
+        response.close()
+
+        sha256 = hashlib.sha256(content).hexdigest()
+        with store.open_file(sha256) as stream:
+            self.assertEqual(content, stream.read())
+
+    def test_download_serves_content_from_largefile_store(self):
+        content, url = self.make_file_for_client()
+        store = LargeFileStore(self.make_dir())
+        store.write_file(hashlib.sha256(content).hexdigest(), [content])
+        self.patch(bootresources, "get_largefile_store").return_value = store
+        mock_get_new_connection = self.patch(
+            bootresources.ConnectionWrapper, '_get_new_connection')
+
+        client = MAASSensibleClient()
+        response = client.get(url)
+        self.assertIsInstance(response, FileResponse)
+        self.assertEqual(content, self.read_response(response))
+        self.assertEqual(str(len(content)), response['Content-Length'])
+        response.close()
+        self.assertThat(mock_get_new_connection, MockNotCalled())
+
     def test_download_calls__get_new_connection(self):
         content, url = self.make_file_for_client()
         mock_get_new_connection = self.patch(
@@ -692,6 +729,85 @@ def make_boot_resource_group_from_product(product):
     return product, resource
 
 
+class TestBootResourceStoreProgress(MAASTestCase):
+    """Tests for `BootResourceStoreProgress`."""
+
+    def test_update_accumulates_size(self):
+        progress = BootResourceStoreProgress()
+        progress.reset(1000, 2)
+        progress.update(100)
+        progress.update(150)
+        self.assertEqual(250, progress.size)
+        self.assertEqual(25.0, progress.percentage)
+
+    def test_update_logs_every_step(self):
+        mock_log = self.patch(bootresources.log, 'msg')
+        progress = BootResourceStoreProgress()
+        progress.reset(1000, 2)
+        progress.update(50)
+        self.assertThat(mock_log, MockNotCalled())
+        progress.update(60)
+        progress.update(10)
+        self.assertThat(mock_log, MockCalledOnceWith(
+            ANY, step=10, size=110, total_size=1000, files=0, total_files=2))
+        progress.update(880)
+        steps = [kwargs['step'] for _, kwargs in mock_log.call_args_list]
+        self.assertEqual([10, 100], steps)
+
+    def test_file_done_counts_files(self):
+        progress = BootResourceStoreProgress()
+        progress.reset(1000, 2)
+        progress.file_done()
+        self.assertEqual(1, progress.files)
+
+    def test_percentage_is_complete_when_nothing_to_write(self):
+        self.assertEqual(100.0, BootResourceStoreProgress().percentage)
+
+
+class TestOpenContentAtOffset(MAASServerTestCase):
+    """Tests for `open_content_at_offset`."""
+
+    def make_reader(self, content, url=None):
+        reader = BytesIO(content)
+        reader.url = url
+        return reader
+
+    def patch_response(self, status, content_range=None):
+        response = Mock(status=status, headers={})
+        if content_range is not None:
+            response.headers['Content-Range'] = content_range
+        build_opener = self.patch(bootresources, 'build_opener')
+        build_opener.return_value.open.return_value = response
+        return build_opener, response
+
+    def test_returns_reader_at_zero_offset(self):
+        reader = self.make_reader(b'content')
+        self.assertIs(reader, open_content_at_offset(reader, 0, 4))
+
+    def test_skips_content_without_url(self):
+        content = factory.make_bytes(size=100)
+        reader = open_content_at_offset(self.make_reader(content), 42, 10)
+        self.assertEqual(content[42:], reader.read())
+
+    def test_requests_range_from_url(self):
+        url = factory.make_simple_http_url()
+        build_opener, response = self.patch_response(206, 'bytes 42-99/100')
+        reader = self.make_reader(b'', url=url)
+        self.assertIs(response, open_content_at_offset(reader, 42, 10))
+        [request], _ = build_opener.return_value.open.call_args
+        self.assertEqual(url, request.full_url)
+        self.assertEqual('bytes=42-', request.get_header('Range'))
+        self.assertTrue(reader.closed)
+
+    def test_skips_content_when_range_ignored(self):
+        content = factory.make_bytes(size=100)
+        _, response = self.patch_response(200)
+        reader = self.make_reader(content, url=factory.make_simple_http_url())
+        reader = open_content_at_offset(reader, 42, 10)
+        self.assertEqual(content[42:], reader.read())
+        self.assertThat(response.close, MockCalledOnceWith())
+
+
 class TestBootResourceStore(MAASServerTestCase):
 
     def make_boot_resources(self):
@@ -713,6 +829,13 @@ class TestBootResourceStore(MAASServerTestCase):
         self.assertItemsEqual(resource_names, store._resources_to_delete)
         self.assertEqual({}, store._content_to_finalize)
 
+    def test_init_uses_configured_parallelism(self):
+        parallelism = random.randint(3, 10)
+        Config.objects.set_config(
+            'boot_images_import_parallelism', parallelism)
+        store = BootResourceStore()
+        self.assertEqual(parallelism, store.write_threads)
+
     def test_prevent_resource_deletion_removes_resource(self):
         resources, resource_names = self.make_boot_resources()
         store = BootResourceStore()
@@ -736,6 +859,17 @@ class TestBootResourceStore(MAASServerTestCase):
             {rfile.id: sentinel.reader},
             store._content_to_finalize)
 
+
+    def test_save_content_later_saves_shared_largefile_once(self):
+        _, _, rfile = make_boot_resource_group()
+        other_rfile = factory.make_BootResourceFile(
+            factory.make_BootResourceSet(rfile.resource_set.resource),
+            rfile.largefile)
+        store = BootResourceStore()
+        store.save_content_later(rfile, sentinel.reader)
+        store.save_content_later(other_rfile, sentinel.other_reader)
+        self.assertEqual(
+            {rfile.id: sentinel.reader}, store._content_to_finalize)
     def test_get_or_create_boot_resource_creates_resource(self):
         name, architecture, product = make_product()
         store = BootResourceStore()
@@ -968,6 +1102,39 @@ class TestBootResourceStore(MAASServerTestCase):
         self.assertEqual(rfile.largefile.size, len(written_data))
         self.assertEqual(rfile.largefile.size, rfile.largefile.total_size)
 
+    def test_write_content_thread_resumes_partial_content(self):
+        store = BootResourceStore()
+        size = int(2.5 * store.read_size)
+        rfile, reader, content = make_boot_resource_file_with_stream(size=size)
+        offset = store.read_size + 100
+        with rfile.largefile.content.open('wb') as stream:
+            stream.write(content[:offset])
+        rfile.largefile.size = offset
+        rfile.largefile.save()
+        store.progress.reset(size, 1)
+        store.write_content_thread(rfile.id, reader)
+        self.assertTrue(BootResourceFile.objects.filter(id=rfile.id).exists())
+        with rfile.largefile.content.open('rb') as stream:
+            written_data = stream.read()
+        self.assertEqual(content, written_data)
+        rfile.largefile = reload_object(rfile.largefile)
+        self.assertEqual(size, rfile.largefile.size)
+        self.assertEqual(size, store.progress.size)
+        self.assertEqual(1, store.progress.files)
+
+    def test_write_content_thread_discards_unrecorded_content(self):
+        store = BootResourceStore()
+        rfile, reader, content = make_boot_resource_file_with_stream()
+        with rfile.largefile.content.open('wb') as stream:
+            stream.write(content[:100])
+            stream.write(factory.make_bytes(size=10))
+        rfile.largefile.size = 100
+        rfile.largefile.save()
+        store.write_content_thread(rfile.id, reader)
+        with rfile.largefile.content.open('rb') as stream:
+            written_data = stream.read()
+        self.assertEqual(content, written_data)
+
     def test_write_content_doesnt_write_if_cancel(self):
         store = BootResourceStore()
         size = int(2.5 * store.read_size)
@@ -1115,6 +1282,25 @@ class TestBootResourceTransactional(MAASTransactionServerTestCase):
             get_one(reload_object(resource_set).files.all()).largefile)
         self.assertThat(mock_save_later, MockNotCalled())
 
+    def test_insert_resumes_incomplete_largefile(self):
+        name, architecture, product = make_product()
+        with transaction.atomic():
+            product, resource = make_boot_resource_group_from_product(product)
+            resource_set = resource.sets.first()
+            with post_commit_hooks:
+                resource_set.files.all().delete()
+            largefile = factory.make_LargeFile(
+                content=factory.make_bytes(size=10), size=100)
+        product['sha256'] = largefile.sha256
+        product['size'] = largefile.total_size
+        store = BootResourceStore()
+        mock_save_later = self.patch(store, 'save_content_later')
+        store.insert(product, sentinel.reader)
+        rfile = get_one(reload_object(resource_set).files.all())
+        self.assertEqual(largefile, rfile.largefile)
+        self.assertThat(
+            mock_save_later, MockCalledOnceWith(rfile, sentinel.reader))
+
     def test_insert_deletes_mismatch_largefile(self):
         self.patch(bootresources.Event.objects, 'create_region_event')
         self.useFixture(SignalsDisabled("largefiles"))
@@ -1423,6 +1609,19 @@ class TestBootResourceTransactional(MAASTransactionServerTestCase):
                     written_data = stream.read()
                 self.assertEqual(content, written_data)
 
+    def test_perform_write_reports_progress(self):
+        with transaction.atomic():
+            files = [make_boot_resource_file_with_stream() for _ in range(3)]
+            store = BootResourceStore()
+            for rfile, reader, content in files:
+                store.save_content_later(rfile, reader)
+        total_size = sum(len(content) for _, _, content in files)
+        store.perform_write()
+        self.assertEqual(total_size, store.progress.total_size)
+        self.assertEqual(total_size, store.progress.size)
+        self.assertEqual(3, store.progress.files)
+        self.assertEqual(100.0, store.progress.percentage)
+
     @asynchronous(timeout=1)
     def test_finalize_calls_notify_errback(self):
 
@@ -115,6 +115,37 @@ class TestRegionConfigurationWorkerOptions(MAASTestCase):
         self.assertEqual({'num_workers': workers}, config.store)
 
 
+class TestRegionConfigurationBootResourceOptions(MAASTestCase):
+    """Tests for the boot resource options in `RegionConfiguration`."""
+
+    def test__default(self):
+        config = RegionConfiguration({})
+        self.assertEqual("", config.boot_resources_store)
+
+    def test__set_and_get(self):
+        config = RegionConfiguration({})
+        path = self.make_dir()
+        config.boot_resources_store = path
+        self.assertEqual(path, config.boot_resources_store)
+        # It's also stored in the configuration database.
+        self.assertEqual({'boot_resources_store': path}, config.store)
+
+
+class TestRegionConfigurationAllocationOptions(MAASTestCase):
+    """Tests for the allocation options in `RegionConfiguration`."""
+
+    def test__default(self):
+        config = RegionConfiguration({})
+        self.assertFalse(config.allocation_index)
+
+    def test__set_and_get(self):
+        config = RegionConfiguration({})
+        config.allocation_index = random.choice(['true', 'yes', 'True'])
+        self.assertTrue(config.allocation_index)
+        # It's also stored in the configuration database.
+        self.assertEqual({'allocation_index': True}, config.store)
+
+
 class TestRegionConfigurationDebugOptions(MAASTestCase):
     """Tests for the debug options in `RegionConfiguration`."""
 
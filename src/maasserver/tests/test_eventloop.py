@@ -15,6 +15,7 @@ from unittest.mock import (
 from crochet import wait_for
 from django.db import connections
 from maasserver import (
+    allocation_index,
     bootresources,
     eventloop,
     ipc,
@@ -444,6 +445,23 @@ class TestFactories(MAASTestCase):
         self.assertFalse(
             eventloop.loop.factories["rack-controller"]["only_on_master"])
 
+    def test_make_AllocationIndexService(self):
+        listener = FakePostgresListenerService()
+        service = eventloop.make_AllocationIndexService(listener)
+        self.assertThat(service, IsInstance(
+            allocation_index.AllocationIndexService))
+        self.assertIs(listener, service.listener)
+        # It is registered as a factory in RegionEventLoop.
+        self.assertIs(
+            eventloop.make_AllocationIndexService,
+            eventloop.loop.factories["allocation-index"]["factory"])
+        # Has a dependency of postgres-listener.
+        self.assertEquals(
+            ["postgres-listener-worker"],
+            eventloop.loop.factories["allocation-index"]["requires"])
+        self.assertFalse(
+            eventloop.loop.factories["allocation-index"]["only_on_master"])
+
     def test_make_ServiceMonitorService(self):
         service = eventloop.make_ServiceMonitorService()
         self.assertThat(service, IsInstance(
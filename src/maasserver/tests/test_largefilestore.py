@@ -0,0 +1,154 @@
+# Copyright 2018 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for `maasserver.largefilestore`."""
+
+__all__ = []
+
+import errno
+import hashlib
+import os
+from unittest.mock import Mock
+
+from maasserver import largefilestore
+from maasserver.largefilestore import (
+    get_largefile_store,
+    LargeFileStore,
+)
+from maasserver.testing.config import RegionConfigurationFixture
+from maasserver.testing.factory import factory
+from maastesting.matchers import MockCalledOnceWith
+from maastesting.testcase import MAASTestCase
+
+
+def make_content():
+    content = factory.make_bytes(size=1024)
+    return content, hashlib.sha256(content).hexdigest()
+
+
+class TestLargeFileStore(MAASTestCase):
+    """Tests for `LargeFileStore`."""
+
+    def make_store(self):
+        return LargeFileStore(self.make_dir())
+
+    def test_get_path_uses_sha256_prefix(self):
+        store = self.make_store()
+        _, sha256 = make_content()
+        self.assertEqual(
+            os.path.join(store.path, sha256[:2], sha256),
+            store.get_path(sha256))
+
+    def test_write_file_stores_content(self):
+        store = self.make_store()
+        content, sha256 = make_content()
+        self.assertTrue(store.write_file(sha256, [content[:10], content[10:]]))
+        self.assertTrue(store.has_file(sha256))
+        with store.open_file(sha256) as stream:
+            self.assertEqual(content, stream.read())
+
+    def test_write_file_discards_mismatched_content(self):
+        store = self.make_store()
+        content, sha256 = make_content()
+        self.assertFalse(store.write_file(sha256, [content[1:]]))
+        self.assertFalse(store.has_file(sha256))
+        self.assertEqual([], os.listdir(os.path.dirname(
+            store.get_path(sha256))))
+
+    def test_open_file_returns_None_when_missing(self):
+        store = self.make_store()
+        _, sha256 = make_content()
+        self.assertIsNone(store.open_file(sha256))
+
+    def test_remove_file(self):
+        store = self.make_store()
+        content, sha256 = make_content()
+        store.write_file(sha256, [content])
+        store.remove_file(sha256)
+        self.assertFalse(store.has_file(sha256))
+        # Removing it again is not an error.
+        store.remove_file(sha256)
+
+    def test_list_files(self):
+        store = self.make_store()
+        hashes = []
+        for _ in range(3):
+            content, sha256 = make_content()
+            store.write_file(sha256, [content])
+            hashes.append(sha256)
+        self.assertItemsEqual(hashes, store.list_files())
+
+    def test_list_files_when_directory_missing(self):
+        store = LargeFileStore(os.path.join(self.make_dir(), "missing"))
+        self.assertEqual([], list(store.list_files()))
+
+    def test_wrap_stores_content_once_exhausted(self):
+        store = self.make_store()
+        content, sha256 = make_content()
+        wrapper = store.wrap(iter([content[:10], content[10:]]), sha256)
+        self.assertEqual(content, b"".join(wrapper))
+        wrapper.close()
+        self.assertTrue(store.has_file(sha256))
+
+    def test_wrap_discards_abandoned_content(self):
+        store = self.make_store()
+        content, sha256 = make_content()
+        wrapper = store.wrap(iter([content[:10], content[10:]]), sha256)
+        next(wrapper)
+        wrapper.close()
+        self.assertFalse(store.has_file(sha256))
+        self.assertEqual([], os.listdir(os.path.dirname(
+            store.get_path(sha256))))
+
+    def test_wrap_serves_content_when_write_fails(self):
+        store = self.make_store()
+        content, sha256 = make_content()
+        write = self.patch(largefilestore.LargeFileStoreWriter, "write")
+        write.side_effect = OSError(errno.ENOSPC, "No space left on device")
+        wrapper = store.wrap(iter([content[:10], content[10:]]), sha256)
+        self.assertEqual(content, b"".join(wrapper))
+        wrapper.close()
+        self.assertFalse(store.has_file(sha256))
+        self.assertEqual([], os.listdir(os.path.dirname(
+            store.get_path(sha256))))
+
+    def test_wrap_serves_content_when_commit_fails(self):
+        store = self.make_store()
+        content, sha256 = make_content()
+        self.patch(os, "rename").side_effect = (
+            OSError(errno.ENOSPC, "No space left on device"))
+        wrapper = store.wrap(iter([content[:10], content[10:]]), sha256)
+        self.assertEqual(content, b"".join(wrapper))
+        wrapper.close()
+        self.assertFalse(store.has_file(sha256))
+        self.assertEqual([], os.listdir(os.path.dirname(
+            store.get_path(sha256))))
+
+    def test_wrap_closes_content(self):
+        store = self.make_store()
+        content, sha256 = make_content()
+        wrapped = Mock()
+        wrapped.__next__ = Mock(side_effect=StopIteration)
+        wrapper = store.wrap(wrapped, sha256)
+        wrapper.close()
+        self.assertThat(wrapped.close, MockCalledOnceWith())
+
+
+class TestGetLargeFileStore(MAASTestCase):
+    """Tests for `get_largefile_store`."""
+
+    def setUp(self):
+        super(TestGetLargeFileStore, self).setUp()
+        get_largefile_store.cache_clear()
+        self.addCleanup(get_largefile_store.cache_clear)
+
+    def test_returns_None_when_not_configured(self):
+        self.useFixture(RegionConfigurationFixture(boot_resources_store=""))
+        self.assertIsNone(largefilestore.get_largefile_store())
+
+    def test_returns_store_when_configured(self):
+        path = self.make_dir()
+        self.useFixture(RegionConfigurationFixture(boot_resources_store=path))
+        store = largefilestore.get_largefile_store()
+        self.assertIsInstance(store, LargeFileStore)
+        self.assertEqual(path, store.path)
@@ -18,6 +18,7 @@ from crochet import wait_for
 from django.db import connection
 from maasserver import listener as listener_module
 from maasserver.listener import (
+    NotificationCoalescer,
     PostgresListenerNotifyError,
     PostgresListenerRegistrationError,
     PostgresListenerService,
@@ -34,6 +35,7 @@ from maastesting.matchers import (
     MockCallsMatch,
     MockNotCalled,
 )
+from maastesting.testcase import MAASTestCase
 from maastesting.twisted import TwistedLoggerFixture
 from provisioningserver.utils.twisted import DeferredValue
 from psycopg2 import OperationalError
@@ -474,8 +476,39 @@ class TestPostgresListenerService(MAASServerTestCase):
         self.patch(listener, "handleNotify")
 
         listener.doRead()
-        self.assertItemsEqual(
-            listener.notifications, set(notifications))
+        self.assertItemsEqual(notifications, listener.notifications)
+
+    def test__doRead_coalesces_notifications_for_same_object(self):
+        listener = PostgresListenerService()
+        connection = self.patch(listener, "connection")
+        connection.connection.poll.return_value = None
+        connection.connection.notifies = [
+            FakeNotify(channel="machine_create", payload="abc"),
+            FakeNotify(channel="machine_update", payload="abc"),
+            FakeNotify(channel="machine_update", payload="def"),
+            FakeNotify(channel="machine_update", payload="abc"),
+            ]
+        listener.doRead()
+        self.assertEqual(
+            [("machine_create", "abc"), ("machine_update", "def")],
+            list(listener.notifications))
+        self.assertEqual(4, listener.notifications.received)
+        self.assertEqual(2, listener.notifications.coalesced)
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test__handleNotifies_delivers_coalesced_notifications(self):
+        listener = PostgresListenerService()
+        handler = MagicMock()
+        listener.register("machine", handler)
+        for action in ("update", "update", "delete"):
+            listener.notifications.add("machine_%s" % action, "abc")
+        listener.notifications.add("machine_update", "def")
+        yield listener.handleNotifies()
+        self.assertThat(handler, MockCallsMatch(
+            call("delete", "abc"), call("update", "def")))
+        self.assertEqual(0, len(listener.notifications))
+        self.assertEqual(2, listener.notifications.delivered)
 
     @wait_for_reactor
     @inlineCallbacks
@@ -597,3 +630,52 @@ class TestPostgresListenerService(MAASServerTestCase):
                 call("UNLISTEN %s_create;" % channel),
                 call("UNLISTEN %s_delete;" % channel),
                 call("UNLISTEN %s_update;" % channel)))
+
+
+class TestNotificationCoalescer(MAASTestCase):
+    """Tests for `NotificationCoalescer`."""
+
+    def test_keeps_distinct_objects_in_order(self):
+        notifications = NotificationCoalescer()
+        notifications.add("machine_update", "b")
+        notifications.add("machine_update", "a")
+        notifications.add("device_update", "a")
+        self.assertEqual(
+            [("machine_update", "b"), ("machine_update", "a"),
+             ("device_update", "a")], list(notifications))
+
+    def test_create_then_update_is_create(self):
+        notifications = NotificationCoalescer()
+        notifications.add("machine_create", "a")
+        notifications.add("machine_update", "a")
+        self.assertEqual([("machine_create", "a")], list(notifications))
+
+    def test_create_then_delete_is_dropped(self):
+        notifications = NotificationCoalescer()
+        notifications.add("machine_create", "a")
+        notifications.add("machine_update", "a")
+        notifications.add("machine_delete", "a")
+        self.assertEqual([], list(notifications))
+        self.assertEqual(3, notifications.coalesced)
+
+    def test_update_then_delete_is_delete(self):
+        notifications = NotificationCoalescer()
+        notifications.add("machine_update", "a")
+        notifications.add("machine_delete", "a")
+        self.assertEqual([("machine_delete", "a")], list(notifications))
+
+    def test_delete_then_create_is_update(self):
+        notifications = NotificationCoalescer()
+        notifications.add("machine_delete", "a")
+        notifications.add("machine_create", "a")
+        self.assertEqual([("machine_update", "a")], list(notifications))
+
+    def test_pop_returns_oldest_and_counts_delivered(self):
+        notifications = NotificationCoalescer()
+        notifications.add("machine_update", "a")
+        notifications.add("machine_update", "b")
+        notifications.add("machine_update", "a")
+        self.assertEqual(("machine_update", "a"), notifications.pop())
+        self.assertEqual(1, notifications.delivered)
+        self.assertEqual(1, notifications.coalesced)
+        self.assertEqual(1, len(notifications))
@@ -118,6 +118,7 @@ class TestRegionWorkerServiceMaker(TestServiceMaker):
         expected_services = [
             "database-tasks",
             "postgres-listener-worker",
+            "allocation-index",
             "rack-controller",
             "rpc",
             "status-worker",
@@ -148,6 +149,7 @@ class TestRegionWorkerServiceMaker(TestServiceMaker):
         expected_services = [
             "database-tasks",
             "postgres-listener-worker",
+            "allocation-index",
             "rack-controller",
             "rpc",
             "status-worker",
@@ -309,6 +311,7 @@ class TestRegionAllInOneServiceMaker(TestServiceMaker):
             # Worker services.
             "database-tasks",
             "postgres-listener-worker",
+            "allocation-index",
             "rack-controller",
             "rpc",
             "service-monitor",
@@ -65,6 +65,7 @@ from maasserver.preseed import (
     get_preseed_type_for,
     load_preseed_template,
     PreseedTemplate,
+    PreseedTemplateCache,
     render_enlistment_preseed,
     render_preseed,
     split_subarch,
@@ -334,6 +335,98 @@ class TestGetPreseedTemplate(MAASServerTestCase):
             get_preseed_template([template_filename]))
 
 
+class TestPreseedTemplateCache(MAASTestCase):
+    """Tests for `PreseedTemplateCache`."""
+
+    def setUp(self):
+        super(TestPreseedTemplateCache, self).setUp()
+        self.location = self.make_dir()
+        self.patch(
+            settings, "PRESEED_TEMPLATE_LOCATIONS", [self.location])
+        self.cache = PreseedTemplateCache()
+
+    def age(self, path, seconds=60):
+        """Set the mtime of `path` to `seconds` ago."""
+        mtime = os.stat(path).st_mtime - seconds
+        os.utime(path, (mtime, mtime))
+
+    def make_template(self, name, content=None, age=60):
+        if content is None:
+            content = factory.make_string()
+        path = os.path.join(self.location, name)
+        with open(path, "w", encoding="utf-8") as stream:
+            stream.write(content)
+        self.age(path, age)
+        self.age(self.location, age)
+        return path
+
+    def test_get_returns_first_template_found(self):
+        name = factory.make_name("template")
+        path = self.make_template(name)
+        self.make_template(GENERIC_FILENAME)
+        filepath, template = self.cache.get([name, GENERIC_FILENAME])
+        self.assertEqual(path, filepath)
+        self.assertIsInstance(template, PreseedTemplate)
+        self.assertEqual(path, template.name)
+
+    def test_get_returns_None_when_not_found(self):
+        self.assertEqual(
+            (None, None), self.cache.get([factory.make_name("template")]))
+
+    def test_get_ignores_directories(self):
+        name = factory.make_name("template")
+        os.mkdir(os.path.join(self.location, name))
+        path = self.make_template(GENERIC_FILENAME)
+        self.assertEqual(
+            path, self.cache.get([name, GENERIC_FILENAME])[0])
+
+    def test_get_reuses_parsed_template(self):
+        name = factory.make_name("template")
+        self.make_template(name)
+        _, template = self.cache.get([name])
+        self.assertIs(template, self.cache.get([name])[1])
+        self.assertEqual((1, 1), (self.cache.hits, self.cache.misses))
+
+    def test_get_reparses_modified_template(self):
+        name = factory.make_name("template")
+        self.make_template(name)
+        self.cache.get([name])
+        content = factory.make_string()
+        self.make_template(name, content, age=30)
+        self.assertEqual(content, self.cache.get([name])[1].content)
+        self.assertEqual((0, 2), (self.cache.hits, self.cache.misses))
+
+    def test_get_does_not_cache_recently_modified_template(self):
+        name = factory.make_name("template")
+        self.make_template(name, age=0)
+        self.cache.get([name])
+        self.cache.get([name])
+        self.assertEqual((0, 2), (self.cache.hits, self.cache.misses))
+
+    def test_list_location_relists_when_location_changes(self):
+        self.make_template(GENERIC_FILENAME)
+        self.assertEqual(
+            {GENERIC_FILENAME}, self.cache.list_location(self.location))
+        name = factory.make_name("template")
+        self.make_template(name, age=30)
+        self.assertEqual(
+            {GENERIC_FILENAME, name},
+            self.cache.list_location(self.location))
+
+    def test_list_location_reuses_listing(self):
+        self.make_template(GENERIC_FILENAME)
+        listdir = self.patch_autospec(preseed_module.os, "listdir")
+        listdir.return_value = [GENERIC_FILENAME]
+        self.cache.list_location(self.location)
+        self.cache.list_location(self.location)
+        self.assertThat(listdir, MockCalledOnceWith(self.location))
+
+    def test_list_location_returns_empty_for_missing_location(self):
+        self.assertEqual(
+            frozenset(), self.cache.list_location(
+                os.path.join(self.location, factory.make_name("missing"))))
+
+
 class TestLoadPreseedTemplate(MAASServerTestCase):
     """Tests for `load_preseed_template`."""
 
@@ -363,6 +456,19 @@ class TestLoadPreseedTemplate(MAASServerTestCase):
         template = load_preseed_template(node, name)
         self.assertIsInstance(template, PreseedTemplate)
 
+    def test_load_preseed_template_binds_get_template_to_a_copy(self):
+        name = factory.make_string()
+        self.create_template(self.location, name)
+        path = os.path.join(self.location, name)
+        mtime = os.stat(path).st_mtime - 60
+        os.utime(path, (mtime, mtime))
+        node = factory.make_Node()
+        template = load_preseed_template(node, name)
+        _, cached = preseed_module.preseed_template_cache.get([name])
+        self.assertIsNot(cached, template)
+        self.assertIsNone(cached.get_template)
+        self.assertIsNotNone(template.get_template)
+
     def test_load_preseed_template_raises_if_no_template(self):
         node = factory.make_Node()
         unknown_template_name = factory.make_string()
@@ -27,6 +27,8 @@ from maastesting.matchers import (
     MockCallsMatch,
     MockNotCalled,
 )
+from provisioningserver.rpc.cluster import InvalidateBootConfig
+from provisioningserver.rpc.exceptions import NoConnectionsAvailable
 from testtools import ExpectedException
 from testtools.matchers import MatchesStructure
 from twisted.internet import reactor
@@ -77,9 +79,9 @@ class TestRackControllerService(MAASTransactionServerTestCase):
         yield service.startService()
         self.assertThat(
             listener.register,
-            MockCalledOnceWith(
-                "sys_core_%d" % regionProcessId,
-                service.coreHandler))
+            MockCallsMatch(
+                call("sys_core_%d" % regionProcessId, service.coreHandler),
+                call("sys_boot_config", service.bootConfigHandler)))
         self.assertEqual(regionProcessId, service.processId)
 
     @wait_for_reactor
@@ -148,8 +150,9 @@ class TestRackControllerService(MAASTransactionServerTestCase):
         yield service.stopService()
         self.assertThat(
             listener.unregister,
-            MockCalledOnceWith(
-                "sys_core_%d" % service.processId, service.coreHandler))
+            MockCallsMatch(
+                call("sys_core_%d" % service.processId, service.coreHandler),
+                call("sys_boot_config", service.bootConfigHandler)))
         self.assertIsNone(service.starting)
 
     @wait_for_reactor
@@ -163,8 +166,9 @@ class TestRackControllerService(MAASTransactionServerTestCase):
         yield service.stopService()
         self.assertThat(
             listener.unregister,
-            MockCalledOnceWith(
-                "sys_core_%d" % processId, service.coreHandler))
+            MockCallsMatch(
+                call("sys_core_%d" % processId, service.coreHandler),
+                call("sys_boot_config", service.bootConfigHandler)))
 
     @wait_for_reactor
     @inlineCallbacks
@@ -279,6 +283,56 @@ class TestRackControllerService(MAASTransactionServerTestCase):
         self.assertEquals(set(), service.needsDHCPUpdate)
         self.assertThat(mock_startProcessing, MockNotCalled())
 
+    def test_bootConfigHandler_does_nothing_when_not_watching(self):
+        service = RackControllerService(
+            sentinel.ipcWorker, sentinel.listener)
+        mock_invalidate = self.patch(service, "invalidateBootConfig")
+        service.bootConfigHandler(
+            "sys_boot_config", factory.make_mac_address())
+        self.assertThat(mock_invalidate, MockNotCalled())
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_bootConfigHandler_invalidates_on_watched_racks(self):
+        make_rack = transactional(factory.make_RackController)
+        rack = yield deferToDatabase(make_rack)
+        yield deferToDatabase(make_rack)
+        service = RackControllerService(
+            sentinel.ipcWorker, sentinel.listener)
+        service.watching = {rack.id}
+        mock_invalidate = self.patch(service, "invalidateBootConfig")
+        macs = [factory.make_mac_address() for _ in range(2)]
+        yield service.bootConfigHandler("sys_boot_config", " ".join(macs))
+        self.assertThat(
+            mock_invalidate, MockCalledOnceWith([rack.system_id], macs))
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_invalidateBootConfig_calls_InvalidateBootConfig(self):
+        system_id = factory.make_name("system_id")
+        client = Mock(return_value=succeed({}))
+        mock_getClientFor = self.patch(rack_controller, "getClientFor")
+        mock_getClientFor.return_value = succeed(client)
+        service = RackControllerService(
+            sentinel.ipcWorker, sentinel.listener)
+        macs = [factory.make_mac_address()]
+        yield service.invalidateBootConfig([system_id], macs)
+        self.assertThat(mock_getClientFor, MockCalledOnceWith(system_id))
+        self.assertThat(
+            client, MockCalledOnceWith(InvalidateBootConfig, macs=macs))
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_invalidateBootConfig_ignores_missing_connections(self):
+        mock_getClientFor = self.patch(rack_controller, "getClientFor")
+        mock_getClientFor.side_effect = NoConnectionsAvailable()
+        mock_err = self.patch(rack_controller.log, "err")
+        service = RackControllerService(
+            sentinel.ipcWorker, sentinel.listener)
+        yield service.invalidateBootConfig(
+            [factory.make_name("system_id")], [factory.make_mac_address()])
+        self.assertThat(mock_err, MockNotCalled())
+
     def test_startProcessing_doesnt_call_start_when_looping_call_running(self):
         service = RackControllerService(
             sentinel.ipcWorker, sentinel.listener)
@@ -39,6 +39,7 @@ from twisted.internet.defer import (
     inlineCallbacks,
     succeed,
 )
+from twisted.internet.task import Clock
 from twisted.names.dns import (
     A,
     Record_SOA,
@@ -283,6 +284,57 @@ class TestRegionControllerService(MAASServerTestCase):
         self.assertThat(
             mock_proxy_update_config, MockCalledOnceWith(reload_proxy=True))
 
+    def test__isFullDNSUpdateDue_on_first_update(self):
+        service = RegionControllerService(sentinel.listener)
+        self.assertTrue(service._isFullDNSUpdateDue())
+
+    def test__isFullDNSUpdateDue_when_marked(self):
+        service = RegionControllerService(sentinel.listener)
+        service.previousSerial = random.randint(1, 1000)
+        self.assertFalse(service._isFullDNSUpdateDue())
+        service.needsFullDNSUpdate = True
+        self.assertTrue(service._isFullDNSUpdateDue())
+
+    def test_markFullDNSForUpdate_marks_full_update(self):
+        service = RegionControllerService(sentinel.listener)
+        mock_startProcessing = self.patch(service, "startProcessing")
+        service.markFullDNSForUpdate()
+        self.assertTrue(service.needsFullDNSUpdate)
+        self.assertTrue(service.needsDNSUpdate)
+        self.assertThat(mock_startProcessing, MockCalledOnceWith())
+
+    def test_full_updates_are_marked_every_interval(self):
+        clock = Clock()
+        service = RegionControllerService(MagicMock(), clock=clock)
+        self.patch(service, "startProcessing")
+        service.startService()
+        self.addCleanup(service.stopService)
+        service.needsDNSUpdate = False
+        clock.advance(region_controller.FULL_DNS_UPDATE_INTERVAL - 1)
+        self.assertFalse(service.needsFullDNSUpdate)
+        clock.advance(1)
+        self.assertTrue(service.needsFullDNSUpdate)
+        self.assertTrue(service.needsDNSUpdate)
+
+    def test_stopService_stops_full_updates(self):
+        clock = Clock()
+        service = RegionControllerService(MagicMock(), clock=clock)
+        self.patch(service, "startProcessing")
+        service.startService()
+        service.stopService()
+        self.assertFalse(service.fullDNSUpdates.running)
+
+    def test_process_clears_needsFullDNSUpdate(self):
+        service = RegionControllerService(sentinel.listener)
+        service.previousSerial = random.randint(1, 1000)
+        service.needsDNSUpdate = True
+        service.needsFullDNSUpdate = True
+        mock_deferToDatabase = self.patch(region_controller, "deferToDatabase")
+        service.process()
+        self.assertFalse(service.needsFullDNSUpdate)
+        self.assertThat(
+            mock_deferToDatabase, MockCalledOnceWith(service._updateDNS, True))
+
     def make_soa_result(self, serial):
         return RRHeader(
             type=SOA, cls=A, ttl=30, payload=Record_SOA(serial=serial))
@@ -453,3 +505,61 @@ class TestRegionControllerServiceTransactional(MAASTransactionServerTestCase):
         self.assertThat(
             mock_msg,
             MockCalledOnceWith(expected_msg))
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_process_updates_changed_zones_only(self):
+        def _create_publications():
+            return [
+                DNSPublication.objects.create(
+                    source=factory.make_name('reason')),
+                DNSPublication.objects.create(
+                    source=factory.make_name('reason'),
+                    domain_ids=[1], subnet_ids=[]),
+                DNSPublication.objects.create(
+                    source=factory.make_name('reason'),
+                    domain_ids=[2], subnet_ids=[3]),
+            ]
+
+        publications = yield deferToDatabase(_create_publications)
+        service = RegionControllerService(sentinel.listener)
+        service.needsDNSUpdate = True
+        service.previousSerial = publications[0].serial
+        dns_result = (publications[-1].serial, [factory.make_name('domain')])
+        mock_dns_update_all_zones = self.patch(
+            region_controller, "dns_update_all_zones")
+        mock_dns_update_zones = self.patch(
+            region_controller, "dns_update_zones")
+        mock_dns_update_zones.return_value = dns_result
+        mock_check_serial = self.patch(service, "_checkSerial")
+        mock_check_serial.return_value = succeed(dns_result)
+        self.patch(region_controller.log, "msg")
+        service.startProcessing()
+        yield service.processingDefer
+        self.assertThat(mock_dns_update_all_zones, MockNotCalled())
+        self.assertThat(
+            mock_dns_update_zones, MockCalledOnceWith(
+                {1, 2}, {3}, publications[-1].serial))
+        self.assertThat(mock_check_serial, MockCalledOnceWith(dns_result))
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_process_updates_all_zones_when_previous_serial_unknown(self):
+        publication = yield deferToDatabase(
+            DNSPublication.objects.create, domain_ids=[1], subnet_ids=[])
+        service = RegionControllerService(sentinel.listener)
+        service.needsDNSUpdate = True
+        service.previousSerial = publication.serial + 1
+        dns_result = (publication.serial, [factory.make_name('domain')])
+        mock_dns_update_all_zones = self.patch(
+            region_controller, "dns_update_all_zones")
+        mock_dns_update_all_zones.return_value = dns_result
+        mock_dns_update_zones = self.patch(
+            region_controller, "dns_update_zones")
+        mock_check_serial = self.patch(service, "_checkSerial")
+        mock_check_serial.return_value = succeed(dns_result)
+        self.patch(region_controller.log, "msg")
+        service.startProcessing()
+        yield service.processingDefer
+        self.assertThat(mock_dns_update_all_zones, MockCalledOnceWith())
+        self.assertThat(mock_dns_update_zones, MockNotCalled())
@@ -891,7 +891,8 @@ DNS_PUBLISH = dedent("""\
     """)
 
 
-# Procedure to mark DNS as needing an update.
+# Procedure to mark DNS as needing an update. All zones, and the DNS
+# configuration, will be regenerated.
 DNS_PUBLISH_UPDATE = dedent("""\
     CREATE OR REPLACE FUNCTION sys_dns_publish_update(reason text)
     RETURNS void as $$
@@ -906,6 +907,24 @@ DNS_PUBLISH_UPDATE = dedent("""\
     """)
 
 
+# Procedure to mark DNS as needing an update, recording which domains and
+# subnets are affected so that only their zones need to be regenerated. A NULL
+# array means that all forward (or reverse) zones are affected.
+DNS_PUBLISH_UPDATE_ZONES = dedent("""\
+    CREATE OR REPLACE FUNCTION sys_dns_publish_update(
+      reason text, domains integer[], subnets integer[])
+    RETURNS void as $$
+    BEGIN
+      INSERT INTO maasserver_dnspublication
+        (serial, created, source, domain_ids, subnet_ids)
+      VALUES
+        (nextval('maasserver_zone_serial_seq'), now(),
+         substring(reason FOR 255), domains, subnets);
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+
 # Triggered when a new domain is added. Increments the zone serial and
 # notifies that DNS needs to be updated.
 DNS_DOMAIN_INSERT = dedent("""\
@@ -947,9 +966,15 @@ DNS_DOMAIN_UPDATE = dedent("""\
             changes := changes || (
               'ttl changed to ' || COALESCE(text(NEW.ttl), 'default'));
         END IF;
-        IF array_length(changes, 1) != 0 THEN
+        IF OLD.name != NEW.name THEN
           PERFORM sys_dns_publish_update(
             'zone ' || OLD.name || ' ' || array_to_string(changes, ' and '));
+        ELSIF array_length(changes, 1) != 0 THEN
+          -- Only the TTL changed; the set of zones is the same. The TTL
+          -- is also used for PTR records, so update all reverse zones.
+          PERFORM sys_dns_publish_update(
+            'zone ' || OLD.name || ' ' || array_to_string(changes, ' and '),
+            ARRAY[NEW.id], NULL);
         END IF;
       END IF;
       RETURN NEW;
@@ -979,13 +1004,16 @@ DNS_DOMAIN_DELETE = dedent("""\
 DNS_STATICIPADDRESS_UPDATE = dedent("""\
     CREATE OR REPLACE FUNCTION sys_dns_staticipaddress_update()
     RETURNS trigger as $$
+    DECLARE
+      domains integer[];
+      subnets integer[];
     BEGIN
       IF ((OLD.ip IS NULL and NEW.ip IS NOT NULL) OR
           (OLD.ip IS NOT NULL and NEW.ip IS NULL) OR
           (OLD.ip != NEW.ip)) OR
           (OLD.alloc_type != NEW.alloc_type) THEN
-        IF EXISTS (
-            SELECT
+        domains := ARRAY(
+            SELECT DISTINCT
               domain.id
             FROM maasserver_staticipaddress AS staticipaddress
             LEFT JOIN (
@@ -1005,19 +1033,23 @@ DNS_STATICIPADDRESS_UPDATE = dedent("""\
             WHERE
               domain.authoritative = TRUE AND
               (staticipaddress.id = OLD.id OR
-               staticipaddress.id = NEW.id))
-        THEN
+               staticipaddress.id = NEW.id));
+        IF array_length(domains, 1) > 0 THEN
+          IF OLD.subnet_id IS NOT NULL AND NEW.subnet_id IS NOT NULL THEN
+            subnets := ARRAY[OLD.subnet_id, NEW.subnet_id];
+          END IF;
           IF OLD.ip IS NULL and NEW.ip IS NOT NULL THEN
             PERFORM sys_dns_publish_update(
-              'ip ' || host(NEW.ip) || ' allocated');
+              'ip ' || host(NEW.ip) || ' allocated', domains, subnets);
             RETURN NEW;
           ELSIF OLD.ip IS NOT NULL and NEW.ip IS NULL THEN
             PERFORM sys_dns_publish_update(
-              'ip ' || host(OLD.ip) || ' released');
+              'ip ' || host(OLD.ip) || ' released', domains, subnets);
             RETURN NEW;
           ELSIF OLD.ip != NEW.ip THEN
             PERFORM sys_dns_publish_update(
-              'ip ' || host(OLD.ip) || ' changed to ' || host(NEW.ip));
+              'ip ' || host(OLD.ip) || ' changed to ' || host(NEW.ip),
+              domains, subnets);
             RETURN NEW;
           END IF;
 
@@ -1026,7 +1058,7 @@ DNS_STATICIPADDRESS_UPDATE = dedent("""\
           IF NEW.ip IS NOT NULL THEN
             PERFORM sys_dns_publish_update(
               'ip ' || host(OLD.ip) || ' alloc_type changed to ' ||
-              NEW.alloc_type);
+              NEW.alloc_type, domains, subnets);
           END IF;
         END IF;
       END IF;
@@ -1045,6 +1077,7 @@ DNS_NIC_IP_LINK = dedent("""\
       node maasserver_node;
       nic maasserver_interface;
       ip maasserver_staticipaddress;
+      subnets integer[];
     BEGIN
       SELECT maasserver_interface.* INTO nic
       FROM maasserver_interface
@@ -1062,9 +1095,12 @@ DNS_NIC_IP_LINK = dedent("""\
               maasserver_domain.id = node.domain_id AND
               maasserver_domain.authoritative = TRUE))
       THEN
+        IF ip.subnet_id IS NOT NULL THEN
+          subnets := ARRAY[ip.subnet_id];
+        END IF;
         PERFORM sys_dns_publish_update(
           'ip ' || host(ip.ip) || ' connected to ' || node.hostname ||
-          ' on ' || nic.name);
+          ' on ' || nic.name, ARRAY[node.domain_id], subnets);
       END IF;
       RETURN NEW;
     END;
@@ -1081,7 +1117,7 @@ DNS_NIC_IP_UNLINK = dedent("""\
       node maasserver_node;
       nic maasserver_interface;
       ip maasserver_staticipaddress;
-      changes text[];
+      subnets integer[];
     BEGIN
       SELECT maasserver_interface.* INTO nic
       FROM maasserver_interface
@@ -1099,9 +1135,12 @@ DNS_NIC_IP_UNLINK = dedent("""\
               maasserver_domain.id = node.domain_id AND
               maasserver_domain.authoritative = TRUE))
       THEN
+        IF ip.subnet_id IS NOT NULL THEN
+          subnets := ARRAY[ip.subnet_id];
+        END IF;
         PERFORM sys_dns_publish_update(
           'ip ' || host(ip.ip) || ' disconnected from ' || node.hostname ||
-          ' on ' || nic.name);
+          ' on ' || nic.name, ARRAY[node.domain_id], subnets);
       END IF;
       RETURN OLD;
     END;
@@ -1187,7 +1226,7 @@ DNS_NODE_UPDATE = dedent("""\
               maasserver_domain.id = NEW.domain_id) THEN
           PERFORM sys_dns_publish_update(
             'node ' || OLD.hostname || ' changed hostname to ' ||
-            NEW.hostname);
+            NEW.hostname, ARRAY[NEW.domain_id], NULL);
         END IF;
       ELSIF OLD.domain_id != NEW.domain_id THEN
         -- Domains have changed. If either one is authoritative then DNS
@@ -1201,7 +1240,7 @@ DNS_NODE_UPDATE = dedent("""\
         IF domain.authoritative = TRUE OR new_domain.authoritative = TRUE THEN
             PERFORM sys_dns_publish_update(
               'node ' || NEW.hostname || ' changed zone to ' ||
-              new_domain.name);
+              new_domain.name, ARRAY[OLD.domain_id, NEW.domain_id], NULL);
         END IF;
       END IF;
       RETURN NEW;
@@ -1227,7 +1266,7 @@ DNS_NODE_DELETE = dedent("""\
             maasserver_domain.authoritative = TRUE AND
             maasserver_domain.id = OLD.domain_id) THEN
         PERFORM sys_dns_publish_update(
-          'removed node ' || OLD.hostname);
+          'removed node ' || OLD.hostname, ARRAY[OLD.domain_id], NULL);
       END IF;
       RETURN NEW;
     END;
@@ -1258,7 +1297,7 @@ DNS_INTERFACE_UPDATE = dedent("""\
                   maasserver_domain.id = node.domain_id) THEN
               PERFORM sys_dns_publish_update(
                 'node ' || node.hostname || ' renamed interface ' ||
-                OLD.name || ' to ' || NEW.name);
+                OLD.name || ' to ' || NEW.name, ARRAY[node.domain_id], NULL);
             END IF;
         END IF;
       ELSIF OLD.node_id IS NULL and NEW.node_id IS NOT NULL THEN
@@ -1272,7 +1311,8 @@ DNS_INTERFACE_UPDATE = dedent("""\
               maasserver_domain.authoritative = TRUE AND
               maasserver_domain.id = node.domain_id) THEN
           PERFORM sys_dns_publish_update(
-            'node ' || node.hostname || ' added interface ' || NEW.name);
+            'node ' || node.hostname || ' added interface ' || NEW.name,
+            ARRAY[node.domain_id], NULL);
         END IF;
       ELSIF OLD.node_id IS NOT NULL and NEW.node_id IS NULL THEN
         SELECT maasserver_node.* INTO node
@@ -1285,7 +1325,8 @@ DNS_INTERFACE_UPDATE = dedent("""\
               maasserver_domain.authoritative = TRUE AND
               maasserver_domain.id = node.domain_id) THEN
           PERFORM sys_dns_publish_update(
-            'node ' || node.hostname || ' removed interface ' || NEW.name);
+            'node ' || node.hostname || ' removed interface ' || NEW.name,
+            ARRAY[node.domain_id], NULL);
         END IF;
       ELSIF OLD.node_id != NEW.node_id THEN
         SELECT maasserver_node.* INTO node
@@ -1298,7 +1339,8 @@ DNS_INTERFACE_UPDATE = dedent("""\
               maasserver_domain.authoritative = TRUE AND
               maasserver_domain.id = node.domain_id) THEN
           PERFORM sys_dns_publish_update(
-            'node ' || node.hostname || ' removed interface ' || NEW.name);
+            'node ' || node.hostname || ' removed interface ' || NEW.name,
+            ARRAY[node.domain_id], NULL);
         END IF;
         SELECT maasserver_node.* INTO node
         FROM maasserver_node
@@ -1310,7 +1352,8 @@ DNS_INTERFACE_UPDATE = dedent("""\
               maasserver_domain.authoritative = TRUE AND
               maasserver_domain.id = node.domain_id) THEN
           PERFORM sys_dns_publish_update(
-            'node ' || node.hostname || ' added interface ' || NEW.name);
+            'node ' || node.hostname || ' added interface ' || NEW.name,
+            ARRAY[node.domain_id], NULL);
         END IF;
       END IF;
       RETURN NEW;
@@ -1376,9 +1419,10 @@ DNS_DNSRESOURCE_INSERT = dedent("""\
       SELECT maasserver_domain.* INTO domain
       FROM maasserver_domain
       WHERE maasserver_domain.id = NEW.domain_id;
+      -- A new resource has no addresses yet, so no reverse zones change.
       PERFORM sys_dns_publish_update(
         'zone ' || domain.name || ' added resource ' ||
-        COALESCE(NEW.name, 'NULL'));
+        COALESCE(NEW.name, 'NULL'), ARRAY[NEW.domain_id], '{}');
       RETURN NEW;
     END;
     $$ LANGUAGE plpgsql;
@@ -1399,13 +1443,13 @@ DNS_DNSRESOURCE_UPDATE = dedent("""\
         WHERE maasserver_domain.id = OLD.domain_id;
         PERFORM sys_dns_publish_update(
           'zone ' || domain.name || ' removed resource ' ||
-          COALESCE(NEW.name, 'NULL'));
+          COALESCE(NEW.name, 'NULL'), ARRAY[OLD.domain_id], NULL);
         SELECT maasserver_domain.* INTO domain
         FROM maasserver_domain
         WHERE maasserver_domain.id = NEW.domain_id;
         PERFORM sys_dns_publish_update(
           'zone ' || domain.name || ' added resource ' ||
-          COALESCE(NEW.name, 'NULL'));
+          COALESCE(NEW.name, 'NULL'), ARRAY[NEW.domain_id], NULL);
       ELSIF ((OLD.name IS NULL AND NEW.name IS NOT NULL) OR
           (OLD.name IS NOT NULL AND NEW.name IS NULL) OR
           (OLD.name != NEW.name) OR
@@ -1417,7 +1461,7 @@ DNS_DNSRESOURCE_UPDATE = dedent("""\
         WHERE maasserver_domain.id = NEW.domain_id;
         PERFORM sys_dns_publish_update(
           'zone ' || domain.name || ' updated resource ' ||
-          COALESCE(NEW.name, 'NULL'));
+          COALESCE(NEW.name, 'NULL'), ARRAY[NEW.domain_id], NULL);
       END IF;
       RETURN NEW;
     END;
@@ -1438,7 +1482,7 @@ DNS_DNSRESOURCE_DELETE = dedent("""\
       WHERE maasserver_domain.id = OLD.domain_id;
       PERFORM sys_dns_publish_update(
         'zone ' || domain.name || ' removed resource ' ||
-        COALESCE(OLD.name, 'NULL'));
+        COALESCE(OLD.name, 'NULL'), ARRAY[OLD.domain_id], NULL);
       RETURN OLD;
     END;
     $$ LANGUAGE plpgsql;
@@ -1454,6 +1498,7 @@ DNS_DNSRESOURCE_IP_LINK = dedent("""\
       sip maasserver_staticipaddress;
       resource maasserver_dnsresource;
       domain maasserver_domain;
+      subnets integer[];
     BEGIN
       SELECT maasserver_staticipaddress.* INTO sip
       FROM maasserver_staticipaddress
@@ -1465,9 +1510,13 @@ DNS_DNSRESOURCE_IP_LINK = dedent("""\
       FROM maasserver_domain
       WHERE maasserver_domain.id = resource.domain_id;
       IF sip.ip IS NOT NULL THEN
+          IF sip.subnet_id IS NOT NULL THEN
+            subnets := ARRAY[sip.subnet_id];
+          END IF;
           PERFORM sys_dns_publish_update(
             'ip ' || host(sip.ip) || ' linked to resource ' ||
-            COALESCE(resource.name, 'NULL') || ' on zone ' || domain.name);
+            COALESCE(resource.name, 'NULL') || ' on zone ' || domain.name,
+            ARRAY[resource.domain_id], subnets);
       END IF;
       RETURN NEW;
     END;
@@ -1484,6 +1533,7 @@ DNS_DNSRESOURCE_IP_UNLINK = dedent("""\
       sip maasserver_staticipaddress;
       resource maasserver_dnsresource;
       domain maasserver_domain;
+      subnets integer[];
     BEGIN
       SELECT maasserver_staticipaddress.* INTO sip
       FROM maasserver_staticipaddress
@@ -1495,9 +1545,13 @@ DNS_DNSRESOURCE_IP_UNLINK = dedent("""\
       FROM maasserver_domain
       WHERE maasserver_domain.id = resource.domain_id;
       IF sip.ip IS NOT NULL THEN
+          IF sip.subnet_id IS NOT NULL THEN
+            subnets := ARRAY[sip.subnet_id];
+          END IF;
           PERFORM sys_dns_publish_update(
             'ip ' || host(sip.ip) || ' unlinked from resource ' ||
-            COALESCE(resource.name, 'NULL') || ' on zone ' || domain.name);
+            COALESCE(resource.name, 'NULL') || ' on zone ' || domain.name,
+            ARRAY[resource.domain_id], subnets);
       END IF;
       RETURN OLD;
     END;
@@ -1522,7 +1576,7 @@ DNS_DNSDATA_INSERT = dedent("""\
       WHERE maasserver_domain.id = resource.domain_id;
       PERFORM sys_dns_publish_update(
         'added ' || NEW.rrtype || ' to resource ' || resource.name ||
-        ' on zone ' || domain.name);
+        ' on zone ' || domain.name, ARRAY[resource.domain_id], '{}');
       RETURN NEW;
     END;
     $$ LANGUAGE plpgsql;
@@ -1546,7 +1600,7 @@ DNS_DNSDATA_UPDATE = dedent("""\
       WHERE maasserver_domain.id = resource.domain_id;
       PERFORM sys_dns_publish_update(
         'updated ' || NEW.rrtype || ' in resource ' || resource.name ||
-        ' on zone ' || domain.name);
+        ' on zone ' || domain.name, ARRAY[resource.domain_id], '{}');
       RETURN NEW;
     END;
     $$ LANGUAGE plpgsql;
@@ -1570,7 +1624,7 @@ DNS_DNSDATA_DELETE = dedent("""\
       WHERE maasserver_domain.id = resource.domain_id;
       PERFORM sys_dns_publish_update(
         'removed ' || OLD.rrtype || ' from resource ' || resource.name ||
-        ' on zone ' || domain.name);
+        ' on zone ' || domain.name, ARRAY[resource.domain_id], '{}');
       RETURN OLD;
     END;
     $$ LANGUAGE plpgsql;
@@ -1628,6 +1682,36 @@ PEER_PROXY_CONFIG_UPDATE = dedent("""\
     """)
 
 
+# Triggered when a node is updated. Notifies the MAC addresses of the node
+# when a change affects the boot configuration that the rack controllers
+# have cached for it.
+BOOT_CONFIG_NODE_UPDATE = dedent("""\
+    CREATE OR REPLACE FUNCTION sys_boot_config_node_update()
+    RETURNS trigger as $$
+    DECLARE
+      macs text;
+    BEGIN
+      IF (OLD.status != NEW.status OR
+          OLD.netboot != NEW.netboot OR
+          OLD.osystem != NEW.osystem OR
+          OLD.distro_series != NEW.distro_series OR
+          OLD.architecture IS DISTINCT FROM NEW.architecture OR
+          OLD.hwe_kernel IS DISTINCT FROM NEW.hwe_kernel OR
+          OLD.min_hwe_kernel IS DISTINCT FROM NEW.min_hwe_kernel OR
+          OLD.boot_interface_id IS DISTINCT FROM NEW.boot_interface_id) THEN
+        SELECT string_agg(DISTINCT mac_address::text, ' ') INTO macs
+        FROM maasserver_interface
+        WHERE node_id = NEW.id AND mac_address IS NOT NULL;
+        IF macs IS NOT NULL THEN
+          PERFORM pg_notify('sys_boot_config', macs);
+        END IF;
+      END IF;
+      RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+
 def render_sys_proxy_procedure(proc_name, on_delete=False):
     """Render a database procedure with name `proc_name` that notifies that a
     proxy update is needed.
@@ -1757,6 +1841,7 @@ def register_system_triggers():
         "maasserver_dnspublication",
         "sys_dns_publish", "insert")
     register_procedure(DNS_PUBLISH_UPDATE)
+    register_procedure(DNS_PUBLISH_UPDATE_ZONES)
 
     # - Domain
     register_procedure(DNS_DOMAIN_INSERT)
@@ -1861,6 +1946,14 @@ def register_system_triggers():
     register_trigger(
         "maasserver_config", "sys_dns_config_update", "update")
 
+    # Boot config
+
+    # - Node
+    register_procedure(BOOT_CONFIG_NODE_UPDATE)
+    register_trigger(
+        "maasserver_node",
+        "sys_boot_config_node_update", "update")
+
     # Proxy
 
     # - Subnet
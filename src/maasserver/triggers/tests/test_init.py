@@ -87,6 +87,7 @@ class TestTriggersUsed(MAASServerTestCase):
         "iprange_sys_dhcp_iprange_delete",
         "iprange_sys_dhcp_iprange_insert",
         "iprange_sys_dhcp_iprange_update",
+        "node_sys_boot_config_node_update",
         "node_sys_dhcp_node_update",
         "node_sys_dns_node_delete",
         "node_sys_dns_node_update",
@@ -58,6 +58,7 @@ class TestTriggers(MAASServerTestCase):
             "interface_sys_dns_interface_update",
             "config_sys_dns_config_insert",
             "config_sys_dns_config_update",
+            "node_sys_boot_config_node_update",
             "subnet_sys_proxy_subnet_insert",
             "subnet_sys_proxy_subnet_update",
             "subnet_sys_proxy_subnet_delete",
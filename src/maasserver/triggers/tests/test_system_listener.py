@@ -19,6 +19,7 @@ from maasserver.enum import (
     INTERFACE_TYPE,
     IPADDRESS_TYPE,
     IPRANGE_TYPE,
+    NODE_STATUS,
     RDNS_MODE,
 )
 from maasserver.models.config import Config
@@ -2180,6 +2181,37 @@ class TestDHCPNodeListener(
             yield listener.stopService()
 
 
+class TestBootConfigNodeListener(
+        MAASTransactionServerTestCase, TransactionalHelpersMixin):
+    """End-to-end test for the boot config triggers code."""
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_sends_message_for_status_change(self):
+        yield deferToDatabase(register_system_triggers)
+        node = yield deferToDatabase(self.create_node, {
+            "status": NODE_STATUS.READY,
+        })
+        interface = yield deferToDatabase(self.create_interface, {
+            "node": node,
+        })
+
+        listener = self.make_listener_without_delay()
+        dv = DeferredValue()
+        listener.register(
+            "sys_boot_config", lambda *args: dv.set(args))
+        yield listener.startService()
+        try:
+            yield deferToDatabase(self.update_node, node.system_id, {
+                "status": NODE_STATUS.DEPLOYING,
+            })
+            channel, message = yield dv.get(timeout=2)
+            self.assertEqual("sys_boot_config", channel)
+            self.assertIn(str(interface.mac_address), message.split())
+        finally:
+            yield listener.stopService()
+
+
 class TestDHCPSnippetListener(
         MAASTransactionServerTestCase, TransactionalHelpersMixin):
     """End-to-end test for the DHCP triggers code."""
@@ -10,11 +10,15 @@ __all__ = [
     "Handler",
     ]
 
+from itertools import islice
 from operator import attrgetter
 
 from django.contrib.postgres.fields import ArrayField
 from django.core.exceptions import ValidationError
-from django.db.models import Model
+from django.db.models import (
+    Model,
+    prefetch_related_objects,
+)
 from django.http import HttpRequest
 from django.utils.encoding import is_protected_type
 from maasserver import concurrency
@@ -93,6 +97,7 @@ class HandlerOptions(object):
     form_requires_request = True
     listen_channels = []
     batch_key = 'id'
+    stream_batch_size = 100
 
     def __new__(cls, meta=None):
         overrides = {}
@@ -165,6 +170,10 @@ class Handler(metaclass=HandlerMetaclass):
         # correct notifications based on what items the client has.
         if "loaded_pks" not in self.cache:
             self.cache["loaded_pks"] = set()
+        # Holds the results of looking up and dehydrating the object of a
+        # notification, shared by the handlers of all the clients in the same
+        # listen group. See `get_listen_group`.
+        self.listen_results = None
 
     def full_dehydrate(self, obj, for_list=False):
         """Convert the given object into a dictionary.
@@ -340,8 +349,28 @@ class Handler(metaclass=HandlerMetaclass):
         else:
             raise HandlerNoSuchMethodError(method_name)
 
-    def _cache_pks(self, objs):
-        """Cache all loaded object pks."""
+    def stream(self, method_name, params, send):
+        """Execute the given method on the handler, streaming its results.
+
+        Only `list` can be streamed; see `stream_list`. Handlers that
+        override `list` are executed as normal, so `send` is never called and
+        the whole result arrives at once.
+        """
+        if method_name != "list" or type(self).list is not Handler.list:
+            return self.execute(method_name, params)
+        elif method_name in self._meta.allowed_methods:
+            return concurrency.webapp.run(
+                deferToDatabase, transactional(self.stream_list),
+                params, send)
+        else:
+            raise HandlerNoSuchMethodError(method_name)
+
+    def _cache_pks(self, objs, for_list=False):
+        """Cache all loaded object pks.
+
+        :param for_list: True when `objs` are about to be dehydrated for a
+            list.
+        """
         getpk = attrgetter(self._meta.pk)
         self.cache["loaded_pks"].update(getpk(obj) for obj in objs)
 
@@ -354,6 +383,15 @@ class Handler(metaclass=HandlerMetaclass):
         :param offset: Offset into the queryset to return.
         :param limit: Maximum number of objects to return.
         """
+        objs = list(self._get_list_queryset(params))
+        self._cache_pks(objs, for_list=True)
+        return [
+            self.full_dehydrate(obj, for_list=True)
+            for obj in objs
+            ]
+
+    def _get_list_queryset(self, params):
+        """Return the ordered `QuerySet` for `list` with `params`."""
         queryset = self.get_queryset(for_list=True)
         queryset = queryset.order_by(self._meta.batch_key)
         if "start" in params:
@@ -362,12 +400,38 @@ class Handler(metaclass=HandlerMetaclass):
                 })
         if "limit" in params:
             queryset = queryset[:params["limit"]]
-        objs = list(queryset)
-        self._cache_pks(objs)
-        return [
-            self.full_dehydrate(obj, for_list=True)
-            for obj in objs
-            ]
+        return queryset
+
+    def stream_list(self, params, send):
+        """List objects, a batch at a time.
+
+        Objects are read through a server-side cursor and dehydrated in
+        batches of `stream_batch_size`, with the related objects of each
+        batch prefetched together. Each batch is passed to `send` as soon as
+        it is ready, apart from the last, which is returned. This takes the
+        same parameters as `list`.
+
+        :param send: Called with each batch of dehydrated objects but the
+            last. This is called from the database thread.
+        """
+        queryset = self._get_list_queryset(params)
+        prefetch = queryset._prefetch_related_lookups
+        objs = queryset.iterator()
+        previous = []
+        while True:
+            batch = list(islice(objs, self._meta.stream_batch_size))
+            if len(batch) == 0:
+                return previous
+            if len(previous) > 0:
+                send(previous)
+            if len(prefetch) > 0:
+                # `QuerySet.iterator` does not prefetch related objects.
+                prefetch_related_objects(batch, *prefetch)
+            self._cache_pks(batch, for_list=True)
+            previous = [
+                self.full_dehydrate(obj, for_list=True)
+                for obj in batch
+                ]
 
     def get(self, params):
         """Get object.
@@ -470,10 +534,13 @@ class Handler(metaclass=HandlerMetaclass):
             else:
                 return None
 
-        try:
-            obj = self.listen(channel, action, pk)
-        except HandlerDoesNotExistError:
-            obj = None
+        def listen():
+            try:
+                return self.listen(channel, action, pk)
+            except HandlerDoesNotExistError:
+                return None
+
+        obj = self._listen_shared(("listen", channel, action, pk), listen)
         if action == "create" and obj is not None:
             if pk in self.cache['loaded_pks']:
                 # The user already knows about this node, so its not a create
@@ -509,21 +576,41 @@ class Handler(metaclass=HandlerMetaclass):
     def on_listen_for_active_pk(self, action, pk, obj):
         """Return the correct data for `obj` depending on if its the
         active primary key."""
-        if 'active_pk' in self.cache and pk == self.cache['active_pk']:
-            # Active so send all the data for the object.
-            return (
-                self._meta.handler_name,
-                action,
-                self.full_dehydrate(obj, for_list=False),
-                )
+        # When active send all the data for the object, otherwise only send
+        # the data like it was comming from the list call.
+        for_list = not (
+            'active_pk' in self.cache and pk == self.cache['active_pk'])
+        data = self._listen_shared(
+            ("dehydrate", pk, for_list),
+            self.listen_dehydrate, obj, for_list)
+        return (self._meta.handler_name, action, data)
+
+    def listen_dehydrate(self, obj, for_list):
+        """Convert `obj` into a dictionary for a notification."""
+        return self.full_dehydrate(obj, for_list=for_list)
+
+    def get_listen_group(self):
+        """Return the group of users that see the same notifications.
+
+        The handlers of clients in the same group share the object looked up
+        and dehydrated for a notification, instead of each doing it again.
+        Every active superuser sees the same data; any other user only shares
+        with their own sessions. Handlers that show superusers data that
+        depends on the user must override this.
+        """
+        if self.user.is_superuser and self.user.is_active:
+            return ("admin",)
         else:
-            # Not active so only send the data like it was comming from
-            # the list call.
-            return (
-                self._meta.handler_name,
-                action,
-                self.full_dehydrate(obj, for_list=True),
-                )
+            return ("user", self.user.id)
+
+    def _listen_shared(self, key, func, *args):
+        """Return `func(*args)`, calling it once for all the handlers that
+        share `listen_results`."""
+        if self.listen_results is None:
+            return func(*args)
+        if key not in self.listen_results:
+            self.listen_results[key] = func(*args)
+        return self.listen_results[key]
 
     def listen(self, channel, action, pk):
         """Called when the handler listens for events on channels with
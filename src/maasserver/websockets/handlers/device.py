@@ -146,7 +146,7 @@ class DeviceHandler(NodeHandler):
             "device",
             ]
 
-    def _cache_pks(self, objs):
+    def _cache_pks(self, objs, for_list=False):
         """Cache all loaded object pks."""
         # Copy from base.py as devices don't have ScriptResults
         getpk = attrgetter(self._meta.pk)
@@ -11,6 +11,7 @@ from functools import partial
 from operator import itemgetter
 
 from django.core.exceptions import ValidationError
+from maasserver import locks
 from maasserver.enum import (
     BMC_TYPE,
     INTERFACE_LINK_TYPE,
@@ -64,6 +65,7 @@ from maasserver.models.node import (
 from maasserver.models.partition import Partition
 from maasserver.models.subnet import Subnet
 from maasserver.node_action import compile_node_actions
+from maasserver.node_constraint_filter_forms import AcquireNodeForm
 from maasserver.utils.orm import (
     reload_object,
     transactional,
@@ -82,7 +84,7 @@ from metadataserver.enum import (
     HARDWARE_TYPE,
     RESULT_TYPE,
 )
-from metadataserver.models.scriptset import get_status_from_qs
+from metadataserver.models.scriptset import get_status_from_statuses
 from provisioningserver.logger import LegacyLogger
 from provisioningserver.rpc.exceptions import UnknownPowerType
 from provisioningserver.utils.twisted import asynchronous
@@ -116,6 +118,7 @@ class MachineHandler(NodeHandler):
             'create',
             'update',
             'action',
+            'allocate',
             'set_active',
             'check_power',
             'create_physical',
@@ -218,56 +221,24 @@ class MachineHandler(NodeHandler):
         if obj.bmc is not None and obj.bmc.bmc_type == BMC_TYPE.POD:
             data['pod'] = self.dehydrate_pod(obj.bmc)
 
-        cpu_script_results = [
-            script_result for script_result in
-            self._script_results.get(obj.id, {}).get(HARDWARE_TYPE.CPU, [])
-            if script_result.script_set.result_type == RESULT_TYPE.TESTING
-        ]
-        data["cpu_test_status"] = get_status_from_qs(cpu_script_results)
-        cpu_tooltip = self.dehydrate_hardware_status_tooltip(
-            cpu_script_results)
-        data["cpu_test_status_tooltip"] = cpu_tooltip
-
-        memory_script_results = [
-            script_result for script_result in
-            self._script_results.get(obj.id, {}).get(HARDWARE_TYPE.MEMORY, [])
-            if script_result.script_set.result_type == RESULT_TYPE.TESTING
-        ]
-        data["memory_test_status"] = get_status_from_qs(
-            memory_script_results)
-        memory_tooltip = self.dehydrate_hardware_status_tooltip(
-            memory_script_results)
-        data["memory_test_status_tooltip"] = memory_tooltip
-
-        storage_script_results = [
-            script_result for script_result in
-            self._script_results.get(obj.id, {}).get(HARDWARE_TYPE.STORAGE, [])
-            if script_result.script_set.result_type == RESULT_TYPE.TESTING
-        ]
-        data["storage_test_status"] = get_status_from_qs(
-            storage_script_results)
-        storage_tooltip = self.dehydrate_hardware_status_tooltip(
-            storage_script_results)
-        data["storage_test_status_tooltip"] = storage_tooltip
-
-        node_script_results = [
-            script_result for script_result in
-            self._script_results.get(obj.id, {}).get(HARDWARE_TYPE.NODE, [])
-            if script_result.script_set.result_type == RESULT_TYPE.TESTING
-        ]
-        data["other_test_status"] = get_status_from_qs(node_script_results)
-        other_tooltip = self.dehydrate_hardware_status_tooltip(
-            node_script_results)
-        data["other_test_status_tooltip"] = other_tooltip
+        for prefix, hardware_type in (
+                ("cpu", HARDWARE_TYPE.CPU),
+                ("memory", HARDWARE_TYPE.MEMORY),
+                ("storage", HARDWARE_TYPE.STORAGE),
+                ("other", HARDWARE_TYPE.NODE)):
+            _, statuses = self.get_script_statuses(
+                obj, result_type=RESULT_TYPE.TESTING,
+                hardware_type=hardware_type)
+            data["%s_test_status" % prefix] = get_status_from_statuses(
+                statuses)
+            data["%s_test_status_tooltip" % prefix] = (
+                self.dehydrate_script_statuses_tooltip(statuses))
 
         if obj.status in {NODE_STATUS.TESTING, NODE_STATUS.FAILED_TESTING}:
-            # Create a list of all results from all types.
-            script_results = []
-            for hardware_script_results in self._script_results.get(
-                    obj.id, {}).values():
-                script_results += hardware_script_results
+            # Summarise all results from all types.
+            _, statuses = self.get_script_statuses(obj)
             data["status_tooltip"] = (
-                self.dehydrate_hardware_status_tooltip(script_results))
+                self.dehydrate_script_statuses_tooltip(statuses))
         else:
             data["status_tooltip"] = ""
 
@@ -747,6 +718,33 @@ class MachineHandler(NodeHandler):
         extra_params = params.get("extra", {})
         return action.execute(**extra_params)
 
+    def allocate(self, params):
+        """Allocate up to `count` machines matching `constraints`.
+
+        The constraints are those of the API's allocate operation. Fewer
+        than `count` machines are allocated when fewer are available.
+
+        :return: The allocated machines, which may be none.
+        """
+        count = params.get("count", 1)
+        if not isinstance(count, int) or count < 1:
+            raise HandlerValidationError(
+                {"count": ["Must be a positive integer."]})
+        form = AcquireNodeForm(data=params.get("constraints", {}))
+        if not form.is_valid():
+            raise HandlerValidationError(form.errors)
+        with locks.node_acquire:
+            machines = Machine.objects.get_available_machines_for_acquisition(
+                self.user)
+            machines, _, _ = form.filter_nodes(machines)
+            machines = form.select_nodes_for_update(machines, count)
+            for machine in machines:
+                machine.acquire(self.user, token=None)
+        objs = list(self.get_queryset().filter(
+            id__in=[machine.id for machine in machines]))
+        self._cache_pks(objs)
+        return [self.full_dehydrate(obj) for obj in objs]
+
     def _create_link_on_interface(self, interface, params):
         """Create a link on a new interface."""
         mode = params.get("mode", None)
@@ -51,8 +51,15 @@ from metadataserver.enum import (
     SCRIPT_STATUS,
     SCRIPT_STATUS_CHOICES,
 )
-from metadataserver.models.scriptresult import ScriptResult
-from metadataserver.models.scriptset import get_status_from_qs
+from metadataserver.models.scriptresult import (
+    get_script_status_summaries,
+    ScriptResult,
+    summarise_script_results,
+)
+from metadataserver.models.scriptset import (
+    get_status_from_qs,
+    get_status_from_statuses,
+)
 from provisioningserver.refresh.node_info_scripts import (
     LIST_MODALIASES_OUTPUT_NAME,
 )
@@ -95,6 +102,7 @@ class NodeHandler(TimestampedModelHandler):
     def __init__(self, user, cache):
         super().__init__(user, cache)
         self._script_results = {}
+        self._script_summaries = {}
 
     def dehydrate_owner(self, user):
         """Return owners username."""
@@ -148,9 +156,12 @@ class NodeHandler(TimestampedModelHandler):
                 script_statuses[script_result.status].add(script_result.name)
             else:
                 script_statuses[script_result.status] = {script_result.name}
+        return self.dehydrate_script_statuses_tooltip(script_statuses)
 
+    def dehydrate_script_statuses_tooltip(self, script_statuses):
+        """Return the tooltip for a dict of script names by status."""
         tooltip = ''
-        for status, scripts in script_statuses.items():
+        for status, scripts in sorted(script_statuses.items()):
             len_scripts = len(scripts)
             if status in {
                     SCRIPT_STATUS.PENDING, SCRIPT_STATUS.RUNNING,
@@ -202,43 +213,26 @@ class NodeHandler(TimestampedModelHandler):
                     for blockdevice in physical_blockdevices
                     ) / (1000 ** 3))
             data["storage_tags"] = self.get_all_storage_tags(blockdevices)
-            commissioning_script_results = []
-            testing_script_results = []
-            log_results = set()
-            for hw_type in self._script_results.get(obj.id, {}).values():
-                for script_result in hw_type:
-                    if (script_result.script_set.result_type ==
-                            RESULT_TYPE.INSTALLATION):
-                        # Don't include installation results in the health
-                        # status.
-                        continue
-                    elif script_result.status == SCRIPT_STATUS.ABORTED:
-                        # LP: #1724235 - Ignore aborted scripts.
-                        continue
-                    elif (script_result.script_set.result_type ==
-                            RESULT_TYPE.COMMISSIONING):
-                        commissioning_script_results.append(script_result)
-                        if (script_result.name in script_output_nsmap and
-                                script_result.status ==
-                                SCRIPT_STATUS.PASSED):
-                            log_results.add(script_result.name)
-                    elif (script_result.script_set.result_type ==
-                            RESULT_TYPE.TESTING):
-                        testing_script_results.append(script_result)
-            data["commissioning_script_count"] = len(
-                commissioning_script_results)
-            data["commissioning_status"] = get_status_from_qs(
-                commissioning_script_results)
+            commissioning_count, commissioning_statuses = (
+                self.get_script_statuses(
+                    obj, result_type=RESULT_TYPE.COMMISSIONING))
+            data["commissioning_script_count"] = commissioning_count
+            data["commissioning_status"] = get_status_from_statuses(
+                commissioning_statuses)
             data["commissioning_status_tooltip"] = (
-                self.dehydrate_hardware_status_tooltip(
-                    commissioning_script_results).replace(
+                self.dehydrate_script_statuses_tooltip(
+                    commissioning_statuses).replace(
                         'test', 'commissioning script'))
-            data["testing_script_count"] = len(testing_script_results)
-            data["testing_status"] = get_status_from_qs(
-                testing_script_results)
+            testing_count, testing_statuses = self.get_script_statuses(
+                obj, result_type=RESULT_TYPE.TESTING)
+            data["testing_script_count"] = testing_count
+            data["testing_status"] = get_status_from_statuses(
+                testing_statuses)
             data["testing_status_tooltip"] = (
-                self.dehydrate_hardware_status_tooltip(
-                    testing_script_results))
+                self.dehydrate_script_statuses_tooltip(testing_statuses))
+            log_results = commissioning_statuses.get(
+                SCRIPT_STATUS.PASSED, set()).intersection(
+                    script_output_nsmap.keys())
             data["has_logs"] = (
                 log_results.difference(script_output_nsmap.keys()) ==
                 set())
@@ -329,6 +323,14 @@ class NodeHandler(TimestampedModelHandler):
                 if Config.objects.get_config('enable_third_party_drivers'):
                     # Pull modaliases from the cache
                     modaliases = []
+                    commissioning_script_results = [
+                        script_result
+                        for script_results in self._script_results.get(
+                            obj.id, {}).values()
+                        for script_result in script_results
+                        if (script_result.script_set.result_type ==
+                            RESULT_TYPE.COMMISSIONING)
+                    ]
                     for script_result in commissioning_script_results:
                         if script_result.name == LIST_MODALIASES_OUTPUT_NAME:
                             if script_result.status == SCRIPT_STATUS.PASSED:
@@ -397,13 +399,58 @@ class NodeHandler(TimestampedModelHandler):
                 self._script_results[node_id][hardware_type].append(
                     script_result)
 
-    def _cache_pks(self, nodes):
-        super()._cache_pks(nodes)
-        self._cache_script_results(nodes)
+    def _cache_script_summaries(self, nodes):
+        """Refresh the script status summaries of the given nodes.
+
+        This is much cheaper than `_cache_script_results` for many nodes, and
+        is all that listing nodes needs.
+        """
+        summaries = get_script_status_summaries([node.id for node in nodes])
+        for node in nodes:
+            self._script_summaries[node.id] = summaries.get(node.id, [])
 
-    def on_listen_for_active_pk(self, action, pk, obj):
-        self._cache_script_results([obj])
-        return super().on_listen_for_active_pk(action, pk, obj)
+    def _cache_scripts(self, nodes, for_list):
+        if for_list:
+            self._cache_script_summaries(nodes)
+        else:
+            # The results are summarised as they're needed.
+            for node in nodes:
+                self._script_summaries.pop(node.id, None)
+            self._cache_script_results(nodes)
+
+    def _cache_pks(self, nodes, for_list=False):
+        super()._cache_pks(nodes, for_list=for_list)
+        self._cache_scripts(nodes, for_list)
+
+    def listen_dehydrate(self, obj, for_list):
+        self._cache_scripts([obj], for_list)
+        return super().listen_dehydrate(obj, for_list)
+
+    def get_script_summaries(self, obj):
+        """Return the `ScriptStatusSummary`s of `obj`'s latest results."""
+        summaries = self._script_summaries.get(obj.id)
+        if summaries is None:
+            summaries = summarise_script_results(chain.from_iterable(
+                self._script_results.get(obj.id, {}).values()))
+        return summaries
+
+    def get_script_statuses(self, obj, result_type=None, hardware_type=None):
+        """Return the number of `obj`'s latest results and their script names
+        by status, optionally only of `result_type` and `hardware_type`.
+
+        :return: A tuple of the count and a dict of sets of names.
+        """
+        count = 0
+        statuses = {}
+        for summary in self.get_script_summaries(obj):
+            if result_type is not None and summary.result_type != result_type:
+                continue
+            if (hardware_type is not None and
+                    summary.hardware_type != hardware_type):
+                continue
+            count += summary.count
+            statuses.setdefault(summary.status, set()).update(summary.names)
+        return count, statuses
 
     def dehydrate_blockdevice(self, blockdevice, obj):
         """Return `BlockDevice` formatted for JSON encoding."""
@@ -42,6 +42,10 @@ class NotificationHandler(TimestampedModelHandler):
         for notification in notifications:
             notification.dismiss(self.user)
 
+    def get_listen_group(self):
+        """Notifications are dismissed per user, even for superusers."""
+        return ("user", self.user.id)
+
     def on_listen(self, channel, action, pk):
         """Intercept `on_listen` because dismissals must be handled specially.
 
@@ -53,6 +53,10 @@ class SSHKeyHandler(TimestampedModelHandler):
         else:
             return obj
 
+    def get_listen_group(self):
+        """SSH keys are only visible to their owner, even for superusers."""
+        return ("user", self.user.id)
+
     def dehydrate_keysource(self, keysource):
         """Dehydrate the keysource to include protocol and auth_id."""
         if keysource is None:
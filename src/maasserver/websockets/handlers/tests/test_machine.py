@@ -105,6 +105,7 @@ from metadataserver.enum import (
     RESULT_TYPE,
     SCRIPT_STATUS,
 )
+from metadataserver.models.scriptresult import ScriptStatusSummary
 from metadataserver.models.scriptset import get_status_from_qs
 from provisioningserver.refresh.node_info_scripts import (
     LIST_MODALIASES_OUTPUT_NAME,
@@ -1684,9 +1685,24 @@ class TestMachineHandler(MAASServerTestCase):
             [self.dehydrate_node(node, handler, for_list=True)],
             handler.list({}))
         self.assertDictEqual(
-            {node.id: {
-                script_result.script.hardware_type: [script_result]}},
-            handler._script_results)
+            {node.id: [ScriptStatusSummary(
+                script_result.script.hardware_type,
+                script_result.script_set.result_type,
+                SCRIPT_STATUS.PASSED, 1, {script_result.name})]},
+            handler._script_summaries)
+
+    def test_list_does_not_load_script_results(self):
+        user = factory.make_User()
+        node = factory.make_Node(status=NODE_STATUS.READY, owner=user)
+        script_set = factory.make_ScriptSet(
+            node=node, result_type=RESULT_TYPE.TESTING)
+        for status in (SCRIPT_STATUS.PASSED, SCRIPT_STATUS.FAILED):
+            factory.make_ScriptResult(script_set=script_set, status=status)
+        handler = MachineHandler(user, {})
+        expected = self.dehydrate_node(node, handler, for_list=True)
+        self.patch(handler, "_cache_script_results")
+        self.assertItemsEqual([expected], handler.list({}))
+        self.assertThat(handler._cache_script_results, MockNotCalled())
 
     def test_list_ignores_devices(self):
         owner = factory.make_User()
@@ -2753,6 +2769,36 @@ class TestMachineHandler(MAASServerTestCase):
         handler.action({"system_id": node.system_id, "action": "delete"})
         self.assertIsNone(reload_object(node))
 
+    def test_allocate_allocates_up_to_count_machines(self):
+        user = factory.make_User()
+        tag = factory.make_Tag()
+        machines = [
+            factory.make_Node(status=NODE_STATUS.READY, with_boot_disk=True)
+            for _ in range(2)
+        ]
+        for machine in machines:
+            machine.tags.add(tag)
+        untagged = factory.make_Node(
+            status=NODE_STATUS.READY, with_boot_disk=True)
+        handler = MachineHandler(user, {})
+        allocated = handler.allocate(
+            {"count": 3, "constraints": {"tags": [tag.name]}})
+        self.assertItemsEqual(
+            [machine.system_id for machine in machines],
+            [machine["system_id"] for machine in allocated])
+        self.assertEqual(
+            [user, user],
+            [reload_object(machine).owner for machine in machines])
+        self.assertIsNone(reload_object(untagged).owner)
+
+    def test_allocate_rejects_invalid_constraints(self):
+        handler = MachineHandler(factory.make_User(), {})
+        self.assertRaises(
+            HandlerValidationError, handler.allocate,
+            {"constraints": {"cpu_count": "many"}})
+        self.assertRaises(
+            HandlerValidationError, handler.allocate, {"count": 0})
+
     def test_action_performs_action_passing_extra(self):
         user = factory.make_User()
         factory.make_SSHKey(user)
@@ -33,9 +33,11 @@ from maasserver.websockets.websockets import STATUSES
 from provisioningserver.logger import LegacyLogger
 from provisioningserver.utils import typed
 from provisioningserver.utils.twisted import (
+    callOut,
     deferred,
     synchronous,
 )
+from twisted.internet import reactor
 from twisted.internet.defer import (
     fail,
     inlineCallbacks,
@@ -69,6 +71,10 @@ class RESPONSE_TYPE:
     #:
     ERROR = 1
 
+    #: Part of the result of a streamed request. The final part is sent as
+    #: SUCCESS.
+    PARTIAL = 2
+
 
 @typed
 def get_cookie(cookies: Optional[str], cookie_name: str) -> Optional[str]:
@@ -92,6 +98,12 @@ class WebSocketProtocol(Protocol):
         self.messages = deque()
         self.user = None
         self.cache = {}
+        # True when the client asked for updates to be sent as deltas, by
+        # connecting with "delta=1" in the query string.
+        self.deltas = False
+        # The data last sent to a client receiving deltas, keyed by the
+        # handler name and primary key of the object.
+        self.notified = {}
 
     def connectionMade(self):
         """Connection has been made to client."""
@@ -100,6 +112,7 @@ class WebSocketProtocol(Protocol):
         # will call loseConnection. A websocket connection is only allowed
         # from an authenticated user.
         cookies = self.transport.cookies.decode("ascii")
+        self.deltas = self.getQueryParam('delta') in ('1', 'true')
         d = self.authenticate(
             get_cookie(cookies, 'sessionid'),
             get_cookie(cookies, 'csrftoken'),
@@ -148,6 +161,18 @@ class WebSocketProtocol(Protocol):
             return None
         return message[field]
 
+    def getQueryParam(self, name):
+        """Return the value of `name` in the query string of the connection
+        request, or `None` if it was not given."""
+        uri = self.transport.uri
+        if isinstance(uri, bytes):
+            uri = uri.decode("ascii")
+        values = parse_qs(urlparse(uri).query).get(name)
+        if values is None:
+            return None
+        else:
+            return values[0]
+
     @synchronous
     @transactional
     def getUserFromSessionId(self, session_id):
@@ -284,7 +309,15 @@ class WebSocketProtocol(Protocol):
             return None
 
         handler = self.buildHandler(handler_class)
-        d = handler.execute(method, message.get("params", {}))
+        params = message.get("params", {})
+        if isinstance(params, dict) and params.get("stream"):
+            d = handler.stream(
+                method, params, partial(self.sendPartialResult, request_id))
+        else:
+            d = handler.execute(method, params)
+        if self.deltas:
+            d.addCallback(
+                callOut, self.forgetNotified, handler_class, method, params)
         d.addCallbacks(
             partial(self.sendResult, request_id),
             partial(self.sendError, request_id, handler, method))
@@ -311,6 +344,22 @@ class WebSocketProtocol(Protocol):
             result_msg, default=self._json_encode).encode("ascii"))
         return result
 
+    def sendPartialResult(self, request_id, result):
+        """Send part of the result of a streamed request to client.
+
+        This can be called from any thread; the message is encoded in the
+        calling thread and written from the reactor.
+        """
+        result_msg = {
+            "type": MSG_TYPE.RESPONSE,
+            "request_id": request_id,
+            "rtype": RESPONSE_TYPE.PARTIAL,
+            "result": result,
+            }
+        message = json.dumps(
+            result_msg, default=self._json_encode).encode("ascii")
+        reactor.callFromThread(self.transport.write, message)
+
     def sendError(self, request_id, handler, method, failure):
         """Log and send error to client."""
         if isinstance(failure.value, ValidationError):
@@ -339,14 +388,74 @@ class WebSocketProtocol(Protocol):
 
     def sendNotify(self, name, action, data):
         """Send the notify message with data."""
+        self.transport.write(self.encodeNotify(name, action, data))
+
+    def encodeNotify(self, name, action, data):
+        """Return the notify message with data, encoded for sending."""
         notify_msg = {
             "type": MSG_TYPE.NOTIFY,
             "name": name,
             "action": action,
             "data": data,
             }
-        self.transport.write(
-            json.dumps(notify_msg, default=self._json_encode).encode("ascii"))
+        return json.dumps(
+            notify_msg, default=self._json_encode).encode("ascii")
+
+    def encodeNotifyDelta(self, name, action, data, pk):
+        """Return the notify message with data, encoded for sending to a
+        client that receives deltas.
+
+        An update to an object that was already sent to the client only
+        includes the fields that changed since, along with `pk`, and sets
+        "delta" in the message. The fields that no longer exist are listed
+        in "removed". Anything else is sent in full.
+
+        :param pk: The name of the primary key field of the handler.
+        :return: The encoded message, or `None` if nothing changed.
+        """
+        if not isinstance(data, dict) or pk not in data:
+            if action == "delete":
+                self.notified.pop((name, data), None)
+            return self.encodeNotify(name, action, data)
+        key = name, data[pk]
+        previous = self.notified.get(key)
+        self.notified[key] = data
+        if action != "update" or previous is None:
+            return self.encodeNotify(name, action, data)
+        changed = {
+            field: value
+            for field, value in data.items()
+            if field not in previous or previous[field] != value
+        }
+        removed = sorted(previous.keys() - data.keys())
+        if len(changed) == 0 and len(removed) == 0:
+            return None
+        changed[pk] = data[pk]
+        notify_msg = {
+            "type": MSG_TYPE.NOTIFY,
+            "name": name,
+            "action": action,
+            "data": changed,
+            "delta": True,
+            "removed": removed,
+            }
+        return json.dumps(
+            notify_msg, default=self._json_encode).encode("ascii")
+
+    def forgetNotified(self, handler_class, method, params):
+        """Forget the data sent to the client for the objects in the result
+        of a request, so that their next update is sent in full.
+
+        The client replaces its copy of an object with the result of a
+        request, so deltas from the data last sent in a notification would
+        no longer apply to it.
+        """
+        name = handler_class._meta.handler_name
+        if method == "list":
+            for key in [key for key in self.notified if key[0] == name]:
+                del self.notified[key]
+        elif isinstance(params, dict) and handler_class._meta.pk in params:
+            self.notified.pop((name, params[handler_class._meta.pk]), None)
 
     def buildHandler(self, handler_class):
         """Return an initialised instance of `handler_class`."""
@@ -415,17 +524,57 @@ class WebSocketFactory(Factory):
 
     @inlineCallbacks
     def onNotify(self, handler_class, channel, action, obj_id):
-        for client in self.clients:
-            handler = client.buildHandler(handler_class)
-            data = yield deferToDatabase(
-                self.processNotify, handler, channel, action, obj_id)
-            if data is not None:
-                (name, client_action, data) = data
-                client.sendNotify(name, client_action, data)
+        if len(self.clients) == 0:
+            return
+        handlers = [
+            (client, client.buildHandler(handler_class))
+            for client in self.clients
+        ]
+        notifications = yield deferToDatabase(
+            self.processNotify, handlers, channel, action, obj_id)
+        # Messages are encoded here, in the reactor, rather than in the
+        # database thread: deltas are computed against, and recorded in,
+        # `client.notified` in the same order as the messages are written.
+        # Maps (name, action, id(data)) to the encoded message. The data
+        # stays referenced by `notifications`, so its id cannot be reused.
+        encoded = {}
+        for client, name, client_action, data, pk in notifications:
+            if client.deltas:
+                message = client.encodeNotifyDelta(
+                    name, client_action, data, pk)
+                if message is None:
+                    continue
+            else:
+                key = name, client_action, id(data)
+                if key not in encoded:
+                    encoded[key] = client.encodeNotify(
+                        name, client_action, data)
+                message = encoded[key]
+            client.transport.write(message)
 
     @transactional
-    def processNotify(self, handler, channel, action, obj_id):
-        return handler.on_listen(channel, action, obj_id)
+    def processNotify(self, handlers, channel, action, obj_id):
+        """Process the notification for each of the `(client, handler)`
+        pairs in `handlers`.
+
+        Handlers in the same listen group share the object looked up and
+        dehydrated for the notification, so clients in the same group are
+        given the same data.
+
+        :return: A list of `(client, name, action, data, pk)` to encode and
+            send, where `pk` is the name of the handler's primary key field.
+        """
+        listen_results = {}
+        notifications = []
+        for client, handler in handlers:
+            handler.listen_results = listen_results.setdefault(
+                handler.get_listen_group(), {})
+            notify = handler.on_listen(channel, action, obj_id)
+            if notify is not None:
+                name, client_action, data = notify
+                notifications.append(
+                    (client, name, client_action, data, handler._meta.pk))
+        return notifications
 
     def registerRPCEvents(self):
         """Register for connected and disconnected events from the RPC
@@ -387,6 +387,41 @@ class TestHandler(MAASServerTestCase):
         result = handler.execute("get", params).wait(30)
         self.assertThat(result, Is(sentinel.thing))
 
+    def test_stream_calls_stream_list_with_params(self):
+        handler = self.make_nodes_handler()
+        params = {"stream": True}
+        self.patch(base, "deferToDatabase").return_value = sentinel.thing
+        result = handler.stream("list", params, sentinel.send).wait(30)
+        self.assertThat(result, Is(sentinel.thing))
+        self.assertThat(
+            base.deferToDatabase,
+            MockCalledOnceWith(ANY, params, sentinel.send))
+        [func, _, _] = base.deferToDatabase.call_args[0]
+        self.assertThat(func.func, Equals(handler.stream_list))
+
+    def test_stream_only_allows_meta_allowed_methods(self):
+        handler = self.make_nodes_handler(allowed_methods=['get'])
+        with ExpectedException(HandlerNoSuchMethodError):
+            handler.stream("list", {}, sentinel.send)
+
+    def test_stream_executes_overridden_list(self):
+        handler = self.make_nodes_handler()
+        self.patch(type(handler), "list", lambda self, params: [])
+        execute = self.patch(handler, "execute")
+        execute.return_value = sentinel.thing
+        self.assertThat(
+            handler.stream("list", {}, sentinel.send), Is(sentinel.thing))
+        self.assertThat(execute, MockCalledOnceWith("list", {}))
+
+    def test_stream_executes_other_methods(self):
+        handler = self.make_nodes_handler()
+        execute = self.patch(handler, "execute")
+        execute.return_value = sentinel.thing
+        params = {"system_id": factory.make_name("system_id")}
+        self.assertThat(
+            handler.stream("get", params, sentinel.send), Is(sentinel.thing))
+        self.assertThat(execute, MockCalledOnceWith("get", params))
+
     def test_list(self):
         output = [
             {"hostname": factory.make_Node().hostname}
@@ -444,6 +479,42 @@ class TestHandler(MAASServerTestCase):
         handler.list({"start": nodes[0].id})
         self.assertItemsEqual(pks, handler.cache['loaded_pks'])
 
+    def test_stream_list_sends_batches_and_returns_last(self):
+        nodes = [factory.make_Node() for _ in range(5)]
+        handler = self.make_nodes_handler(
+            fields=['hostname'], stream_batch_size=2)
+        batches = []
+        last = handler.stream_list({}, batches.append)
+        self.assertEqual([
+            [{"hostname": node.hostname} for node in nodes[:2]],
+            [{"hostname": node.hostname} for node in nodes[2:4]],
+            ], batches)
+        self.assertEqual([{"hostname": nodes[4].hostname}], last)
+
+    def test_stream_list_matches_list(self):
+        nodes = [factory.make_Node() for _ in range(9)]
+        handler = self.make_nodes_handler(
+            fields=['hostname'], stream_batch_size=2)
+        params = {"start": nodes[2].id, "limit": 5}
+        batches = []
+        batches.append(handler.stream_list(params, batches.append))
+        self.assertEqual(
+            handler.list(params),
+            [obj for batch in batches for obj in batch])
+
+    def test_stream_list_adds_to_loaded_pks(self):
+        pks = [factory.make_Node().system_id for _ in range(3)]
+        handler = self.make_nodes_handler(
+            fields=['hostname'], stream_batch_size=2)
+        handler.stream_list({}, lambda batch: None)
+        self.assertItemsEqual(pks, handler.cache['loaded_pks'])
+
+    def test_stream_list_returns_empty_list_without_objects(self):
+        handler = self.make_nodes_handler(fields=['hostname'])
+        send = MagicMock()
+        self.assertEqual([], handler.stream_list({}, send))
+        self.assertThat(send, MockNotCalled())
+
     def test_get(self):
         node = factory.make_Node()
         handler = self.make_nodes_handler(fields=['hostname'])
@@ -754,6 +825,45 @@ class TestHandler(MAASServerTestCase):
             mock_dehydrate,
             MockCalledOnceWith(node, for_list=False))
 
+    def test_on_listen_shares_results_between_handlers(self):
+        node = factory.make_Node()
+        handlers = [self.make_nodes_handler() for _ in range(2)]
+        listen_results = {}
+        mock_dehydrates = []
+        for handler in handlers:
+            handler.listen_results = listen_results
+            mock_dehydrate = self.patch(handler, "full_dehydrate")
+            mock_dehydrate.return_value = sentinel.data
+            mock_dehydrates.append(mock_dehydrate)
+        for handler in handlers:
+            self.expectThat(
+                handler.on_listen(sentinel.channel, "update", node.system_id),
+                Equals((handler._meta.handler_name, "create", sentinel.data)))
+        self.expectThat(
+            mock_dehydrates[0], MockCalledOnceWith(node, for_list=True))
+        self.expectThat(mock_dehydrates[1], MockNotCalled())
+
+    def test_on_listen_does_not_share_results_by_default(self):
+        node = factory.make_Node()
+        handlers = [self.make_nodes_handler() for _ in range(2)]
+        for handler in handlers:
+            mock_dehydrate = self.patch(handler, "full_dehydrate")
+            handler.on_listen(sentinel.channel, "update", node.system_id)
+            self.expectThat(
+                mock_dehydrate, MockCalledOnceWith(node, for_list=True))
+
+    def test_get_listen_group_is_shared_by_superusers(self):
+        handlers = [self.make_nodes_handler() for _ in range(2)]
+        for handler in handlers:
+            handler.user = factory.make_admin()
+        self.assertEqual(
+            handlers[0].get_listen_group(), handlers[1].get_listen_group())
+
+    def test_get_listen_group_is_per_user_for_other_users(self):
+        handlers = [self.make_nodes_handler() for _ in range(2)]
+        self.assertNotEqual(
+            handlers[0].get_listen_group(), handlers[1].get_listen_group())
+
     def test_listen_calls_get_object_with_pk_on_other_actions(self):
         handler = self.make_nodes_handler()
         mock_get_object = self.patch(handler, "get_object")
@@ -8,6 +8,7 @@ from collections import deque
 import json
 import random
 from unittest.mock import (
+    ANY,
     MagicMock,
     sentinel,
 )
@@ -38,6 +39,7 @@ from maastesting.matchers import (
     IsFiredDeferred,
     MockCalledOnceWith,
     MockCalledWith,
+    MockNotCalled,
 )
 from maastesting.testcase import MAASTestCase
 from maastesting.twisted import TwistedLoggerFixture
@@ -536,6 +538,54 @@ class TestWebSocketProtocol(MAASTransactionServerTestCase):
             protocol.cache[handler_name],
             handler_class.call_args[0][1])
 
+    def test_handleRequest_streams_when_requested(self):
+        protocol, factory = self.make_protocol()
+        protocol.user = sentinel.user
+
+        handler_class = MagicMock()
+        handler_name = maas_factory.make_name("handler")
+        handler_class._meta.handler_name = handler_name
+        handler = handler_class.return_value
+        handler.stream.return_value = succeed([])
+
+        # Inject mock handler into the factory.
+        factory.handlers[handler_name] = handler_class
+
+        request_id = random.randint(1, 999999)
+        params = {"stream": True}
+        d = protocol.handleRequest({
+            "type": MSG_TYPE.REQUEST,
+            "request_id": request_id,
+            "method": "%s.list" % handler_name,
+            "params": params,
+        })
+
+        self.assertThat(d, IsFiredDeferred())
+        self.assertThat(handler.execute, MockNotCalled())
+        self.assertThat(
+            handler.stream, MockCalledOnceWith("list", params, ANY))
+        send = handler.stream.call_args[0][2]
+        self.assertEqual(
+            (protocol.sendPartialResult, (request_id,)),
+            (send.func, send.args))
+
+    def test_sendPartialResult_writes_from_reactor(self):
+        protocol, _ = self.make_protocol()
+        reactor = self.patch(protocol_module, "reactor")
+        request_id = random.randint(1, 999999)
+        result = [{"hostname": maas_factory.make_name("hostname")}]
+        protocol.sendPartialResult(request_id, result)
+        self.assertThat(
+            reactor.callFromThread,
+            MockCalledOnceWith(protocol.transport.write, ANY))
+        message = reactor.callFromThread.call_args[0][1]
+        self.assertEqual({
+            "type": MSG_TYPE.RESPONSE,
+            "request_id": request_id,
+            "rtype": RESPONSE_TYPE.PARTIAL,
+            "result": result,
+            }, json.loads(message.decode("ascii")))
+
     @wait_for_reactor
     @inlineCallbacks
     def test_handleRequest_sends_response(self):
@@ -663,6 +713,82 @@ class TestWebSocketProtocol(MAASTransactionServerTestCase):
         self.assertEquals(
             message, self.get_written_transport_message(protocol))
 
+    def test_connectionMade_enables_deltas_when_requested(self):
+        protocol, _ = self.make_protocol(
+            transport_uri=ascii_url("/MAAS/ws?csrftoken=abc&delta=1"))
+        protocol.authenticate.return_value = defer.succeed(None)
+        protocol.connectionMade()
+        self.assertTrue(protocol.deltas)
+
+    def test_connectionMade_disables_deltas_by_default(self):
+        protocol, _ = self.make_protocol(
+            transport_uri=self.make_ws_uri(csrftoken="abc"))
+        protocol.authenticate.return_value = defer.succeed(None)
+        protocol.connectionMade()
+        self.assertFalse(protocol.deltas)
+
+    def test_encodeNotifyDelta_sends_first_update_in_full(self):
+        protocol, _ = self.make_protocol()
+        data = {"system_id": "abc", "power_state": "on"}
+        message = protocol.encodeNotifyDelta(
+            "machine", "update", data, "system_id")
+        self.assertEqual(
+            protocol.encodeNotify("machine", "update", data), message)
+
+    def test_encodeNotifyDelta_sends_changed_fields(self):
+        protocol, _ = self.make_protocol()
+        protocol.encodeNotifyDelta(
+            "machine", "update",
+            {"system_id": "abc", "power_state": "on", "hostname": "a",
+             "fqdn": "a.maas"},
+            "system_id")
+        message = protocol.encodeNotifyDelta(
+            "machine", "update",
+            {"system_id": "abc", "power_state": "off", "hostname": "a"},
+            "system_id")
+        self.assertEqual({
+            "type": MSG_TYPE.NOTIFY,
+            "name": "machine",
+            "action": "update",
+            "data": {"system_id": "abc", "power_state": "off"},
+            "delta": True,
+            "removed": ["fqdn"],
+            }, json.loads(message.decode("ascii")))
+
+    def test_encodeNotifyDelta_returns_None_when_unchanged(self):
+        protocol, _ = self.make_protocol()
+        data = {"system_id": "abc", "power_state": "on"}
+        protocol.encodeNotifyDelta("machine", "update", data, "system_id")
+        self.assertIsNone(protocol.encodeNotifyDelta(
+            "machine", "update", dict(data), "system_id"))
+
+    def test_encodeNotifyDelta_forgets_deleted_objects(self):
+        protocol, _ = self.make_protocol()
+        data = {"system_id": "abc", "power_state": "on"}
+        protocol.encodeNotifyDelta("machine", "update", data, "system_id")
+        protocol.encodeNotifyDelta("machine", "delete", "abc", "system_id")
+        self.assertEqual({}, protocol.notified)
+
+    def test_forgetNotified_forgets_handler_objects_on_list(self):
+        protocol, _ = self.make_protocol()
+        protocol.notified = {
+            ("machine", "abc"): {},
+            ("machine", "def"): {},
+            ("device", "abc"): {},
+            }
+        protocol.forgetNotified(MachineHandler, "list", {})
+        self.assertEqual([("device", "abc")], list(protocol.notified))
+
+    def test_forgetNotified_forgets_requested_object(self):
+        protocol, _ = self.make_protocol()
+        protocol.notified = {
+            ("machine", "abc"): {},
+            ("machine", "def"): {},
+            }
+        protocol.forgetNotified(
+            MachineHandler, "get", {"system_id": "abc"})
+        self.assertEqual([("machine", "def")], list(protocol.notified))
+
 
 class MakeProtocolFactoryMixin:
 
@@ -674,13 +800,16 @@ class MakeProtocolFactoryMixin:
         self.patch(services, "getServiceNamed").return_value = rpc_service
         return factory
 
-    def make_protocol_with_factory(self, user=None, rpc_service=None):
-        factory = self.make_factory(rpc_service=rpc_service)
-        factory.startFactory()
-        self.addCleanup(factory.stopFactory)
+    def make_protocol_with_factory(
+            self, user=None, rpc_service=None, factory=None):
+        if factory is None:
+            factory = self.make_factory(rpc_service=rpc_service)
+            factory.startFactory()
+            self.addCleanup(factory.stopFactory)
         protocol = factory.buildProtocol(None)
         protocol.transport = MagicMock()
         protocol.transport.cookies = b""
+        protocol.transport.uri = b""
         if user is None:
             user = maas_factory.make_User()
         mock_authenticate = self.patch(protocol, "authenticate")
@@ -875,7 +1004,7 @@ class TestWebSocketFactoryTransactional(
 
     @wait_for_reactor
     @inlineCallbacks
-    def test_onNotify_calls_sendNotify_on_protocol(self):
+    def test_onNotify_sends_notify_to_protocol(self):
         user = yield deferToDatabase(self.make_user)
         protocol, factory = self.make_protocol_with_factory(user=user)
         name = maas_factory.make_name("name")
@@ -883,11 +1012,102 @@ class TestWebSocketFactoryTransactional(
         data = maas_factory.make_name("data")
         mock_class = MagicMock()
         mock_class.return_value.on_listen.return_value = (name, action, data)
-        mock_sendNotify = self.patch(protocol, "sendNotify")
         yield factory.onNotify(
             mock_class, sentinel.channel, action, sentinel.obj_id)
         self.assertThat(
-            mock_sendNotify, MockCalledWith(name, action, data))
+            protocol.transport.write,
+            MockCalledWith(protocol.encodeNotify(name, action, data)))
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_onNotify_dehydrates_once_for_superusers(self):
+        users = yield deferToDatabase(
+            lambda: [transactional(maas_factory.make_admin)()
+                     for _ in range(3)])
+        node = yield deferToDatabase(
+            transactional(maas_factory.make_Machine))
+        factory = self.make_factory()
+        protocols = []
+        for user in users:
+            protocol, factory = self.make_protocol_with_factory(
+                user=user, factory=factory)
+            protocols.append(protocol)
+        mock_dehydrate = self.patch(MachineHandler, "full_dehydrate")
+        mock_dehydrate.return_value = {"system_id": node.system_id}
+        yield factory.onNotify(
+            MachineHandler, "machine", "update", node.system_id)
+        self.assertThat(mock_dehydrate, MockCalledOnceWith(ANY, for_list=True))
+        message = protocols[0].encodeNotify(
+            "machine", "create", {"system_id": node.system_id})
+        for protocol in protocols:
+            self.assertThat(
+                protocol.transport.write, MockCalledOnceWith(message))
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_onNotify_dehydrates_for_each_user(self):
+        users = yield deferToDatabase(
+            lambda: [transactional(maas_factory.make_User)()
+                     for _ in range(3)])
+        node = yield deferToDatabase(
+            transactional(maas_factory.make_Machine))
+        factory = self.make_factory()
+        for user in users:
+            self.make_protocol_with_factory(user=user, factory=factory)
+        mock_dehydrate = self.patch(MachineHandler, "full_dehydrate")
+        mock_dehydrate.return_value = {"system_id": node.system_id}
+        yield factory.onNotify(
+            MachineHandler, "machine", "update", node.system_id)
+        self.assertEqual(3, mock_dehydrate.call_count)
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_onNotify_sends_deltas_to_clients_that_requested_them(self):
+        user = yield deferToDatabase(self.make_user)
+        node = yield deferToDatabase(
+            transactional(maas_factory.make_Machine))
+        protocol, factory = self.make_protocol_with_factory(user=user)
+        protocol.deltas = True
+        mock_dehydrate = self.patch(MachineHandler, "full_dehydrate")
+        mock_dehydrate.side_effect = [
+            {"system_id": node.system_id, "power_state": "on",
+             "hostname": node.hostname},
+            {"system_id": node.system_id, "power_state": "off",
+             "hostname": node.hostname},
+            ]
+        protocol.cache.setdefault("machine", {})["loaded_pks"] = {
+            node.system_id}
+        for _ in range(2):
+            yield factory.onNotify(
+                MachineHandler, "machine", "update", node.system_id)
+        message = json.loads(
+            protocol.transport.write.call_args[0][0].decode("ascii"))
+        self.assertEqual(
+            {"system_id": node.system_id, "power_state": "off"},
+            message["data"])
+        self.assertTrue(message["delta"])
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_processNotify_returns_data_without_encoding(self):
+        user = yield deferToDatabase(self.make_user)
+        protocol, factory = self.make_protocol_with_factory(user=user)
+        protocol.deltas = True
+        self.patch(protocol, "encodeNotifyDelta")
+        data = {"system_id": maas_factory.make_name("system_id")}
+        mock_class = MagicMock()
+        mock_class.return_value.on_listen.return_value = (
+            "machine", "update", data)
+        handler = mock_class()
+        handler._meta.pk = "system_id"
+        notifications = yield deferToDatabase(
+            factory.processNotify, [(protocol, handler)],
+            sentinel.channel, "update", sentinel.obj_id)
+        self.assertEqual(
+            [(protocol, "machine", "update", data, "system_id")],
+            notifications)
+        self.assertThat(protocol.encodeNotifyDelta, MockNotCalled())
+        self.assertEqual({}, protocol.notified)
 
     @wait_for_reactor
     @inlineCallbacks
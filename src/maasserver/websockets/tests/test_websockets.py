@@ -12,6 +12,10 @@ HyBi-07 (http://tools.ietf.org/html/draft-ietf-hybi-thewebsocketprotocol-07),
 which are drafts of RFC 6455.
 """
 
+from itertools import cycle
+import os
+from unittest.mock import Mock
+
 from maasserver.websockets.websockets import (
     _makeAccept,
     _makeFrame,
@@ -106,6 +110,29 @@ class TestFrameHelpers(MAASTestCase):
         key = b"\x37\xfa\x21\x3d"
         self.assertEqual(_mask(b"Hello", key), b"\x7f\x9f\x4d\x51\x58")
 
+    def test_maskLong(self):
+        """
+        Masking a long buffer matches masking it byte by byte.
+        """
+        key = b"\x37\xfa\x21\x3d"
+        buf = os.urandom(100003)
+        self.assertEqual(
+            bytes(b ^ k for b, k in zip(buf, cycle(key))), _mask(buf, key))
+
+    def test_maskMemoryview(self):
+        """
+        A C{memoryview} of a buffer can be masked, returning C{bytes}.
+        """
+        key = b"\x37\xfa\x21\x3d"
+        view = memoryview(b"--Hello--")[2:7]
+        self.assertEqual(b"\x7f\x9f\x4d\x51\x58", _mask(view, key))
+
+    def test_maskEmpty(self):
+        """
+        Masking an empty buffer returns an empty buffer.
+        """
+        self.assertEqual(b"", _mask(b"", b"\x37\xfa\x21\x3d"))
+
     def test_parseUnmaskedText(self):
         """
         A sample unmasked frame of "Hello" from HyBi-10, 4.7.
@@ -418,6 +445,22 @@ class WebSocketsTransportTest(MAASTestCase):
     Tests for L{WebSocketsTransport}.
     """
 
+    def test_sendFramesWritesPayloadsWithoutCopying(self):
+        """
+        L{WebSocketsTransport.sendFrames} writes the header and the payload of
+        every frame with a single C{writeSequence}, passing the payloads
+        through as they are.
+        """
+        transport = Mock()
+        payloads = [b"Hello", b"x" * 200]
+        WebSocketsTransport(transport).sendFrames(CONTROLS.TEXT, payloads)
+        [packets], _ = transport.writeSequence.call_args
+        self.assertEqual(
+            [b"\x81\x05", payloads[0], b"\x81\x7e\x00\xc8", payloads[1]],
+            packets)
+        self.assertIs(payloads[0], packets[1])
+        self.assertIs(payloads[1], packets[3])
+
     def test_loseConnection(self):
         """
         L{WebSocketsTransport.loseConnection} sends a close frame and closes
@@ -17,7 +17,6 @@ __all__ = ["WebSocketsResource", "IWebSocketsFrameReceiver",
 
 import base64
 from hashlib import sha1
-from itertools import cycle
 from struct import (
     pack,
     unpack,
@@ -110,11 +109,14 @@ def _makeAccept(key: bytes) -> bytes:
 
 
 @typed
-def _mask(buf: bytes, key: bytes) -> bytes:
+def _mask(buf: (bytes, memoryview), key: bytes) -> bytes:
     """
     Mask or unmask a buffer of bytes with a masking key.
 
-    @type buf: C{bytes}
+    The buffer and the repeated key are each read as a single integer, so
+    that the XOR is done in one operation rather than byte by byte.
+
+    @type buf: C{bytes} or C{memoryview}
     @param buf: A buffer of bytes.
 
     @type key: C{bytes}
@@ -123,19 +125,23 @@ def _mask(buf: bytes, key: bytes) -> bytes:
     @rtype: C{str}
     @return: A masked buffer of bytes.
     """
-    return bytes((b ^ k) for b, k in zip(buf, cycle(key)))
+    length = len(buf)
+    if length == 0:
+        return b""
+    keys = (key * (length // 4 + 1))[:length]
+    masked = (
+        int.from_bytes(buf, "little") ^ int.from_bytes(keys, "little"))
+    return masked.to_bytes(length, "little")
 
 
 @typed
-def _makeFrame(buf: bytes, opcode, fin: bool, mask: bytes=None) -> bytes:
+def _makeFrameHeader(
+        bufferLength: int, opcode, fin: bool, mask: bytes=None) -> bytes:
     """
-    Make a frame.
+    Make the header of a frame, which comes before its payload.
 
-    This function always creates unmasked frames, and attempts to use the
-    smallest possible lengths.
-
-    @type buf: C{bytes}
-    @param buf: A buffer of bytes.
+    @type bufferLength: C{int}
+    @param bufferLength: The length of the payload.
 
     @type opcode: C{CONTROLS}
     @param opcode: Which type of frame to create.
@@ -144,36 +150,63 @@ def _makeFrame(buf: bytes, opcode, fin: bool, mask: bytes=None) -> bytes:
     @param fin: Whether or not we're creating a final frame.
 
     @type mask: C{bytes} or C{NoneType}
-    @param mask: If specified, the masking key to apply on the created frame.
+    @param mask: If specified, the masking key of the frame.
 
     @rtype: C{bytes}
-    @return: A packed frame.
+    @return: A packed frame header.
     """
-    bufferLength = len(buf)
     if mask is not None:
         lengthMask = 0x80
     else:
         lengthMask = 0
 
-    if bufferLength > 0xffff:
-        length = b"%s%s" % (
-            bytes([lengthMask | 0x7f]), pack(">Q", bufferLength))
-    elif bufferLength > 0x7d:
-        length = b"%s%s" % (
-            bytes([lengthMask | 0x7e]), pack(">H", bufferLength))
-    else:
-        length = bytes([lengthMask | bufferLength])
-
     if fin:
         header = 0x80
     else:
         header = 0x01
+    header |= opcode.value
+
+    if bufferLength > 0xffff:
+        frameHeader = pack(
+            ">BBQ", header, lengthMask | 0x7f, bufferLength)
+    elif bufferLength > 0x7d:
+        frameHeader = pack(
+            ">BBH", header, lengthMask | 0x7e, bufferLength)
+    else:
+        frameHeader = pack(">BB", header, lengthMask | bufferLength)
 
-    header = bytes([header | opcode.value])
     if mask is not None:
-        buf = b"%s%s" % (mask, _mask(buf, mask))
-    frame = b"%s%s%s" % (header, length, buf)
-    return frame
+        frameHeader += mask
+    return frameHeader
+
+
+@typed
+def _makeFrame(buf: bytes, opcode, fin: bool, mask: bytes=None) -> bytes:
+    """
+    Make a frame.
+
+    This function always creates unmasked frames, and attempts to use the
+    smallest possible lengths.
+
+    @type buf: C{bytes}
+    @param buf: A buffer of bytes.
+
+    @type opcode: C{CONTROLS}
+    @param opcode: Which type of frame to create.
+
+    @type fin: C{bool}
+    @param fin: Whether or not we're creating a final frame.
+
+    @type mask: C{bytes} or C{NoneType}
+    @param mask: If specified, the masking key to apply on the created frame.
+
+    @rtype: C{bytes}
+    @return: A packed frame.
+    """
+    header = _makeFrameHeader(len(buf), opcode, fin, mask)
+    if mask is not None:
+        buf = _mask(buf, mask)
+    return header + buf
 
 
 @typed
@@ -189,7 +222,13 @@ def _parseFrames(frameBuffer: List[bytes], needMask: bool=True):
     @type needMask: C{bool}
     """
     start = 0
-    payload = b"".join(frameBuffer)
+    if len(frameBuffer) == 1:
+        payload = frameBuffer[0]
+    else:
+        payload = b"".join(frameBuffer)
+    # Frame payloads are sliced out of a view of the buffer, so that they are
+    # only copied once, when they are unmasked or converted to bytes.
+    view = memoryview(payload)
 
     while True:
         # If there's not at least two bytes in the buffer, bail.
@@ -257,10 +296,12 @@ def _parseFrames(frameBuffer: List[bytes], needMask: bool=True):
         if len(payload) - (start + offset) < length:
             break
 
-        data = payload[start + offset:start + offset + length]
+        data = view[start + offset:start + offset + length]
 
         if masked:
             data = _mask(data, key)
+        else:
+            data = data.tobytes()
 
         if opcode == CONTROLS.CLOSE:
             if len(data) >= 2:
@@ -274,7 +315,9 @@ def _parseFrames(frameBuffer: List[bytes], needMask: bool=True):
         yield opcode, data, bool(fin)
         start += offset + length
 
-    if len(payload) > start:
+    if start == 0:
+        frameBuffer[:] = [payload] if len(payload) > 0 else []
+    elif len(payload) > start:
         frameBuffer[:] = [payload[start:]]
     else:
         frameBuffer[:] = []
@@ -339,8 +382,31 @@ class WebSocketsTransport(object):
         @type fin: C{bool}
         @param fin: Whether or not we're sending a final frame.
         """
-        packet = _makeFrame(data, opcode, fin)
-        self._transport.write(packet)
+        self.sendFrames(opcode, [data], fin)
+
+    @typed
+    def sendFrames(self, opcode, frames: Sequence, fin: bool=True):
+        """
+        Build a frame packet for each of C{frames} and send them over the
+        wire with a single C{writeSequence}.
+
+        The payloads are passed to the transport as they are, rather than
+        being copied into each packet.
+
+        @type opcode: C{CONTROLS}
+        @param opcode: The type of frames to send.
+
+        @type frames: C{list} of C{bytes}
+        @param frames: The content of each frame to send.
+
+        @type fin: C{bool}
+        @param fin: Whether or not the frames are final.
+        """
+        packets = []
+        for data in frames:
+            packets.append(_makeFrameHeader(len(data), opcode, fin))
+            packets.append(data)
+        self._transport.writeSequence(packets)
 
     @typed
     def loseConnection(self, code=STATUSES.NORMAL, reason: bytes=b""):
@@ -536,13 +602,12 @@ class WebSocketsProtocolWrapper(WebSocketsProtocol):
     @typed
     def writeSequence(self, data: Sequence):
         """
-        Send all chunks from C{data} using C{write}.
+        Send all chunks from C{data}, each in its own frame.
 
         @type data: C{list} of C{bytes}
         @param data: Data buffers used for the frames content.
         """
-        for chunk in data:
-            self.write(chunk)
+        self._receiver._transport.sendFrames(self.defaultOpcode, data)
 
     def loseConnection(self):
         """
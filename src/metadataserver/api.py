@@ -15,21 +15,29 @@ __all__ = [
 ]
 
 import base64
+from collections import OrderedDict
 from datetime import datetime
-from functools import partial
+import gzip
+import hashlib
 import http.client
-from io import BytesIO
 from itertools import chain
 import json
 from operator import itemgetter
 import os
+import re
 import tarfile
+import threading
 import time
 
 from django.conf import settings
 from django.core.exceptions import PermissionDenied
 from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.cache import (
+    get_conditional_response,
+    patch_vary_headers,
+)
+from django.utils.http import quote_etag
 from formencode.validators import (
     Int,
     String,
@@ -864,8 +872,15 @@ class CurtinUserDataHandler(MetadataViewHandler):
             content_type='application/octet-stream')
 
 
-def add_file_to_tar(tar, path, content, mtime, permission=0o755):
-    """Add a script to a tar."""
+# Number of script tar members, and of compressed archives, to cache.
+SCRIPT_TAR_MEMBER_CACHE_SIZE = 1000
+SCRIPT_TAR_ARCHIVE_CACHE_SIZE = 50
+
+ACCEPTS_GZIP = re.compile(r'\bgzip\b')
+
+
+def make_tar_member(path, content, mtime, permission=0o755):
+    """Return a file's header and content as blocks of a tar archive."""
     assert isinstance(content, bytes), "Script content must be binary."
     tarinfo = tarfile.TarInfo(name=path)
     tarinfo.size = len(content)
@@ -873,7 +888,112 @@ def add_file_to_tar(tar, path, content, mtime, permission=0o755):
     # Modification time defaults to Epoch, which elicits annoying
     # warnings when decompressing.
     tarinfo.mtime = mtime
-    tar.addfile(tarinfo, BytesIO(content))
+    header = tarinfo.tobuf(
+        tarfile.DEFAULT_FORMAT, tarfile.ENCODING, "surrogateescape")
+    remainder = len(content) % tarfile.BLOCKSIZE
+    if remainder > 0:
+        content += tarfile.NUL * (tarfile.BLOCKSIZE - remainder)
+    return header + content
+
+
+def make_tar(members):
+    """Return a tar archive of `members`, as from `make_tar_member`."""
+    archive = b"".join(members) + tarfile.NUL * (tarfile.BLOCKSIZE * 2)
+    # Pad the archive to a whole record, as `tarfile` does.
+    remainder = len(archive) % tarfile.RECORDSIZE
+    if remainder > 0:
+        archive += tarfile.NUL * (tarfile.RECORDSIZE - remainder)
+    return archive
+
+
+class ScriptTarCache:
+    """Process-wide cache of script tar members and compressed archives.
+
+    Many nodes commissioning or testing at once download the same scripts.
+    A script's tar member is built once for its path and content, and is
+    then reused in every archive containing it; its mtime is when it was
+    first built. Archives are compressed once for each distinct archive.
+    """
+
+    def __init__(
+            self, member_size=SCRIPT_TAR_MEMBER_CACHE_SIZE,
+            archive_size=SCRIPT_TAR_ARCHIVE_CACHE_SIZE):
+        super(ScriptTarCache, self).__init__()
+        self.member_size = member_size
+        self.archive_size = archive_size
+        self.lock = threading.Lock()
+        self.members = OrderedDict()
+        self.archives = OrderedDict()
+
+    def _get(self, cache, size, key, make):
+        with self.lock:
+            try:
+                value = cache[key]
+            except KeyError:
+                pass
+            else:
+                cache.move_to_end(key)
+                return value
+        value = make()
+        with self.lock:
+            cache[key] = value
+            while len(cache) > size:
+                cache.popitem(last=False)
+        return value
+
+    def get_member(self, path, content, permission=0o755):
+        """Return the tar member for a script at `path` with `content`."""
+        key = path, permission, hashlib.sha256(content).digest()
+        return self._get(
+            self.members, self.member_size, key,
+            lambda: make_tar_member(
+                path, content, int(time.time()), permission))
+
+    def compress(self, digest, archive):
+        """Return `archive`, with SHA-256 `digest`, compressed with gzip."""
+        return self._get(
+            self.archives, self.archive_size, digest,
+            lambda: gzip.compress(archive))
+
+    def clear(self):
+        """Forget all cached members and archives."""
+        with self.lock:
+            self.members.clear()
+            self.archives.clear()
+
+
+script_tar_cache = ScriptTarCache()
+
+
+def make_tar_response(request, archive, content_type, shared=True):
+    """Return a response for the tar `archive`, or Not Modified.
+
+    The ETag of the archive is its SHA-256 digest. Clients accepting gzip
+    are sent the archive compressed, which `GZipMiddleware` then leaves
+    alone. A `shared` archive, one that many nodes download, is compressed
+    by `script_tar_cache`; any other is compressed for each request.
+    """
+    digest = hashlib.sha256(archive).hexdigest()
+    accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    compress = ACCEPTS_GZIP.search(accept_encoding) is not None
+    if compress:
+        # Each encoding of the archive needs its own strong ETag.
+        digest += '-gzip'
+    etag = quote_etag(digest)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        if compress:
+            if shared:
+                compressed = script_tar_cache.compress(digest, archive)
+            else:
+                compressed = gzip.compress(archive)
+            response = HttpResponse(compressed, content_type=content_type)
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(archive, content_type=content_type)
+    response['ETag'] = etag
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
 
 
 class CommissioningScriptsHandler(MetadataViewHandler):
@@ -908,24 +1028,27 @@ class CommissioningScriptsHandler(MetadataViewHandler):
 
         Each of the scripts will be in the `ARCHIVE_PREFIX` directory.
         """
-        binary = BytesIO()
         scripts = sorted(self._iter_scripts())
-        with tarfile.open(mode='w', fileobj=binary) as tarball:
-            add_script = partial(
-                add_file_to_tar, tarball, mtime=time.time())
-            for name, content in scripts:
-                add_script(os.path.join("commissioning.d", name), content)
-        return binary.getvalue()
+        return make_tar(
+            script_tar_cache.get_member(
+                os.path.join("commissioning.d", name), content)
+            for name, content in scripts)
 
     def read(self, request, version, mac=None):
         check_version(version)
-        return HttpResponse(
-            self._get_archive(), content_type='application/tar')
+        return make_tar_response(
+            request, self._get_archive(), 'application/tar')
 
 
 class MAASScriptsHandler(OperationsHandler):
 
-    def _add_script_set_to_tar(self, script_set, tar, prefix, mtime):
+    def _add_script_set_to_tar(self, script_set, tar, prefix, mtimes):
+        """Add members for the scripts in `script_set` to the list `tar`.
+
+        The mtime of each result is appended to `mtimes`. It is taken from
+        when the result was last updated, so that the tar for a node is the
+        same, as is its ETag, until its results change.
+        """
         if script_set is None:
             return []
         meta_data = []
@@ -937,13 +1060,16 @@ class MAASScriptsHandler(OperationsHandler):
                 continue
 
             path = os.path.join(prefix, script_result.name)
+            mtime = int(script_result.updated.timestamp())
+            mtimes.append(mtime)
             md_item = {}
             if script_result.script is None:
                 # Check if its a builtin in commissioning script and pull the
                 # data from the source.
                 if script_result.name in NODE_INFO_SCRIPTS:
                     script = NODE_INFO_SCRIPTS[script_result.name]
-                    add_file_to_tar(tar, path, script['content'], mtime)
+                    tar.append(script_tar_cache.get_member(
+                        path, script['content']))
                     md_item = {
                         'name': script_result.name,
                         'path': path,
@@ -963,7 +1089,7 @@ class MAASScriptsHandler(OperationsHandler):
                     continue
             else:
                 content = script_result.script.script.data.encode()
-                add_file_to_tar(tar, path, content, mtime)
+                tar.append(script_tar_cache.get_member(path, content))
                 md_item = {
                     'name': script_result.name,
                     'path': path,
@@ -985,13 +1111,14 @@ class MAASScriptsHandler(OperationsHandler):
                 # them back when done.
                 out_path = os.path.join('out', '%s.%s' % (
                     script_result.name, script_result.id))
-                add_file_to_tar(tar, out_path, script_result.output, mtime)
-                add_file_to_tar(
-                    tar, '%s.out' % out_path, script_result.stdout, mtime)
-                add_file_to_tar(
-                    tar, '%s.err' % out_path, script_result.stderr, mtime)
-                add_file_to_tar(
-                    tar, '%s.yaml' % out_path, script_result.result, mtime)
+                tar.append(make_tar_member(
+                    out_path, script_result.output, mtime))
+                tar.append(make_tar_member(
+                    '%s.out' % out_path, script_result.stdout, mtime))
+                tar.append(make_tar_member(
+                    '%s.err' % out_path, script_result.stderr, mtime))
+                tar.append(make_tar_member(
+                    '%s.yaml' % out_path, script_result.result, mtime))
             meta_data.append(md_item)
         return meta_data
 
@@ -999,69 +1126,67 @@ class MAASScriptsHandler(OperationsHandler):
         """Returns a tar containing user and status selected scripts.
 
         The tar produced will contain scripts which are set to be run during
-        a node's status and/or user selected scripts. The tar is currently
-        uncompressed as all API requests are already gziped. This may change
-        so auto-decompress is suggested. If the node returns a script status
+        a node's status and/or user selected scripts. The tar is gzip
+        compressed for clients which accept it, and is otherwise
+        uncompressed, so auto-decompress is suggested. The tar's ETag is
+        honoured in If-None-Match. If the node returns a script status
         and calls this request again only the scripts which havn't been run
         will be returned.
         """
         node = get_queried_node(request)
-        binary = BytesIO()
-        mtime = time.time()
+        tar = []
+        mtimes = []
         tar_meta_data = {}
-        # Responses are currently gzip compressed using
-        # django.middleware.gzip.GZipMiddleware.
-        with tarfile.open(mode='w', fileobj=binary) as tar:
-            # Commissioning scripts should only be run during commissioning or
-            # in rescue mode.
-            if (node.status in (
-                    NODE_STATUS.COMMISSIONING,
-                    NODE_STATUS.ENTERING_RESCUE_MODE,
-                    NODE_STATUS.RESCUE_MODE,
-                    ) and node.current_commissioning_script_set is not None):
-                # Prefetch all the data we need.
-                qs = node.current_commissioning_script_set.scriptresult_set
-                qs = qs.select_related('script', 'script__script')
-                # After the script runner finishes sending all commissioning
-                # results it redownloads the script tar. It does this in-case
-                # a commissioning script discovers hardware associated with
-                # hardware identified in the for_hardware field of a script.
-                # select_for_hardware_scripts() processes the output of the
-                # builtin commissioning scripts and adds any associated script.
-                # This does not need to happen the first time the script runner
-                # downloads the tar as the region has not yet received new
-                # data.
-                for script_result in qs:
-                    if script_result.status != SCRIPT_STATUS.PENDING:
-                        script_set = node.current_commissioning_script_set
-                        script_set.select_for_hardware_scripts()
-                        break
-                meta_data = self._add_script_set_to_tar(
-                    node.current_commissioning_script_set, tar,
-                    'commissioning', mtime)
-                if meta_data != []:
-                    tar_meta_data['commissioning_scripts'] = sorted(
-                        meta_data, key=itemgetter('name', 'script_result_id'))
-
-            # Always send testing scripts.
-            if node.current_testing_script_set is not None:
-                # prefetch all the data we need
-                qs = node.current_testing_script_set.scriptresult_set
-                qs = qs.select_related('script', 'script__script')
-                meta_data = self._add_script_set_to_tar(
-                    qs, tar, 'testing', mtime)
-                if meta_data != []:
-                    tar_meta_data['testing_scripts'] = sorted(
-                        meta_data, key=itemgetter('name', 'script_result_id'))
-
-            if not tar_meta_data:
-                return HttpResponse(status=int(http.client.NO_CONTENT))
-
-            add_file_to_tar(
-                tar, 'index.json', json.dumps({'1.0': tar_meta_data}).encode(),
-                mtime, 0o644)
-        return HttpResponse(
-            binary.getvalue(), content_type='application/x-tar')
+        # Commissioning scripts should only be run during commissioning or
+        # in rescue mode.
+        if (node.status in (
+                NODE_STATUS.COMMISSIONING,
+                NODE_STATUS.ENTERING_RESCUE_MODE,
+                NODE_STATUS.RESCUE_MODE,
+                ) and node.current_commissioning_script_set is not None):
+            # Prefetch all the data we need.
+            qs = node.current_commissioning_script_set.scriptresult_set
+            qs = qs.select_related('script', 'script__script')
+            # After the script runner finishes sending all commissioning
+            # results it redownloads the script tar. It does this in-case
+            # a commissioning script discovers hardware associated with
+            # hardware identified in the for_hardware field of a script.
+            # select_for_hardware_scripts() processes the output of the
+            # builtin commissioning scripts and adds any associated script.
+            # This does not need to happen the first time the script runner
+            # downloads the tar as the region has not yet received new
+            # data.
+            for script_result in qs:
+                if script_result.status != SCRIPT_STATUS.PENDING:
+                    script_set = node.current_commissioning_script_set
+                    script_set.select_for_hardware_scripts()
+                    break
+            meta_data = self._add_script_set_to_tar(
+                node.current_commissioning_script_set, tar,
+                'commissioning', mtimes)
+            if meta_data != []:
+                tar_meta_data['commissioning_scripts'] = sorted(
+                    meta_data, key=itemgetter('name', 'script_result_id'))
+
+        # Always send testing scripts.
+        if node.current_testing_script_set is not None:
+            # prefetch all the data we need
+            qs = node.current_testing_script_set.scriptresult_set
+            qs = qs.select_related('script', 'script__script')
+            meta_data = self._add_script_set_to_tar(
+                qs, tar, 'testing', mtimes)
+            if meta_data != []:
+                tar_meta_data['testing_scripts'] = sorted(
+                    meta_data, key=itemgetter('name', 'script_result_id'))
+
+        if not tar_meta_data:
+            return HttpResponse(status=int(http.client.NO_CONTENT))
+
+        tar.append(make_tar_member(
+            'index.json', json.dumps({'1.0': tar_meta_data}).encode(),
+            max(mtimes), 0o644))
+        return make_tar_response(
+            request, make_tar(tar), 'application/x-tar', shared=False)
 
 
 class EnlistMetaDataHandler(OperationsHandler):
@@ -1,16 +1,21 @@
 # Copyright 2017-2018 Canonical Ltd.  This software is licensed under the
 # GNU Affero General Public License version 3 (see the file LICENSE).
 __all__ = [
+    'get_script_status_summaries',
     'ScriptResult',
+    'ScriptStatusSummary',
+    'summarise_script_results',
     ]
 
 
+from collections import namedtuple
 from datetime import (
     datetime,
     timedelta,
 )
 
 from django.core.exceptions import ValidationError
+from django.db import connection
 from django.db.models import (
     CASCADE,
     CharField,
@@ -35,6 +40,7 @@ from metadataserver import (
 )
 from metadataserver.builtin_scripts.hooks import NODE_INFO_SCRIPTS
 from metadataserver.enum import (
+    HARDWARE_TYPE,
     RESULT_TYPE,
     SCRIPT_STATUS,
     SCRIPT_STATUS_CHOICES,
@@ -49,6 +55,11 @@ from metadataserver.models.scriptset import ScriptSet
 from provisioningserver.events import EVENT_TYPES
 import yaml
 
+# The number of `ScriptResult`s of a node with the same hardware type, result
+# type and status, and the names of their scripts.
+ScriptStatusSummary = namedtuple("ScriptStatusSummary", (
+    "hardware_type", "result_type", "status", "count", "names"))
+
 
 class ScriptResult(CleanSave, TimestampedModel):
 
@@ -377,3 +388,78 @@ class ScriptResult(CleanSave, TimestampedModel):
                         'physical_blockdevice_id'] = physical_blockdevice.id
 
         return super().save(*args, **kwargs)
+
+
+def summarise_script_results(script_results):
+    """Summarise `script_results`, as `get_script_status_summaries` does.
+
+    Aborted results are not included.
+
+    :return: A list of `ScriptStatusSummary`.
+    """
+    summaries = {}
+    for script_result in script_results:
+        if script_result.status == SCRIPT_STATUS.ABORTED:
+            continue
+        if script_result.script is not None:
+            hardware_type = script_result.script.hardware_type
+        else:
+            hardware_type = HARDWARE_TYPE.NODE
+        key = (
+            hardware_type, script_result.script_set.result_type,
+            script_result.status)
+        count, names = summaries.get(key, (0, set()))
+        names.add(script_result.name)
+        summaries[key] = count + 1, names
+    return [
+        ScriptStatusSummary(*key, count=count, names=names)
+        for key, (count, names) in summaries.items()
+    ]
+
+
+def get_script_status_summaries(node_ids):
+    """Summarise the latest `ScriptResult`s of each node in `node_ids`.
+
+    This is done with a single grouped query, so that listing many nodes does
+    not need to load every one of their results. Only the latest result of
+    each script, and of each block device the script ran against, is
+    included; aborted results are not.
+
+    :return: A dict mapping each node id to a list of `ScriptStatusSummary`.
+        Nodes without results are not included.
+    """
+    summaries = {}
+    if len(node_ids) == 0:
+        return summaries
+    with connection.cursor() as cursor:
+        cursor.execute(_sql_script_status_summaries, [
+            HARDWARE_TYPE.NODE, list(node_ids), SCRIPT_STATUS.ABORTED])
+        for node_id, hardware_type, result_type, status, count, names in (
+                cursor.fetchall()):
+            summaries.setdefault(node_id, []).append(ScriptStatusSummary(
+                hardware_type, result_type, status, count, set(names)))
+    return summaries
+
+
+_sql_script_status_summaries = """\
+SELECT latest.node_id, latest.hardware_type, latest.result_type,
+  latest.status, count(*), array_agg(DISTINCT latest.name)
+FROM (
+  SELECT DISTINCT ON (
+    result.script_name, result.physical_blockdevice_id, scriptset.node_id)
+    scriptset.node_id, scriptset.result_type, result.status,
+    COALESCE(script.hardware_type, %s) AS hardware_type,
+    COALESCE(script.name, result.script_name, 'Unknown') AS name
+  FROM metadataserver_scriptresult AS result
+  JOIN metadataserver_scriptset AS scriptset
+    ON scriptset.id = result.script_set_id
+  LEFT OUTER JOIN metadataserver_script AS script
+    ON script.id = result.script_id
+  WHERE scriptset.node_id = ANY(%s)
+  ORDER BY result.script_name, result.physical_blockdevice_id,
+    scriptset.node_id, result.id DESC
+) AS latest
+WHERE latest.status != %s
+GROUP BY latest.node_id, latest.hardware_type, latest.result_type,
+  latest.status
+"""
@@ -4,6 +4,7 @@
 __all__ = [
     "ScriptSet",
     "get_status_from_qs",
+    "get_status_from_statuses",
     "translate_result_type",
 ]
 
@@ -28,7 +29,6 @@ from django.db.models import (
     Q,
     TextField,
 )
-from django.db.models.query import QuerySet
 from maasserver.enum import (
     POWER_STATE,
     POWER_STATE_CHOICES,
@@ -60,12 +60,15 @@ from provisioningserver.refresh.node_info_scripts import NODE_INFO_SCRIPTS
 
 def get_status_from_qs(qs):
     """Given a QuerySet or list of ScriptResults return the set's status."""
-    # If no tests have been run the QuerySet or list has no status.
-    if isinstance(qs, QuerySet):
-        count = qs.count()
-    else:
-        count = len(qs)
-    if count == 0:
+    return get_status_from_statuses(
+        script_result.status for script_result in qs)
+
+
+def get_status_from_statuses(statuses):
+    """Given the statuses of a set's ScriptResults return the set's status."""
+    statuses = set(statuses)
+    # If no tests have been run the set has no status.
+    if len(statuses) == 0:
         return -1
     # The status order below represents the order of precedence.
     # Skipped is omitted here otherwise one skipped test will show
@@ -75,21 +78,20 @@ def get_status_from_qs(qs):
             SCRIPT_STATUS.PENDING, SCRIPT_STATUS.ABORTED,
             SCRIPT_STATUS.FAILED, SCRIPT_STATUS.FAILED_INSTALLING,
             SCRIPT_STATUS.TIMEDOUT, SCRIPT_STATUS.DEGRADED):
-        for script_result in qs:
-            if script_result.status == status:
-                if status == SCRIPT_STATUS.INSTALLING:
-                    # When a script is installing the set is running.
-                    return SCRIPT_STATUS.RUNNING
-                elif status == SCRIPT_STATUS.TIMEDOUT:
-                    # A timeout causes the node to go into a failed status
-                    # so show the set as failed.
-                    return SCRIPT_STATUS.FAILED
-                elif status == SCRIPT_STATUS.FAILED_INSTALLING:
-                    # Installation failure causes the node to go into a
-                    # failed status so show the set as failed.
-                    return SCRIPT_STATUS.FAILED
-                else:
-                    return status
+        if status in statuses:
+            if status == SCRIPT_STATUS.INSTALLING:
+                # When a script is installing the set is running.
+                return SCRIPT_STATUS.RUNNING
+            elif status == SCRIPT_STATUS.TIMEDOUT:
+                # A timeout causes the node to go into a failed status
+                # so show the set as failed.
+                return SCRIPT_STATUS.FAILED
+            elif status == SCRIPT_STATUS.FAILED_INSTALLING:
+                # Installation failure causes the node to go into a
+                # failed status so show the set as failed.
+                return SCRIPT_STATUS.FAILED
+            else:
+                return status
     return SCRIPT_STATUS.PASSED
 
 
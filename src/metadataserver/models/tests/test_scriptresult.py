@@ -35,6 +35,11 @@ from metadataserver.models import (
     ScriptResult,
     scriptresult as scriptresult_module,
 )
+from metadataserver.models.scriptresult import (
+    get_script_status_summaries,
+    ScriptStatusSummary,
+    summarise_script_results,
+)
 from provisioningserver.events import EVENT_TYPES
 import yaml
 
@@ -646,3 +651,53 @@ class TestScriptResult(MAASServerTestCase):
         factory.make_ScriptResult(script=script)
         script_result = script_results[-1]
         self.assertItemsEqual(script_results, script_result.history)
+
+
+class TestGetScriptStatusSummaries(MAASServerTestCase):
+    """Tests for `get_script_status_summaries`."""
+
+    def test_returns_empty_dict_without_nodes(self):
+        self.assertEqual({}, get_script_status_summaries([]))
+
+    def test_summarises_latest_results(self):
+        node = factory.make_Node()
+        script_set = factory.make_ScriptSet(
+            node=node, result_type=RESULT_TYPE.TESTING)
+        script = factory.make_Script(script_type=SCRIPT_TYPE.TESTING)
+        factory.make_ScriptResult(
+            script=script, script_set=script_set,
+            status=SCRIPT_STATUS.FAILED)
+        latest = factory.make_ScriptResult(
+            script=script, script_set=script_set,
+            status=SCRIPT_STATUS.PASSED)
+        self.assertEqual({
+            node.id: [ScriptStatusSummary(
+                script.hardware_type, RESULT_TYPE.TESTING,
+                SCRIPT_STATUS.PASSED, 1, {latest.name})],
+            }, get_script_status_summaries([node.id]))
+
+    def test_groups_results_by_status(self):
+        node = factory.make_Node()
+        script_set = factory.make_ScriptSet(
+            node=node, result_type=RESULT_TYPE.COMMISSIONING)
+        script_results = [
+            factory.make_ScriptResult(
+                script_set=script_set, status=SCRIPT_STATUS.PASSED)
+            for _ in range(3)
+        ]
+        summaries = get_script_status_summaries([node.id])
+        self.assertItemsEqual(
+            summarise_script_results(script_results), summaries[node.id])
+
+    def test_excludes_aborted_results(self):
+        node = factory.make_Node()
+        factory.make_ScriptResult(
+            script_set=factory.make_ScriptSet(node=node),
+            status=SCRIPT_STATUS.ABORTED)
+        self.assertEqual({}, get_script_status_summaries([node.id]))
+
+    def test_excludes_other_nodes(self):
+        node = factory.make_Node()
+        factory.make_ScriptResult(
+            script_set=factory.make_ScriptSet(), status=SCRIPT_STATUS.PASSED)
+        self.assertEqual({}, get_script_status_summaries([node.id]))
@@ -8,6 +8,8 @@ __all__ = []
 import base64
 from collections import namedtuple
 from datetime import datetime
+import gzip
+import hashlib
 import http.client
 from io import BytesIO
 import json
@@ -78,9 +80,12 @@ from metadataserver.api import (
     get_node_for_request,
     get_queried_node,
     make_list_response,
+    make_tar,
+    make_tar_member,
     make_text_response,
     MetaDataHandler,
     process_file,
+    ScriptTarCache,
     UnknownMetadataVersion,
 )
 from metadataserver.enum import (
@@ -1137,8 +1142,62 @@ class TestInstallingAPI(MAASServerTestCase):
         self.assertEquals(script_status, script_result.status)
 
 
+class TestScriptTar(MAASServerTestCase):
+    """Tests for `make_tar`, `make_tar_member`, and `ScriptTarCache`."""
+
+    def test_make_tar_matches_tarfile(self):
+        files = [
+            (factory.make_name('path'), factory.make_bytes(size), mode)
+            for size, mode in ((0, 0o644), (512, 0o755), (700, 0o755))
+        ]
+        mtime = int(time.time())
+        binary = BytesIO()
+        with tarfile.open(mode='w', fileobj=binary) as tar:
+            for path, content, mode in files:
+                tarinfo = tarfile.TarInfo(name=path)
+                tarinfo.size = len(content)
+                tarinfo.mode = mode
+                tarinfo.mtime = mtime
+                tar.addfile(tarinfo, BytesIO(content))
+        self.assertEqual(binary.getvalue(), make_tar(
+            make_tar_member(path, content, mtime, mode)
+            for path, content, mode in files))
+
+    def test_get_member_reuses_member_for_same_content(self):
+        cache = ScriptTarCache()
+        path = factory.make_name('path')
+        content = factory.make_bytes()
+        member = cache.get_member(path, content)
+        self.assertIs(member, cache.get_member(path, bytes(content)))
+        self.assertIsNot(
+            member, cache.get_member(path, content + b'changed'))
+
+    def test_get_member_evicts_least_recently_used(self):
+        cache = ScriptTarCache(member_size=2)
+        paths = [factory.make_name('path') for _ in range(3)]
+        for path in paths:
+            cache.get_member(path, b'content')
+        self.assertEqual(2, len(cache.members))
+        self.assertEqual(
+            paths[1:], [path for path, _, _ in cache.members])
+
+    def test_compress_reuses_compressed_archive(self):
+        cache = ScriptTarCache()
+        archive = make_tar([make_tar_member(
+            factory.make_name('path'), factory.make_bytes(), 0)])
+        digest = factory.make_name('digest')
+        compressed = cache.compress(digest, archive)
+        self.assertEqual(archive, gzip.decompress(compressed))
+        self.assertIs(compressed, cache.compress(digest, archive))
+
+
 class TestMAASScripts(MAASServerTestCase):
 
+    def setUp(self):
+        super(TestMAASScripts, self).setUp()
+        # Cached members keep the mtime of when they were first built.
+        api.script_tar_cache.clear()
+
     def extract_and_validate_file(
             self, tar, path, start_time, end_time, content):
         member = tar.getmember(path)
@@ -1523,11 +1582,81 @@ class TestMAASScripts(MAASServerTestCase):
             % (response.status_code, response.content))
 
 
+class TestScriptTarResponses(MAASServerTestCase):
+    """Tests for ETags and compression of script tars."""
+
+    def setUp(self):
+        super(TestScriptTarResponses, self).setUp()
+        api.script_tar_cache.clear()
+
+    def get_scripts(self, node, **extra):
+        return make_node_client(node=node).get(
+            reverse('maas-scripts', args=['latest']), **extra)
+
+    def test_sends_etag(self):
+        node = factory.make_Node(
+            status=NODE_STATUS.COMMISSIONING, with_empty_script_sets=True)
+        response = self.get_scripts(node)
+        self.assertThat(response, HasStatusCode(http.client.OK))
+        self.assertEqual(
+            '"%s"' % hashlib.sha256(response.content).hexdigest(),
+            response['ETag'])
+
+    def test_not_modified_if_none_match(self):
+        node = factory.make_Node(
+            status=NODE_STATUS.COMMISSIONING, with_empty_script_sets=True)
+        etag = self.get_scripts(node)['ETag']
+        response = self.get_scripts(node, HTTP_IF_NONE_MATCH=etag)
+        self.assertThat(response, HasStatusCode(http.client.NOT_MODIFIED))
+        self.assertEqual(etag, response['ETag'])
+
+    def test_sends_compressed_tar_when_accepted(self):
+        node = factory.make_Node(
+            status=NODE_STATUS.COMMISSIONING, with_empty_script_sets=True)
+        response = self.get_scripts(node, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertThat(response, HasStatusCode(http.client.OK))
+        self.assertEqual('gzip', response['Content-Encoding'])
+        self.assertTrue(response['ETag'].endswith('-gzip"'))
+        tar = tarfile.open(
+            mode='r', fileobj=BytesIO(gzip.decompress(response.content)))
+        self.assertIn('index.json', tar.getnames())
+
+    def test_result_mtime_is_when_result_was_updated(self):
+        node = factory.make_Node(
+            status=NODE_STATUS.COMMISSIONING, with_empty_script_sets=True)
+        script_result = factory.make_ScriptResult(
+            script_set=node.current_commissioning_script_set,
+            status=SCRIPT_STATUS.RUNNING)
+        response = self.get_scripts(node)
+        tar = tarfile.open(mode='r', fileobj=BytesIO(response.content))
+        out_path = os.path.join('out', '%s.%s' % (
+            script_result.name, script_result.id))
+        self.assertEqual(
+            int(reload_object(script_result).updated.timestamp()),
+            tar.getmember(out_path).mtime)
+
+    def test_does_not_cache_compressed_tars_for_nodes(self):
+        node = factory.make_Node(
+            status=NODE_STATUS.COMMISSIONING, with_empty_script_sets=True)
+        self.get_scripts(node, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertThat(api.script_tar_cache.archives, HasLength(0))
+
+    def test_commissioning_scripts_etag_is_shared_by_nodes(self):
+        url = reverse('commissioning-scripts', args=['latest'])
+        etags = {
+            make_node_client().get(url)['ETag']
+            for _ in range(2)
+        }
+        self.assertThat(etags, HasLength(1))
+
+
 class TestCommissioningAPI(MAASServerTestCase):
 
     def setUp(self):
         super(TestCommissioningAPI, self).setUp()
         self.useFixture(SignalsDisabled("power"))
+        # Cached members keep the mtime of when they were first built.
+        api.script_tar_cache.clear()
 
     def test_commissioning_scripts(self):
         start_time = floor(time.time())
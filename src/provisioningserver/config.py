@@ -138,6 +138,7 @@ from formencode.api import (
 )
 from formencode.declarative import DeclarativeMeta
 from formencode.validators import (
+    Int,
     Number,
     Set,
     StringBool,
@@ -789,6 +790,13 @@ class ClusterConfiguration(Configuration, metaclass=ClusterConfigurationMeta):
         "cluster_uuid", "The UUID for this cluster controller",
         UUIDString(if_missing=UUID_NOT_SET))
 
+    # Tag options.
+    tag_processes = ConfigurationOption(
+        "tag_processes", "The number of processes to evaluate tags for many "
+        "nodes in. With 1, tags are evaluated in the rack process itself. "
+        "Changes take effect when rackd restarts.",
+        Int(min=1, if_missing=1))
+
     # Debug options.
     debug = ConfigurationOption(
         "debug", "Enable debug mode for detailed error and log reporting.",
@@ -12,6 +12,7 @@ from http import HTTPStatus
 from io import BytesIO
 import json
 from os.path import join
+from urllib.parse import urlparse
 
 from provisioningserver.drivers import (
     make_ip_extractor,
@@ -34,6 +35,7 @@ from provisioningserver.logger import get_maas_logger
 from provisioningserver.rpc.exceptions import PodInvalidResources
 from provisioningserver.utils.twisted import (
     asynchronous,
+    DeferredValue,
     pause,
 )
 from twisted.internet import reactor
@@ -41,11 +43,17 @@ from twisted.internet._sslverify import (
     ClientTLSOptions,
     OpenSSLCertificateOptions,
 )
-from twisted.internet.defer import inlineCallbacks
+from twisted.internet.defer import (
+    DeferredList,
+    DeferredSemaphore,
+    inlineCallbacks,
+    maybeDeferred,
+)
 from twisted.web.client import (
     Agent,
     BrowserLikePolicyForHTTPS,
     FileBodyProducer,
+    HTTPConnectionPool,
     PartialDownloadError,
     readBody,
 )
@@ -75,6 +83,24 @@ RSD_NODE_POWER_STATE = {
     'PoweredOff': "off"
     }
 
+# Maximum number of requests in flight to a single pod endpoint. This is
+# also the number of persistent connections kept open to it.
+RSD_MAX_CONCURRENT_REQUESTS = 8
+
+
+def gather(calls):
+    """Run each of `calls`, returning a list of their results in order.
+
+    Each call is a tuple of a callable and its arguments. If any call fails
+    the returned `Deferred` fails with the first failure, unwrapped.
+    """
+    d = DeferredList(
+        [maybeDeferred(*call) for call in calls],
+        fireOnOneErrback=True, consumeErrors=True)
+    d.addCallback(lambda results: [result for _, result in results])
+    d.addErrback(lambda failure: failure.value.subFailure)
+    return d
+
 
 class WebClientContextFactory(BrowserLikePolicyForHTTPS):
 
@@ -91,6 +117,8 @@ class RSDPodDriver(PodDriver):
 
     name = 'rsd'
     description = "Rack Scale Design"
+    # Queries are cheap HTTP requests to the pod manager.
+    max_query_concurrency = 10
     settings = [
         make_setting_field(
             'power_address', "Pod address", required=True),
@@ -104,6 +132,15 @@ class RSDPodDriver(PodDriver):
     ]
     ip_extractor = make_ip_extractor('power_address')
 
+    def __init__(self):
+        super(RSDPodDriver, self).__init__()
+        # Map of endpoint to the `Agent` and `DeferredSemaphore` used for
+        # all requests to that endpoint.
+        self.endpoints = {}
+        # Map of id(headers) to a map of URI to `DeferredValue`, for the
+        # headers used in each discovery in progress.
+        self.request_memos = {}
+
     def detect_missing_packages(self):
         # no required packages
         return []
@@ -128,10 +165,50 @@ class RSDPodDriver(PodDriver):
             }
         )
 
+    def get_endpoint(self, uri):
+        """Return the `Agent` and `DeferredSemaphore` for `uri`'s endpoint.
+
+        Each endpoint has its own pool of persistent connections, so that
+        TLS connections are reused between requests, and a limit on the
+        requests in flight to it at once.
+        """
+        parsed = urlparse(uri)
+        key = parsed.scheme, parsed.netloc
+        try:
+            return self.endpoints[key]
+        except KeyError:
+            pool = HTTPConnectionPool(reactor, persistent=True)
+            pool.maxPersistentPerHost = RSD_MAX_CONCURRENT_REQUESTS
+            agent = Agent(
+                reactor, contextFactory=WebClientContextFactory(), pool=pool)
+            semaphore = DeferredSemaphore(RSD_MAX_CONCURRENT_REQUESTS)
+            return self.endpoints.setdefault(key, (agent, semaphore))
+
     @asynchronous
     def redfish_request(self, method, uri, headers=None, bodyProducer=None):
-        """Send the redfish request and return the response."""
-        agent = Agent(reactor, contextFactory=WebClientContextFactory())
+        """Send the redfish request and return the response.
+
+        GET requests made with the headers of a discovery in progress are
+        sent once per URI; see `discover`.
+        """
+        memo = self.request_memos.get(id(headers))
+        if method != b"GET" or memo is None:
+            return self._redfish_request(method, uri, headers, bodyProducer)
+        elif uri in memo:
+            return memo[uri].get()
+        else:
+            dvalue = memo[uri] = DeferredValue()
+            dvalue.capture(
+                self._redfish_request(method, uri, headers, bodyProducer))
+            return dvalue.get()
+
+    def _redfish_request(self, method, uri, headers, bodyProducer):
+        agent, semaphore = self.get_endpoint(uri)
+        return semaphore.run(
+            self._send_redfish_request, agent, method, uri, headers,
+            bodyProducer)
+
+    def _send_redfish_request(self, agent, method, uri, headers, bodyProducer):
         d = agent.request(
             method, uri, headers=headers, bodyProducer=bodyProducer)
 
@@ -191,6 +268,17 @@ class RSDPodDriver(PodDriver):
                 resource['@odata.id'].lstrip('/').encode('utf-8'))
         return resource_ids
 
+    def get_resources(self, url, resources, headers):
+        """Get the data of each of `resources` concurrently.
+
+        Returns a `Deferred` list of the data in the order of `resources`.
+        """
+        d = gather(
+            (self.redfish_request, b"GET", join(url, resource), headers)
+            for resource in resources)
+        d.addCallback(lambda responses: [data for data, _ in responses])
+        return d
+
     @inlineCallbacks
     def scrape_logical_drives_and_targets(self, url, headers):
         """ Scrape the logical drive and targets data from storage services."""
@@ -205,18 +293,15 @@ class RSDPodDriver(PodDriver):
             logical_volumes_uri = join(url, service, b"LogicalDrives")
             logical_volumes = yield self.list_resources(
                 logical_volumes_uri, headers)
-            for logical_volume in logical_volumes:
-                lv_data, _ = yield self.redfish_request(
-                    b"GET", join(url, logical_volume), headers)
-                logical_drives[logical_volume] = lv_data
+            lvs_data = yield self.get_resources(
+                url, logical_volumes, headers)
+            logical_drives.update(zip(logical_volumes, lvs_data))
             # Get list of all the targets for this service.
             targets_uri = join(url, service, b"Targets")
             targets = yield self.list_resources(
                 targets_uri, headers)
-            for target in targets:
-                target_data, _ = yield self.redfish_request(
-                    b"GET", join(url, target), headers)
-                target_links[target] = target_data
+            targets_data = yield self.get_resources(url, targets, headers)
+            target_links.update(zip(targets, targets_data))
         return logical_drives, target_links
 
     @inlineCallbacks
@@ -225,9 +310,8 @@ class RSDPodDriver(PodDriver):
         targets = []
         nodes_uri = join(url, b"redfish/v1/Nodes")
         nodes = yield self.list_resources(nodes_uri, headers)
-        for node in nodes:
-            node_data, _ = yield self.redfish_request(
-                b"GET", join(url, node), headers)
+        nodes_data = yield self.get_resources(url, nodes, headers)
+        for node_data in nodes_data:
             remote_drives = node_data.get('Links', {}).get('RemoteDrives', [])
             for remote_drive in remote_drives:
                 targets.append(remote_drive['@odata.id'])
@@ -333,10 +417,9 @@ class RSDPodDriver(PodDriver):
         # Get list of all memories for this specific system.
         memories_uri = join(url, system, b"Memory")
         memories = yield self.list_resources(memories_uri, headers)
+        memories_data = yield self.get_resources(url, memories, headers)
         # Iterate over all the memories for this specific system.
-        for memory in memories:
-            memory_data, _ = yield self.redfish_request(
-                b"GET", join(url, memory), headers)
+        for memory_data in memories_data:
             system_memory.append(memory_data.get('CapacityMiB'))
         return system_memory
 
@@ -349,10 +432,9 @@ class RSDPodDriver(PodDriver):
         # Get list of all processors for this specific system.
         processors_uri = join(url, system, b"Processors")
         processors = yield self.list_resources(processors_uri, headers)
+        processors_data = yield self.get_resources(url, processors, headers)
         # Iterate over all processors for this specific system.
-        for processor in processors:
-            processor_data, _ = yield self.redfish_request(
-                b"GET", join(url, processor), headers)
+        for processor_data in processors_data:
             # Using 'TotalThreads' instead of 'TotalCores'
             # as this is what MAAS finds when commissioning.
             cores.append(processor_data.get('TotalThreads'))
@@ -376,10 +458,9 @@ class RSDPodDriver(PodDriver):
             devices_uri = join(url, adapter, b"Devices")
             devices = yield self.list_resources(
                 devices_uri, headers)
+            devices_data = yield self.get_resources(url, devices, headers)
             # Iterate over all the devices for this specific adapter.
-            for device in devices:
-                device_data, _ = yield self.redfish_request(
-                    b"GET", join(url, device), headers)
+            for device_data in devices_data:
                 storages.append(device_data.get('CapacityGiB'))
         return storages
 
@@ -441,10 +522,11 @@ class RSDPodDriver(PodDriver):
             self, node_data, url, headers, discovered_machine):
         """Get pod machine memories."""
         memories = node_data.get('Links', {}).get('Memory', [])
-        for memory in memories:
-            memory_data, _ = yield self.redfish_request(
-                b"GET", join(url, memory[
-                    '@odata.id'].lstrip('/').encode('utf-8')), headers)
+        memories_data = yield self.get_resources(url, [
+            memory['@odata.id'].lstrip('/').encode('utf-8')
+            for memory in memories
+        ], headers)
+        for memory_data in memories_data:
             discovered_machine.memory += memory_data['CapacityMiB']
 
     @inlineCallbacks
@@ -452,10 +534,11 @@ class RSDPodDriver(PodDriver):
             self, node_data, url, headers, discovered_machine):
         """Get pod machine processors."""
         processors = node_data.get('Links', {}).get('Processors', [])
-        for processor in processors:
-            processor_data, _ = yield self.redfish_request(
-                b"GET", join(url, processor[
-                    '@odata.id'].lstrip('/').encode('utf-8')), headers)
+        processors_data = yield self.get_resources(url, [
+            processor['@odata.id'].lstrip('/').encode('utf-8')
+            for processor in processors
+        ], headers)
+        for processor_data in processors_data:
             # Using 'TotalThreads' instead of 'TotalCores'
             # as this is what MAAS finds when commissioning.
             discovered_machine.cores += processor_data['TotalThreads']
@@ -473,14 +556,15 @@ class RSDPodDriver(PodDriver):
             self, node_data, url, headers, discovered_machine, request=None):
         """Get pod machine local strorages."""
         local_drives = node_data.get('Links', {}).get('LocalDrives', [])
-        for local_drive in local_drives:
+        drives_data = yield self.get_resources(url, [
+            local_drive['@odata.id'].lstrip('/').encode('utf-8')
+            for local_drive in local_drives
+        ], headers)
+        for local_drive, drive_data in zip(local_drives, drives_data):
             local_drive_endpoint = local_drive['@odata.id']
             discovered_machine_block_device = (
                 DiscoveredMachineBlockDevice(
                     model='', serial='', size=0))
-            drive_data, _ = yield self.redfish_request(
-                b"GET", join(url, local_drive_endpoint.lstrip(
-                    '/').encode('utf-8')), headers)
             discovered_machine_block_device.model = drive_data['Model']
             discovered_machine_block_device.serial = drive_data['SerialNumber']
             discovered_machine_block_device.size = float(
@@ -617,12 +701,13 @@ class RSDPodDriver(PodDriver):
             self, node_data, url, headers, discovered_machine):
         """Get pod machine interfaces."""
         interfaces = node_data.get('Links', {}).get('EthernetInterfaces', [])
-        for interface in interfaces:
+        interfaces_data = yield self.get_resources(url, [
+            interface['@odata.id'].lstrip('/').encode('utf-8')
+            for interface in interfaces
+        ], headers)
+        for interface_data in interfaces_data:
             discovered_machine_interface = DiscoveredMachineInterface(
                 mac_address='')
-            interface_data, _ = yield self.redfish_request(
-                b"GET", join(url, interface[
-                    '@odata.id'].lstrip('/').encode('utf-8')), headers)
             discovered_machine_interface.mac_address = (
                 interface_data['MACAddress'])
             nic_speed = interface_data['SpeedMbps']
@@ -726,15 +811,13 @@ class RSDPodDriver(PodDriver):
         discovered machines returned to the region.
         """
         # Get list of all composed nodes in the pod.
-        discovered_machines = []
         nodes_uri = join(url, b"redfish/v1/Nodes")
         nodes = yield self.list_resources(nodes_uri, headers)
-        # Iterate over all composed nodes in the pod.
-        for node in nodes:
-            discovered_machine = yield self.get_pod_machine(
-                node, url, headers, remote_drives,
-                logical_drives, targets, request)
-            discovered_machines.append(discovered_machine)
+        # Discover all composed nodes in the pod concurrently.
+        discovered_machines = yield gather(
+            (self.get_pod_machine, node, url, headers, remote_drives,
+             logical_drives, targets, request)
+            for node in nodes)
         return discovered_machines
 
     def get_pod_hints(self, discovered_pod):
@@ -768,9 +851,21 @@ class RSDPodDriver(PodDriver):
         """Discover all resources.
 
         Returns a defer to a DiscoveredPod object.
+
+        Resources are fetched at most once during a discovery, though many
+        are linked from both the pod's systems and its composed nodes.
         """
         url = self.get_url(context)
         headers = self.make_auth_headers(**context)
+        self.request_memos[id(headers)] = {}
+        try:
+            discovered_pod = yield self._discover(url, headers)
+        finally:
+            del self.request_memos[id(headers)]
+        return discovered_pod
+
+    @inlineCallbacks
+    def _discover(self, url, headers):
         logical_drives, targets = yield self.scrape_logical_drives_and_targets(
             url, headers)
         remote_drives = yield self.scrape_remote_drives(url, headers)
@@ -42,6 +42,8 @@ from provisioningserver.drivers.pod import (
     RequestedMachineInterface,
 )
 from provisioningserver.drivers.pod.rsd import (
+    gather,
+    RSD_MAX_CONCURRENT_REQUESTS,
     RSD_NODE_POWER_STATE,
     RSD_SYSTEM_POWER_STATE,
     RSDPodDriver,
@@ -800,6 +802,26 @@ class TestWebClientContextFactory(MAASTestCase):
         self.assertIsInstance(opts, ClientTLSOptions)
 
 
+class TestGather(MAASTestCase):
+
+    run_tests_with = MAASTwistedRunTest.make_factory(timeout=5)
+
+    @inlineCallbacks
+    def test_returns_results_in_order(self):
+        values = [factory.make_name('value') for _ in range(3)]
+        results = yield gather(
+            (succeed, value) for value in values)
+        self.assertEqual(values, results)
+
+    @inlineCallbacks
+    def test_fails_with_first_failure(self):
+        with ExpectedException(PodActionError):
+            yield gather([
+                (succeed, None),
+                (fail, PodActionError()),
+            ])
+
+
 class TestRSDPodDriver(MAASTestCase):
 
     run_tests_with = MAASTwistedRunTest.make_factory(timeout=5)
@@ -920,6 +942,91 @@ class TestRSDPodDriver(MAASTestCase):
         self.assertThat(mock_readBody, MockCalledOnceWith(
             expected_headers))
 
+    def test_get_endpoint_reuses_agent_for_endpoint(self):
+        driver = RSDPodDriver()
+        url = driver.get_url(make_context())
+        agent, semaphore = driver.get_endpoint(
+            join(url, b"redfish/v1/Systems"))
+        self.assertEqual(
+            (agent, semaphore),
+            driver.get_endpoint(join(url, b"redfish/v1/Nodes")))
+        self.assertTrue(agent._pool.persistent)
+        self.assertEqual(
+            RSD_MAX_CONCURRENT_REQUESTS, agent._pool.maxPersistentPerHost)
+        self.assertEqual(RSD_MAX_CONCURRENT_REQUESTS, semaphore.limit)
+
+    def test_get_endpoint_separates_endpoints(self):
+        driver = RSDPodDriver()
+        url1 = driver.get_url(make_context())
+        url2 = driver.get_url(make_context())
+        self.assertNotEqual(
+            driver.get_endpoint(url1), driver.get_endpoint(url2))
+
+    @inlineCallbacks
+    def test_redfish_request_memoizes_gets_during_discovery(self):
+        driver = RSDPodDriver()
+        context = make_context()
+        uri = join(driver.get_url(context), b"redfish/v1/Systems")
+        headers = driver.make_auth_headers(**context)
+        mock_request = self.patch(driver, '_redfish_request')
+        mock_request.return_value = succeed((SAMPLE_JSON_SYSTEMS, None))
+        driver.request_memos[id(headers)] = {}
+
+        first = yield driver.redfish_request(b"GET", uri, headers)
+        second = yield driver.redfish_request(b"GET", uri, headers)
+        self.assertEqual(first, second)
+        self.assertThat(
+            mock_request, MockCalledOnceWith(b"GET", uri, headers, None))
+
+    @inlineCallbacks
+    def test_redfish_request_does_not_memoize_other_methods(self):
+        driver = RSDPodDriver()
+        context = make_context()
+        uri = join(driver.get_url(context), b"redfish/v1/Systems")
+        headers = driver.make_auth_headers(**context)
+        mock_request = self.patch(driver, '_redfish_request')
+        mock_request.side_effect = lambda *args: succeed((None, None))
+        driver.request_memos[id(headers)] = {}
+
+        yield driver.redfish_request(b"POST", uri, headers)
+        yield driver.redfish_request(b"POST", uri, headers)
+        self.assertThat(mock_request, MockCallsMatch(
+            call(b"POST", uri, headers, None),
+            call(b"POST", uri, headers, None)))
+
+    @inlineCallbacks
+    def test_redfish_request_does_not_memoize_outside_discovery(self):
+        driver = RSDPodDriver()
+        context = make_context()
+        uri = join(driver.get_url(context), b"redfish/v1/Systems")
+        headers = driver.make_auth_headers(**context)
+        mock_request = self.patch(driver, '_redfish_request')
+        mock_request.side_effect = lambda *args: succeed((None, None))
+
+        yield driver.redfish_request(b"GET", uri, headers)
+        yield driver.redfish_request(b"GET", uri, headers)
+        self.assertThat(mock_request, MockCallsMatch(
+            call(b"GET", uri, headers, None),
+            call(b"GET", uri, headers, None)))
+
+    @inlineCallbacks
+    def test__get_resources(self):
+        driver = RSDPodDriver()
+        context = make_context()
+        url = driver.get_url(context)
+        headers = driver.make_auth_headers(**context)
+        resources = [b"redfish/v1/Nodes/1", b"redfish/v1/Nodes/2"]
+        mock_redfish_request = self.patch(driver, 'redfish_request')
+        mock_redfish_request.side_effect = [
+            (SAMPLE_JSON_NODE, None),
+            (SAMPLE_JSON_SYSTEM, None),
+        ]
+        data = yield driver.get_resources(url, resources, headers)
+        self.assertEqual([SAMPLE_JSON_NODE, SAMPLE_JSON_SYSTEM], data)
+        self.assertThat(mock_redfish_request, MockCallsMatch(
+            call(b"GET", join(url, resources[0]), headers),
+            call(b"GET", join(url, resources[1]), headers)))
+
     @inlineCallbacks
     def test__list_resources(self):
         driver = RSDPodDriver()
@@ -1500,15 +1607,13 @@ class TestRSDPodDriver(MAASTestCase):
         NIC4_DATA['Links']['Oem'] = None
         mock_redfish_request.side_effect = [
             (NIC1_DATA, None),
-            (SAMPLE_JSON_PORT, None),
-            (SAMPLE_JSON_VLAN, None),
             (NIC2_DATA, None),
+            (NIC3_DATA, None),
+            (NIC4_DATA, None),
             (SAMPLE_JSON_PORT, None),
             (SAMPLE_JSON_VLAN, None),
-            (NIC3_DATA, None),
             (SAMPLE_JSON_PORT, None),
             (SAMPLE_JSON_VLAN, None),
-            (NIC4_DATA, None),
             (SAMPLE_JSON_PORT, None),
             (SAMPLE_JSON_VLAN, None),
         ]
@@ -1722,6 +1827,7 @@ class TestRSDPodDriver(MAASTestCase):
                 url, headers, remote_drives, logical_drives, targets))
         self.assertThat(mock_get_pod_hints, MockCalledOnceWith(
             mock_get_pod_resources.return_value))
+        self.assertEqual({}, driver.request_memos)
 
     def test__select_remote_master(self):
         driver = RSDPodDriver()
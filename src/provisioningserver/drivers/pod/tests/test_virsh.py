@@ -19,6 +19,7 @@ from maastesting.factory import factory
 from maastesting.matchers import (
     MockCalledOnceWith,
     MockCallsMatch,
+    MockNotCalled,
 )
 from maastesting.testcase import (
     MAASTestCase,
@@ -116,6 +117,13 @@ SAMPLE_POOLINFO_TB = dedent("""
     Available:      1.35 TiB
     """)
 
+SAMPLE_LIST = dedent("""
+     Id    Name                           State
+    ----------------------------------------------------
+     1     running-machine                running
+     -     stopped-machine                shut off
+    """)
+
 SAMPLE_IFLIST = dedent("""
     Interface  Type       Source     Model       MAC
     -------------------------------------------------------
@@ -505,6 +513,17 @@ class TestVirshSSH(MAASTestCase):
         expected = conn.get_machine_state('')
         self.assertEqual(None, expected)
 
+    def test_get_machine_states(self):
+        conn = self.configure_virshssh(SAMPLE_LIST)
+        self.assertEqual({
+            'running-machine': virsh.VirshVMState.ON,
+            'stopped-machine': virsh.VirshVMState.OFF,
+        }, conn.get_machine_states())
+
+    def test_get_machine_states_error(self):
+        conn = self.configure_virshssh('error:')
+        self.assertIsNone(conn.get_machine_states())
+
     def test_machine_mac_addresses_returns_list(self):
         macs = [factory.make_mac_address() for _ in range(2)]
         output = SAMPLE_IFLIST % (macs[0], macs[1])
@@ -755,6 +774,20 @@ class TestVirshSSH(MAASTestCase):
         self.assertFalse(discovered_machine.interfaces[1].boot)
         self.assertFalse(discovered_machine.interfaces[2].boot)
 
+    def test__get_discovered_machine_uses_given_state(self):
+        conn = self.configure_virshssh('')
+        for method in (
+                'get_machine_arch', 'get_machine_cpu_count',
+                'get_machine_memory', 'list_machine_block_devices',
+                'list_machine_mac_addresses'):
+            self.patch(virsh.VirshSSH, method).return_value = []
+        mock_get_machine_state = self.patch(
+            virsh.VirshSSH, 'get_machine_state')
+        discovered_machine = conn.get_discovered_machine(
+            factory.make_name('hostname'), state=virsh.VirshVMState.ON)
+        self.assertEqual('on', discovered_machine.power_state)
+        self.assertThat(mock_get_machine_state, MockNotCalled())
+
     def test__get_discovered_machine_handles_bad_storage_device(self):
         conn = self.configure_virshssh('')
         hostname = factory.make_name('hostname')
@@ -1248,10 +1281,155 @@ class TestVirsh(MAASTestCase):
                 domain=factory.make_string())
 
 
+class TestVirshSessionPool(MAASTestCase):
+    """Tests for `VirshSessionPool`."""
+
+    def make_pool(self, **kwargs):
+        self.now = 0
+        self.patch(virsh.VirshSSH, 'isalive').return_value = True
+        return virsh.VirshSessionPool(clock=lambda: self.now, **kwargs)
+
+    def test_acquire_logs_in(self):
+        pool = self.make_pool()
+        mock_login = self.patch(virsh.VirshSSH, 'login')
+        mock_login.return_value = True
+        poweraddr = factory.make_name('poweraddr')
+        password = factory.make_name('password')
+        conn = pool.acquire(poweraddr, password)
+        self.assertIsInstance(conn, virsh.VirshSSH)
+        self.assertThat(mock_login, MockCalledOnceWith(poweraddr, password))
+
+    def test_acquire_raises_error_on_failed_login(self):
+        pool = self.make_pool()
+        self.patch(virsh.VirshSSH, 'login').return_value = False
+        self.assertRaises(
+            virsh.VirshError, pool.acquire, factory.make_name('poweraddr'))
+
+    def test_acquire_reuses_released_session(self):
+        pool = self.make_pool()
+        mock_login = self.patch(virsh.VirshSSH, 'login')
+        mock_login.return_value = True
+        poweraddr = factory.make_name('poweraddr')
+        conn = pool.acquire(poweraddr)
+        conn.xml['machine'] = factory.make_name('xml')
+        pool.release(poweraddr, None, conn)
+        self.assertIs(conn, pool.acquire(poweraddr))
+        self.assertThat(mock_login, MockCalledOnceWith(poweraddr, None))
+        self.assertEqual({}, conn.xml)
+
+    def test_acquire_does_not_reuse_session_for_other_password(self):
+        pool = self.make_pool()
+        self.patch(virsh.VirshSSH, 'login').return_value = True
+        poweraddr = factory.make_name('poweraddr')
+        conn = pool.acquire(poweraddr)
+        pool.release(poweraddr, None, conn)
+        self.assertIsNot(
+            conn, pool.acquire(poweraddr, factory.make_name('password')))
+
+    def test_acquire_does_not_reuse_dead_session(self):
+        pool = self.make_pool()
+        self.patch(virsh.VirshSSH, 'login').return_value = True
+        poweraddr = factory.make_name('poweraddr')
+        conn = pool.acquire(poweraddr)
+        pool.release(poweraddr, None, conn)
+        virsh.VirshSSH.isalive.return_value = False
+        mock_close = self.patch(conn, 'close')
+        self.assertIsNot(conn, pool.acquire(poweraddr))
+        self.assertThat(mock_close, MockCalledOnceWith())
+
+    def test_evicts_idle_sessions(self):
+        pool = self.make_pool(idle_timeout=60)
+        self.patch(virsh.VirshSSH, 'login').return_value = True
+        poweraddr = factory.make_name('poweraddr')
+        conn = pool.acquire(poweraddr)
+        pool.release(poweraddr, None, conn)
+        mock_close = self.patch(conn, 'close')
+        self.now += 61
+        self.assertIsNot(conn, pool.acquire(poweraddr))
+        self.assertThat(mock_close, MockCalledOnceWith())
+        self.assertEqual({}, pool.idle)
+
+    def test_session_releases_session(self):
+        pool = self.make_pool()
+        self.patch(virsh.VirshSSH, 'login').return_value = True
+        poweraddr = factory.make_name('poweraddr')
+        with pool.session(poweraddr) as conn:
+            pass
+        self.assertIs(conn, pool.acquire(poweraddr))
+
+    def test_session_closes_session_on_error(self):
+        pool = self.make_pool()
+        self.patch(virsh.VirshSSH, 'login').return_value = True
+        mock_close = self.patch(virsh.VirshSSH, 'close')
+        poweraddr = factory.make_name('poweraddr')
+        with ExpectedException(ZeroDivisionError):
+            with pool.session(poweraddr):
+                0 / 0
+        self.assertThat(mock_close, MockCalledOnceWith())
+        self.assertEqual({}, pool.idle)
+
+    def test_get_machine_states_lists_once_within_max_age(self):
+        pool = self.make_pool(max_states_age=10)
+        self.patch(virsh.VirshSSH, 'login').return_value = True
+        mock_run = self.patch(virsh.VirshSSH, 'run')
+        mock_run.return_value = SAMPLE_LIST
+        poweraddr = factory.make_name('poweraddr')
+        self.assertEqual(
+            virsh.VirshVMState.ON,
+            pool.get_machine_state(poweraddr, 'running-machine'))
+        self.now += 9
+        self.assertEqual(
+            virsh.VirshVMState.OFF,
+            pool.get_machine_state(poweraddr, 'stopped-machine'))
+        self.assertThat(mock_run, MockCalledOnceWith(['list', '--all']))
+        self.now += 1
+        pool.get_machine_state(poweraddr, 'running-machine')
+        self.assertThat(mock_run, MockCallsMatch(
+            call(['list', '--all']), call(['list', '--all'])))
+
+    def test_get_machine_states_raises_error_on_failure(self):
+        pool = self.make_pool()
+        self.patch(virsh.VirshSSH, 'login').return_value = True
+        self.patch(virsh.VirshSSH, 'get_machine_states').return_value = None
+        self.assertRaises(
+            virsh.VirshError, pool.get_machine_states,
+            factory.make_name('poweraddr'))
+
+    def test_get_machine_state_queries_unlisted_machine(self):
+        pool = self.make_pool()
+        self.patch(virsh.VirshSSH, 'login').return_value = True
+        self.patch(virsh.VirshSSH, 'get_machine_states').return_value = {}
+        mock_get_machine_state = self.patch(
+            virsh.VirshSSH, 'get_machine_state')
+        mock_get_machine_state.return_value = virsh.VirshVMState.ON
+        machine = factory.make_name('machine')
+        self.assertEqual(
+            virsh.VirshVMState.ON,
+            pool.get_machine_state(factory.make_name('poweraddr'), machine))
+        self.assertThat(mock_get_machine_state, MockCalledOnceWith(machine))
+
+    def test_forget_machine_states(self):
+        pool = self.make_pool()
+        self.patch(virsh.VirshSSH, 'login').return_value = True
+        mock_get_machine_states = self.patch(
+            virsh.VirshSSH, 'get_machine_states')
+        mock_get_machine_states.return_value = {}
+        poweraddr = factory.make_name('poweraddr')
+        pool.get_machine_states(poweraddr)
+        pool.forget_machine_states(poweraddr)
+        pool.get_machine_states(poweraddr)
+        self.assertThat(
+            mock_get_machine_states, MockCallsMatch(call(), call()))
+
+
 class TestVirshPodDriver(MAASTestCase):
 
     run_tests_with = MAASTwistedRunTest.make_factory(timeout=5)
 
+    def setUp(self):
+        super(TestVirshPodDriver, self).setUp()
+        self.patch(virsh, 'virsh_sessions', virsh.VirshSessionPool())
+
     def test_missing_packages(self):
         mock = self.patch(has_command_available)
         mock.return_value = False
@@ -1407,11 +1585,11 @@ class TestVirshPodDriver(MAASTestCase):
         driver = VirshPodDriver()
         mock_login = self.patch(virsh.VirshSSH, 'login')
         mock_login.return_value = True
-        mock_state = self.patch(virsh.VirshSSH, 'get_machine_state')
-        mock_state.return_value = virsh.VirshVMState.ON
-
         power_address = factory.make_name('power_address')
         power_id = factory.make_name('power_id')
+        mock_states = self.patch(virsh.VirshSSH, 'get_machine_states')
+        mock_states.return_value = {power_id: virsh.VirshVMState.ON}
+
         state = yield driver.power_state_virsh(power_address, power_id)
         self.assertEqual('on', state)
 
@@ -1420,11 +1598,11 @@ class TestVirshPodDriver(MAASTestCase):
         driver = VirshPodDriver()
         mock_login = self.patch(virsh.VirshSSH, 'login')
         mock_login.return_value = True
-        mock_state = self.patch(virsh.VirshSSH, 'get_machine_state')
-        mock_state.return_value = virsh.VirshVMState.OFF
-
         power_address = factory.make_name('power_address')
         power_id = factory.make_name('power_id')
+        mock_states = self.patch(virsh.VirshSSH, 'get_machine_states')
+        mock_states.return_value = {power_id: virsh.VirshVMState.OFF}
+
         state = yield driver.power_state_virsh(power_address, power_id)
         self.assertEqual('off', state)
 
@@ -1433,6 +1611,7 @@ class TestVirshPodDriver(MAASTestCase):
         driver = VirshPodDriver()
         mock_login = self.patch(virsh.VirshSSH, 'login')
         mock_login.return_value = True
+        self.patch(virsh.VirshSSH, 'get_machine_states').return_value = {}
         mock_state = self.patch(virsh.VirshSSH, 'get_machine_state')
         mock_state.return_value = None
 
@@ -1447,15 +1626,48 @@ class TestVirshPodDriver(MAASTestCase):
         driver = VirshPodDriver()
         mock_login = self.patch(virsh.VirshSSH, 'login')
         mock_login.return_value = True
-        mock_state = self.patch(virsh.VirshSSH, 'get_machine_state')
-        mock_state.return_value = 'unknown'
-
         power_address = factory.make_name('power_address')
         power_id = factory.make_name('power_id')
+        mock_states = self.patch(virsh.VirshSSH, 'get_machine_states')
+        mock_states.return_value = {power_id: 'unknown'}
+
         with ExpectedException(virsh.VirshError):
             yield driver.power_state_virsh(
                 power_address, power_id)
 
+    @inlineCallbacks
+    def test_power_state_lists_states_once_for_host(self):
+        driver = VirshPodDriver()
+        mock_login = self.patch(virsh.VirshSSH, 'login')
+        mock_login.return_value = True
+        mock_states = self.patch(virsh.VirshSSH, 'get_machine_states')
+        mock_states.return_value = {
+            'running-machine': virsh.VirshVMState.ON,
+            'stopped-machine': virsh.VirshVMState.OFF,
+        }
+
+        power_address = factory.make_name('power_address')
+        on = yield driver.power_state_virsh(power_address, 'running-machine')
+        off = yield driver.power_state_virsh(power_address, 'stopped-machine')
+        self.assertEqual(('on', 'off'), (on, off))
+        self.assertThat(mock_login, MockCalledOnceWith(power_address, None))
+        self.assertThat(mock_states, MockCalledOnceWith())
+
+    @inlineCallbacks
+    def test_power_control_forgets_listed_states(self):
+        driver = VirshPodDriver()
+        self.patch(virsh.VirshSSH, 'login').return_value = True
+        mock_state = self.patch(virsh.VirshSSH, 'get_machine_state')
+        mock_state.return_value = virsh.VirshVMState.OFF
+        self.patch(virsh.VirshSSH, 'poweron')
+        mock_forget = self.patch(
+            virsh.virsh_sessions, 'forget_machine_states')
+
+        power_address = factory.make_name('power_address')
+        power_id = factory.make_name('power_id')
+        yield driver.power_control_virsh(power_address, power_id, 'on')
+        self.assertThat(mock_forget, MockCalledOnceWith(power_address, None))
+
     @inlineCallbacks
     def test_discover_errors_on_failed_login(self):
         driver = VirshPodDriver()
@@ -1509,6 +1721,12 @@ class TestVirshPodDriver(MAASTestCase):
         mock_get_pod_hints = self.patch(
             virsh.VirshSSH, 'get_pod_hints')
         mock_list_machines = self.patch(virsh.VirshSSH, 'list_machines')
+        mock_get_machine_states = self.patch(
+            virsh.VirshSSH, 'get_machine_states')
+        mock_get_machine_states.return_value = {
+            machines[0]: virsh.VirshVMState.ON,
+            machines[1]: virsh.VirshVMState.OFF,
+        }
         mock_get_discovered_machine = self.patch(
             virsh.VirshSSH, 'get_discovered_machine')
         mock_list_machines.return_value = machines
@@ -1521,11 +1739,13 @@ class TestVirshPodDriver(MAASTestCase):
             mock_get_pod_hints, MockCalledOnceWith())
         self.expectThat(
             mock_list_machines, MockCalledOnceWith())
+        self.expectThat(
+            mock_get_machine_states, MockCalledOnceWith())
         self.expectThat(
             mock_get_discovered_machine, MockCallsMatch(
-                call(machines[0]),
-                call(machines[1]),
-                call(machines[2])))
+                call(machines[0], state=virsh.VirshVMState.ON),
+                call(machines[1], state=virsh.VirshVMState.OFF),
+                call(machines[2], state=None)))
         self.expectThat(['virtual'], Equals(discovered_pod.tags))
         self.expectThat(driver.default_storage_pool, Equals('default'))
 
@@ -8,9 +8,13 @@ __all__ = [
     'VirshPodDriver',
     ]
 
+from collections import defaultdict
+from contextlib import contextmanager
 import string
 from tempfile import NamedTemporaryFile
 from textwrap import dedent
+import threading
+import time
 import uuid
 
 from lxml import etree
@@ -126,6 +130,13 @@ REQUIRED_PACKAGES = [["virsh", "libvirt-clients"],
                      ["virt-login-shell", "libvirt-clients"]]
 
 
+# Seconds an unused virsh session is kept open before it is logged out.
+SESSION_IDLE_TIMEOUT = 300
+
+# Seconds the VM states listed from a host are used to answer power queries.
+MACHINE_STATES_MAX_AGE = 10
+
+
 class VirshVMState:
     OFF = "shut off"
     ON = "running"
@@ -352,6 +363,21 @@ class VirshSSH(pexpect.spawn):
             return None
         return state
 
+    def get_machine_states(self):
+        """Gets the states of all VMs, as a mapping of name to state."""
+        output = self.run(['list', '--all']).strip()
+        if output.startswith('error:'):
+            return None
+        states = {}
+        # Skip the two header lines; states such as "shut off" contain
+        # spaces, so only split off the ID and the name.
+        for line in output.splitlines()[2:]:
+            values = line.split(None, 2)
+            if len(values) == 3:
+                _, machine, state = values
+                states[machine] = state
+        return states
+
     def list_machine_mac_addresses(self, machine):
         """Gets list of mac addressess assigned to the VM."""
         output = self.run(['domiflist', machine]).strip()
@@ -513,8 +539,11 @@ class VirshSSH(pexpect.spawn):
             self.get_pod_available_local_storage())
         return discovered_pod_hints
 
-    def get_discovered_machine(self, machine, request=None):
-        """Gets the discovered machine."""
+    def get_discovered_machine(self, machine, request=None, state=None):
+        """Gets the discovered machine.
+
+        :param state: The state of the VM, if already known.
+        """
         # Discovered machine.
         discovered_machine = DiscoveredMachine(
             architecture="", cores=0, cpu_speed=0, memory=0,
@@ -523,7 +552,8 @@ class VirshSSH(pexpect.spawn):
         discovered_machine.architecture = self.get_machine_arch(machine)
         discovered_machine.cores = self.get_machine_cpu_count(machine)
         discovered_machine.memory = self.get_machine_memory(machine)
-        state = self.get_machine_state(machine)
+        if state is None:
+            state = self.get_machine_state(machine)
         discovered_machine.power_state = VM_STATE_TO_POWER_STATE[state]
         discovered_machine.power_parameters = {
             'power_id': machine,
@@ -826,10 +856,163 @@ class VirshSSH(pexpect.spawn):
             'undefine', domain, '--remove-all-storage', '--managed-save'])
 
 
+class VirshSessionPool:
+    """Logged in `VirshSSH` sessions, kept open for reuse.
+
+    Sessions are pooled per power address and password, and each is used by
+    one thread at a time. Sessions unused for `idle_timeout` seconds are
+    logged out.
+
+    The states of all VMs on a host are listed together and then answer
+    power queries for that host for `max_states_age` seconds, so polling
+    many VMs on one host costs a single `virsh list --all`.
+    """
+
+    def __init__(
+            self, idle_timeout=SESSION_IDLE_TIMEOUT,
+            max_states_age=MACHINE_STATES_MAX_AGE, clock=time.monotonic):
+        super(VirshSessionPool, self).__init__()
+        self.idle_timeout = idle_timeout
+        self.max_states_age = max_states_age
+        self.clock = clock
+        self.lock = threading.Lock()
+        # Map of (poweraddr, password) to a list of (session, last used).
+        self.idle = defaultdict(list)
+        # Map of (poweraddr, password) to (states, time listed).
+        self.states = {}
+        # Map of (poweraddr, password) to the lock held while listing.
+        self.listing = defaultdict(threading.Lock)
+
+    def _evict_idle(self):
+        """Remove and return sessions that have been idle too long.
+
+        Must be called with `lock` held.
+        """
+        evicted = []
+        cutoff = self.clock() - self.idle_timeout
+        for key, sessions in list(self.idle.items()):
+            evicted.extend(
+                conn for conn, last_used in sessions if last_used < cutoff)
+            sessions[:] = [
+                (conn, last_used) for conn, last_used in sessions
+                if last_used >= cutoff
+            ]
+            if len(sessions) == 0:
+                del self.idle[key]
+        return evicted
+
+    def _close(self, sessions):
+        for conn in sessions:
+            conn.close()
+
+    def acquire(self, poweraddr, password=None):
+        """Return a logged in session, reusing an idle one if possible.
+
+        :raise VirshError: If logging in to virsh fails.
+        """
+        key = poweraddr, password
+        conn = None
+        with self.lock:
+            evicted = self._evict_idle()
+            sessions = self.idle.get(key, [])
+            while conn is None and len(sessions) > 0:
+                conn, _ = sessions.pop()
+                if not conn.isalive():
+                    evicted.append(conn)
+                    conn = None
+        self._close(evicted)
+        if conn is None:
+            conn = VirshSSH()
+            logged_in = conn.login(poweraddr, password)
+            if not logged_in:
+                raise VirshError('Failed to login to virsh console.')
+        return conn
+
+    def release(self, poweraddr, password, conn):
+        """Return `conn`, acquired for `poweraddr`, to the pool."""
+        # Sessions now outlive a single operation, so don't let the XML
+        # cached by this one be used by the next.
+        conn.xml.clear()
+        with self.lock:
+            self.idle[poweraddr, password].append((conn, self.clock()))
+            evicted = self._evict_idle()
+        self._close(evicted)
+
+    @contextmanager
+    def session(self, poweraddr, password=None):
+        """Context manager for a pooled session.
+
+        The session is closed instead of being returned to the pool if an
+        exception is raised while it is in use.
+        """
+        conn = self.acquire(poweraddr, password)
+        try:
+            yield conn
+        except:
+            conn.close()
+            raise
+        else:
+            self.release(poweraddr, password, conn)
+
+    def get_machine_states(self, poweraddr, password=None):
+        """Return the states of all VMs on `poweraddr`.
+
+        States listed less than `max_states_age` seconds ago are reused.
+
+        :raise VirshError: If the VMs cannot be listed.
+        """
+        key = poweraddr, password
+        with self.lock:
+            listing = self.listing[key]
+        # Concurrent queries to the same host wait for one listing.
+        with listing:
+            states, listed = self.states.get(key, (None, None))
+            if states is None or self.clock() - listed >= self.max_states_age:
+                with self.session(poweraddr, password) as conn:
+                    states = conn.get_machine_states()
+                if states is None:
+                    raise VirshError('Failed to list domains.')
+                self.states[key] = states, self.clock()
+            return states
+
+    def get_machine_state(self, poweraddr, machine, password=None):
+        """Return the state of `machine` on `poweraddr`, or `None`.
+
+        The state is taken from the listed states of all VMs on the host;
+        a VM missing from them, perhaps because it was created since, is
+        queried on its own.
+        """
+        states = self.get_machine_states(poweraddr, password)
+        if machine in states:
+            return states[machine]
+        with self.session(poweraddr, password) as conn:
+            return conn.get_machine_state(machine)
+
+    def forget_machine_states(self, poweraddr, password=None):
+        """Forget the listed states of VMs on `poweraddr`."""
+        self.states.pop((poweraddr, password), None)
+
+    def close(self):
+        """Close all idle sessions."""
+        with self.lock:
+            evicted = [
+                conn for sessions in self.idle.values()
+                for conn, _ in sessions
+            ]
+            self.idle.clear()
+            self.states.clear()
+        self._close(evicted)
+
+
+virsh_sessions = VirshSessionPool()
+
+
 class VirshPodDriver(PodDriver):
 
     name = 'virsh'
     description = "Virsh (virtual systems)"
+    # Each query opens a session to a hypervisor shared by many nodes.
+    max_query_concurrency = 2
     settings = [
         make_setting_field(
             'power_address', "Virsh address", required=True),
@@ -854,7 +1037,6 @@ class VirshPodDriver(PodDriver):
                 missing_packages.add(package)
         return list(missing_packages)
 
-    @inlineCallbacks
     def power_control_virsh(
             self, power_address, power_id, power_change,
             power_pass=None, **kwargs):
@@ -865,25 +1047,31 @@ class VirshPodDriver(PodDriver):
         if power_pass == '':
             power_pass = None
 
-        conn = VirshSSH()
-        logged_in = yield deferToThread(conn.login, power_address, power_pass)
-        if not logged_in:
-            raise VirshError('Failed to login to virsh console.')
-
-        state = yield deferToThread(conn.get_machine_state, power_id)
-        if state is None:
-            raise VirshError('%s: Failed to get power state' % power_id)
-
-        if state == VirshVMState.OFF:
-            if power_change == 'on':
-                powered_on = yield deferToThread(conn.poweron, power_id)
-                if powered_on is False:
-                    raise VirshError('%s: Failed to power on VM' % power_id)
-        elif state == VirshVMState.ON:
-            if power_change == 'off':
-                powered_off = yield deferToThread(conn.poweroff, power_id)
-                if powered_off is False:
-                    raise VirshError('%s: Failed to power off VM' % power_id)
+        return deferToThread(
+            self._power_control_virsh, power_address, power_id,
+            power_change, power_pass)
+
+    def _power_control_virsh(
+            self, power_address, power_id, power_change, power_pass):
+        with virsh_sessions.session(power_address, power_pass) as conn:
+            state = conn.get_machine_state(power_id)
+            if state is None:
+                raise VirshError('%s: Failed to get power state' % power_id)
+
+            if state == VirshVMState.OFF:
+                if power_change == 'on':
+                    powered_on = conn.poweron(power_id)
+                    if powered_on is False:
+                        raise VirshError(
+                            '%s: Failed to power on VM' % power_id)
+            elif state == VirshVMState.ON:
+                if power_change == 'off':
+                    powered_off = conn.poweroff(power_id)
+                    if powered_off is False:
+                        raise VirshError(
+                            '%s: Failed to power off VM' % power_id)
+        # The listed states no longer reflect this VM.
+        virsh_sessions.forget_machine_states(power_address, power_pass)
 
     @inlineCallbacks
     def power_state_virsh(
@@ -895,12 +1083,9 @@ class VirshPodDriver(PodDriver):
         if power_pass == '':
             power_pass = None
 
-        conn = VirshSSH()
-        logged_in = yield deferToThread(conn.login, power_address, power_pass)
-        if not logged_in:
-            raise VirshError('Failed to login to virsh console.')
-
-        state = yield deferToThread(conn.get_machine_state, power_id)
+        state = yield deferToThread(
+            virsh_sessions.get_machine_state, power_address, power_id,
+            power_pass)
         if state is None:
             raise VirshError('Failed to get domain: %s' % power_id)
 
@@ -926,16 +1111,22 @@ class VirshPodDriver(PodDriver):
 
     @inlineCallbacks
     def get_virsh_connection(self, context):
-        """Connect and return the virsh connection."""
+        """Connect and return the virsh connection.
+
+        The connection is taken from `virsh_sessions`; give it back with
+        `release_virsh_connection` once finished with it.
+        """
         power_address = context.get('power_address')
         power_pass = context.get('power_pass')
-        # Login to Virsh console.
-        conn = VirshSSH()
-        logged_in = yield deferToThread(conn.login, power_address, power_pass)
-        if not logged_in:
-            raise VirshError('Failed to login to virsh console.')
+        conn = yield deferToThread(
+            virsh_sessions.acquire, power_address, power_pass)
         return conn
 
+    def release_virsh_connection(self, context, conn):
+        """Return `conn` to `virsh_sessions` for reuse."""
+        virsh_sessions.release(
+            context.get('power_address'), context.get('power_pass'), conn)
+
     @inlineCallbacks
     def discover(self, system_id, context):
         """Discover all resources.
@@ -943,18 +1134,26 @@ class VirshPodDriver(PodDriver):
         Returns a defer to a DiscoveredPod object.
         """
         conn = yield self.get_virsh_connection(context)
+        try:
+            discovered_pod = yield deferToThread(
+                self._discover, conn, context)
+        except:
+            conn.close()
+            raise
+        yield deferToThread(self.release_virsh_connection, context, conn)
+        return discovered_pod
 
+    def _discover(self, conn, context):
         # Check that we have at least one storage pool.  If not, create it.
-        pools = yield deferToThread(conn.list_pools)
+        pools = conn.list_pools()
         if not len(pools):
-            yield deferToThread(conn.create_storage_pool)
+            conn.create_storage_pool()
 
         # Check and set default storage pool.
         self.default_storage_pool = context.get('default_storage_pool')
         if self.default_storage_pool:
             try:
-                yield deferToThread(
-                    conn.list_pools, self.default_storage_pool)
+                conn.list_pools(self.default_storage_pool)
             except VirshError:
                 # Set the default_storage_pool to None since
                 # one wasn't found and raise the error.
@@ -962,17 +1161,19 @@ class VirshPodDriver(PodDriver):
                 raise
 
         # Discover pod resources.
-        discovered_pod = yield deferToThread(conn.get_pod_resources)
+        discovered_pod = conn.get_pod_resources()
 
         # Discovered pod hints.
-        discovered_pod.hints = yield deferToThread(conn.get_pod_hints)
+        discovered_pod.hints = conn.get_pod_hints()
 
-        # Discover VMs.
+        # Discover VMs. The states of all VMs are listed at once rather
+        # than queried for each VM.
         machines = []
-        virtual_machines = yield deferToThread(conn.list_machines)
+        states = conn.get_machine_states() or {}
+        virtual_machines = conn.list_machines()
         for vm in virtual_machines:
-            discovered_machine = yield deferToThread(
-                conn.get_discovered_machine, vm)
+            discovered_machine = conn.get_discovered_machine(
+                vm, state=states.get(vm))
             if discovered_machine is not None:
                 discovered_machine.cpu_speed = discovered_pod.cpu_speed
                 machines.append(discovered_machine)
@@ -988,17 +1189,27 @@ class VirshPodDriver(PodDriver):
     def compose(self, system_id, context, request):
         """Compose machine."""
         conn = yield self.get_virsh_connection(context)
-        created_machine = yield deferToThread(
-            conn.create_domain, request, self.default_storage_pool)
-        hints = yield deferToThread(conn.get_pod_hints)
+        try:
+            created_machine = yield deferToThread(
+                conn.create_domain, request, self.default_storage_pool)
+            hints = yield deferToThread(conn.get_pod_hints)
+        except:
+            conn.close()
+            raise
+        yield deferToThread(self.release_virsh_connection, context, conn)
         return created_machine, hints
 
     @inlineCallbacks
     def decompose(self, system_id, context):
         """Decompose machine."""
         conn = yield self.get_virsh_connection(context)
-        yield deferToThread(conn.delete_domain, context['power_id'])
-        hints = yield deferToThread(conn.get_pod_hints)
+        try:
+            yield deferToThread(conn.delete_domain, context['power_id'])
+            hints = yield deferToThread(conn.get_pod_hints)
+        except:
+            conn.close()
+            raise
+        yield deferToThread(self.release_virsh_connection, context, conn)
         return hints
 
 
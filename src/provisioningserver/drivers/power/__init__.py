@@ -152,6 +152,10 @@ class PowerActionError(PowerError):
 class PowerDriverBase(metaclass=ABCMeta):
     """Base driver for a power driver."""
 
+    # The most power queries that the rack controller will make at once
+    # using this driver.
+    max_query_concurrency = 5
+
     def __init__(self):
         super(PowerDriverBase, self).__init__()
         validate(
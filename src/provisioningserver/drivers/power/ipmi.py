@@ -191,6 +191,8 @@ class IPMIPowerDriver(PowerDriver):
 
     name = 'ipmi'
     description = "IPMI"
+    # Every node has its own BMC, so many can be queried at once.
+    max_query_concurrency = 20
     settings = [
         make_setting_field(
             'power_driver', "Power driver", field_type='choice',
@@ -34,6 +34,8 @@ class VirshPowerDriver(PowerDriver):
 
     name = 'virsh'
     description = "Virsh (virtual systems)"
+    # Each query opens a session to a hypervisor shared by many nodes.
+    max_query_concurrency = 2
     settings = [
         make_setting_field('power_address', "Power address", required=True),
         make_setting_field(
@@ -32,6 +32,7 @@ from provisioningserver.rpc.region import (
     RegisterEventType,
     SendEvent,
     SendEventMACAddress,
+    SendEvents,
 )
 from provisioningserver.utils.env import get_maas_id
 from provisioningserver.utils.twisted import (
@@ -42,9 +43,13 @@ from provisioningserver.utils.twisted import (
     suppress,
 )
 from twisted.internet.defer import (
+    Deferred,
+    inlineCallbacks,
     maybeDeferred,
     succeed,
 )
+from twisted.protocols.amp import UnhandledCommand
+from twisted.python.failure import Failure
 
 
 maaslog = get_maas_logger("events")
@@ -53,6 +58,9 @@ log = LegacyLogger()
 # AUDIT event logging level
 AUDIT = 0
 
+# Maximum number of events to send to the region in one `SendEvents` call.
+EVENTS_BATCH_SIZE = 500
+
 
 class EVENT_TYPES:
     # Power-related events.
@@ -402,12 +410,20 @@ class NodeEventHub:
 
     This automatically ensures that the event type is registered before
     sending logs to the region.
+
+    An event is sent at once when no others are being sent. Events logged
+    while others are being sent are held, then sent together in a single
+    `SendEvents` call, so that a flood of events costs the region only a
+    few calls.
     """
 
     def __init__(self):
         super(NodeEventHub, self).__init__()
         self._types_registering = dict()
         self._types_registered = set()
+        # List of (event, Deferred) waiting to be sent.
+        self._pending = []
+        self._sending = False
 
     @asynchronous
     def registerEventType(self, event_type):
@@ -480,6 +496,60 @@ class NodeEventHub:
             self._types_registered.discard(event_type)
         return failure
 
+    def _send(self, event):
+        """Send `event` to the region, with any others that are pending.
+
+        :param event: A dict of arguments for `SendEvents`.
+        :return: :class:`Deferred` that fires once the event has been sent.
+        """
+        d = Deferred()
+        self._pending.append((event, d))
+        if not self._sending:
+            self._flush()
+        return d
+
+    def _flush(self):
+        """Send pending events until there are none left."""
+        batch = self._pending[:EVENTS_BATCH_SIZE]
+        del self._pending[:EVENTS_BATCH_SIZE]
+        if len(batch) == 0:
+            self._sending = False
+        else:
+            self._sending = True
+            self._sendBatch(batch).addBoth(callOut, self._flush)
+
+    @inlineCallbacks
+    def _sendBatch(self, batch):
+        """Send a `batch` of events, firing each event's `Deferred`.
+
+        This never fails; failures are passed to the events' `Deferred`s.
+        """
+        try:
+            client = getRegionClient()
+            yield client(SendEvents, events=[event for event, _ in batch])
+        except UnhandledCommand:
+            # Region has not been upgraded to support the new call, so send
+            # the events one at a time.
+            for event, d in batch:
+                yield self._sendOne(client, event).chainDeferred(d)
+        except Exception:
+            failure = Failure()
+            for _, d in batch:
+                d.errback(failure)
+        else:
+            for _, d in batch:
+                d.callback(None)
+
+    def _sendOne(self, client, event):
+        """Send `event` with `SendEvent` or `SendEventMACAddress`."""
+        event = event.copy()
+        if event.get("system_id") is not None:
+            del event["mac_address"]
+            return client(SendEvent, **event)
+        else:
+            del event["system_id"]
+            return client(SendEventMACAddress, **event)
+
     @asynchronous
     def logByID(self, event_type, system_id, description=""):
         """Send the given node event to the region.
@@ -494,10 +564,9 @@ class NodeEventHub:
         :type description: unicode
         """
         def send(_):
-            client = getRegionClient()
-            return client(
-                SendEvent, system_id=system_id, type_name=event_type,
-                description=description)
+            return self._send({
+                "system_id": system_id, "mac_address": None,
+                "type_name": event_type, "description": description})
 
         d = self.ensureEventTypeRegistered(event_type).addCallback(send)
         d.addErrback(self._checkEventTypeRegistered, event_type)
@@ -517,10 +586,9 @@ class NodeEventHub:
         :type description: unicode
         """
         def send(_):
-            client = getRegionClient()
-            return client(
-                SendEventMACAddress, mac_address=mac_address,
-                type_name=event_type, description=description)
+            return self._send({
+                "system_id": None, "mac_address": mac_address,
+                "type_name": event_type, "description": description})
 
         d = self.ensureEventTypeRegistered(event_type).addCallback(send)
         d.addErrback(self._checkEventTypeRegistered, event_type)
@@ -176,6 +176,15 @@ class ProvisioningServiceMaker:
         ntp_service.setName("ntp")
         return ntp_service
 
+    def _makeTagEvaluationService(self):
+        from provisioningserver.rackdservices.tag_evaluation import (
+            TagEvaluationService)
+        with ClusterConfiguration.open() as config:
+            tag_processes = config.tag_processes
+        tag_evaluation_service = TagEvaluationService(tag_processes)
+        tag_evaluation_service.setName("tag_evaluation")
+        return tag_evaluation_service
+
     def _makeServices(self, tftp_root, tftp_port, clock=reactor):
         # Several services need to make use of the RPC service.
         rpc_service = self._makeRPCService()
@@ -189,6 +198,7 @@ class ProvisioningServiceMaker:
         yield self._makeServiceMonitorService(rpc_service)
         yield self._makeImageDownloadService(rpc_service, tftp_root)
         yield self._makeNetworkTimeProtocolService(rpc_service)
+        yield self._makeTagEvaluationService()
         # The following are network-accessible services.
         yield self._makeImageService(tftp_root)
         yield self._makeTFTPService(tftp_root, tftp_port, rpc_service)
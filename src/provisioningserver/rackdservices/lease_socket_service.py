@@ -14,7 +14,10 @@ import os
 from provisioningserver.logger import get_maas_logger
 from provisioningserver.path import get_data_path
 from provisioningserver.rpc.exceptions import NoConnectionsAvailable
-from provisioningserver.rpc.region import UpdateLease
+from provisioningserver.rpc.region import (
+    UpdateLease,
+    UpdateLeases,
+)
 from provisioningserver.utils.twisted import (
     pause,
     retries,
@@ -24,8 +27,12 @@ from twisted.internet import (
     reactor,
     task,
 )
-from twisted.internet.defer import inlineCallbacks
+from twisted.internet.defer import (
+    inlineCallbacks,
+    returnValue,
+)
 from twisted.internet.protocol import DatagramProtocol
+from twisted.protocols.amp import UnhandledCommand
 
 
 maaslog = get_maas_logger("lease_socket_service")
@@ -42,6 +49,10 @@ class LeaseSocketService(Service, DatagramProtocol):
     # None, or a Deferred that will fire when the processor exits.
     done = None
 
+    # The most notifications to send to the region in one call. Notifications
+    # received while the processor is idle are sent together, every 0.1s.
+    batch_size = 100
+
     def __init__(self, client_service, reactor):
         self.client_service = client_service
         self.reactor = reactor
@@ -92,32 +103,61 @@ class LeaseSocketService(Service, DatagramProtocol):
         self.notifications.append(notification)
 
     def processNotifications(self, clock=reactor):
-        """Process all notifications."""
-        def gen_notifications(notifications):
+        """Process all notifications, in batches of up to `batch_size`."""
+        def gen_batches(notifications):
             while len(notifications) != 0:
-                yield notifications.popleft()
+                batch = []
+                while (len(notifications) != 0 and
+                       len(batch) < self.batch_size):
+                    batch.append(notifications.popleft())
+                yield batch
         return task.coiterate(
-            self.processNotification(notification, clock=clock)
-            for notification in gen_notifications(self.notifications))
+            self.processNotificationBatch(batch, clock=clock)
+            for batch in gen_batches(self.notifications))
 
     @inlineCallbacks
-    def processNotification(self, notification, clock=reactor):
-        """Send a notification to the region."""
-        client = None
+    def getClient(self, clock=reactor):
+        """Return a client to the region, or `None` if there is none."""
         for elapsed, remaining, wait in retries(30, 10, clock):
             try:
                 client = yield self.client_service.getClientNow()
-                break
             except NoConnectionsAvailable:
-                yield pause(wait, self.clock)
+                yield pause(wait, clock)
+            else:
+                returnValue(client)
         else:
             maaslog.error(
                 "Can't send DHCP lease information, no RPC "
                 "connection to region.")
+            returnValue(None)
+
+    @inlineCallbacks
+    def processNotificationBatch(self, notifications, clock=reactor):
+        """Send a batch of notifications to the region in one call."""
+        client = yield self.getClient(clock)
+        if client is None:
             return
+        try:
+            yield client(
+                UpdateLeases, cluster_uuid=client.localIdent,
+                updates=notifications)
+        except UnhandledCommand:
+            # Region has not been upgraded to support the new call, so send
+            # the notifications one at a time, in order.
+            for notification in notifications:
+                yield self.sendNotification(client, notification)
+
+    @inlineCallbacks
+    def processNotification(self, notification, clock=reactor):
+        """Send a notification to the region."""
+        client = yield self.getClient(clock)
+        if client is not None:
+            yield self.sendNotification(client, notification)
 
+    def sendNotification(self, client, notification):
+        """Send a notification to the region using `client`."""
         # Notification contains all the required data except for the cluster
         # UUID. Add that into the notification and send the information to
         # the region for processing.
         notification["cluster_uuid"] = client.localIdent
-        yield client(UpdateLease, **notification)
+        return client(UpdateLease, **notification)
@@ -19,10 +19,18 @@ from provisioningserver.rpc.exceptions import (
     NoConnectionsAvailable,
     NoSuchCluster,
 )
-from provisioningserver.rpc.power import query_all_nodes
+from provisioningserver.rpc.power import (
+    PowerQueryScheduler,
+    PowerStateReporter,
+    query_all_nodes,
+)
 from provisioningserver.rpc.region import ListNodePowerParameters
 from twisted.application.internet import TimerService
-from twisted.internet.defer import inlineCallbacks
+from twisted.internet import reactor
+from twisted.internet.defer import (
+    DeferredList,
+    inlineCallbacks,
+)
 from twisted.internet.error import ConnectionDone
 
 
@@ -34,13 +42,17 @@ class NodePowerMonitorService(TimerService, object):
     """Service to monitor the power status of all nodes in this cluster."""
 
     check_interval = timedelta(seconds=15).total_seconds()
-    max_nodes_at_once = 5
 
     def __init__(self, clock=None):
         # Call self.query_nodes() every self.check_interval.
         super(NodePowerMonitorService, self).__init__(
             self.check_interval, self.try_query_nodes)
         self.clock = clock
+        if clock is None:
+            clock = reactor
+        self.reporter = PowerStateReporter(clock=clock)
+        self.scheduler = PowerQueryScheduler(
+            self.check_interval, clock, reporter=self.reporter)
 
     def try_query_nodes(self):
         """Attempt to query nodes' power states.
@@ -61,17 +73,36 @@ class NodePowerMonitorService(TimerService, object):
     @inlineCallbacks
     def query_nodes(self, client):
         # Get the nodes' power parameters from the region. Keep getting more
-        # power parameters until the region returns an empty list.
-        while True:
-            response = yield client(
-                ListNodePowerParameters, uuid=client.localIdent)
-            power_parameters = response['nodes']
-            if len(power_parameters) > 0:
-                yield query_all_nodes(
-                    power_parameters, max_concurrency=self.max_nodes_at_once,
-                    clock=self.clock)
-            else:
-                break
+        # power parameters until the region returns an empty list. Queries
+        # for each batch are started without waiting for earlier batches to
+        # finish; the scheduler limits how many run at once.
+        queries = []
+        try:
+            while True:
+                response = yield client(
+                    ListNodePowerParameters, uuid=client.localIdent)
+                power_parameters = response['nodes']
+                if len(power_parameters) > 0:
+                    queries.append(query_all_nodes(
+                        power_parameters, scheduler=self.scheduler,
+                        clock=self.clock))
+                else:
+                    break
+        finally:
+            yield DeferredList(queries)
+            # Report the power states that have changed in one call.
+            yield self.reporter.flush(client)
+        self.log_query_latency()
+
+    def log_query_latency(self):
+        """Log the latency of power queries so far, per power driver."""
+        for power_type, latency in sorted(self.scheduler.latency.items()):
+            log.debug(
+                "Power queries using {power_type}: {count} queries, "
+                "{failures} failed, mean {mean:.2f}s, max {maximum:.2f}s.",
+                power_type=power_type, count=latency.count,
+                failures=latency.failures, mean=latency.mean,
+                maximum=latency.maximum)
 
     def query_nodes_failed(self, failure, localIdent):
         if failure.check(NoSuchCluster):
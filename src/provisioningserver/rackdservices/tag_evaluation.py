@@ -0,0 +1,45 @@
+# Copyright 2018 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Service that keeps a pool of worker processes for evaluating tags."""
+
+__all__ = [
+    "TagEvaluationService",
+]
+
+from multiprocessing import get_context
+
+from twisted.application.service import Service
+from twisted.internet.threads import deferToThread
+
+
+class TagEvaluationService(Service):
+    """Keeps a pool of worker processes for evaluating tags.
+
+    The pool lives as long as the service, so the merged details cached by
+    each worker are reused by every `EvaluateTag` call. Workers are started
+    by a fork server rather than forked from rackd itself, which has many
+    threads running by the time a tag is evaluated.
+
+    :ivar pool: The `multiprocessing.pool.Pool`, or `None` if tags are to
+        be evaluated in the rack process itself.
+    """
+
+    def __init__(self, processes):
+        super(TagEvaluationService, self).__init__()
+        self.processes = processes
+        self.pool = None
+
+    def startService(self):
+        super(TagEvaluationService, self).startService()
+        if self.processes > 1:
+            context = get_context("forkserver")
+            self.pool = context.Pool(self.processes)
+
+    def stopService(self):
+        super(TagEvaluationService, self).stopService()
+        pool, self.pool = self.pool, None
+        if pool is not None:
+            pool.close()
+            # Wait for outstanding work without blocking the reactor.
+            return deferToThread(pool.join)
@@ -10,12 +10,16 @@ import os
 import socket
 import time
 from unittest.mock import (
+    call,
     MagicMock,
     sentinel,
 )
 
 from maastesting.factory import factory
-from maastesting.matchers import MockCalledOnceWith
+from maastesting.matchers import (
+    MockCalledOnceWith,
+    MockCallsMatch,
+)
 from maastesting.testcase import (
     MAASTestCase,
     MAASTwistedRunTest,
@@ -25,7 +29,10 @@ from provisioningserver.rackdservices.lease_socket_service import (
     LeaseSocketService,
 )
 from provisioningserver.rpc import getRegionClient
-from provisioningserver.rpc.region import UpdateLease
+from provisioningserver.rpc.region import (
+    UpdateLease,
+    UpdateLeases,
+)
 from provisioningserver.rpc.testing import MockLiveClusterToRegionRPCFixture
 from provisioningserver.utils.twisted import (
     DeferredValue,
@@ -43,6 +50,7 @@ from twisted.internet import (
 )
 from twisted.internet.protocol import DatagramProtocol
 from twisted.internet.threads import deferToThread
+from twisted.protocols.amp import UnhandledCommand
 
 
 class TestLeaseSocketService(MAASTestCase):
@@ -128,16 +136,18 @@ class TestLeaseSocketService(MAASTestCase):
         self.assertEquals([packet], list(service.notifications))
 
     @defer.inlineCallbacks
-    def test_processNotification_gets_called_with_notification(self):
+    def test_processNotificationBatch_gets_called_with_notification(self):
         socket_path = self.patch_socket_path()
         service = LeaseSocketService(
             sentinel.service, reactor)
         dv = DeferredValue()
 
-        # Mock processNotifcation to catch the call.
-        def mock_processNotification(*args, **kwargs):
+        # Mock processNotificationBatch to catch the call.
+        def mock_processNotificationBatch(*args, **kwargs):
             dv.set(args)
-        self.patch(service, "processNotification", mock_processNotification)
+        self.patch(
+            service, "processNotificationBatch",
+            mock_processNotificationBatch)
 
         # Start the service and stop it at the end of the test.
         service.startService()
@@ -152,26 +162,27 @@ class TestLeaseSocketService(MAASTestCase):
         yield deferToThread(self.send_notification, socket_path, packet)
         yield dv.get(timeout=10)
 
-        # Packet should be the argument passed to processNotifcation
-        self.assertEquals((packet,), dv.value)
+        # Packet should be the only notification passed to
+        # processNotificationBatch.
+        self.assertEquals(([packet],), dv.value)
 
     @defer.inlineCallbacks
-    def test_processNotification_gets_called_multiple_times(self):
+    def test_processNotificationBatch_gets_notifications_in_order(self):
         socket_path = self.patch_socket_path()
         service = LeaseSocketService(
             sentinel.service, reactor)
-        dvs = [
-            DeferredValue(),
-            DeferredValue(),
-        ]
+        received = []
+        dv = DeferredValue()
 
-        # Mock processNotifcation to catch the call.
-        def mock_processNotification(*args, **kwargs):
-            for dv in dvs:
-                if not dv.isSet:
-                    dv.set(args)
-                    break
-        self.patch(service, "processNotification", mock_processNotification)
+        # Mock processNotificationBatch to catch the calls. The packets may
+        # arrive in one batch or in two.
+        def mock_processNotificationBatch(notifications, **kwargs):
+            received.extend(notifications)
+            if len(received) == 2:
+                dv.set(received)
+        self.patch(
+            service, "processNotificationBatch",
+            mock_processNotificationBatch)
 
         # Start the service and stop it at the end of the test.
         service.startService()
@@ -188,13 +199,78 @@ class TestLeaseSocketService(MAASTestCase):
         # Send notifications to the socket and wait for notifications.
         yield deferToThread(self.send_notification, socket_path, packet1)
         yield deferToThread(self.send_notification, socket_path, packet2)
-        yield dvs[0].get(timeout=10)
-        yield dvs[1].get(timeout=10)
+        yield dv.get(timeout=10)
+
+        # Packets should be passed to processNotificationBatch in order.
+        self.assertEquals([packet1, packet2], dv.value)
+
+    @defer.inlineCallbacks
+    def test_processNotifications_limits_batch_size(self):
+        service = LeaseSocketService(
+            sentinel.service, reactor)
+        service.batch_size = 2
+        batches = []
+        self.patch(
+            service, "processNotificationBatch",
+            lambda notifications, **kwargs: batches.append(notifications))
+        service.notifications.extend(range(5))
+        yield service.processNotifications()
+        self.assertEquals([[0, 1], [2, 3], [4]], batches)
+
+    def make_packet(self):
+        return {
+            "action": "commit",
+            "mac": factory.make_mac_address(),
+            "ip_family": "ipv4",
+            "ip": factory.make_ipv4_address(),
+            "timestamp": int(time.time()),
+            "lease_time": 30,
+            "hostname": factory.make_name("host"),
+        }
+
+    @defer.inlineCallbacks
+    def test_processNotificationBatch_send_to_region(self):
+        fixture = self.useFixture(MockLiveClusterToRegionRPCFixture())
+        protocol, connecting = fixture.makeEventLoop(UpdateLeases)
+        self.addCleanup((yield connecting))
+
+        client = getRegionClient()
+        rpc_service = MagicMock()
+        rpc_service.getClientNow.return_value = defer.succeed(client)
+        service = LeaseSocketService(
+            rpc_service, reactor)
+
+        packets = [self.make_packet(), self.make_packet()]
+        yield service.processNotificationBatch(packets, clock=reactor)
+        self.assertThat(
+            protocol.UpdateLeases,
+            MockCalledOnceWith(
+                protocol, cluster_uuid=client.localIdent, updates=packets))
+
+    @defer.inlineCallbacks
+    def test_processNotificationBatch_falls_back_to_UpdateLease(self):
+        client = MagicMock()
+        client.localIdent = factory.make_UUID()
+        client.side_effect = [
+            defer.fail(UnhandledCommand()),
+            defer.succeed({}),
+            defer.succeed({}),
+        ]
+        rpc_service = MagicMock()
+        rpc_service.getClientNow.return_value = defer.succeed(client)
+        service = LeaseSocketService(
+            rpc_service, reactor)
 
-        # Packet should be the argument passed to processNotification in
-        # order.
-        self.assertEquals((packet1,), dvs[0].value)
-        self.assertEquals((packet2,), dvs[1].value)
+        packets = [self.make_packet(), self.make_packet()]
+        yield service.processNotificationBatch(packets, clock=reactor)
+        self.assertThat(client, MockCallsMatch(
+            call(
+                UpdateLeases, cluster_uuid=client.localIdent,
+                updates=packets),
+            call(UpdateLease, **packets[0]),
+            call(UpdateLease, **packets[1]),
+        ))
+        self.assertEquals(client.localIdent, packets[0]["cluster_uuid"])
 
     @defer.inlineCallbacks
     def test_processNotification_send_to_region(self):
@@ -14,7 +14,10 @@ from unittest.mock import (
 
 from fixtures import FakeLogger
 from maastesting.factory import factory
-from maastesting.matchers import MockCalledOnceWith
+from maastesting.matchers import (
+    MockCalledOnceWith,
+    MockNotCalled,
+)
 from maastesting.testcase import (
     MAASTestCase,
     MAASTwistedRunTest,
@@ -34,6 +37,7 @@ from provisioningserver.rpc import (
 from provisioningserver.rpc.testing import MockClusterToRegionRPCFixture
 from testtools.matchers import MatchesStructure
 from twisted.internet.defer import (
+    Deferred,
     fail,
     succeed,
 )
@@ -55,6 +59,15 @@ class TestNodePowerMonitorService(MAASTestCase):
         service = npms.NodePowerMonitorService(Clock())
         return service
 
+    def make_power_parameters(self):
+        return {
+            "system_id": factory.make_UUID(),
+            "hostname": factory.make_hostname(),
+            "power_state": factory.make_name("power_state"),
+            "power_type": factory.make_name("power_type"),
+            "context": {},
+        }
+
     def test_query_nodes_calls_the_region(self):
         service = self.make_monitor_service()
 
@@ -75,7 +88,6 @@ class TestNodePowerMonitorService(MAASTestCase):
 
     def test_query_nodes_calls_query_all_nodes(self):
         service = self.make_monitor_service()
-        service.max_nodes_at_once = sentinel.max_nodes_at_once
 
         example_power_parameters = {
             "system_id": factory.make_UUID(),
@@ -94,6 +106,7 @@ class TestNodePowerMonitorService(MAASTestCase):
         ]
 
         query_all_nodes = self.patch(npms, "query_all_nodes")
+        query_all_nodes.return_value = succeed([])
 
         d = service.query_nodes(getRegionClient())
         io.flush()
@@ -103,8 +116,66 @@ class TestNodePowerMonitorService(MAASTestCase):
             query_all_nodes,
             MockCalledOnceWith(
                 [example_power_parameters],
-                max_concurrency=sentinel.max_nodes_at_once,
-                clock=service.clock))
+                scheduler=service.scheduler, clock=service.clock))
+
+    def test_query_nodes_does_not_wait_between_batches(self):
+        service = self.make_monitor_service()
+
+        rpc_fixture = self.useFixture(MockClusterToRegionRPCFixture())
+        proto_region, io = rpc_fixture.makeEventLoop(
+            region.ListNodePowerParameters)
+        proto_region.ListNodePowerParameters.side_effect = [
+            succeed({"nodes": [self.make_power_parameters()]}),
+            succeed({"nodes": [self.make_power_parameters()]}),
+            succeed({"nodes": []}),
+        ]
+
+        queries = [Deferred(), Deferred()]
+        query_all_nodes = self.patch(npms, "query_all_nodes")
+        query_all_nodes.side_effect = queries
+
+        d = service.query_nodes(getRegionClient())
+        io.flush()
+
+        # Both batches have been handed to the scheduler, but query_nodes
+        # waits for them to finish.
+        self.assertEqual(3, proto_region.ListNodePowerParameters.call_count)
+        self.assertEqual(2, query_all_nodes.call_count)
+        self.assertFalse(d.called)
+        for query in queries:
+            query.callback([])
+        self.assertEqual(None, extract_result(d))
+
+    def test_query_nodes_reports_power_states_once_queried(self):
+        service = self.make_monitor_service()
+
+        rpc_fixture = self.useFixture(MockClusterToRegionRPCFixture())
+        proto_region, io = rpc_fixture.makeEventLoop(
+            region.ListNodePowerParameters)
+        proto_region.ListNodePowerParameters.side_effect = [
+            succeed({"nodes": [self.make_power_parameters()]}),
+            succeed({"nodes": []}),
+        ]
+
+        query = Deferred()
+        self.patch(npms, "query_all_nodes").return_value = query
+        flush = self.patch(service.reporter, "flush")
+        flush.return_value = succeed(None)
+
+        client = getRegionClient()
+        d = service.query_nodes(client)
+        io.flush()
+
+        self.assertThat(flush, MockNotCalled())
+        query.callback([])
+        self.assertEqual(None, extract_result(d))
+        self.assertThat(flush, MockCalledOnceWith(client))
+
+    def test_init_creates_scheduler(self):
+        clock = Clock()
+        service = npms.NodePowerMonitorService(clock)
+        self.assertThat(service.scheduler, MatchesStructure.byEquality(
+            interval=service.check_interval, clock=clock))
 
     def test_query_nodes_copes_with_NoSuchCluster(self):
         service = self.make_monitor_service()
@@ -0,0 +1,61 @@
+# Copyright 2018 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for src/provisioningserver/rackdservices/tag_evaluation.py"""
+
+__all__ = []
+
+from multiprocessing.pool import ThreadPool
+
+from maastesting.matchers import (
+    MockCalledOnceWith,
+    MockNotCalled,
+)
+from maastesting.testcase import (
+    MAASTestCase,
+    MAASTwistedRunTest,
+)
+from provisioningserver.rackdservices import tag_evaluation
+from provisioningserver.rackdservices.tag_evaluation import (
+    TagEvaluationService,
+)
+from twisted.internet.defer import inlineCallbacks
+
+
+class TestTagEvaluationService(MAASTestCase):
+
+    run_tests_with = MAASTwistedRunTest.make_factory(timeout=5)
+
+    def patch_get_context(self):
+        get_context = self.patch(tag_evaluation, "get_context")
+        # Threads stand in for processes here.
+        get_context.return_value.Pool.side_effect = ThreadPool
+        return get_context
+
+    def test_start_makes_no_pool_for_one_process(self):
+        get_context = self.patch_get_context()
+        service = TagEvaluationService(1)
+        service.startService()
+        self.assertIsNone(service.pool)
+        self.assertThat(get_context, MockNotCalled())
+        return service.stopService()
+
+    def test_start_makes_forkserver_pool(self):
+        get_context = self.patch_get_context()
+        service = TagEvaluationService(3)
+        service.startService()
+        self.addCleanup(service.stopService)
+        self.assertIsInstance(service.pool, ThreadPool)
+        self.assertThat(get_context, MockCalledOnceWith("forkserver"))
+        self.assertThat(
+            get_context.return_value.Pool, MockCalledOnceWith(3))
+
+    @inlineCallbacks
+    def test_stop_closes_and_joins_pool(self):
+        self.patch_get_context()
+        service = TagEvaluationService(2)
+        service.startService()
+        pool = service.pool
+        yield service.stopService()
+        self.assertIsNone(service.pool)
+        self.assertRaises(ValueError, pool.map, str, [1])
@@ -43,11 +43,14 @@ from provisioningserver.rackdservices import tftp as tftp_module
 from provisioningserver.rackdservices.tftp import (
     get_boot_image,
     log_request,
+    MappedFileReader,
+    MappedFiles,
     Port,
     TFTPBackend,
     TFTPService,
     UDPServer,
 )
+from provisioningserver.rpc.boot_config import BootConfigCache
 from provisioningserver.rpc.exceptions import BootConfigNoResponse
 from provisioningserver.rpc.region import GetBootConfig
 from provisioningserver.testing.boot_images import (
@@ -68,8 +71,10 @@ from testtools.matchers import (
 )
 from tftp.backend import IReader
 from tftp.errors import (
+    AccessViolation,
     BackendError,
     FileNotFound,
+    Unsupported,
 )
 from tftp.protocol import TFTP
 from twisted.application import internet
@@ -87,6 +92,7 @@ from twisted.internet.defer import (
 from twisted.internet.protocol import Protocol
 from twisted.internet.task import Clock
 from twisted.python import context
+from twisted.python.filepath import FilePath
 from zope.interface.verify import verifyObject
 
 
@@ -206,6 +212,106 @@ class TestBytesReader(MAASTestCase):
         self.assertRaises(ValueError, reader.read, 1)
 
 
+class TestMappedFileReader(MAASTestCase):
+    """Tests for `MappedFileReader`."""
+
+    def make_reader(self, data, maps=None):
+        if maps is None:
+            maps = MappedFiles()
+        path = FilePath(self.make_file(contents=data))
+        reader = MappedFileReader(path, maps)
+        self.addCleanup(reader.finish)
+        return reader
+
+    def test_interfaces(self):
+        reader = self.make_reader(b"data")
+        verifyObject(IReader, reader)
+
+    def test_size(self):
+        data = factory.make_bytes(size=100)
+        reader = self.make_reader(data)
+        self.assertEqual(len(data), reader.size)
+
+    def test_read(self):
+        data = factory.make_bytes(size=10)
+        reader = self.make_reader(data)
+        self.assertEqual(data[:7], reader.read(7))
+        self.assertEqual(data[7:], reader.read(7))
+        self.assertEqual(b"", reader.read(7))
+
+    def test_read_with_block_size_dividing_file(self):
+        data = factory.make_bytes(size=16)
+        reader = self.make_reader(data)
+        self.assertEqual(data[:8], reader.read(8))
+        self.assertEqual(data[8:], reader.read(8))
+        self.assertEqual(b"", reader.read(8))
+
+    def test_read_empty_file(self):
+        maps = MappedFiles()
+        reader = self.make_reader(b"", maps)
+        self.assertEqual(0, reader.size)
+        self.assertEqual(b"", reader.read(512))
+        self.assertEqual({}, maps.maps)
+
+    def test_raises_FileNotFound_for_missing_file(self):
+        path = FilePath(os.path.join(self.make_dir(), "missing"))
+        self.assertRaises(FileNotFound, MappedFileReader, path, MappedFiles())
+
+    def test_raises_FileNotFound_for_directory(self):
+        path = FilePath(self.make_dir())
+        maps = MappedFiles()
+        self.assertRaises(FileNotFound, MappedFileReader, path, maps)
+        self.assertEqual({}, maps.maps)
+
+    def test_raises_FileNotFound_if_mapping_fails(self):
+        self.patch(tftp_module.mmap, "mmap").side_effect = OSError()
+        path = FilePath(self.make_file(contents=b"data"))
+        self.assertRaises(FileNotFound, MappedFileReader, path, MappedFiles())
+
+    def test_shares_map_between_readers(self):
+        maps = MappedFiles()
+        data = factory.make_bytes(size=100)
+        path = FilePath(self.make_file(contents=data))
+        reader1 = MappedFileReader(path, maps)
+        reader2 = MappedFileReader(path, maps)
+        self.addCleanup(reader1.finish)
+        self.addCleanup(reader2.finish)
+        self.assertIs(reader1.data, reader2.data)
+        self.assertThat(maps.maps, HasLength(1))
+
+    def test_releases_map_when_all_readers_finish(self):
+        maps = MappedFiles()
+        data = factory.make_bytes(size=100)
+        path = FilePath(self.make_file(contents=data))
+        reader1 = MappedFileReader(path, maps)
+        reader2 = MappedFileReader(path, maps)
+        self.assertEqual(data, reader1.read(len(data) + 1))
+        self.assertThat(maps.maps, HasLength(1))
+        reader2.finish()
+        self.assertEqual({}, maps.maps)
+        self.assertTrue(reader1.data.closed)
+
+    def test_finish_after_eof_does_not_release_twice(self):
+        maps = MappedFiles()
+        reader = self.make_reader(b"data", maps)
+        reader.read(512)
+        reader.finish()
+        self.assertEqual({}, maps.maps)
+        self.assertEqual(b"", reader.read(512))
+
+    def test_maps_replaced_file_afresh(self):
+        maps = MappedFiles()
+        path = FilePath(self.make_file(contents=b"old"))
+        reader1 = MappedFileReader(path, maps)
+        self.addCleanup(reader1.finish)
+        new = self.make_file(contents=b"new data")
+        os.rename(new, path.path)
+        reader2 = MappedFileReader(path, maps)
+        self.addCleanup(reader2.finish)
+        self.assertEqual(b"old", reader1.read(512))
+        self.assertEqual(b"new data", reader2.read(512))
+
+
 class TestTFTPBackend(MAASTestCase):
     """Tests for `TFTPBackend`."""
 
@@ -217,6 +323,7 @@ class TestTFTPBackend(MAASTestCase):
         from provisioningserver import boot
         self.patch(boot, "find_mac_via_arp")
         self.patch(tftp_module, 'log_request')
+        self.patch(tftp_module, 'boot_config_cache', BootConfigCache())
 
     def test_init(self):
         temp_dir = self.make_dir()
@@ -234,16 +341,27 @@ class TestTFTPBackend(MAASTestCase):
 
     @inlineCallbacks
     def test_get_reader_regular_file(self):
-        # TFTPBackend.get_reader() returns a regular FilesystemReader for
-        # paths not matching re_config_file.
+        # TFTPBackend.get_reader() returns a MappedFileReader for paths not
+        # matching re_config_file.
         self.patch(tftp_module, 'get_remote_mac')
         data = factory.make_string().encode("ascii")
         reader = yield self.get_reader(data)
         self.addCleanup(reader.finish)
+        self.assertIsInstance(reader, MappedFileReader)
         self.assertEqual(len(data), reader.size)
         self.assertEqual(data, reader.read(len(data)))
         self.assertEqual(b"", reader.read(1))
 
+    def test_get_file_reader_requires_can_read(self):
+        backend = TFTPBackend(self.make_dir(), Mock())
+        backend.can_read = False
+        self.assertRaises(Unsupported, backend.get_file_reader, b"file")
+
+    def test_get_file_reader_rejects_insecure_path(self):
+        backend = TFTPBackend(self.make_dir(), Mock())
+        self.assertRaises(
+            AccessViolation, backend.get_file_reader, b"../etc/passwd")
+
     @inlineCallbacks
     def test_get_reader_handles_backslashes_in_path(self):
         self.patch(tftp_module, 'get_remote_mac')
@@ -591,7 +709,8 @@ class TestTFTPBackend(MAASTestCase):
         # The first client is now saved.
         self.assertEquals(clients[0], backend.client_to_remote[remote_ip])
 
-        # Get the reader twice.
+        # Get the reader twice, without the cached boot config.
+        backend.boot_config_cache.invalidate()
         params_with_ip = dict(fake_params)
         params_with_ip['remote_ip'] = remote_ip
         reader = yield backend.get_boot_method_reader(method, params_with_ip)
@@ -862,6 +981,68 @@ class TestTFTPBackend(MAASTestCase):
             backend.fetcher, MockCalledOnceWith(
                 client, GetBootConfig, **params_okay))
 
+    def make_backend_for_kernel_params(self, result):
+        client = Mock()
+        client.localIdent = factory.make_name("system_id")
+        client_service = Mock()
+        client_service.getClientNow.return_value = succeed(client)
+        backend = TFTPBackend(self.make_dir(), client_service)
+        backend.fetcher = Mock(return_value=result)
+        self.patch(backend, "get_boot_image").side_effect = (
+            lambda params, client, remote_ip: dict(params, label="local"))
+        return backend
+
+    def make_kernel_params_request(self):
+        return {
+            "local_ip": factory.make_ipv4_address(),
+            "remote_ip": factory.make_ipv4_address(),
+            "arch": "amd64",
+            "subarch": "generic",
+            "mac": factory.make_mac_address("-"),
+            "bios_boot_method": "pxe",
+        }
+
+    @inlineCallbacks
+    def test_get_kernel_params_caches_boot_config(self):
+        fake_params = make_kernel_parameters()._asdict()
+        del fake_params["label"]
+        backend = self.make_backend_for_kernel_params(succeed(fake_params))
+        params = self.make_kernel_params_request()
+
+        first = yield backend.get_kernel_params(dict(params))
+        second = yield backend.get_kernel_params(dict(params))
+
+        self.assertEqual(first, second)
+        self.assertThat(backend.fetcher, MockCalledOnceWith(
+            ANY, GetBootConfig, system_id=ANY, **params))
+        self.assertEqual(
+            (1, 1), (backend.boot_config_cache.hits,
+                     backend.boot_config_cache.misses))
+
+    @inlineCallbacks
+    def test_get_kernel_params_refetches_after_invalidation(self):
+        fake_params = make_kernel_parameters()._asdict()
+        del fake_params["label"]
+        backend = self.make_backend_for_kernel_params(succeed(fake_params))
+        params = self.make_kernel_params_request()
+
+        yield backend.get_kernel_params(dict(params))
+        backend.boot_config_cache.invalidate([params["mac"]])
+        yield backend.get_kernel_params(dict(params))
+
+        self.assertEqual(2, backend.fetcher.call_count)
+
+    @inlineCallbacks
+    def test_get_kernel_params_does_not_cache_failures(self):
+        backend = self.make_backend_for_kernel_params(
+            fail(BootConfigNoResponse()))
+        params = self.make_kernel_params_request()
+
+        with ExpectedException(BootConfigNoResponse):
+            yield backend.get_kernel_params(dict(params))
+
+        self.assertEqual(0, len(backend.boot_config_cache))
+
 
 class TestTFTPService(MAASTestCase):
 
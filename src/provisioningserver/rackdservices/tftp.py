@@ -4,15 +4,19 @@
 """Twisted Application Plugin for the MAAS TFTP server."""
 
 __all__ = [
+    "MappedFileReader",
     "TFTPBackend",
     "TFTPService",
     ]
 
 from functools import partial
+import mmap
+import os
 from socket import (
     AF_INET,
     AF_INET6,
 )
+import stat
 
 from netaddr import IPAddress
 from provisioningserver.boot import (
@@ -30,6 +34,7 @@ from provisioningserver.logger import (
     get_maas_logger,
     LegacyLogger,
 )
+from provisioningserver.rpc.boot_config import boot_config_cache
 from provisioningserver.rpc.boot_images import list_boot_images
 from provisioningserver.rpc.exceptions import BootConfigNoResponse
 from provisioningserver.rpc.region import (
@@ -46,10 +51,15 @@ from provisioningserver.utils.twisted import (
     deferred,
     RPCFetcher,
 )
-from tftp.backend import FilesystemSynchronousBackend
+from tftp.backend import (
+    FilesystemReader,
+    FilesystemSynchronousBackend,
+)
 from tftp.errors import (
+    AccessViolation,
     BackendError,
     FileNotFound,
+    Unsupported,
 )
 from tftp.protocol import TFTP
 from twisted.application import internet
@@ -70,7 +80,10 @@ from twisted.internet.defer import (
     succeed,
 )
 from twisted.internet.task import deferLater
-from twisted.python.filepath import FilePath
+from twisted.python.filepath import (
+    FilePath,
+    InsecurePath,
+)
 
 
 maaslog = get_maas_logger("tftp")
@@ -135,6 +148,99 @@ def log_request(mac_address, file_name, clock=reactor):
     d.addErrback(log.err, "Logging TFTP request failed.")
 
 
+class MappedFiles:
+    """Read-only memory maps of the files being served over TFTP.
+
+    Concurrent transfers of the same file share a single map, so a rack of
+    machines fetching the same kernel or initrd is served from one copy in
+    the page cache without a read system call per block. A map is closed
+    once the last transfer using it finishes.
+
+    Maps are keyed on the identity of the file rather than its path, so a
+    file replaced by a boot image import is mapped afresh.
+    """
+
+    def __init__(self):
+        super(MappedFiles, self).__init__()
+        self.maps = {}
+
+    def acquire(self, file_path):
+        """Return a key and the mapped contents of `file_path`.
+
+        :raise FileNotFound: If `file_path` is not a regular file, or cannot
+            be opened or mapped.
+        """
+        try:
+            fd = os.open(file_path.path, os.O_RDONLY)
+        except OSError:
+            raise FileNotFound(file_path)
+        try:
+            st = os.fstat(fd)
+            if not stat.S_ISREG(st.st_mode):
+                # Directories, for one, can be opened but not mapped.
+                raise FileNotFound(file_path)
+            key = (st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size)
+            if key in self.maps:
+                data, refs = self.maps[key]
+            elif st.st_size == 0:
+                # Empty files cannot be mapped.
+                data, refs = b"", 0
+            else:
+                data, refs = mmap.mmap(fd, 0, access=mmap.ACCESS_READ), 0
+            self.maps[key] = data, refs + 1
+        except (OSError, ValueError):
+            raise FileNotFound(file_path)
+        finally:
+            os.close(fd)
+        return key, data
+
+    def release(self, key):
+        """Release a map obtained from `acquire`."""
+        data, refs = self.maps.pop(key)
+        if refs > 1:
+            self.maps[key] = data, refs - 1
+        elif isinstance(data, mmap.mmap):
+            data.close()
+
+
+# The maps shared by all `MappedFileReader`s.
+mapped_files = MappedFiles()
+
+
+class MappedFileReader(FilesystemReader):
+    """A `FilesystemReader` that reads from a shared memory map.
+
+    Each block is sliced straight from the map, whatever block size was
+    negotiated for the transfer.
+    """
+
+    def __init__(self, file_path, maps=mapped_files):
+        self.file_path = file_path
+        self.maps = maps
+        self.key, self.data = maps.acquire(file_path)
+        self.offset = 0
+        self.state = 'active'
+
+    @property
+    def size(self):
+        return len(self.data)
+
+    def read(self, size):
+        if self.state != 'active':
+            return b''
+        data = self.data[self.offset:self.offset + size]
+        self.offset += len(data)
+        if self.offset >= len(self.data):
+            self.maps.release(self.key)
+            self.state = 'eof'
+        return data
+
+    def finish(self):
+        if self.state == 'active':
+            self.maps.release(self.key)
+        self.state = 'finished'
+
+
 class TFTPBackend(FilesystemSynchronousBackend):
     """A partially dynamic read-only TFTP server.
 
@@ -168,6 +274,7 @@ class TFTPBackend(FilesystemSynchronousBackend):
         self.client_to_remote = {}
         self.client_service = client_service
         self.fetcher = RPCFetcher()
+        self.boot_config_cache = boot_config_cache
 
     def _get_new_client_for_remote(self, remote_ip):
         """Return a new client for the `remote_ip`.
@@ -276,6 +383,10 @@ class TFTPBackend(FilesystemSynchronousBackend):
     def get_kernel_params(self, params):
         """Return kernel parameters obtained from the API.
 
+        Boot configs are cached on the rack for a short while, so a burst of
+        requests from the same machine results in a single `GetBootConfig`
+        call to the region.
+
         :param params: Parameters so far obtained, typically from the file
             path requested.
         :return: A `KernelParameters` instance.
@@ -293,8 +404,15 @@ class TFTPBackend(FilesystemSynchronousBackend):
         }
 
         def fetch(client, params):
-            params["system_id"] = client.localIdent
-            d = self.fetcher(client, GetBootConfig, **params)
+            config = self.boot_config_cache.get(params)
+            if config is None:
+                d = self.fetcher(
+                    client, GetBootConfig,
+                    **dict(params, system_id=client.localIdent))
+                d.addCallback(partial(self.boot_config_cache.set, params))
+                d.addCallback(dict)
+            else:
+                d = succeed(config)
             d.addCallback(self.get_boot_image, client, params['remote_ip'])
             d.addCallback(lambda data: KernelParameters(**data))
             return d
@@ -317,6 +435,17 @@ class TFTPBackend(FilesystemSynchronousBackend):
 
         return self.get_kernel_params(params).addCallback(generate)
 
+    def get_file_reader(self, file_name):
+        """Return a `MappedFileReader` for `file_name` beneath the base."""
+        if not self.can_read:
+            raise Unsupported("Reading not supported")
+        try:
+            target_path = self.base.asBytesMode().descendant(
+                file_name.split(b"/"))
+        except InsecurePath as e:
+            raise AccessViolation("Insecure path: %s" % e)
+        return MappedFileReader(target_path)
+
     @staticmethod
     def no_response_errback(failure, file_name):
         failure.trap(BootConfigNoResponse)
@@ -328,7 +457,7 @@ class TFTPBackend(FilesystemSynchronousBackend):
     def handle_boot_method(self, file_name: TFTPPath, result):
         boot_method, params = result
         if boot_method is None:
-            return super(TFTPBackend, self).get_reader(file_name)
+            return self.get_file_reader(file_name)
 
         # Map pxe namespace architecture names to MAAS's.
         arch = params.get("arch")
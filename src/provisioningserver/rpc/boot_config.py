@@ -0,0 +1,111 @@
+# Copyright 2018 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Rack-side cache of boot configurations obtained from the region."""
+
+__all__ = [
+    "boot_config_cache",
+    "BootConfigCache",
+    "invalidate_boot_config",
+    ]
+
+from provisioningserver.logger import LegacyLogger
+from twisted.internet import reactor
+
+
+log = LegacyLogger()
+
+
+# How long a boot configuration obtained from the region is reused for. The
+# region invalidates entries for nodes whose boot-relevant state changes, so
+# this only bounds how stale global configuration can get.
+BOOT_CONFIG_TTL = 30
+
+
+def normalise_mac(mac):
+    """Normalise `mac` so that it can be compared with cached keys."""
+    if mac is None:
+        return None
+    return mac.lower().replace("-", ":")
+
+
+class BootConfigCache:
+    """Cache of `GetBootConfig` responses, with a time-to-live.
+
+    Entries are keyed on the arguments sent to the region in `GetBootConfig`,
+    principally the MAC address, architecture, sub-architecture and remote IP
+    address of the booting machine.
+    """
+
+    def __init__(self, ttl=BOOT_CONFIG_TTL, clock=reactor):
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(self, params):
+        """Return the cache key for the `GetBootConfig` arguments."""
+        params = dict(params)
+        params["mac"] = normalise_mac(params.get("mac"))
+        return tuple(sorted(params.items()))
+
+    def get(self, params):
+        """Return a copy of the cached boot config for `params`.
+
+        :return: The boot config, or `None` if it is not cached or the
+            cached entry has expired.
+        """
+        key = self.make_key(params)
+        entry = self.entries.get(key)
+        if entry is not None:
+            expires, config = entry
+            if expires > self.clock.seconds():
+                self.hits += 1
+                return dict(config)
+            else:
+                del self.entries[key]
+        self.misses += 1
+        return None
+
+    def set(self, params, config):
+        """Cache `config` as the boot config for `params`.
+
+        Expired entries are purged at the same time so that the cache does
+        not grow without bound.
+
+        :return: `config`, so this can be used as a callback.
+        """
+        now = self.clock.seconds()
+        self.entries = {
+            key: entry for key, entry in self.entries.items()
+            if entry[0] > now
+        }
+        self.entries[self.make_key(params)] = (now + self.ttl, dict(config))
+        return config
+
+    def invalidate(self, macs=None):
+        """Drop cached boot configs for `macs`, or all if `macs` is empty."""
+        if not macs:
+            self.entries.clear()
+        else:
+            macs = {normalise_mac(mac) for mac in macs}
+            self.entries = {
+                key: entry for key, entry in self.entries.items()
+                if dict(key).get("mac") not in macs
+            }
+
+    def __len__(self):
+        return len(self.entries)
+
+
+# The cache used by the TFTP backend.
+boot_config_cache = BootConfigCache()
+
+
+def invalidate_boot_config(macs):
+    """Invalidate the boot configs cached for `macs` on this rack."""
+    boot_config_cache.invalidate(macs)
+    log.debug(
+        "Invalidated cached boot configs (hits: {hits}, misses: {misses}).",
+        hits=boot_config_cache.hits, misses=boot_config_cache.misses)
@@ -18,6 +18,7 @@ __all__ = [
     "DescribeNOSTypes",
     "GetPreseedData",
     "Identify",
+    "InvalidateBootConfig",
     "ListBootImages",
     "ListOperatingSystems",
     "ListSupportedArchitectures",
@@ -588,6 +589,20 @@ class IsImportBootImagesRunning(amp.Command):
     errors = {}
 
 
+class InvalidateBootConfig(amp.Command):
+    """Drop boot configurations cached by the rack controller.
+
+    :since: 2.5
+    """
+    arguments = [
+        # MAC addresses of the machines whose cached boot configurations
+        # should be dropped; all are dropped when this is empty.
+        (b"macs", amp.ListOf(amp.Unicode())),
+    ]
+    response = []
+    errors = {}
+
+
 class RefreshRackControllerInfo(amp.Command):
     """Refresh the rack controller's hardware and network details.
 
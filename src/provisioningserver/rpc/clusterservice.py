@@ -57,6 +57,7 @@ from provisioningserver.rpc import (
     pods,
     region,
 )
+from provisioningserver.rpc.boot_config import invalidate_boot_config
 from provisioningserver.rpc.boot_images import (
     import_boot_images,
     is_import_boot_images_running,
@@ -308,6 +309,16 @@ class Cluster(RPCProtocol):
         """
         return {"running": is_import_boot_images_running()}
 
+    @cluster.InvalidateBootConfig.responder
+    def invalidate_boot_config(self, macs):
+        """invalidate_boot_config()
+
+        Implementation of
+        :py:class:`~provisioningserver.rpc.cluster.InvalidateBootConfig`.
+        """
+        invalidate_boot_config(macs)
+        return {}
+
     @cluster.DescribePowerTypes.responder
     def describe_power_types(self):
         """describe_power_types()
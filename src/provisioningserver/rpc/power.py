@@ -9,6 +9,7 @@ __all__ = [
     "maybe_change_power_state",
 ]
 
+from collections import defaultdict
 from datetime import timedelta
 from functools import partial
 import sys
@@ -35,6 +36,7 @@ from provisioningserver.rpc.exceptions import (
 from provisioningserver.rpc.region import (
     MarkNodeFailed,
     UpdateNodePowerState,
+    UpdateNodePowerStates,
 )
 from provisioningserver.utils.twisted import (
     asynchronous,
@@ -52,6 +54,8 @@ from twisted.internet.defer import (
     succeed,
 )
 from twisted.internet.task import deferLater
+from twisted.protocols.amp import UnhandledCommand
+from twisted.python.failure import Failure
 
 
 maaslog = get_maas_logger("power")
@@ -62,6 +66,14 @@ log = LegacyLogger()
 # meant to cope with broken BMCs.
 CHANGE_POWER_STATE_TIMEOUT = timedelta(minutes=5).total_seconds()
 
+# The longest time for which power queries for a node will be skipped after
+# its BMC has repeatedly failed to respond.
+MAX_QUERY_BACKOFF = timedelta(hours=1).total_seconds()
+
+# The longest time for which a node's unchanged power state will go unreported
+# to the region.
+POWER_STATE_HEARTBEAT = timedelta(minutes=30).total_seconds()
+
 # We could use a Registry here, but it seems kind of like overkill.
 power_action_registry = {}
 
@@ -431,10 +443,184 @@ def maaslog_report_failure(node, failure):
         # log.err(failure, "Failed to refresh power state.")
 
 
-def query_node(node, clock):
+class PowerQueryLatency:
+    """Latency of the power queries made using one power driver."""
+
+    def __init__(self):
+        super(PowerQueryLatency, self).__init__()
+        self.count = 0
+        self.failures = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    @property
+    def mean(self):
+        """The mean latency of the queries, in seconds."""
+        return 0.0 if self.count == 0 else self.total / self.count
+
+    def record(self, latency, failed):
+        """Record a query that took `latency` seconds."""
+        self.count += 1
+        self.total += latency
+        self.maximum = max(self.maximum, latency)
+        if failed:
+            self.failures += 1
+
+
+class PowerStateReporter:
+    """Reports nodes' power states to the region in batches.
+
+    A power state is only reported when it differs from the state that the
+    region or this reporter last knew of, or when it has not been reported
+    for `heartbeat` seconds. States are held until `flush` is called, which
+    reports them all in a single `UpdateNodePowerStates` call.
+    """
+
+    def __init__(self, heartbeat=POWER_STATE_HEARTBEAT, clock=reactor):
+        super(PowerStateReporter, self).__init__()
+        self.heartbeat = heartbeat
+        self.clock = clock
+        # Map of system_id to (power state, time reported).
+        self.states = {}
+        # Map of system_id to power state, waiting to be reported.
+        self.pending = {}
+
+    def update(self, node, state):
+        """Note that `node` is in `state`, reporting it later if needed."""
+        system_id = node['system_id']
+        last_state, last_reported = self.states.get(system_id, (None, None))
+        needs_report = (
+            state != node['power_state'] or
+            state != last_state or
+            self.clock.seconds() - last_reported >= self.heartbeat)
+        if needs_report:
+            self.pending[system_id] = state
+
+    def report(self, d, node):
+        """Report the result of a power query, as `report_power_state`.
+
+        :param d: A `Deferred` that will fire with the node's updated power
+            state, or an error condition. The callback/errback values are
+            passed through unaltered.
+        """
+        def cb(state):
+            self.update(node, state)
+            return state
+
+        def eb(failure):
+            self.update(node, 'error')
+            maaslog.error("%s: Power state could not be queried: %s" % (
+                node['hostname'], failure.getErrorMessage()))
+            d = send_node_event(
+                EVENT_TYPES.NODE_POWER_QUERY_FAILED,
+                node['system_id'], node['hostname'],
+                failure.getErrorMessage())
+            d.addCallback(lambda _: failure)
+            return d
+
+        return d.addCallbacks(cb, eb)
+
+    @inlineCallbacks
+    def flush(self, client):
+        """Report all pending power states to the region using `client`."""
+        pending, self.pending = self.pending, {}
+        if len(pending) == 0:
+            return
+        power_states = [
+            {"system_id": system_id, "power_state": state}
+            for system_id, state in pending.items()
+        ]
+        try:
+            yield client(UpdateNodePowerStates, power_states=power_states)
+        except UnhandledCommand:
+            # Region has not been upgraded to support the new call, so send
+            # the power states one at a time.
+            for power_state in power_states:
+                try:
+                    yield client(UpdateNodePowerState, **power_state)
+                except NoSuchNode:
+                    pass
+        reported = self.clock.seconds()
+        for system_id, state in pending.items():
+            self.states[system_id] = state, reported
+
+
+class PowerQueryScheduler:
+    """Schedules power queries for nodes.
+
+    Queries are run concurrently, up to the `max_query_concurrency` of each
+    power driver, so that slow BMCs of one type do not hold up queries to
+    BMCs of another. A node whose BMC fails to answer is not queried again
+    until a backoff period has passed; this period starts at `interval` and
+    doubles with each consecutive failure, up to `MAX_QUERY_BACKOFF`.
+
+    The latency of queries is recorded per power driver in `latency`.
+
+    Power states are reported with `reporter`, a `PowerStateReporter`, or
+    immediately with `report_power_state` when that is `None`.
+    """
+
+    def __init__(self, interval, clock=reactor, reporter=None):
+        super(PowerQueryScheduler, self).__init__()
+        self.interval = interval
+        self.clock = clock
+        self.reporter = reporter
+        self.semaphores = {}
+        self.latency = defaultdict(PowerQueryLatency)
+        # Map of system_id to (consecutive failures, time of next query).
+        self.backoff = {}
+
+    def get_semaphore(self, power_type):
+        """Return the semaphore limiting queries for `power_type`."""
+        try:
+            return self.semaphores[power_type]
+        except KeyError:
+            power_driver = PowerDriverRegistry[power_type]
+            semaphore = DeferredSemaphore(power_driver.max_query_concurrency)
+            return self.semaphores.setdefault(power_type, semaphore)
+
+    def is_backing_off(self, system_id):
+        """Whether queries for `system_id` should be skipped for now."""
+        if system_id in self.backoff:
+            _, next_query = self.backoff[system_id]
+            return self.clock.seconds() < next_query
+        else:
+            return False
+
+    def record(self, node, latency, failed):
+        """Record the outcome of a power query for `node`."""
+        self.latency[node['power_type']].record(latency, failed)
+        system_id = node['system_id']
+        if failed:
+            failures, _ = self.backoff.get(system_id, (0, None))
+            delay = min(self.interval * (2 ** failures), MAX_QUERY_BACKOFF)
+            self.backoff[system_id] = (
+                failures + 1, self.clock.seconds() + delay)
+        else:
+            self.backoff.pop(system_id, None)
+
+    def query(self, node):
+        """Query the power state of `node`, when there is capacity to."""
+        if self.is_backing_off(node['system_id']):
+            log.debug(
+                "{hostname}: Skipping query power status, BMC has "
+                "recently failed to respond.", hostname=node['hostname'])
+            return succeed(None)
+        else:
+            semaphore = self.get_semaphore(node['power_type'])
+            return semaphore.run(
+                query_node, node, self.clock, self.record, self.reporter)
+
+
+def query_node(node, clock, record=None, reporter=None):
     """Calls `get_power_state` on the given node.
 
     Logs to maaslog as errors and power states change.
+
+    :param record: Optional callable, called with the node, the latency of
+        the query in seconds, and whether or not the query failed.
+    :param reporter: Optional `PowerStateReporter` with which to report the
+        power state. By default it is reported immediately.
     """
     if node['system_id'] in power_action_registry:
         log.debug(
@@ -443,26 +629,39 @@ def query_node(node, clock):
             hostname=node['hostname'])
         return succeed(None)
     else:
+        started = clock.seconds()
         d = get_power_state(
             node['system_id'], node['hostname'], node['power_type'],
             node['context'], clock=clock)
-        d = report_power_state(d, node['system_id'], node['hostname'])
+        if record is not None:
+            def record_query(result):
+                failed = isinstance(result, Failure)
+                record(node, clock.seconds() - started, failed)
+                return result
+            d.addBoth(record_query)
+        if reporter is None:
+            d = report_power_state(d, node['system_id'], node['hostname'])
+        else:
+            d = reporter.report(d, node)
         d.addCallbacks(
             partial(maaslog_report_success, node),
             partial(maaslog_report_failure, node))
         return d
 
 
-def query_all_nodes(nodes, max_concurrency=5, clock=reactor):
+def query_all_nodes(nodes, scheduler=None, clock=reactor):
     """Queries the given nodes for their power state.
 
     Nodes' states are reported back to the region.
 
+    :param scheduler: The `PowerQueryScheduler` with which to query the
+        nodes. By default a new scheduler is used for just these nodes.
     :return: A deferred, which fires once all nodes have been queried,
         successfully or not.
     """
-    semaphore = DeferredSemaphore(tokens=max_concurrency)
+    if scheduler is None:
+        scheduler = PowerQueryScheduler(interval=0, clock=clock)
     queries = (
-        semaphore.run(query_node, node, clock)
+        scheduler.query(node)
         for node in nodes if node['power_type'] in PowerDriverRegistry)
     return DeferredList(queries, consumeErrors=True)
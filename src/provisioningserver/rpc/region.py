@@ -30,14 +30,18 @@ __all__ = [
     "RequestNodeInfoByMACAddress",
     "SendEvent",
     "SendEventMACAddress",
+    "SendEvents",
     "UpdateInterfaces",
     "UpdateLastImageSync",
+    "UpdateLeases",
     "UpdateNodePowerState",
+    "UpdateNodePowerStates",
 ]
 
 from provisioningserver.rpc.arguments import (
     AmpList,
     Bytes,
+    CompressedAmpList,
     ParsedURL,
     StructureAsJSON,
 )
@@ -314,6 +318,23 @@ class UpdateNodePowerState(amp.Command):
     errors = {NoSuchNode: b"NoSuchNode"}
 
 
+class UpdateNodePowerStates(amp.Command):
+    """Update the power states of many nodes.
+
+    Unlike `UpdateNodePowerState`, nodes that do not exist are ignored.
+
+    :since: 2.5
+    """
+
+    arguments = [
+        (b"power_states", CompressedAmpList(
+            [(b"system_id", amp.Unicode()),
+             (b"power_state", amp.Unicode())])),
+    ]
+    response = []
+    errors = {}
+
+
 class RegisterEventType(amp.Command):
     """Register an event type.
 
@@ -371,6 +392,27 @@ class SendEventMACAddress(amp.Command):
     }
 
 
+class SendEvents(amp.Command):
+    """Send many events.
+
+    Each event has either a `system_id` or a `mac_address`. Events for nodes
+    that do not exist, or of types that have not been registered, are
+    ignored.
+
+    :since: 2.5
+    """
+
+    arguments = [
+        (b"events", CompressedAmpList(
+            [(b"system_id", amp.Unicode(optional=True)),
+             (b"mac_address", amp.Unicode(optional=True)),
+             (b"type_name", amp.Unicode()),
+             (b"description", amp.Unicode())])),
+    ]
+    response = []
+    errors = []
+
+
 class ReportForeignDHCPServer(amp.Command):
     """Report a foreign DHCP server on a rack controller's interface.
 
@@ -534,6 +576,31 @@ class UpdateLease(amp.Command):
     }
 
 
+class UpdateLeases(amp.Command):
+    """Report many DHCP lease updates from a cluster controller.
+
+    The updates are processed by the region in the order given, within a
+    single transaction. Each update is as for `UpdateLease`.
+
+    :since: 2.5
+    """
+    arguments = [
+        (b"cluster_uuid", amp.Unicode()),
+        (b"updates", CompressedAmpList(
+            [(b"action", amp.Unicode()),
+             (b"mac", amp.Unicode()),
+             (b"ip_family", amp.Unicode()),
+             (b"ip", amp.Unicode()),
+             (b"timestamp", amp.Integer()),
+             (b"lease_time", amp.Integer(optional=True)),
+             (b"hostname", amp.Unicode(optional=True))])),
+    ]
+    response = []
+    errors = {
+        NoSuchCluster: b"NoSuchCluster",
+    }
+
+
 class UpdateServices(amp.Command):
     """Report service statuses that are monitored on the rackd.
 
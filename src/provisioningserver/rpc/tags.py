@@ -5,6 +5,7 @@
 
 __all__ = [
     "evaluate_tag",
+    "get_tag_evaluation_pool",
 ]
 
 from apiclient.maas_client import (
@@ -12,11 +13,27 @@ from apiclient.maas_client import (
     MAASDispatcher,
     MAASOAuth,
 )
+import provisioningserver
 from provisioningserver.config import ClusterConfiguration
 from provisioningserver.tags import process_node_tags
 from provisioningserver.utils.twisted import synchronous
 
 
+def get_tag_evaluation_pool():
+    """Return the pool of worker processes to evaluate tags in.
+
+    :return: A `multiprocessing.pool.Pool`, or `None` if tags should be
+        evaluated in this process.
+    """
+    try:
+        service = provisioningserver.services.getServiceNamed(
+            "tag_evaluation")
+    except KeyError:
+        return None
+    else:
+        return service.pool
+
+
 @synchronous
 def evaluate_tag(
         system_id, nodes, tag_name, tag_definition, tag_nsmap, credentials):
@@ -37,4 +54,5 @@ def evaluate_tag(
     process_node_tags(
         rack_id=system_id, nodes=nodes,
         tag_name=tag_name, tag_definition=tag_definition,
-        tag_nsmap=tag_nsmap, client=client)
+        tag_nsmap=tag_nsmap, client=client,
+        pool=get_tag_evaluation_pool())
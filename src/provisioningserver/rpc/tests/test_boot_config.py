@@ -0,0 +1,120 @@
+# Copyright 2018 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for :py:module:`~provisioningserver.rpc.boot_config`."""
+
+__all__ = []
+
+from maastesting.factory import factory
+from maastesting.testcase import MAASTestCase
+from provisioningserver.rpc import boot_config
+from provisioningserver.rpc.boot_config import (
+    BootConfigCache,
+    invalidate_boot_config,
+)
+from twisted.internet.task import Clock
+
+
+def make_params(mac=None):
+    return {
+        "local_ip": factory.make_ipv4_address(),
+        "remote_ip": factory.make_ipv4_address(),
+        "arch": "amd64",
+        "subarch": "generic",
+        "mac": factory.make_mac_address() if mac is None else mac,
+    }
+
+
+class TestBootConfigCache(MAASTestCase):
+
+    def make_cache(self, ttl=30):
+        clock = Clock()
+        return BootConfigCache(ttl, clock), clock
+
+    def test_get_misses_when_empty(self):
+        cache, _ = self.make_cache()
+        self.assertIsNone(cache.get(make_params()))
+        self.assertEqual((0, 1), (cache.hits, cache.misses))
+
+    def test_get_hits_after_set(self):
+        cache, _ = self.make_cache()
+        params = make_params()
+        config = {"purpose": factory.make_name("purpose")}
+        cache.set(params, config)
+        self.assertEqual(config, cache.get(params))
+        self.assertEqual((1, 0), (cache.hits, cache.misses))
+
+    def test_get_returns_copy(self):
+        cache, _ = self.make_cache()
+        params = make_params()
+        cache.set(params, {"purpose": "xinstall"})
+        cache.get(params)["purpose"] = "local"
+        self.assertEqual({"purpose": "xinstall"}, cache.get(params))
+
+    def test_set_returns_config(self):
+        cache, _ = self.make_cache()
+        config = {"purpose": "xinstall"}
+        self.assertIs(config, cache.set(make_params(), config))
+
+    def test_get_ignores_mac_formatting(self):
+        cache, _ = self.make_cache()
+        mac = factory.make_mac_address("-").upper()
+        params = make_params(mac)
+        cache.set(params, {})
+        params = dict(params, mac=mac.lower().replace("-", ":"))
+        self.assertIsNotNone(cache.get(params))
+
+    def test_get_keyed_on_all_params(self):
+        cache, _ = self.make_cache()
+        params = make_params()
+        cache.set(params, {})
+        self.assertIsNone(
+            cache.get(dict(params, remote_ip=factory.make_ipv4_address())))
+        self.assertIsNone(cache.get(dict(params, arch="arm64")))
+        self.assertIsNone(cache.get(dict(params, subarch="hwe-18.04")))
+
+    def test_get_misses_after_ttl(self):
+        cache, clock = self.make_cache(ttl=30)
+        params = make_params()
+        cache.set(params, {})
+        clock.advance(29)
+        self.assertIsNotNone(cache.get(params))
+        clock.advance(1)
+        self.assertIsNone(cache.get(params))
+        self.assertEqual(0, len(cache))
+
+    def test_set_purges_expired_entries(self):
+        cache, clock = self.make_cache(ttl=30)
+        cache.set(make_params(), {})
+        clock.advance(30)
+        cache.set(make_params(), {})
+        self.assertEqual(1, len(cache))
+
+    def test_invalidate_drops_macs(self):
+        cache, _ = self.make_cache()
+        mac = factory.make_mac_address()
+        params = make_params(mac)
+        other = make_params()
+        cache.set(params, {})
+        cache.set(other, {})
+        cache.invalidate([mac.upper()])
+        self.assertIsNone(cache.get(params))
+        self.assertIsNotNone(cache.get(other))
+
+    def test_invalidate_drops_all_without_macs(self):
+        cache, _ = self.make_cache()
+        cache.set(make_params(), {})
+        cache.set(make_params(), {})
+        cache.invalidate([])
+        self.assertEqual(0, len(cache))
+
+
+class TestInvalidateBootConfig(MAASTestCase):
+
+    def test_invalidates_module_cache(self):
+        cache = BootConfigCache()
+        self.patch(boot_config, "boot_config_cache", cache)
+        params = make_params()
+        cache.set(params, {})
+        invalidate_boot_config([params["mac"]])
+        self.assertEqual(0, len(cache))
@@ -400,6 +400,27 @@ class TestClusterProtocol_IsImportBootImagesRunning(MAASTestCase):
         self.assertEqual({"running": True}, response)
 
 
+class TestClusterProtocol_InvalidateBootConfig(MAASTestCase):
+
+    run_tests_with = MAASTwistedRunTest.make_factory(timeout=5)
+
+    def test_invalidate_boot_config_is_registered(self):
+        protocol = Cluster()
+        responder = protocol.locateResponder(
+            cluster.InvalidateBootConfig.commandName)
+        self.assertIsNotNone(responder)
+
+    @inlineCallbacks
+    def test_invalidate_boot_config_invalidates_macs(self):
+        invalidate_boot_config = self.patch(
+            clusterservice, "invalidate_boot_config")
+        macs = [factory.make_mac_address() for _ in range(3)]
+        response = yield call_responder(
+            Cluster(), cluster.InvalidateBootConfig, {"macs": macs})
+        self.assertEqual({}, response)
+        self.assertThat(invalidate_boot_config, MockCalledOnceWith(macs))
+
+
 class TestClusterProtocol_DescribePowerTypes(MAASTestCase):
 
     run_tests_with = MAASTwistedRunTest.make_factory(timeout=5)
@@ -54,6 +54,7 @@ from testtools.deferredruntest import assert_fails_with
 from testtools.matchers import (
     Equals,
     IsInstance,
+    MatchesStructure,
     Not,
 )
 from twisted.internet import reactor
@@ -66,6 +67,7 @@ from twisted.internet.defer import (
     succeed,
 )
 from twisted.internet.task import Clock
+from twisted.protocols.amp import UnhandledCommand
 from twisted.python.failure import Failure
 
 
@@ -1179,3 +1181,224 @@ class TestPowerQueryAsync(MAASTestCase):
         self.assertEqual(
             [(True, node1['power_state']), (True, node2['power_state'])],
             results)
+
+    @inlineCallbacks
+    def test_query_all_nodes_limits_concurrency_per_power_driver(self):
+        ipmi_nodes = [self.make_node(power_type='ipmi') for _ in range(3)]
+        virsh_nodes = [self.make_node(power_type='virsh') for _ in range(3)]
+        self.patch(PowerDriverRegistry['ipmi'], 'max_query_concurrency', 3)
+        self.patch(PowerDriverRegistry['virsh'], 'max_query_concurrency', 1)
+        queries = {
+            node['system_id']: Deferred()
+            for node in ipmi_nodes + virsh_nodes
+        }
+        get_power_state = self.patch(power, 'get_power_state')
+        get_power_state.side_effect = (
+            lambda system_id, *args, **kwargs: queries[system_id])
+        suppress_reporting(self)
+
+        d = power.query_all_nodes(ipmi_nodes + virsh_nodes)
+        # All of the IPMI nodes are being queried, but only one virsh node.
+        self.assertItemsEqual(
+            [node['system_id'] for node in ipmi_nodes + virsh_nodes[:1]],
+            [args[0] for args, _ in get_power_state.call_args_list])
+        for query in queries.values():
+            if not query.called:
+                query.callback('on')
+        yield d
+        self.assertEqual(6, get_power_state.call_count)
+
+
+class TestPowerQueryScheduler(MAASTestCase):
+
+    run_tests_with = MAASTwistedRunTest.make_factory(timeout=5)
+
+    def make_node(self, power_type='ipmi'):
+        return {
+            'context': {},
+            'hostname': factory.make_name('hostname'),
+            'power_state': 'on',
+            'power_type': power_type,
+            'system_id': factory.make_name('system_id'),
+        }
+
+    def test_get_semaphore_uses_driver_max_query_concurrency(self):
+        scheduler = power.PowerQueryScheduler(15, Clock())
+        semaphore = scheduler.get_semaphore('ipmi')
+        self.assertEqual(
+            PowerDriverRegistry['ipmi'].max_query_concurrency,
+            semaphore.limit)
+        self.assertIs(semaphore, scheduler.get_semaphore('ipmi'))
+
+    def test_record_backs_off_exponentially_after_failures(self):
+        clock = Clock()
+        scheduler = power.PowerQueryScheduler(15, clock)
+        node = self.make_node()
+        scheduler.record(node, 1.0, failed=True)
+        self.assertTrue(scheduler.is_backing_off(node['system_id']))
+        clock.advance(15)
+        self.assertFalse(scheduler.is_backing_off(node['system_id']))
+        scheduler.record(node, 1.0, failed=True)
+        clock.advance(15)
+        self.assertTrue(scheduler.is_backing_off(node['system_id']))
+        clock.advance(15)
+        self.assertFalse(scheduler.is_backing_off(node['system_id']))
+
+    def test_record_caps_backoff(self):
+        clock = Clock()
+        scheduler = power.PowerQueryScheduler(15, clock)
+        node = self.make_node()
+        for _ in range(30):
+            scheduler.record(node, 1.0, failed=True)
+        clock.advance(power.MAX_QUERY_BACKOFF)
+        self.assertFalse(scheduler.is_backing_off(node['system_id']))
+
+    def test_record_success_resets_backoff(self):
+        scheduler = power.PowerQueryScheduler(15, Clock())
+        node = self.make_node()
+        scheduler.record(node, 1.0, failed=True)
+        scheduler.record(node, 1.0, failed=False)
+        self.assertFalse(scheduler.is_backing_off(node['system_id']))
+
+    def test_record_tracks_latency_per_power_type(self):
+        scheduler = power.PowerQueryScheduler(15, Clock())
+        scheduler.record(self.make_node('ipmi'), 1.0, failed=False)
+        scheduler.record(self.make_node('ipmi'), 3.0, failed=True)
+        scheduler.record(self.make_node('virsh'), 2.0, failed=False)
+        self.assertThat(
+            scheduler.latency['ipmi'], MatchesStructure.byEquality(
+                count=2, failures=1, total=4.0, maximum=3.0, mean=2.0))
+        self.assertThat(
+            scheduler.latency['virsh'], MatchesStructure.byEquality(
+                count=1, failures=0, total=2.0, maximum=2.0, mean=2.0))
+
+    def test_query_records_latency_and_failure(self):
+        clock = Clock()
+        scheduler = power.PowerQueryScheduler(15, clock)
+        node = self.make_node()
+        query = Deferred()
+        self.patch(power, 'get_power_state').return_value = query
+        suppress_reporting(self)
+        d = scheduler.query(node)
+        clock.advance(2)
+        with FakeLogger("maas.power"):
+            query.errback(PowerError(factory.make_name("error")))
+        self.assertIsNone(extract_result(d))
+        self.assertThat(
+            scheduler.latency['ipmi'], MatchesStructure.byEquality(
+                count=1, failures=1, total=2.0))
+        self.assertTrue(scheduler.is_backing_off(node['system_id']))
+
+    def test_query_skips_nodes_backing_off(self):
+        scheduler = power.PowerQueryScheduler(15, Clock())
+        node = self.make_node()
+        scheduler.record(node, 1.0, failed=True)
+        get_power_state = self.patch(power, 'get_power_state')
+        self.assertIsNone(extract_result(scheduler.query(node)))
+        self.assertThat(get_power_state, MockNotCalled())
+
+
+class TestPowerStateReporter(MAASTestCase):
+
+    run_tests_with = MAASTwistedRunTest.make_factory(timeout=5)
+
+    def make_node(self, power_state='on'):
+        return {
+            'context': {},
+            'hostname': factory.make_name('hostname'),
+            'power_state': power_state,
+            'power_type': 'ipmi',
+            'system_id': factory.make_name('system_id'),
+        }
+
+    def test_update_reports_state_not_known_to_region(self):
+        reporter = power.PowerStateReporter(clock=Clock())
+        node = self.make_node('on')
+        reporter.update(node, 'off')
+        self.assertEqual({node['system_id']: 'off'}, reporter.pending)
+
+    def test_update_reports_state_not_reported_before(self):
+        reporter = power.PowerStateReporter(clock=Clock())
+        node = self.make_node('on')
+        reporter.update(node, 'on')
+        self.assertEqual({node['system_id']: 'on'}, reporter.pending)
+
+    def test_update_skips_unchanged_state(self):
+        clock = Clock()
+        reporter = power.PowerStateReporter(heartbeat=60, clock=clock)
+        node = self.make_node('on')
+        reporter.states[node['system_id']] = ('on', clock.seconds())
+        clock.advance(59)
+        reporter.update(node, 'on')
+        self.assertEqual({}, reporter.pending)
+
+    def test_update_reports_unchanged_state_after_heartbeat(self):
+        clock = Clock()
+        reporter = power.PowerStateReporter(heartbeat=60, clock=clock)
+        node = self.make_node('on')
+        reporter.states[node['system_id']] = ('on', clock.seconds())
+        clock.advance(60)
+        reporter.update(node, 'on')
+        self.assertEqual({node['system_id']: 'on'}, reporter.pending)
+
+    def test_report_notes_error_on_failure(self):
+        reporter = power.PowerStateReporter(clock=Clock())
+        node = self.make_node('on')
+        send_node_event = self.patch(power, 'send_node_event')
+        send_node_event.return_value = succeed(None)
+        error_message = factory.make_name("error")
+        with FakeLogger("maas.power"):
+            d = reporter.report(fail(PowerError(error_message)), node)
+        self.assertRaises(PowerError, extract_result, d)
+        self.assertEqual({node['system_id']: 'error'}, reporter.pending)
+        self.assertThat(send_node_event, MockCalledOnceWith(
+            EVENT_TYPES.NODE_POWER_QUERY_FAILED, node['system_id'],
+            node['hostname'], error_message))
+
+    def test_flush_sends_pending_states_in_one_call(self):
+        clock = Clock()
+        reporter = power.PowerStateReporter(clock=clock)
+        node1, node2 = self.make_node(), self.make_node()
+        reporter.update(node1, 'off')
+        reporter.update(node2, 'on')
+        client = MagicMock()
+        client.return_value = succeed({})
+        extract_result(reporter.flush(client))
+        self.assertThat(client, MockCalledOnceWith(
+            region.UpdateNodePowerStates, power_states=[
+                {"system_id": node1['system_id'], "power_state": 'off'},
+                {"system_id": node2['system_id'], "power_state": 'on'},
+            ]))
+        self.assertEqual({}, reporter.pending)
+        self.assertEqual({
+            node1['system_id']: ('off', clock.seconds()),
+            node2['system_id']: ('on', clock.seconds()),
+        }, reporter.states)
+
+    def test_flush_does_nothing_when_nothing_pending(self):
+        reporter = power.PowerStateReporter(clock=Clock())
+        client = MagicMock()
+        extract_result(reporter.flush(client))
+        self.assertThat(client, MockNotCalled())
+
+    def test_flush_falls_back_to_UpdateNodePowerState(self):
+        reporter = power.PowerStateReporter(clock=Clock())
+        node1, node2 = self.make_node(), self.make_node()
+        reporter.update(node1, 'off')
+        reporter.update(node2, 'on')
+        client = MagicMock()
+        client.side_effect = [
+            fail(UnhandledCommand()),
+            fail(exceptions.NoSuchNode()),
+            succeed({}),
+        ]
+        extract_result(reporter.flush(client))
+        self.assertThat(client, MockCallsMatch(
+            call(region.UpdateNodePowerStates, power_states=ANY),
+            call(
+                region.UpdateNodePowerState,
+                system_id=node1['system_id'], power_state='off'),
+            call(
+                region.UpdateNodePowerState,
+                system_id=node2['system_id'], power_state='on'),
+        ))
@@ -18,6 +18,10 @@ from apiclient.maas_client import (
 from maastesting.factory import factory
 from maastesting.matchers import MockCalledOnceWith
 from maastesting.testcase import MAASTestCase
+import provisioningserver
+from provisioningserver.rackdservices.tag_evaluation import (
+    TagEvaluationService,
+)
 from provisioningserver.rpc import tags
 from provisioningserver.testing.config import ClusterConfigurationFixture
 
@@ -41,7 +45,16 @@ class TestEvaluateTag(MAASTestCase):
                 nodes=[], rack_id=rack_id,
                 tag_name=sentinel.tag_name,
                 tag_definition=sentinel.tag_definition,
-                tag_nsmap=sentinel.tag_nsmap, client=ANY))
+                tag_nsmap=sentinel.tag_nsmap, client=ANY, pool=None))
+
+    def test__passes_tag_evaluation_pool(self):
+        self.patch(tags, "get_tag_evaluation_pool").return_value = (
+            sentinel.pool)
+        process_node_tags = self.patch_autospec(tags, "process_node_tags")
+        tags.evaluate_tag(
+            factory.make_name('rack'), [], sentinel.tag_name,
+            sentinel.tag_definition, sentinel.tag_nsmap, ("a", "b", "c"))
+        self.assertIs(sentinel.pool, process_node_tags.call_args[1]["pool"])
 
     def test__constructs_client_with_credentials(self):
         consumer_key = factory.make_name("ckey")
@@ -64,3 +77,17 @@ class TestEvaluateTag(MAASTestCase):
         self.assertIsInstance(client.auth, MAASOAuth)
         self.assertThat(tags.MAASOAuth, MockCalledOnceWith(
             consumer_key, resource_token, resource_secret))
+
+
+class TestGetTagEvaluationPool(MAASTestCase):
+
+    def test__returns_pool_of_service(self):
+        service = TagEvaluationService(1)
+        service.pool = sentinel.pool
+        service.setName("tag_evaluation")
+        service.setServiceParent(provisioningserver.services)
+        self.addCleanup(service.disownServiceParent)
+        self.assertIs(sentinel.pool, tags.get_tag_evaluation_pool())
+
+    def test__returns_None_without_service(self):
+        self.assertIsNone(tags.get_tag_evaluation_pool())
@@ -4,15 +4,22 @@
 """Cluster-side evaluation of tags."""
 
 __all__ = [
+    'compile_xpath',
     'merge_details',
+    'merge_details_cached',
     'merge_details_cleanly',
     'process_node_tags',
     ]
 
 from collections import OrderedDict
-from functools import partial
+from functools import (
+    lru_cache,
+    partial,
+)
+import hashlib
 import http.client
 import json
+import threading
 import urllib.error
 import urllib.parse
 import urllib.request
@@ -38,6 +45,14 @@ maaslog = get_maas_logger("tag_processing")
 # face of it, appears excessive.
 DEFAULT_BATCH_SIZE = 100
 
+# The number of merged details documents kept by `merged_details_cache`. A
+# parsed document takes a few times the size of its XML, so this is bounded
+# at a few hundred megabytes.
+DETAILS_CACHE_SIZE = 500
+
+# The number of compiled tag definitions kept by `compile_xpath`.
+XPATH_CACHE_SIZE = 1000
+
 
 def process_response(response):
     """All responses should be httplib.OK.
@@ -227,6 +242,89 @@ def merge_details_cleanly(details):
     return _details_do_merge(details, root)
 
 
+def get_details_key(details):
+    """Return a hash of `details` that identifies its merged document.
+
+    :param details: A dict of details, as passed to `merge_details`.
+    :return: A hex digest.
+    """
+    digest = hashlib.sha256()
+    for namespace in sorted(details):
+        xmldata = details[namespace]
+        digest.update(namespace.encode("utf-8") + b"\0")
+        if xmldata is None:
+            digest.update(b"-\0")
+        else:
+            if isinstance(xmldata, str):
+                xmldata = xmldata.encode("utf-8")
+            digest.update(b"%d\0" % len(xmldata))
+            digest.update(xmldata)
+    return digest.hexdigest()
+
+
+class MergedDetailsCache:
+    """A bounded cache of the documents made by `merge_details`.
+
+    Documents are keyed by a hash of the details they were merged from, so
+    a node's document is parsed again only once its details change. The
+    least recently used documents are discarded first. The documents must
+    not be modified.
+    """
+
+    def __init__(self, size=DETAILS_CACHE_SIZE):
+        super(MergedDetailsCache, self).__init__()
+        self.size = size
+        self.docs = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, details):
+        """Return the merged document for `details`."""
+        key = get_details_key(details)
+        with self.lock:
+            doc = self.docs.get(key)
+            if doc is not None:
+                self.docs.move_to_end(key)
+                return doc
+        doc = merge_details(details)
+        with self.lock:
+            self.docs[key] = doc
+            while len(self.docs) > self.size:
+                self.docs.popitem(last=False)
+        return doc
+
+    def clear(self):
+        with self.lock:
+            self.docs.clear()
+
+
+# The merged details documents of this process.
+merged_details_cache = MergedDetailsCache()
+
+
+def merge_details_cached(details):
+    """Merge node details into a single XML document, from a cache.
+
+    This is `merge_details`, but the document is shared with every other
+    caller that merges the same details, so it must not be modified.
+    """
+    return merged_details_cache.get(details)
+
+
+@lru_cache(maxsize=XPATH_CACHE_SIZE)
+def _compile_xpath(definition, namespaces):
+    return etree.XPath(definition, namespaces=dict(namespaces))
+
+
+def compile_xpath(definition, namespaces):
+    """Compile the XPath expression `definition`, from a cache.
+
+    :param namespaces: A dict mapping prefixes to namespace URIs.
+    :raise etree.XPathSyntaxError: If `definition` is not valid.
+    :rtype: `etree.XPath`
+    """
+    return _compile_xpath(definition, tuple(sorted(namespaces.items())))
+
+
 def gen_batch_slices(count, size):
     """Generate `slice`s to split `count` objects into batches.
 
@@ -268,14 +366,64 @@ def gen_node_details(client, batches):
 
     :return: An iterator of ``(system-id, details-document)`` tuples.
     """
+    for system_id, details in gen_unmerged_node_details(client, batches):
+        yield system_id, merge_details_cached(details)
+
+
+def gen_unmerged_node_details(client, batches):
+    """Fetch node details, as returned by the region.
+
+    :return: An iterator of ``(system-id, details)`` tuples.
+    """
     get_details = partial(get_details_for_nodes, client)
     for batch in batches:
-        for system_id, details in get_details(batch).items():
-            yield system_id, merge_details(details)
+        yield from get_details(batch).items()
+
+
+def match_details(definition, namespaces, details):
+    """Does the tag `definition` match the merged `details`?
+
+    This is called in the worker processes of `classify_in_processes`.
+    """
+    xpath = compile_xpath(definition, namespaces)
+    return try_match_xpath(
+        xpath, merge_details_cached(details), logger=maaslog)
+
+
+def classify_in_processes(
+        definition, namespaces, node_details, pool, batch_size):
+    """Classify nodes by whether `definition` matches, in `pool`.
+
+    The details are merged and matched by a pool of worker processes, a
+    batch at a time, so that parsing the XML of many nodes can use more
+    than one CPU.
+
+    :param node_details: An iterable of ``(system-id, details)`` tuples.
+    :param pool: A `multiprocessing.pool.Pool`.
+    :return: A ``(matched, other)`` tuple of lists of system IDs.
+    """
+    matched, other = [], []
+    match = partial(match_details, definition, namespaces)
+    batch = []
+    for item in node_details:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            _classify_batch(pool, match, batch, matched, other)
+            batch = []
+    _classify_batch(pool, match, batch, matched, other)
+    return matched, other
+
+
+def _classify_batch(pool, match, batch, matched, other):
+    system_ids = [system_id for system_id, _ in batch]
+    results = pool.map(match, [details for _, details in batch])
+    for system_id, result in zip(system_ids, results):
+        bucket = matched if result else other
+        bucket.append(system_id)
 
 
 def process_all(client, rack_id, tag_name, tag_definition, system_ids,
-                xpath, batch_size=None):
+                xpath, batch_size=None, tag_nsmap=None, pool=None):
     log.debug(
         "Processing {nums} system_ids for tag {name}.",
         nums=len(system_ids), name=tag_name)
@@ -284,9 +432,15 @@ def process_all(client, rack_id, tag_name, tag_definition, system_ids,
         batch_size = DEFAULT_BATCH_SIZE
 
     batches = gen_batches(system_ids, batch_size)
-    node_details = gen_node_details(client, batches)
-    nodes_matched, nodes_unmatched = classify(
-        partial(try_match_xpath, xpath, logger=maaslog), node_details)
+    if pool is not None:
+        nodes_matched, nodes_unmatched = classify_in_processes(
+            tag_definition, tag_nsmap,
+            gen_unmerged_node_details(client, batches),
+            pool, batch_size)
+    else:
+        node_details = gen_node_details(client, batches)
+        nodes_matched, nodes_unmatched = classify(
+            partial(try_match_xpath, xpath, logger=maaslog), node_details)
     post_updated_nodes(
         client, rack_id, tag_name, tag_definition,
         nodes_matched, nodes_unmatched)
@@ -294,7 +448,7 @@ def process_all(client, rack_id, tag_name, tag_definition, system_ids,
 
 def process_node_tags(
         rack_id, nodes, tag_name, tag_definition, tag_nsmap,
-        client, batch_size=None):
+        client, batch_size=None, pool=None):
     """Update the nodes for a new/changed tag definition.
 
     :param rack_id: System ID for the rack controller.
@@ -304,14 +458,16 @@ def process_node_tags(
     :param tag_name: Name of the tag to update nodes for
     :param tag_definition: Tag definition
     :param batch_size: Size of batch
+    :param pool: A `multiprocessing.pool.Pool` of worker processes to
+        evaluate the tag in, or `None` to evaluate it in this process.
     """
     # We evaluate this early, so we can fail before sending a bunch of data to
     # the server
-    xpath = etree.XPath(tag_definition, namespaces=tag_nsmap)
+    xpath = compile_xpath(tag_definition, tag_nsmap)
     system_ids = [
         node["system_id"]
         for node in nodes
     ]
     process_all(
         client, rack_id, tag_name, tag_definition, system_ids, xpath,
-        batch_size=batch_size)
+        batch_size=batch_size, tag_nsmap=tag_nsmap, pool=pool)
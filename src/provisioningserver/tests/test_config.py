@@ -662,6 +662,17 @@ class TestClusterConfiguration(MAASTestCase):
         # It's also stored in the configuration database.
         self.assertEqual({"cluster_uuid": str(example_uuid)}, config.store)
 
+    def test_default_tag_processes(self):
+        config = ClusterConfiguration({})
+        self.assertEqual(1, config.tag_processes)
+
+    def test_set_and_get_tag_processes(self):
+        config = ClusterConfiguration({})
+        config.tag_processes = 4
+        self.assertEqual(4, config.tag_processes)
+        # It's also stored in the configuration database.
+        self.assertEqual({"tag_processes": 4}, config.store)
+
 
 class TestClusterConfigurationGRUBRoot(MAASTestCase):
     """Tests for `ClusterConfiguration.grub_root`."""
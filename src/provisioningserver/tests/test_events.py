@@ -32,8 +32,10 @@ from provisioningserver.events import (
     send_node_event_mac_address,
     send_rack_event,
 )
+from provisioningserver import events
 from provisioningserver.rpc import region
 from provisioningserver.rpc.exceptions import (
+    NoConnectionsAvailable,
     NoSuchEventType,
     NoSuchNode,
 )
@@ -49,6 +51,7 @@ from testtools.matchers import (
     IsInstance,
 )
 from twisted.internet.defer import (
+    DeferredList,
     fail,
     inlineCallbacks,
     succeed,
@@ -278,3 +281,89 @@ class TestSendEventMACAddress(MAASTestCase):
             yield event_hub.logByMAC(event_name, mac_address, description)
         # The event has been removed from the cache.
         self.assertThat(event_hub._types_registered, HasLength(0))
+
+
+class TestNodeEventHubSendEvents(MAASTestCase):
+    """Tests for batching of events by `NodeEventHub`."""
+
+    run_tests_with = MAASTwistedRunTest.make_factory(timeout=5)
+
+    def patch_rpc_methods(self):
+        fixture = self.useFixture(MockLiveClusterToRegionRPCFixture())
+        protocol, connecting = fixture.makeEventLoop(
+            region.SendEvents, region.RegisterEventType)
+        return protocol, connecting
+
+    def make_event(self, system_id=None, mac_address=None):
+        return {
+            "system_id": system_id, "mac_address": mac_address,
+            "type_name": random.choice(list(map_enum(EVENT_TYPES))),
+            "description": factory.make_name("description"),
+        }
+
+    def log(self, event_hub, event):
+        if event["system_id"] is None:
+            return event_hub.logByMAC(
+                event["type_name"], event["mac_address"],
+                event["description"])
+        else:
+            return event_hub.logByID(
+                event["type_name"], event["system_id"],
+                event["description"])
+
+    @inlineCallbacks
+    def test__events_logged_while_sending_are_sent_together(self):
+        protocol, connecting = self.patch_rpc_methods()
+        self.addCleanup((yield connecting))
+        event_hub = NodeEventHub()
+        event_hub._types_registered.update(map_enum(EVENT_TYPES).values())
+
+        node_events = [
+            self.make_event(system_id=factory.make_name("system_id")),
+            self.make_event(mac_address=factory.make_mac_address()),
+            self.make_event(system_id=factory.make_name("system_id")),
+        ]
+        results = yield DeferredList(
+            [self.log(event_hub, event) for event in node_events],
+            fireOnOneErrback=True)
+
+        self.assertEqual([(True, None)] * 3, results)
+        # The first event is sent at once; the others are held until the
+        # region has responded, then sent together.
+        self.assertEqual(
+            [[node_events[0]], node_events[1:]],
+            [call[1]["events"] for call in protocol.SendEvents.call_args_list])
+        self.assertFalse(event_hub._sending)
+
+    @inlineCallbacks
+    def test__events_are_sent_in_batches_of_limited_size(self):
+        self.patch(events, "EVENTS_BATCH_SIZE", 2)
+        protocol, connecting = self.patch_rpc_methods()
+        self.addCleanup((yield connecting))
+        event_hub = NodeEventHub()
+        event_hub._types_registered.update(map_enum(EVENT_TYPES).values())
+
+        node_events = [
+            self.make_event(system_id=factory.make_name("system_id"))
+            for _ in range(4)
+        ]
+        yield DeferredList(
+            [self.log(event_hub, event) for event in node_events],
+            fireOnOneErrback=True)
+
+        self.assertEqual(
+            [node_events[:1], node_events[1:3], node_events[3:]],
+            [call[1]["events"] for call in protocol.SendEvents.call_args_list])
+
+    @inlineCallbacks
+    def test__failure_is_passed_to_each_event(self):
+        getRegionClient = self.patch(events, "getRegionClient")
+        getRegionClient.side_effect = NoConnectionsAvailable()
+        event_hub = NodeEventHub()
+        event_hub._types_registered.update(map_enum(EVENT_TYPES).values())
+
+        event = self.make_event(system_id=factory.make_name("system_id"))
+        with ExpectedException(NoConnectionsAvailable):
+            yield self.log(event_hub, event)
+        self.assertThat(event_hub._pending, HasLength(0))
+        self.assertFalse(event_hub._sending)
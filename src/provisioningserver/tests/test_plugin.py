@@ -41,6 +41,9 @@ from provisioningserver.rackdservices.node_power_monitor_service import (
 from provisioningserver.rackdservices.service_monitor_service import (
     ServiceMonitorService,
 )
+from provisioningserver.rackdservices.tag_evaluation import (
+    TagEvaluationService,
+)
 from provisioningserver.rackdservices.tftp import (
     TFTPBackend,
     TFTPService,
@@ -110,7 +113,7 @@ class TestProvisioningServiceMaker(MAASTestCase):
         expected_services = [
             "dhcp_probe", "networks_monitor", "image_download",
             "lease_socket_service", "node_monitor", "ntp", "rpc", "rpc-ping",
-            "tftp", "image_service", "service_monitor",
+            "tftp", "image_service", "service_monitor", "tag_evaluation",
             ]
         self.assertThat(service.namedServices, KeysEqual(*expected_services))
         self.assertEqual(
@@ -134,7 +137,7 @@ class TestProvisioningServiceMaker(MAASTestCase):
         expected_services = [
             "dhcp_probe", "networks_monitor", "image_download",
             "lease_socket_service", "node_monitor", "ntp", "rpc", "rpc-ping",
-            "tftp", "image_service", "service_monitor",
+            "tftp", "image_service", "service_monitor", "tag_evaluation",
             ]
         self.assertThat(service.namedServices, KeysEqual(*expected_services))
         self.assertEqual(
@@ -260,3 +263,12 @@ class TestProvisioningServiceMaker(MAASTestCase):
         service = service_maker.makeService(options, clock=None)
         lease_socket_service = service.getServiceNamed("lease_socket_service")
         self.assertIsInstance(lease_socket_service, LeaseSocketService)
+
+    def test_tag_evaluation_service(self):
+        self.useFixture(ClusterConfigurationFixture(tag_processes=3))
+        options = Options()
+        service_maker = ProvisioningServiceMaker("Harry", "Hill")
+        service = service_maker.makeService(options, clock=None)
+        tag_evaluation = service.getServiceNamed("tag_evaluation")
+        self.assertIsInstance(tag_evaluation, TagEvaluationService)
+        self.assertEqual(3, tag_evaluation.processes)
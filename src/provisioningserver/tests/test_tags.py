@@ -9,6 +9,7 @@ import doctest
 import http.client
 from itertools import chain
 import json
+from multiprocessing.pool import ThreadPool
 from textwrap import dedent
 from unittest.mock import (
     call,
@@ -352,6 +353,82 @@ class TestMergeDetails(TestMergeDetailsCleanly):
             self.logger.output)
 
 
+class TestMergedDetailsCache(MAASTestCase):
+
+    def test_get_details_key_depends_on_content(self):
+        details = {"lshw": b"<list />", "lldp": None}
+        self.assertEqual(
+            tags.get_details_key(details),
+            tags.get_details_key(dict(details)))
+        self.assertNotEqual(
+            tags.get_details_key(details),
+            tags.get_details_key({"lshw": b"<list />", "lldp": b""}))
+        self.assertNotEqual(
+            tags.get_details_key(details),
+            tags.get_details_key({"lshw": b"<list/>", "lldp": None}))
+
+    def test_get_merges_details_once(self):
+        merge_details = self.patch(tags, "merge_details")
+        merge_details.side_effect = lambda details: object()
+        cache = tags.MergedDetailsCache()
+        doc = cache.get({"lshw": b"<list />"})
+        self.assertIs(doc, cache.get({"lshw": b"<list />"}))
+        self.assertIsNot(doc, cache.get({"lshw": b"<node />"}))
+        self.assertEqual(2, merge_details.call_count)
+
+    def test_get_discards_least_recently_used(self):
+        cache = tags.MergedDetailsCache(size=2)
+        first = {"lshw": b"<first />"}
+        doc = cache.get(first)
+        cache.get({"lshw": b"<second />"})
+        self.assertIs(doc, cache.get(first))
+        cache.get({"lshw": b"<third />"})
+        self.assertEqual(2, len(cache.docs))
+        self.assertIn(tags.get_details_key(first), cache.docs)
+
+    def test_get_returns_merged_document(self):
+        details = {"lshw": b"<list><node /></list>"}
+        self.assertThat(
+            tags.MergedDetailsCache().get(details),
+            EqualsXML(tags.merge_details(details)))
+
+
+class TestCompileXPath(MAASTestCase):
+
+    def test_returns_compiled_expression(self):
+        xpath = tags.compile_xpath("//lshw:node", {"lshw": "lshw"})
+        self.assertIsInstance(xpath, etree.XPath)
+        self.assertEqual("//lshw:node", xpath.path)
+
+    def test_caches_expression(self):
+        definition = "//%s" % factory.make_name("node")
+        self.assertIs(
+            tags.compile_xpath(definition, {"a": "a", "b": "b"}),
+            tags.compile_xpath(definition, {"b": "b", "a": "a"}))
+
+    def test_raises_for_invalid_expression(self):
+        self.assertRaises(
+            etree.XPathSyntaxError, tags.compile_xpath, "//[", {})
+
+
+class TestClassifyInProcesses(MAASTestCase):
+
+    def test_classifies_details(self):
+        # Threads stand in for processes here.
+        pool = ThreadPool(2)
+        self.addCleanup(pool.terminate)
+        node_details = [
+            ("a", {"lshw": b"<node />"}),
+            ("b", {"lshw": b"<not-node />"}),
+            ("c", {"lshw": b"<parent><node /></parent>"}),
+        ]
+        self.assertEqual(
+            (["a", "c"], ["b"]),
+            tags.classify_in_processes(
+                "//lshw:node", {"lshw": "lshw"}, node_details,
+                pool=pool, batch_size=2))
+
+
 class TestGenBatchSlices(MAASTestCase):
 
     def test_batch_of_1_no_things(self):
@@ -451,6 +528,7 @@ class TestGenNodeDetails(MAASTestCase):
         self.patch(
             tags, "merge_details",
             lambda mapping: "merged:" + "+".join(mapping))
+        self.patch(tags, "merged_details_cache", tags.MergedDetailsCache())
 
     def test__generates_node_details(self):
         batches = [["s1", "s2"], ["s3"]]
@@ -19,8 +19,10 @@ __all__ = [
     'ip_range_within_network',
 ]
 
+from bisect import bisect_right
 import codecs
 from collections import namedtuple
+import heapq
 from operator import attrgetter
 import random
 import re
@@ -418,20 +420,40 @@ class MAASIPSet(set):
         (1) Ensuring range set is is sorted list of MAASIPRange objects.
         (2) De-duplicate set by combining overlapping IP ranges.
         (3) Combining adjacent ranges with an identical purpose.
+
+        The condensed ranges do not overlap, so the first address of each is
+        also kept in the sorted `_firsts` list, which `find` bisects.
         """
         self.ranges = _normalize_ipranges(self.ranges)
+        self._merge_condensed()
+
+    def _merge_condensed(self):
         self.ranges = _combine_overlapping_maasipranges(self.ranges)
         self.ranges = _coalesce_adjacent_purposes(self.ranges)
+        self._firsts = [item.first for item in self.ranges]
 
     def __ior__(self, other):
         """Return self |= other."""
-        self.ranges.extend(list(other.ranges))
-        self._condense()
+        if isinstance(other, MAASIPSet):
+            # Both lists of ranges are already sorted, so merge them.
+            self.ranges = list(heapq.merge(self.ranges, other.ranges))
+            self._merge_condensed()
+        else:
+            self.ranges.extend(list(other.ranges))
+            self._condense()
         # Replace the underlying set with the new ranges.
         super().clear()
         super().__ior__(set(self.ranges))
         return self
 
+    def _find_index(self, addr: int) -> Optional[int]:
+        """Return the index of the range containing the integer `addr`."""
+        index = bisect_right(self._firsts, addr) - 1
+        if index >= 0 and addr <= self.ranges[index].last:
+            return index
+        else:
+            return None
+
     def find(self, search) -> Optional[MAASIPRange]:
         """Searches the list of IPRange objects until it finds the specified
         search parameter, and returns the range it belongs to if found.
@@ -440,16 +462,14 @@ class MAASIPSet(set):
         within that range.)
         """
         if isinstance(search, IPRange):
-            for item in self.ranges:
-                if (item.first <= search.first <= item.last and
-                        item.first <= search.last <= item.last):
-                    return item
+            index = self._find_index(search.first)
+            if index is not None and search.last <= self.ranges[index].last:
+                return self.ranges[index]
         else:
             addr = IPAddress(search)
-            addr = int(addr)
-            for item in self.ranges:
-                if item.first <= addr <= item.last:
-                    return item
+            index = self._find_index(int(addr))
+            if index is not None:
+                return self.ranges[index]
         return None
 
     @property
@@ -599,7 +619,11 @@ class MAASIPSet(set):
 
     def get_full_range(self, outer_range):
         unused_ranges = self.get_unused_ranges(outer_range)
-        full_range = MAASIPSet(self | unused_ranges, cidr=outer_range)
+        # The unused ranges fill the gaps between the used ranges, and both
+        # are sorted, so they only need merging.
+        full_range = MAASIPSet(
+            list(heapq.merge(self.ranges, unused_ranges.ranges)),
+            cidr=outer_range)
         # The full_range should always contain at least one IP address.
         # However, in bug #1570606 we observed a situation where there were
         # no resulting ranges. This assert is just in case the fix didn't cover
@@ -882,6 +882,50 @@ class TestMAASIPSet(MAASTestCase):
         self.assertThat(str(IPAddress(s1.first)), Equals("10.0.0.1"))
         self.assertThat(str(IPAddress(s1.last)), Equals("10.0.0.8"))
 
+    def test__ior_combines_overlapping_ranges(self):
+        s1 = MAASIPSet([make_iprange('10.0.0.1', '10.0.0.10', purpose="foo")])
+        s2 = MAASIPSet([make_iprange('10.0.0.5', '10.0.0.20', purpose="bar")])
+        s1 |= s2
+        self.assertThat(s1.ranges, HasLength(1))
+        self.assertThat(s1['10.0.0.20'].purpose, Equals({"foo", "bar"}))
+        self.assertThat(s1, Not(Contains('10.0.0.21')))
+
+    def test__find_matches_linear_search_in_large_set(self):
+        # A /16 with thousands of static addresses and neighbours, as seen
+        # by Subnet.get_iprange_usage().
+        network = IPNetwork('10.1.0.0/16')
+        addresses = range(network.first + 1, network.last)
+        s = MAASIPSet([
+            make_iprange(ip, purpose="assigned-ip")
+            for ip in random.sample(addresses, 4000)
+        ])
+        s |= MAASIPSet([
+            make_iprange(ip, purpose="neighbour")
+            for ip in random.sample(addresses, 2000)
+        ])
+        full = s.get_full_range(network)
+        self.assertThat(
+            sum(item.num_addresses for item in full.ranges),
+            Equals(network.size - 2))
+        for ip in random.sample(addresses, 500):
+            expected = [
+                item for item in full.ranges
+                if item.first <= ip <= item.last
+            ]
+            self.assertThat([full.find(ip)], Equals(expected))
+        self.assertIsNone(full.find(network.first))
+        self.assertIsNone(full.find(network.last))
+
+    def test__find_range_must_be_within_one_range(self):
+        s = MAASIPSet([
+            make_iprange('10.0.0.1', '10.0.0.10', purpose="foo"),
+            make_iprange('10.0.0.11', '10.0.0.20', purpose="bar"),
+        ])
+        self.assertThat(
+            s.find(IPRange('10.0.0.11', '10.0.0.20')),
+            Equals(s.ranges[1]))
+        self.assertIsNone(s.find(IPRange('10.0.0.5', '10.0.0.15')))
+
 
 class TestIPRangeStatistics(MAASTestCase):
 